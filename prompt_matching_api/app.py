@@ -1,26 +1,224 @@
 from flask import Flask
+from typing import Any, Dict, Optional
+import argparse
+import functools
 import logging
-from src.controllers.prompt_controller import prompt_bp
+import os
+from src.controllers.prompt_controller import prompt_bp, PromptController
+from src.controllers.admin_controller import admin_bp
+from src.controllers.job_controller import job_bp
+from src.services.jobs import job_queue
+from src.services.prompt_service import PromptMatchingService
+from src.services.response_cache import ResponseCache, response_cache
+from src.services.templates import template_cache
+from src.services.tenants import tenant_registry
+from src.servers.admission import AdmissionMiddleware, admission_controller
+from src.servers.asgi_app import PromptMatchingASGIApp
+from src.servers.compression import CompressionMiddleware
+from src.servers.wsgi_app import PromptMatchingWSGIApp
+from src.utils.intake import streaming_intake
+from src.utils.logging_setup import configure_logging, log_stats, reinit_after_fork
+from src.utils.memory import MemoryTrackingMiddleware, memory_diagnostics
+from src.utils.metrics import ServerTimingMiddleware, metrics
+from src.utils.profiling import ProfilingMiddleware, profiler
 from config.config import Config
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
-def create_app():
-    """Application factory function."""
+# (owner, attribute, stage) timed when METRICS_ENABLED is set
+METRIC_STAGES = [
+    (PromptController, 'read_json', 'parse_json'),
+    (PromptMatchingWSGIApp, 'parse_json', 'parse_json'),
+    (PromptMatchingService, 'check_request', 'validate_request'),
+    # The memoized lookup, since find_prompt only runs on a memo miss
+    (ResponseCache, 'lookup', 'match_prompt'),
+    (PromptController, 'cached_response', 'serialize_response'),
+    (PromptMatchingWSGIApp, 'respond', 'serialize_response')
+]
+
+def collect_runtime_metrics():
+    """Expose logging and response memo counters alongside the stage metrics."""
+    yield "# HELP prompt_api_log_records_total Success-path log records by sampling outcome."
+    yield "# TYPE prompt_api_log_records_total counter"
+    for outcome, value in log_stats.snapshot().items():
+        yield f'prompt_api_log_records_total{{outcome="{outcome}"}} {value}'
+    
+    hits, misses, size = response_cache.memo_info()
+    yield "# HELP prompt_api_response_memo_lookups_total Response memo lookups by result."
+    yield "# TYPE prompt_api_response_memo_lookups_total counter"
+    yield f'prompt_api_response_memo_lookups_total{{result="hit"}} {hits}'
+    yield f'prompt_api_response_memo_lookups_total{{result="miss"}} {misses}'
+    yield "# HELP prompt_api_response_memo_entries Entries in the response memo."
+    yield "# TYPE prompt_api_response_memo_entries gauge"
+    yield f"prompt_api_response_memo_entries {size}"
+    
+    hits, misses, size = template_cache.info()
+    yield "# HELP prompt_api_template_cache_lookups_total Compiled template cache lookups by result."
+    yield "# TYPE prompt_api_template_cache_lookups_total counter"
+    yield f'prompt_api_template_cache_lookups_total{{result="hit"}} {hits}'
+    yield f'prompt_api_template_cache_lookups_total{{result="miss"}} {misses}'
+    
+    if tenant_registry.enabled:
+        yield from tenant_registry.metric_lines()
+    
+    if job_queue.enabled:
+        yield from job_queue.metric_lines()
+    
+    if admission_controller.enabled:
+        yield from admission_controller.metric_lines()
+    
+    if memory_diagnostics.enabled:
+        yield from memory_diagnostics.metric_lines()
+
+def configure_services(config: Dict[str, Any]) -> None:
+    """
+    Set up logging, rules, response cache and metrics shared by every front end.
+    
+    Args:
+        config: Application config mapping
+    """
+    # Configure non-blocking logging (background writer with rotation)
+    configure_logging(config)
+    
+    # Compile prompt rules once so requests only do index lookups
+    PromptMatchingService.rule_store.configure(config)
+    if config['RULES_WATCH_INTERVAL'] > 0:
+        PromptMatchingService.rule_store.start_watching(config['RULES_WATCH_INTERVAL'])
+    
+    # Pre-encode responses for every rule and error
+    response_cache.configure(config['RESPONSE_MEMO_SIZE'])
+    template_cache.configure(config['TEMPLATE_CACHE_SIZE'])
+    
+    # Tenant rule sets compile on first use into a bounded LRU
+    tenant_registry.configure(config)
+    
+    # Background job workers start on the first submission
+    job_queue.configure(config)
+    
+    # Incremental body parsing for large documents (off by default)
+    streaming_intake.configure(config)
+    
+    # Opt-in per-request profiling and memory diagnostics
+    profiler.configure(config)
+    memory_diagnostics.configure(config)
+    
+    # Concurrency and per-client rate limits in front of the match endpoints
+    admission_controller.configure(config)
+    
+    # Install stage timers only when metrics are enabled
+    metrics.configure(config['METRICS_ENABLED'], METRIC_STAGES)
+    metrics.add_collector(collect_runtime_metrics)
+
+def wrap_middleware(wsgi_app, config: Dict[str, Any]):
+    """
+    Wrap a WSGI app with the configured cross-cutting middleware.
+    
+    Args:
+        wsgi_app: Application to wrap
+        config: Application config mapping
+        
+    Returns:
+        Wrapped application
+    """
+    if memory_diagnostics.enabled:
+        wsgi_app = MemoryTrackingMiddleware(wsgi_app, memory_diagnostics)
+    if profiler.enabled:
+        wsgi_app = ProfilingMiddleware(wsgi_app, profiler)
+    if config['COMPRESSION_ENABLED']:
+        # Decompressed bodies get the same limits as plain ones: batch and NDJSON bodies stream
+        max_decompressed = config['COMPRESSION_MAX_DECOMPRESSED_BYTES']
+        max_buffered = max_decompressed or (
+            config['STREAMING_MAX_BODY_BYTES'] if config['STREAMING_INTAKE'] else config['MAX_BODY_BYTES']
+        )
+        wsgi_app = CompressionMiddleware(wsgi_app, max_buffered, config['COMPRESSION_MIN_BYTES'],
+                                         config['COMPRESSION_LEVEL'], config['STREAMING_CHUNK_BYTES'],
+                                         max_decompressed or config['STREAMING_MAX_BODY_BYTES'])
+    # Shed excess load before anything parses the request
+    if admission_controller.enabled:
+        wsgi_app = AdmissionMiddleware(wsgi_app, admission_controller)
+    if config['SERVER_TIMING_ENABLED']:
+        wsgi_app = ServerTimingMiddleware(wsgi_app, metrics)
+    return wsgi_app
+
+def load_config(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Return the Config settings as a plain mapping.
+    
+    Args:
+        overrides: Settings replacing the Config values for this app only
+    """
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    config.update(overrides or {})
+    return config
+
+def warm_app(wsgi_app) -> None:
+    """Send one request per rule and error type so caches are populated before forking."""
+    from werkzeug.test import Client
+    client = Client(wsgi_app)
+    snapshot = PromptMatchingService.get_snapshot()
+    for criteria in snapshot.criteria.values():
+        client.post('/api/match-prompt', json=dict(criteria, data=""))
+    client.post('/api/match-prompt', json={"situation": "", "level": "", "file_type": "", "data": ""})
+    client.get('/health')
+
+def after_fork() -> None:
+    """Restart per-process background threads in a forked worker."""
+    config = load_config()
+    reinit_after_fork(config)
+    if config['RULES_WATCH_INTERVAL'] > 0:
+        PromptMatchingService.rule_store.stop_watching()
+        PromptMatchingService.rule_store.start_watching(config['RULES_WATCH_INTERVAL'])
+
+def create_fast_app(overrides: Optional[Dict[str, Any]] = None):
+    """Factory for the Flask-free WSGI app serving the match, rules, codes and health endpoints."""
+    config = load_config(overrides)
+    configure_services(config)
+    wsgi_app = PromptMatchingWSGIApp(config['MAX_BODY_BYTES'], config['RULES_EXPORT_MAX_AGE'])
+    return wrap_middleware(wsgi_app, config)
+
+def create_asgi_app():
+    """
+    Factory for the ASGI app serving /api/match-prompt and /health on an event loop.
+    
+    The WSGI middleware is not applied: there is no admission control,
+    profiling, memory tracking, Server-Timing header or body compression, and
+    /metrics is not served (stage timings and counters are still recorded).
+    Opt-in middleware that is configured anyway is logged as a warning.
+    """
+    config = load_config()
+    configure_services(config)
+    bypassed = [name for name, enabled in (
+        ("admission control", admission_controller.enabled),
+        ("profiling", profiler.enabled),
+        ("memory diagnostics", memory_diagnostics.enabled)
+    ) if enabled]
+    if bypassed:
+        logger.warning("The ASGI app does not apply the WSGI middleware; ignoring %s", ", ".join(bypassed))
+    return PromptMatchingASGIApp(config['MAX_BODY_BYTES'])
+
+def create_app(overrides: Optional[Dict[str, Any]] = None):
+    """
+    Application factory function.
+    
+    Args:
+        overrides: Settings replacing the Config values for this app only
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config.update(overrides or {})
+    
+    configure_services(app.config)
     
     # Register blueprints
     app.register_blueprint(prompt_bp, url_prefix='/api')
+    app.register_blueprint(job_bp, url_prefix='/api')
+    # Admin endpoints reload rules and expose internals, so they need a token
+    if app.config.get('ADMIN_TOKEN'):
+        app.register_blueprint(admin_bp, url_prefix='/admin')
+    else:
+        logger.info("ADMIN_TOKEN is not set, /admin endpoints are disabled")
+    
+    app.wsgi_app = wrap_middleware(app.wsgi_app, app.config)
     
     # Health check endpoint
     @app.route('/health', methods=['GET'])
@@ -32,6 +230,13 @@ def create_app():
             "service": "Prompt Matching API"
         }), 200
     
+    # Metrics endpoint
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Prometheus metrics endpoint."""
+        from flask import Response
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+    
     # Global error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -50,8 +255,60 @@ def create_app():
     
     return app
 
+def prefork_overrides(workers: int) -> Dict[str, Any]:
+    """
+    Settings the prefork server overrides for its app.
+    
+    The job API is turned off when more than one worker would serve it: jobs
+    live in the worker that accepted them and the shared listening socket
+    sends each poll to any worker, so most polls would miss the job.
+    
+    Args:
+        workers: Number of prefork workers
+        
+    Returns:
+        Config overrides for the app factory
+    """
+    if workers > 1 and Config.JOB_WORKERS > 0:
+        logger.warning("Background jobs are disabled with %d prefork workers; use --workers 1 to serve /api/jobs",
+                       workers)
+        return {"JOB_WORKERS": 0}
+    return {}
+
+def run_prefork(args: argparse.Namespace) -> None:
+    """Serve the API with the pre-forking multi-process server."""
+    from src.servers.prefork import PreforkServer
+    overrides = prefork_overrides(args.workers or os.cpu_count() or 1)
+    server = PreforkServer(
+        functools.partial(create_fast_app if args.fast else create_app, overrides),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        threads=Config.SERVER_THREADS,
+        max_requests=args.max_requests,
+        max_requests_jitter=Config.SERVER_MAX_REQUESTS_JITTER,
+        keepalive_timeout=Config.SERVER_KEEPALIVE_TIMEOUT,
+        graceful_timeout=Config.SERVER_GRACEFUL_TIMEOUT,
+        warmup=warm_app,
+        post_fork=after_fork
+    )
+    server.serve_forever()
+
 if __name__ == '__main__':
-    app = create_app()
+    parser = argparse.ArgumentParser(description="Run the Prompt Matching API")
+    parser.add_argument('--fast', action='store_true', default=Config.WSGI_FASTPATH,
+                        help="Serve with the Flask-free WSGI fast path (also WSGI_FASTPATH=true)")
+    parser.add_argument('--asgi', action='store_true',
+                        help="Serve the ASGI app with the built-in asyncio server")
+    parser.add_argument('--prefork', action='store_true',
+                        help="Production mode: pre-fork one worker per core instead of the dev server")
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS,
+                        help="Number of prefork workers (default: one per CPU core)")
+    parser.add_argument('--max-requests', type=int, default=Config.SERVER_MAX_REQUESTS,
+                        help="Recycle each prefork worker after this many requests (0 = never)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
     
     print("Starting Prompt Matching API...")
     print("Available endpoints:")
@@ -68,4 +325,17 @@ if __name__ == '__main__':
     }
     """)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if args.prefork:
+        run_prefork(args)
+    elif args.asgi:
+        from src.servers.asgi_server import ASGIServer
+        print("Serving the ASGI app with the asyncio server")
+        ASGIServer(create_asgi_app(), host=args.host, port=args.port,
+                   keepalive_timeout=Config.SERVER_KEEPALIVE_TIMEOUT).run()
+    elif args.fast:
+        from werkzeug.serving import run_simple
+        print("Serving with the WSGI fast path")
+        run_simple(args.host, args.port, create_fast_app(), threaded=True)
+    else:
+        app = create_app()
+        app.run(debug=True, host=args.host, port=args.port)
\ No newline at end of file
@@ -0,0 +1 @@
+"""Benchmark scripts for the Prompt Matching API."""
@@ -0,0 +1,195 @@
+"""
+Load test of the ASGI app on the asyncio server against the threaded Werkzeug server.
+
+Opens 1k to 10k connections at once. Each connection sends its request head
+and the first part of a ``--data-size`` character body, stalls for
+``--upload-delay`` seconds like a slow client, then sends the rest and reads
+the response. Reports completed and failed requests, wall time, latency
+percentiles, and the server's peak thread count and resident memory.
+
+Both servers run in a subprocess; the client runs on one asyncio loop in
+this process. Raise ``ulimit -n`` above twice the largest concurrency first.
+
+Usage:
+    python -m benchmarks.bench_asgi
+    python -m benchmarks.bench_asgi --concurrency 1000 5000 10000 --upload-delay 1 --wsgi-app flask
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_SCRIPT = """
+import resource, sys
+soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+port = int(sys.argv[1])
+if sys.argv[2] == "asgi":
+    from app import create_asgi_app
+    from src.servers.asgi_server import ASGIServer
+    ASGIServer(create_asgi_app(), port=port, backlog=16384, keepalive_timeout=30).run()
+else:
+    from werkzeug.serving import make_server
+    from app import create_app, create_fast_app
+    app = create_fast_app() if sys.argv[3] == "fast" else create_app()
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def read_status(pid: int) -> Dict[str, int]:
+    """Thread count and peak RSS (kB) of a process, from /proc."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii") as status:
+            for line in status:
+                name, _, value = line.partition(":")
+                if name in ("Threads", "VmHWM"):
+                    values[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+class ProcessSampler:
+    """Poll a process's thread count in the background, keeping the peak."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(0.05):
+            self.peak_threads = max(self.peak_threads, read_status(self.pid).get("Threads", 0))
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        self._thread.join()
+        return {"peak_threads": self.peak_threads, "peak_rss_kb": read_status(self.pid).get("VmHWM", 0)}
+
+
+def wait_for_server(port: int) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as probe:
+                probe.sendall(b"GET /health HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+                if probe.recv(64).startswith(b"HTTP/1."):
+                    return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def slow_upload(port: int, body: bytes, split: int, upload_delay: float, timeout: float) -> Optional[float]:
+    """One request with a stalled upload; returns its latency, or None on failure."""
+    start = time.perf_counter()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+        writer.write(b"POST /api/match-prompt HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                     b"Connection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body[:split]))
+        await writer.drain()
+        await asyncio.sleep(upload_delay)
+        writer.write(body[split:])
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+        if not response.startswith(b"HTTP/1.1 200") and not response.startswith(b"HTTP/1.0 200"):
+            return None
+        return time.perf_counter() - start
+    except (OSError, asyncio.TimeoutError):
+        return None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def drive(port: int, concurrency: int, body: bytes, upload_delay: float, timeout: float) -> List[Optional[float]]:
+    split = len(body) // 2
+    return await asyncio.gather(*(slow_upload(port, body, split, upload_delay, timeout)
+                                  for _ in range(concurrency)))
+
+
+def run_load(server: str, wsgi_app: str, concurrency: int, body: bytes, upload_delay: float,
+             timeout: float) -> Dict[str, float]:
+    port = free_port()
+    env = dict(os.environ, LOG_LEVEL="ERROR", METRICS_ENABLED="false", LOG_SUCCESS_SAMPLE_RATE="0")
+    process = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(port), server, wsgi_app],
+                               cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(port)
+        sampler = ProcessSampler(process.pid)
+        start = time.perf_counter()
+        latencies = asyncio.run(drive(port, concurrency, body, upload_delay, timeout))
+        wall = time.perf_counter() - start
+        usage = sampler.stop()
+    finally:
+        process.terminate()
+        process.wait()
+
+    completed = sorted(latency for latency in latencies if latency is not None)
+
+    def percentile(fraction: float) -> float:
+        if not completed:
+            return 0.0
+        return completed[min(len(completed) - 1, int(fraction * len(completed)))]
+
+    return {
+        "ok": len(completed),
+        "failed": concurrency - len(completed),
+        "wall_s": wall,
+        "p50_s": percentile(0.50),
+        "p99_s": percentile(0.99),
+        "req_per_s": len(completed) / wall,
+        **usage
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ASGI/asyncio vs threaded Werkzeug under many slow connections")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1000, 5000, 10000],
+                        help="Simultaneous connections per run")
+    parser.add_argument("--upload-delay", type=float, default=0.5, help="Seconds each client stalls mid-body")
+    parser.add_argument("--data-size", type=int, default=8000, help="Characters of data per request")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout in seconds")
+    parser.add_argument("--wsgi-app", choices=("fast", "flask"), default="flask",
+                        help="App behind the Werkzeug server (default: the Flask blueprint)")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if max(args.concurrency) + 64 > hard:
+        print(f"warning: open file limit {hard} is below the largest concurrency; expect client failures")
+
+    body = json.dumps({"situation": "Workers Compensation", "level": "Summarize", "file_type": "Summons",
+                       "data": "x" * args.data_size}).encode("utf-8")
+
+    print(f"{'server':>10}  {'conns':>6}  {'ok':>6}  {'failed':>6}  {'wall s':>7}  {'p50 s':>7}  {'p99 s':>7}  "
+          f"{'req/s':>8}  {'threads':>7}  {'rss MB':>7}")
+    for concurrency in args.concurrency:
+        for server in ("asgi", "werkzeug"):
+            result = run_load(server, args.wsgi_app, concurrency, body, args.upload_delay, args.timeout)
+            print(f"{server:>10}  {concurrency:>6}  {result['ok']:>6}  {result['failed']:>6}  "
+                  f"{result['wall_s']:>7.2f}  {result['p50_s']:>7.3f}  {result['p99_s']:>7.3f}  "
+                  f"{result['req_per_s']:>8.0f}  {result['peak_threads']:>7}  {result['peak_rss_kb'] / 1024:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
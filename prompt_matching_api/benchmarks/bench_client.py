@@ -0,0 +1,79 @@
+"""
+Benchmark the pooled, batching client against one-shot requests.post calls.
+
+Starts the Flask app on a local threaded HTTP/1.1 server and sends the same
+calls from several client threads three ways:
+
+    one-shot   requests.post per call (new connection every time)
+    pooled     MatchClient with batching disabled (keep-alive pool)
+    batched    MatchClient with micro-batching
+
+Usage:
+    python -m benchmarks.bench_client
+    python -m benchmarks.bench_client --calls 5000 --threads 16
+"""
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app
+from config.config import Config
+from src.client import MatchClient
+
+PAYLOADS = [dict(criteria, data="Claim notes") for criteria in Config.PROMPT_CRITERIA.values()]
+
+
+class KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def run_calls(call: Callable[[Dict], object], calls: int, threads: int) -> float:
+    """Make ``calls`` calls from ``threads`` threads and return calls per second."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in pool.map(call, (PAYLOADS[i % len(PAYLOADS)] for i in range(calls))):
+            pass
+    return calls / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Batching client vs one-shot requests.post")
+    parser.add_argument("--calls", type=int, default=2000, help="Calls per scenario")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent caller threads")
+    parser.add_argument("--batch-window-ms", type=float, default=2.0, help="Micro-batching window")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    app = create_app()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    def one_shot(payload):
+        return requests.post(base_url + "/api/match-prompt", json=payload, timeout=5).json()
+
+    results = {"one-shot": run_calls(one_shot, args.calls, args.threads)}
+    with MatchClient(base_url, pool_size=args.threads, max_batch=1) as client:
+        results["pooled"] = run_calls(client.match, args.calls, args.threads)
+    with MatchClient(base_url, pool_size=4, batch_window=args.batch_window_ms / 1000) as client:
+        results["batched"] = run_calls(client.match, args.calls, args.threads)
+
+    server.shutdown()
+    baseline = results["one-shot"]
+    print(f"{'client':>10}  {'calls/s':>10}  {'speedup':>8}")
+    for name, rate in results.items():
+        print(f"{name:>10}  {rate:>10.0f}  {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark the integer-coded wire format against the JSON match endpoint.
+
+Sends every valid routing combination through the WSGI fast path three
+ways: one JSON request each (POST /api/match-prompt), one six-byte code
+record each (POST /api/match-codes), and packed bulk bodies of
+``--batch`` records. Reports request and response body bytes and CPU time
+(process time, so only this process's work counts) per matched record.
+
+Usage:
+    python -m benchmarks.bench_codes
+    python -m benchmarks.bench_codes --iterations 50000 --batch 1000
+"""
+import argparse
+import io
+import itertools
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from app import create_fast_app
+from src.services.codes import MEDIA_TYPE, RECORD, pack_records
+from src.services.response_cache import response_cache
+
+
+def call(app: Callable, path: str, body: bytes, content_type: str) -> bytes:
+    """POST a body straight to a WSGI app, returning the response body."""
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "CONTENT_TYPE": content_type,
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body)
+    }
+    return b"".join(app(environ, lambda status, headers, exc_info=None: None))
+
+
+def measure(app: Callable, path: str, bodies: List[bytes], content_type: str, records_per_body: int,
+            iterations: int) -> Tuple[float, float, float]:
+    """
+    Send bodies round-robin until ``iterations`` records have been matched.
+
+    Returns:
+        Tuple of (request bytes, response bytes, CPU microseconds) per record
+    """
+    calls = max(1, iterations // records_per_body)
+    cycle = itertools.cycle(bodies)
+    sent = received = 0
+    start = time.process_time()
+    for _ in range(calls):
+        body = next(cycle)
+        sent += len(body)
+        received += len(call(app, path, body, content_type))
+    elapsed = time.process_time() - start
+    records = calls * records_per_body
+    return sent / records, received / records, elapsed / records * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Integer-coded wire format vs JSON")
+    parser.add_argument("--iterations", type=int, default=20000, help="Records matched per measurement")
+    parser.add_argument("--batch", type=int, default=256, help="Records per bulk body")
+    args = parser.parse_args()
+
+    app = create_fast_app()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    table = response_cache.code_table()
+    records = list(itertools.product(*(range(len(values)) for values in table.values.values())))
+    payloads: List[Dict[str, Any]] = [
+        {"situation": table.values["situation"][situation], "level": table.values["level"][level],
+         "file_type": table.values["file_type"][file_type], "data": "Claim notes"}
+        for situation, level, file_type in records
+    ]
+
+    json_bodies = [json.dumps(payload).encode("utf-8") for payload in payloads]
+    single_bodies = [RECORD.pack(*record) for record in records]
+    bulk_records = list(itertools.islice(itertools.cycle(records), args.batch))
+    bulk_bodies = [pack_records(bulk_records)]
+
+    results = [
+        ("json", measure(app, "/api/match-prompt", json_bodies, "application/json", 1, args.iterations)),
+        ("codes", measure(app, "/api/match-codes", single_bodies, MEDIA_TYPE, 1, args.iterations)),
+        (f"codes x{args.batch}", measure(app, "/api/match-codes", bulk_bodies, MEDIA_TYPE, args.batch,
+                                          args.iterations))
+    ]
+
+    print(f"{'format':>12}  {'req B/rec':>10}  {'resp B/rec':>10}  {'cpu us/rec':>10}")
+    for name, (sent, received, cpu_us) in results:
+        print(f"{name:>12}  {sent:>10.1f}  {received:>10.1f}  {cpu_us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
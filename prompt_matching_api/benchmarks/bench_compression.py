@@ -0,0 +1,131 @@
+"""
+Benchmark the CPU/bandwidth tradeoff of gzip bodies at several levels.
+
+Captures real response bodies from the WSGI fast path and the Flask app (a
+single match, the /api/rules document, a JSON batch and an NDJSON stream)
+plus a large-document request body, then gzips each at every ``--levels``
+value. Reports bytes saved, compress and decompress CPU time, and the
+break-even link speed: below it, sending fewer bytes wins back more time
+than compressing costs.
+
+Also times single-match requests through the fast path without the
+middleware, and through it with and without ``Accept-Encoding: gzip``,
+showing what the size threshold costs responses too small to compress.
+
+Usage:
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --levels 1 4 6 9 --batch 5000
+"""
+import argparse
+import io
+import json
+import logging
+import random
+import time
+import zlib
+from typing import Callable, Dict, List, Tuple
+
+from app import create_app, create_fast_app
+from config.config import Config
+from src.servers.compression import GZIP_WBITS, compressor
+
+PAYLOAD = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report",
+           "data": "Claim notes"}
+
+WORDS = ("claimant", "vehicle", "collision", "deposition", "insured", "policy", "coverage", "adjuster",
+         "intersection", "damages", "witness", "statement", "medical", "report", "liability", "the", "and",
+         "of", "to", "was", "on", "at", "in", "a", "stated", "reported", "approximately", "2023")
+
+
+def call(app: Callable, method: str, path: str, body: bytes = b"", content_type: str = "application/json",
+         headers: Dict[str, str] = None) -> bytes:
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "CONTENT_TYPE": content_type,
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        **(headers or {})
+    }
+    return b"".join(app(environ, lambda status, response_headers, exc_info=None: None))
+
+
+def sample_bodies(batch: int, document_bytes: int) -> List[Tuple[str, bytes]]:
+    """Collect uncompressed bodies representative of each kind of traffic."""
+    client = create_app().test_client()
+    rng = random.Random(7)
+    words = rng.choices(WORDS, k=document_bytes // 7)
+    document = json.dumps(dict(PAYLOAD, data=" ".join(words))).encode()
+    lines = "\n".join(json.dumps(PAYLOAD) for _ in range(batch))
+    return [
+        ("single match", client.post("/api/match-prompt", json=PAYLOAD).data),
+        ("rules document", client.get("/api/rules").data),
+        (f"batch x{batch}", client.post("/api/match-prompt/batch", json=[PAYLOAD] * batch).data),
+        (f"ndjson x{batch}", client.post("/api/match-prompt/stream", data=lines,
+                                         content_type="application/x-ndjson").data),
+        (f"document {len(document) // 1024} KiB", document)
+    ]
+
+
+def cpu_seconds(function: Callable[[], object], repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        function()
+    return (time.process_time() - start) / repeat
+
+
+def gzip_body(body: bytes, level: int) -> bytes:
+    encoder = compressor("gzip", level)
+    return encoder.compress(body) + encoder.flush()
+
+
+def report(name: str, body: bytes, levels: List[int]) -> None:
+    repeat = max(5, 2_000_000 // max(len(body), 1))
+    for level in levels:
+        compressed = gzip_body(body, level)
+        compress = cpu_seconds(lambda: gzip_body(body, level), repeat)
+        decompress = cpu_seconds(lambda: zlib.decompress(compressed, GZIP_WBITS), repeat)
+        saved = len(body) - len(compressed)
+        # Link speed at which the bytes saved take as long to send as compressing took
+        break_even = saved * 8 / compress / 1e6 if saved > 0 else 0.0
+        print(f"{name:<20} {level:>5} {len(body):>10} {len(compressed):>10} {len(compressed) / len(body):>6.1%} "
+              f"{compress * 1e6:>10.1f} {decompress * 1e6:>10.1f} {break_even:>12.0f}")
+
+
+def requests_per_second(app: Callable, headers: Dict[str, str], iterations: int) -> float:
+    body = json.dumps(PAYLOAD).encode()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call(app, "POST", "/api/match-prompt", body, headers=headers)
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="gzip CPU/bandwidth tradeoff per level and body type")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9], help="zlib levels to compare")
+    parser.add_argument("--batch", type=int, default=1000, help="Items in the batch and NDJSON bodies")
+    parser.add_argument("--document-kib", type=int, default=1024, help="Size of the large document body")
+    parser.add_argument("--iterations", type=int, default=20000, help="Requests per threshold measurement")
+    args = parser.parse_args()
+
+    bodies = sample_bodies(args.batch, args.document_kib * 1024)
+    Config.COMPRESSION_ENABLED = False
+    bare_app = create_fast_app()
+    Config.COMPRESSION_ENABLED = True
+    app = create_fast_app()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    print(f"{'body':<20} {'level':>5} {'raw B':>10} {'gzip B':>10} {'ratio':>6} "
+          f"{'comp us':>10} {'decomp us':>10} {'b/even Mbps':>12}")
+    for name, body in bodies:
+        report(name, body, args.levels)
+
+    bare = requests_per_second(bare_app, {}, args.iterations)
+    plain = requests_per_second(app, {}, args.iterations)
+    negotiated = requests_per_second(app, {"HTTP_ACCEPT_ENCODING": "gzip"}, args.iterations)
+    print(f"single match below threshold: {bare:.0f} req/s without the middleware, {plain:.0f} req/s with it "
+          f"({plain / bare:.2f}x), {negotiated:.0f} req/s with Accept-Encoding: gzip ({negotiated / bare:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
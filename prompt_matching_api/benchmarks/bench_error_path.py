@@ -0,0 +1,107 @@
+"""
+Benchmark the exception-free error path against the exception-based one.
+
+Matches valid, invalid and mixed (one third invalid) payloads two ways:
+
+    exceptions  the previous flow: process_request raises ValueError for every
+                failure and the caller catches it and branches on str(e)
+    codes       PromptMatchingService.evaluate returns a MatchResult and the
+                batch controller maps its ErrorCode to a pre-built body
+
+Both produce the same (body, status) pair per payload.
+
+Usage:
+    python -m benchmarks.bench_error_path
+    python -m benchmarks.bench_error_path --iterations 500000
+"""
+import argparse
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from app import create_app
+from config.config import Config
+from src.controllers.prompt_controller import PromptController
+from src.services.prompt_service import PromptMatchingService
+from src.services.errors import ERROR_STATUS
+from src.utils.metrics import metrics
+
+# Data cap enabled for the run, so the too-large payload is an error
+DATA_CAP = 10000
+
+VALID = [dict(criteria, data="Claim notes") for criteria in Config.PROMPT_CRITERIA.values()]
+INVALID = [
+    {"situation": "Commercial Auto", "level": "Structure", "file_type": "Deposition", "data": ""},
+    {"situation": "Invalid Situation", "level": "Structure", "file_type": "Summary Report", "data": ""},
+    {"situation": "Commercial Auto", "level": "Structure", "data": "missing file_type"},
+    {"situation": "", "level": "Structure", "file_type": "Summary Report", "data": ""},
+    {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report",
+     "data": "x" * (DATA_CAP + 1)}
+]
+
+
+def raising_match_prompt(data: Dict[str, Any]) -> str:
+    """match_prompt as it was: raise when no rule matches."""
+    prompt_name = PromptMatchingService.find_prompt(data)
+    if prompt_name is None:
+        raise ValueError("Invalid Prompt")
+    return prompt_name
+
+
+def raising_process_request(data: Dict[str, Any]) -> str:
+    """process_request as it was: raise ValueError for every validation failure."""
+    snapshot = PromptMatchingService.get_snapshot()
+    is_valid, error_msg = PromptMatchingService.validate_request(data, snapshot)
+    if not is_valid:
+        raise ValueError(error_msg)
+    return raising_match_prompt(data)
+
+
+def exception_item(item: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """The previous batch item handler, branching on the exception message."""
+    try:
+        matched_prompt = raising_process_request(item)
+        return {"matched_prompt": matched_prompt, "status": "success"}, 200
+    except ValueError as e:
+        error_message = str(e)
+        if error_message not in ("Missing Data", "Data exceeds maximum length"):
+            error_message = "Invalid Prompt"
+        return {"error": error_message}, ERROR_STATUS.get(error_message, 400)
+
+
+def measure(handler: Callable[[Any], Any], payloads: List[Dict[str, Any]], iterations: int) -> float:
+    """Return payloads handled per second."""
+    cycle = itertools.cycle(payloads)
+    for _ in range(min(iterations, 1000)):
+        handler(next(cycle))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        handler(next(cycle))
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Exception-free error path vs exceptions")
+    parser.add_argument("--iterations", type=int, default=200000, help="Payloads per measurement")
+    args = parser.parse_args()
+
+    Config.MAX_DATA_LENGTH = DATA_CAP
+    create_app()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    # Stage timers would add the same cost to both paths
+    metrics.configure(False)
+
+    mixes = {"valid": VALID, "invalid": INVALID, "mixed": VALID * 2 + INVALID}
+    for payload in VALID + INVALID:
+        assert exception_item(payload) == PromptController.match_item(payload)
+
+    print(f"{'payloads':>10}  {'exceptions/s':>14}  {'codes/s':>14}  {'speedup':>8}")
+    for name, payloads in mixes.items():
+        before = measure(exception_item, payloads, args.iterations)
+        after = measure(PromptController.match_item, payloads, args.iterations)
+        print(f"{name:>10}  {before:>14.0f}  {after:>14.0f}  {after / before:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Load test for the prefork server's scaling with worker count.
+
+Starts the server with 1, 2, 4, ... workers (up to the core count), drives it
+with keep-alive client processes for a fixed duration and reports requests
+per second and scaling efficiency relative to one worker. Clients share the
+machine with the server, so leave cores free for them (--max-workers) to see
+near-linear scaling.
+
+Usage:
+    python -m benchmarks.bench_prefork --duration 5
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_SCRIPT = """
+import sys
+from app import create_fast_app, create_app, warm_app, after_fork
+from src.servers.prefork import PreforkServer
+factory = create_fast_app if sys.argv[3] == "fast" else create_app
+PreforkServer(factory, host="127.0.0.1", port=int(sys.argv[1]), workers=int(sys.argv[2]), threads=4,
+              warmup=warm_app, post_fork=after_fork).serve_forever()
+"""
+
+PAYLOAD = json.dumps({
+    "situation": "Workers Compensation",
+    "level": "Summarize",
+    "file_type": "Summons",
+    "data": "Legal document data"
+})
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def client_worker(port: int, duration: float, results) -> None:
+    """Send requests over one keep-alive connection until the duration elapses."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    count = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        connection.request("POST", "/api/match-prompt", body=PAYLOAD, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        count += 1
+    results.put(count)
+
+
+def wait_for_server(port: int) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def run_load(workers: int, clients: int, duration: float, app: str) -> float:
+    """Start a server with ``workers`` workers and return measured requests per second."""
+    port = free_port()
+    env = dict(os.environ, LOG_LEVEL="ERROR", METRICS_ENABLED="false", LOG_SUCCESS_SAMPLE_RATE="0")
+    server = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(port), str(workers), app],
+                              cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(port)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=client_worker, args=(port, duration, results))
+                     for _ in range(clients)]
+        for process in processes:
+            process.start()
+        total = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        return total / duration
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load per worker count")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--app", choices=["fast", "flask"], default="fast")
+    args = parser.parse_args()
+
+    counts = []
+    workers = 1
+    while workers <= args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    print(f"{'workers':>8}  {'req/s':>10}  {'speedup':>8}  {'efficiency':>10}")
+    baseline = None
+    for workers in counts:
+        rps = run_load(workers, workers * args.clients_per_worker, args.duration, args.app)
+        baseline = baseline or rps
+        speedup = rps / baseline
+        print(f"{workers:>8}  {rps:>10.0f}  {speedup:>8.2f}  {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark pre-serialized responses against the jsonify path.
+
+Runs the same payload mix through the cached /api/match-prompt route and a
+reference route that calls process_request and jsonify per request, both via
+the Flask test client.
+
+Usage:
+    python -m benchmarks.bench_response_cache
+"""
+import argparse
+import itertools
+import logging
+import time
+
+from flask import jsonify, request
+
+from app import create_app
+from config.config import Config
+from src.services.prompt_service import PromptMatchingService
+from src.services.response_cache import response_cache
+
+PAYLOADS = [dict(criteria, data="") for criteria in Config.PROMPT_CRITERIA.values()] + [
+    {"situation": "Commercial Auto", "level": "Structure", "file_type": "Deposition", "data": ""},
+    {"situation": "Commercial Auto", "level": "Structure", "data": ""}
+]
+
+
+def jsonify_match():
+    """Reference handler reproducing the original per-request jsonify path."""
+    try:
+        matched_prompt = PromptMatchingService.process_request(request.get_json(force=True))
+        return jsonify({"matched_prompt": matched_prompt, "status": "success"}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def measure(client, path: str, requests: int) -> float:
+    """Return requests per second for ``requests`` posts to ``path``."""
+    payloads = itertools.cycle(PAYLOADS)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.post(path, json=next(payloads))
+    return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="Measurements per path (best is kept)")
+    args = parser.parse_args()
+
+    app = create_app()
+    app.add_url_rule('/bench/jsonify-match', 'bench_jsonify_match', jsonify_match, methods=['POST'])
+    logging.getLogger().setLevel(logging.ERROR)
+    client = app.test_client()
+
+    results = {}
+    for label, path in (("jsonify", "/bench/jsonify-match"), ("cached", "/api/match-prompt")):
+        measure(client, path, min(args.requests, 500))
+        results[label] = max(measure(client, path, args.requests) for _ in range(args.repeat))
+
+    for label, rps in results.items():
+        print(f"{label:>8}: {rps:10.0f} req/s")
+    print(f" speedup: {results['cached'] / results['jsonify']:10.2f}x")
+
+    # Serialization only, without the test client overhead
+    cache_number = 100_000
+    with app.app_context():
+        start = time.perf_counter()
+        for _ in range(cache_number):
+            jsonify({"matched_prompt": "Prompt 1", "status": "success"})
+        jsonify_us = (time.perf_counter() - start) / cache_number * 1e6
+    payload = PAYLOADS[0]
+    start = time.perf_counter()
+    for _ in range(cache_number):
+        response_cache.respond(payload)
+    cached_us = (time.perf_counter() - start) / cache_number * 1e6
+    print(f"\njsonify body only: {jsonify_us:.2f} us, cached validate+match+body: {cached_us:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Microbenchmark for compiled rule index lookups.
+
+Shows that lookup cost stays flat as the rule set grows, compared with the
+previous linear scan over PROMPT_CRITERIA. A second table covers mixed exact
+and wildcard rule sets served by the bitset engine, compared with a
+priority-ordered scan.
+
+Usage:
+    python -m benchmarks.bench_rule_index
+"""
+import argparse
+import random
+import timeit
+from typing import Dict, List, Tuple
+
+from src.services.rule_index import RuleIndex
+
+RULE_COUNTS = [5, 100, 1_000, 10_000, 100_000]
+MIXED_RULE_COUNTS = [100, 1_000, 10_000, 50_000]
+LINEAR_SCAN_LIMIT = 10_000
+
+
+def build_criteria(count: int) -> Dict[str, Dict[str, str]]:
+    """Build a synthetic rule set with ``count`` distinct criteria."""
+    criteria = {}
+    for i in range(count):
+        criteria[f"Prompt {i + 1}"] = {
+            "situation": f"Situation {i // 100}",
+            "level": f"Level {(i // 10) % 10}",
+            "file_type": f"File Type {i % 10}"
+        }
+    return criteria
+
+
+def build_mixed_criteria(count: int) -> Dict[str, Dict[str, object]]:
+    """Build a rule set where roughly a fifth of the rules use wildcards or value sets."""
+    criteria = build_criteria(count)
+    for i, (prompt_name, rule) in enumerate(criteria.items()):
+        if (i // 10) % 10 == 0:
+            # One "any level" rule per situation and file type
+            rule["level"] = "*"
+        elif i % 8 == 3:
+            rule["file_type"] = [rule["file_type"], "File Type Extra"]
+        if i % 16 == 5:
+            rule["priority"] = 1
+    return criteria
+
+
+def ranked_scan(rules, situation: str, level: str, file_type: str):
+    """Reference implementation: first matching rule in priority order."""
+    for rule in rules:
+        if rule.matches(situation, level, file_type):
+            return rule.name
+    return None
+
+
+def linear_scan(criteria: Dict[str, Dict[str, str]], situation: str, level: str, file_type: str):
+    """Reference implementation of the original linear scan."""
+    for prompt_name, rule in criteria.items():
+        if (rule["situation"] == situation and
+                rule["level"] == level and
+                rule["file_type"] == file_type):
+            return prompt_name
+    return None
+
+
+def sample_keys(criteria: Dict[str, Dict[str, str]], samples: int) -> List[Tuple[str, str, str]]:
+    """Pick lookup keys, copying strings so lookups don't hit interned objects."""
+    rules = list(criteria.values())
+    rng = random.Random(42)
+    return [
+        tuple("".join(rule[field]) for field in ("situation", "level", "file_type"))
+        for rule in (rng.choice(rules) for _ in range(samples))
+    ]
+
+
+def run(number: int) -> None:
+    print(f"{'rules':>8}  {'index ns/lookup':>16}  {'scan ns/lookup':>15}")
+    for count in RULE_COUNTS:
+        criteria = build_criteria(count)
+        index = RuleIndex.compile(criteria)
+        keys = sample_keys(criteria, 1000)
+
+        def indexed():
+            for key in keys:
+                index.lookup(*key)
+
+        index_ns = min(timeit.repeat(indexed, number=number, repeat=5)) / (number * len(keys)) * 1e9
+
+        scan_column = "-"
+        if count <= LINEAR_SCAN_LIMIT:
+            scan_keys = keys[:max(1, 100_000 // count)]
+
+            def scanned():
+                for key in scan_keys:
+                    linear_scan(criteria, *key)
+
+            scan_ns = min(timeit.repeat(scanned, number=1, repeat=3)) / len(scan_keys) * 1e9
+            scan_column = f"{scan_ns:.1f}"
+
+        print(f"{count:>8}  {index_ns:>16.1f}  {scan_column:>15}")
+
+    print(f"\n{'mixed':>8}  {'lookup ns':>10}  {'bitset ns':>10}  {'scan ns':>12}")
+    for count in MIXED_RULE_COUNTS:
+        criteria = build_mixed_criteria(count)
+        index = RuleIndex.compile(criteria)
+        ranked = [rule for _, rule in sorted(enumerate(index.rules),
+                                             key=lambda item: (-item[1].priority, item[0]))]
+        keys = sample_keys(build_criteria(count), 1000)
+
+        def memoized():
+            for key in keys:
+                index.lookup(*key)
+
+        def bitset():
+            for key in keys:
+                index.match(*key)
+
+        lookup_ns = min(timeit.repeat(memoized, number=number, repeat=5)) / (number * len(keys)) * 1e9
+        bitset_ns = min(timeit.repeat(bitset, number=max(1, number // 10), repeat=5)) \
+            / (max(1, number // 10) * len(keys)) * 1e9
+
+        scan_keys = keys[:max(1, 20_000 // count)]
+
+        def scanned():
+            for key in scan_keys:
+                ranked_scan(ranked, *key)
+
+        scan_ns = min(timeit.repeat(scanned, number=1, repeat=3)) / len(scan_keys) * 1e9
+        print(f"{count:>8}  {lookup_ns:>10.1f}  {bitset_ns:>10.1f}  {scan_ns:>12.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200, help="Lookup loops per timing run")
+    args = parser.parse_args()
+    run(args.number)
+
+
+if __name__ == "__main__":
+    main()
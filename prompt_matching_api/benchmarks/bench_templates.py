@@ -0,0 +1,70 @@
+"""
+Benchmark compiled prompt templates against str.format per request.
+
+Renders every rule's template with small and large ``data`` values three
+ways: ``str.format`` on the raw template (what a client does today), the
+compiled template alone, and TemplateCache.render (cache lookup included).
+
+Usage:
+    python -m benchmarks.bench_templates
+    python -m benchmarks.bench_templates --data-size 100000 --iterations 20000
+"""
+import argparse
+import itertools
+import time
+from typing import Callable, Dict, List
+
+from config.config import Config
+from src.services.rule_store import RuleSnapshot
+from src.services.templates import CompiledTemplate, TemplateCache
+
+
+def build_requests(data_size: int) -> List[Dict[str, str]]:
+    """One validated request per rule, carrying ``data_size`` characters of data."""
+    data = ("Patient presented with lower back pain following the collision. " * (data_size // 64 + 1))[:data_size]
+    return [dict(criteria, data=data) for criteria in Config.PROMPT_CRITERIA.values()]
+
+
+def measure(render: Callable[[str, Dict[str, str]], str], names: List[str],
+            requests: List[Dict[str, str]], iterations: int) -> float:
+    """Return renders per second."""
+    cases = itertools.cycle(list(zip(names, requests)))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        name, data = next(cases)
+        render(name, data)
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compiled templates vs str.format")
+    parser.add_argument("--iterations", type=int, default=100000, help="Renders per measurement")
+    parser.add_argument("--data-size", type=int, default=10000,
+                        help="Characters of data in the large case")
+    args = parser.parse_args()
+
+    snapshot = RuleSnapshot.from_config(Config)
+    names = list(snapshot.criteria)
+    sources = {name: snapshot.criteria[name]["template"] for name in names}
+    compiled = {name: CompiledTemplate.compile(source) for name, source in sources.items()}
+    cache = TemplateCache()
+
+    def naive(name, data):
+        return sources[name].format(prompt=name, **data)
+
+    def precompiled(name, data):
+        return compiled[name].render({"prompt": name, **data})
+
+    def cached(name, data):
+        return cache.render(snapshot, name, data)
+
+    print(f"{'data':>8}  {'str.format/s':>14}  {'compiled/s':>14}  {'cache/s':>14}")
+    for size in (32, args.data_size):
+        requests = build_requests(size)
+        assert naive(names[0], requests[0]) == precompiled(names[0], requests[0]) == cached(names[0], requests[0])
+        rates = [measure(render, names, requests, args.iterations) for render in (naive, precompiled, cached)]
+        print(f"{size:>8}  {rates[0]:>14.0f}  {rates[1]:>14.0f}  {rates[2]:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
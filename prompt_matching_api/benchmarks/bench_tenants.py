@@ -0,0 +1,121 @@
+"""
+Benchmark tenant-scoped rule sets: memory per tenant, compile time and hit rate.
+
+Writes ``--tenants`` rule files (the built-in rules with tenant-specific
+prompt names) to a temporary directory, then:
+
+    cold     compiles every tenant once, reporting compile time and the
+             accounted bytes and traced allocations per tenant
+    hot      matches through the WSGI fast path against one resident tenant
+             and against the global rules, so the lookup overhead shows
+    skewed   sends Zipf-distributed tenant traffic through a cache holding
+             ``--cache-size`` tenants, reporting hit rate and evictions
+
+Usage:
+    python -m benchmarks.bench_tenants
+    python -m benchmarks.bench_tenants --tenants 5000 --cache-size 1000
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List
+
+from app import create_fast_app
+from config.config import Config
+from src.services.rule_store import RuleSnapshot
+from src.services.tenants import tenant_registry
+
+PAYLOAD = json.dumps({"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report",
+                      "data": "Claim notes"}).encode()
+
+
+def write_tenants(rules_dir: str, count: int) -> List[str]:
+    document = RuleSnapshot.from_config(Config).to_document()
+    tenant_ids = []
+    for number in range(count):
+        tenant_id = f"tenant-{number:05d}"
+        tenant_document = dict(document, prompts={f"{tenant_id} {name}": rule
+                                                  for name, rule in document["prompts"].items()})
+        with open(os.path.join(rules_dir, tenant_id + ".json"), "w", encoding="utf-8") as rule_file:
+            json.dump(tenant_document, rule_file)
+        tenant_ids.append(tenant_id)
+    return tenant_ids
+
+
+def call(app: Callable, path: str, tenant_id: str = "") -> bytes:
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(PAYLOAD)),
+        "wsgi.input": io.BytesIO(PAYLOAD)
+    }
+    if tenant_id:
+        environ["HTTP_X_TENANT"] = tenant_id
+    return b"".join(app(environ, lambda status, headers, exc_info=None: None))
+
+
+def requests_per_second(app: Callable, tenant_id: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call(app, "/api/match-prompt", tenant_id)
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tenant rule set memory, compile time and hit rate")
+    parser.add_argument("--tenants", type=int, default=2000, help="Tenant rule files to generate")
+    parser.add_argument("--cache-size", type=int, default=500, help="Tenants kept for the skewed run")
+    parser.add_argument("--requests", type=int, default=100000, help="Requests in the skewed run")
+    parser.add_argument("--iterations", type=int, default=50000, help="Requests per hot measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as rules_dir:
+        tenant_ids = write_tenants(rules_dir, args.tenants)
+        Config.TENANT_RULES_DIR = rules_dir
+        Config.TENANT_CACHE_SIZE = args.tenants
+        app = create_fast_app()
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for tenant_id in tenant_ids:
+            tenant_registry.lookup(tenant_id)
+        elapsed = time.perf_counter() - start
+        traced = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        info = tenant_registry.info(0)
+        print(f"cold: {args.tenants} tenants compiled in {elapsed:.2f} s "
+              f"({elapsed / args.tenants * 1e3:.3f} ms each); "
+              f"accounted {info['bytes'] / args.tenants / 1024:.1f} KiB/tenant, "
+              f"traced {traced / args.tenants / 1024:.1f} KiB/tenant")
+
+        global_rps = requests_per_second(app, "", args.iterations)
+        tenant_rps = requests_per_second(app, tenant_ids[0], args.iterations)
+        print(f"hot: global rules {global_rps:.0f} req/s, resident tenant {tenant_rps:.0f} req/s "
+              f"({tenant_rps / global_rps:.2f}x)")
+
+        tenant_registry.configure(dict(Config.__dict__, TENANT_CACHE_SIZE=args.cache_size))
+        rng = random.Random(7)
+        weights = [1 / rank for rank in range(1, args.tenants + 1)]
+        traffic = rng.choices(tenant_ids, weights, k=args.requests)
+        start = time.perf_counter()
+        for tenant_id in traffic:
+            call(app, "/api/match-prompt", tenant_id)
+        elapsed = time.perf_counter() - start
+        info = tenant_registry.info(0)
+        print(f"skewed: {args.requests} requests over {args.tenants} tenants with {args.cache_size} cached: "
+              f"hit rate {info['hit_rate']:.1%}, {info['evictions']} evictions, "
+              f"{info['compiles']} compiles, {args.requests / elapsed:.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
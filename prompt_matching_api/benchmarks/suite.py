@@ -0,0 +1,259 @@
+"""
+Layered benchmark suite with regression gating.
+
+Measures each layer of the API on its own with a realistic payload mix:
+
+    service    PromptMatchingService.process_request called directly
+    validator  PromptValidator.validate_prompt_request
+    http       full round trip through the Flask test client
+    wsgi       full round trip through the Flask-free WSGI fast path
+    startup    create_app()
+
+Usage:
+    python -m benchmarks.suite run --output benchmarks/baseline.json
+    python -m benchmarks.suite run --output current.json
+    python -m benchmarks.suite compare benchmarks/baseline.json current.json --threshold 0.25
+
+``compare`` exits with status 1 when any p50 or p99 regresses by more than
+the threshold (a fraction of the baseline value).
+"""
+import argparse
+import gc
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from werkzeug.test import Client
+
+from app import create_app, create_fast_app
+from config.config import Config
+from src.services.prompt_service import PromptMatchingService
+from src.utils.validators import PromptValidator
+
+DEFAULT_REPLAY_FILE = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "match_requests.jsonl")
+
+LARGE_DATA = "Patient presented with lower back pain following the collision. " * 1600
+
+
+def build_payload_mix(replay_file: Optional[str] = None) -> List[Any]:
+    """
+    Build the payload mix shared by all request-level benchmarks.
+
+    Args:
+        replay_file: Optional JSONL file whose records are replayed as payloads
+
+    Returns:
+        List of payloads (mostly dicts, some deliberately invalid)
+    """
+    valid = [dict(criteria, data="Claim notes") for criteria in Config.PROMPT_CRITERIA.values()]
+    large = [dict(criteria, data=LARGE_DATA) for criteria in list(Config.PROMPT_CRITERIA.values())[:2]]
+    invalid = [
+        {"situation": "Commercial Auto", "level": "Structure", "file_type": "Deposition", "data": ""},
+        {"situation": "Invalid Situation", "level": "Structure", "file_type": "Summary Report", "data": ""},
+        {"situation": "Commercial Auto", "level": "Structure", "data": "missing file_type"},
+        {"situation": "", "level": "Structure", "file_type": "Summary Report", "data": ""},
+        {"situation": 42, "level": "Structure", "file_type": "Summary Report", "data": ""},
+        {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": 7}
+    ]
+    # Weight towards valid traffic, roughly a third invalid
+    payloads = valid * 3 + large + invalid
+
+    if replay_file and os.path.exists(replay_file):
+        with open(replay_file, "r", encoding="utf-8") as replay:
+            payloads.extend(json.loads(line) for line in replay if line.strip())
+
+    return payloads
+
+
+def percentile(sorted_samples: List[int], fraction: float) -> float:
+    """Nearest-rank percentile of pre-sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, int(round(fraction * len(sorted_samples))) - 1))
+    return float(sorted_samples[rank])
+
+
+def measure(operation: Callable[[Any], Any], inputs: Iterable[Any], iterations: int,
+            warmup: int) -> Dict[str, float]:
+    """
+    Time individual calls of an operation.
+
+    Args:
+        operation: Callable taking one input
+        inputs: Inputs cycled through in order
+        iterations: Number of timed calls
+        warmup: Number of untimed calls made first
+
+    Returns:
+        Dictionary with p50_us, p99_us, mean_us and ops_per_sec
+    """
+    cycle = itertools.cycle(list(inputs))
+    for _ in range(warmup):
+        operation(next(cycle))
+
+    perf_counter_ns = time.perf_counter_ns
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            item = next(cycle)
+            start = perf_counter_ns()
+            operation(item)
+            samples.append(perf_counter_ns() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    samples.sort()
+    total_ns = sum(samples)
+    return {
+        "p50_us": round(percentile(samples, 0.50) / 1000, 3),
+        "p99_us": round(percentile(samples, 0.99) / 1000, 3),
+        "mean_us": round(total_ns / len(samples) / 1000, 3),
+        "ops_per_sec": round(len(samples) / (total_ns / 1e9), 1)
+    }
+
+
+def run_suite(iterations: int, replay_file: Optional[str]) -> Dict[str, Any]:
+    """
+    Run every layer benchmark.
+
+    Args:
+        iterations: Timed calls per request-level benchmark
+        replay_file: Optional JSONL file replayed as extra payloads
+
+    Returns:
+        Results document
+    """
+    logging.getLogger().setLevel(logging.CRITICAL)
+    app = create_app()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    client = app.test_client()
+    fast_client = Client(create_fast_app())
+    logging.getLogger().setLevel(logging.CRITICAL)
+    payloads = build_payload_mix(replay_file)
+    dict_payloads = [payload for payload in payloads if isinstance(payload, dict)]
+
+    def service(payload):
+        try:
+            PromptMatchingService.process_request(payload)
+        except (ValueError, TypeError):
+            pass
+
+    def http(payload):
+        client.post('/api/match-prompt', json=payload)
+
+    def wsgi(payload):
+        fast_client.post('/api/match-prompt', json=payload)
+
+    def startup(_):
+        create_app()
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+    warmup = max(1, iterations // 10)
+    results = {
+        "service": measure(service, payloads, iterations, warmup),
+        "validator": measure(PromptValidator.validate_prompt_request, dict_payloads, iterations, warmup),
+        "http": measure(http, payloads, max(1, iterations // 5), warmup),
+        "wsgi": measure(wsgi, payloads, max(1, iterations // 5), warmup),
+        "startup": measure(startup, [None], max(20, iterations // 500), 1)
+    }
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "payloads": len(payloads),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        },
+        "results": results
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float,
+            metrics: Iterable[str] = ("p50_us", "p99_us")) -> List[str]:
+    """
+    Find benchmarks whose latency regressed beyond the threshold.
+
+    Args:
+        baseline: Baseline results document
+        current: Current results document
+        threshold: Allowed relative increase (0.25 allows +25%)
+        metrics: Latency metrics to check
+
+    Returns:
+        Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    for name, base_stats in baseline["results"].items():
+        current_stats = current["results"].get(name)
+        if current_stats is None:
+            continue
+        for metric in metrics:
+            base_value = base_stats[metric]
+            current_value = current_stats[metric]
+            if base_value > 0 and current_value > base_value * (1 + threshold):
+                change = (current_value / base_value - 1) * 100
+                regressions.append(f"{name}.{metric}: {base_value:.3f} -> {current_value:.3f} (+{change:.1f}%)")
+    return regressions
+
+
+def print_results(document: Dict[str, Any]) -> None:
+    print(f"{'layer':>10}  {'p50 us':>10}  {'p99 us':>10}  {'mean us':>10}  {'ops/s':>12}")
+    for name, stats in document["results"].items():
+        print(f"{name:>10}  {stats['p50_us']:>10.2f}  {stats['p99_us']:>10.2f}  "
+              f"{stats['mean_us']:>10.2f}  {stats['ops_per_sec']:>12.0f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Layered benchmark suite with regression gating")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and write results as JSON")
+    run_parser.add_argument("--output", help="Path to write the results JSON")
+    run_parser.add_argument("--iterations", type=int, default=20000, help="Timed calls per layer")
+    run_parser.add_argument("--replay", default=DEFAULT_REPLAY_FILE,
+                            help="JSONL file replayed as extra payloads (skipped if missing)")
+
+    compare_parser = subparsers.add_parser("compare", help="Fail if current results regress")
+    compare_parser.add_argument("baseline", help="Baseline results JSON")
+    compare_parser.add_argument("current", help="Current results JSON")
+    compare_parser.add_argument("--threshold", type=float, default=0.25,
+                                help="Allowed relative p50/p99 increase (default 0.25)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        document = run_suite(args.iterations, args.replay)
+        print_results(document)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output:
+                json.dump(document, output, indent=2)
+            print(f"\nResults written to {args.output}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.current, "r", encoding="utf-8") as current_file:
+        current = json.load(current_file)
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,124 @@ class Config:
     # Logging settings
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
     LOG_FILE = os.environ.get('LOG_FILE') or 'logs/app.log'
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES') or 10 * 1024 * 1024)
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT') or 5)
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE') or 10000)
+    
+    # Fraction of successful requests whose request/response is logged
+    LOG_SUCCESS_SAMPLE_RATE = float(os.environ.get('LOG_SUCCESS_SAMPLE_RATE') or 1.0)
+    
+    # Long payload values are truncated to this many characters in log lines
+    LOG_PAYLOAD_MAX_CHARS = int(os.environ.get('LOG_PAYLOAD_MAX_CHARS') or 200)
+    LOG_PAYLOAD_HASH = os.environ.get('LOG_PAYLOAD_HASH', '').lower() in ('1', 'true', 'yes')
+    
+    # External rule file (JSON/YAML/TOML); when unset the rules below are used
+    RULES_FILE = os.environ.get('RULES_FILE')
+    
+    # Seconds between rule file change checks (0 disables the watcher)
+    RULES_WATCH_INTERVAL = float(os.environ.get('RULES_WATCH_INTERVAL') or 0)
+    
+    # Cache-Control max-age of the GET /api/rules export, in seconds
+    RULES_EXPORT_MAX_AGE = int(os.environ.get('RULES_EXPORT_MAX_AGE', 60))
+    
+    # Tenant rule sets: <TENANT_RULES_DIR>/<tenant>.json|yaml|toml, selected by header or
+    # /api/tenants/<tenant>/match-prompt (unset disables tenancy)
+    TENANT_RULES_DIR = os.environ.get('TENANT_RULES_DIR')
+    TENANT_HEADER = os.environ.get('TENANT_HEADER') or 'X-Tenant'
+    # Compiled tenants kept in memory, least recently used evicted first
+    TENANT_CACHE_SIZE = int(os.environ.get('TENANT_CACHE_SIZE') or 1000)
+    TENANT_CACHE_MAX_BYTES = int(os.environ.get('TENANT_CACHE_MAX_BYTES') or 256 * 1024 * 1024)
+    TENANT_MEMO_SIZE = int(os.environ.get('TENANT_MEMO_SIZE') or 64)  # Response memo entries per tenant
+    
+    # Token required in the X-Admin-Token header for /admin endpoints (unset disables the check)
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    
+    # Number of (situation, level, file_type) outcomes kept in the response memo
+    RESPONSE_MEMO_SIZE = int(os.environ.get('RESPONSE_MEMO_SIZE') or 1024)
+    
+    # Per-stage latency histograms and outcome counters served on /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Add a Server-Timing header with per-stage durations to every response
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Per-request cProfile capture, aggregated on GET /admin/profile
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE') or 0.0)  # Fraction of requests profiled
+    PROFILE_HEADER = os.environ.get('PROFILE_HEADER') or 'X-Profile'  # Set to ADMIN_TOKEN to profile one request
+    PROFILE_RETENTION_SECONDS = int(os.environ.get('PROFILE_RETENTION_SECONDS') or 300)
+    PROFILE_BUCKET_SECONDS = int(os.environ.get('PROFILE_BUCKET_SECONDS') or 10)
+    
+    # Memory diagnostics: tracemalloc per-request peaks and body sizes on GET /admin/memory
+    MEMORY_DIAGNOSTICS_ENABLED = os.environ.get('MEMORY_DIAGNOSTICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    MEMORY_TRACE_FRAMES = int(os.environ.get('MEMORY_TRACE_FRAMES') or 1)  # Stack depth kept per allocation
+    MEMORY_TOP_REQUESTS = int(os.environ.get('MEMORY_TOP_REQUESTS') or 20)
+    
+    # Serve /api/match-prompt and /health with the Flask-free WSGI app
+    WSGI_FASTPATH = os.environ.get('WSGI_FASTPATH', '').lower() in ('1', 'true', 'yes')
+    
+    # Largest buffered request body on /api/match-prompt, /api/match-codes and /api/jobs (413 above it)
+    MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES') or 16 * 1024 * 1024)
+    
+    # Streaming intake: parse /api/match-prompt bodies incrementally, spooling
+    # large data values instead of buffering them (MAX_BODY_BYTES then caps
+    # only the fields held in memory)
+    STREAMING_INTAKE = os.environ.get('STREAMING_INTAKE', '').lower() in ('1', 'true', 'yes')
+    STREAMING_MAX_BODY_BYTES = int(os.environ.get('STREAMING_MAX_BODY_BYTES') or 1024 * 1024 * 1024)
+    STREAMING_SPOOL_MEMORY_BYTES = int(os.environ.get('STREAMING_SPOOL_MEMORY_BYTES') or 1024 * 1024)  # Then a temp file
+    STREAMING_CHUNK_BYTES = int(os.environ.get('STREAMING_CHUNK_BYTES') or 64 * 1024)
+    
+    # gzip/deflate request bodies and negotiated response compression
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL') or 1)  # 1 = fastest; see bench_compression
+    COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES') or 1024)  # Smaller responses are sent as is
+    # Largest decompressed request body; 0 = STREAMING_MAX_BODY_BYTES for batch/NDJSON bodies and with
+    # streaming intake, MAX_BODY_BYTES otherwise
+    COMPRESSION_MAX_DECOMPRESSED_BYTES = int(os.environ.get('COMPRESSION_MAX_DECOMPRESSED_BYTES') or 0)
+    
+    # Prefork server settings (python app.py --prefork)
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS') or 0)  # 0 = one per CPU core
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS') or 4)
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS') or 0)  # 0 = never recycle
+    SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('SERVER_MAX_REQUESTS_JITTER') or 0)
+    SERVER_KEEPALIVE_TIMEOUT = float(os.environ.get('SERVER_KEEPALIVE_TIMEOUT') or 5)
+    SERVER_GRACEFUL_TIMEOUT = float(os.environ.get('SERVER_GRACEFUL_TIMEOUT') or 30)
+    
+    # Admission control on /api/match-prompt* (all checks are off by default)
+    ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT') or 0)  # 503 above this
+    ADMISSION_RATE = float(os.environ.get('ADMISSION_RATE') or 0)  # Requests/second per client, 429 above this
+    ADMISSION_BURST = int(os.environ.get('ADMISSION_BURST') or 0)  # 0 = same as ADMISSION_RATE
+    # Client id header set by a trusted proxy; unset = rate limit by peer address only
+    ADMISSION_CLIENT_HEADER = os.environ.get('ADMISSION_CLIENT_HEADER') or ''
+    ADMISSION_MAX_CLIENTS = int(os.environ.get('ADMISSION_MAX_CLIENTS') or 10000)
+    # Adaptive shedding: queue for a slot, shed once waits exceed the target for an interval
+    ADMISSION_QUEUE_TARGET_MS = float(os.environ.get('ADMISSION_QUEUE_TARGET_MS') or 0)  # 0 = reject at once
+    ADMISSION_QUEUE_INTERVAL_MS = float(os.environ.get('ADMISSION_QUEUE_INTERVAL_MS') or 100)
+    ADMISSION_QUEUE_TIMEOUT_MS = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS') or 100)
+    
+    # Background jobs (POST /api/jobs): match in the request, process the matched prompt in a worker pool
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 0)  # 0 disables the job API
+    JOB_EXECUTOR = os.environ.get('JOB_EXECUTOR') or 'thread'  # thread or process
+    JOB_PROCESSOR = os.environ.get('JOB_PROCESSOR')  # module:function, defaults to rendering the template
+    JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE') or 1000)  # 503 above this many queued jobs
+    JOB_QUEUE_MAX_BYTES = int(os.environ.get('JOB_QUEUE_MAX_BYTES') or 256 * 1024 * 1024)  # Or above this many queued payload bytes
+    JOB_RESULT_TTL = float(os.environ.get('JOB_RESULT_TTL') or 300)  # Seconds finished jobs are kept
+    JOB_RESULT_MAX_BYTES = int(os.environ.get('JOB_RESULT_MAX_BYTES') or 256 * 1024 * 1024)  # Oldest results dropped above this
+    JOB_MAX_WAIT = float(os.environ.get('JOB_MAX_WAIT') or 30)  # Longest ?wait= long poll in seconds
+    # Queue priority per prompt, lower first, e.g. "Prompt 2=0,Prompt 4=5"
+    JOB_PRIORITIES = {
+        name.strip(): int(priority)
+        for name, _, priority in (item.rpartition('=') for item in (os.environ.get('JOB_PRIORITIES') or '').split(','))
+        if name.strip()
+    }
+    JOB_DEFAULT_PRIORITY = int(os.environ.get('JOB_DEFAULT_PRIORITY') or 10)
+    
+    # Compiled prompt templates kept per rule snapshot
+    TEMPLATE_CACHE_SIZE = int(os.environ.get('TEMPLATE_CACHE_SIZE') or 256)
+    
+    # Maximum length of the data field in characters, rejected with a 413 above it
+    # (0 = no separate cap; MAX_BODY_BYTES still bounds the whole body)
+    MAX_DATA_LENGTH = int(os.environ.get('MAX_DATA_LENGTH') or 0)
     
     # Valid input options
     VALID_SITUATIONS = ["Commercial Auto", "General Liability", "Workers Compensation"]
@@ -27,27 +145,32 @@ class Config:
         "Prompt 1": {
             "situation": "Commercial Auto",
             "level": "Structure",
-            "file_type": "Summary Report"
+            "file_type": "Summary Report",
+            "template": "Structure the following Commercial Auto summary report into labelled sections: parties, incident, coverage and damages.\n\n{data}"
         },
         "Prompt 2": {
             "situation": "General Liability",
             "level": "Summarize",
-            "file_type": "Deposition"
+            "file_type": "Deposition",
+            "template": "Summarize the key testimony, admissions and disputed facts in this General Liability deposition.\n\n{data}"
         },
         "Prompt 3": {
             "situation": "Commercial Auto",
             "level": "Summarize",
-            "file_type": "Summons"
+            "file_type": "Summons",
+            "template": "Summarize this Commercial Auto summons, including the parties, the court and the response deadline.\n\n{data}"
         },
         "Prompt 4": {
             "situation": "Workers Compensation",
             "level": "Structure",
-            "file_type": "Medical Records"
+            "file_type": "Medical Records",
+            "template": "Structure these Workers Compensation medical records chronologically by provider, diagnosis and treatment.\n\n{data}"
         },
         "Prompt 5": {
             "situation": "Workers Compensation",
             "level": "Summarize",
-            "file_type": "Summons"
+            "file_type": "Summons",
+            "template": "Summarize this Workers Compensation summons, including the parties, the court and the response deadline.\n\n{data}"
         }
     }
 
@@ -0,0 +1,226 @@
+"""
+Offline bulk prompt matching over JSONL.
+
+Streams records shaped like ``/api/match-prompt`` payloads through
+PromptMatchingService.evaluate and writes one result per record, in
+input order, as JSONL. Records are matched in chunks across a process pool;
+at most ``workers * 2`` chunks are in flight, so memory stays bounded however
+large the input is.
+
+Usage:
+    python -m src.cli.bulk_match archive.jsonl --output results.jsonl
+    cat archive.jsonl | python -m src.cli.bulk_match - --workers 4 > results.jsonl
+"""
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, Optional, Tuple
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+
+from src.services.prompt_service import PromptMatchingService
+from src.services.response_cache import encode_body
+
+logger = logging.getLogger(__name__)
+
+# (first line number, raw lines) handed to a worker
+Chunk = Tuple[int, List[bytes]]
+# (encoded result lines, matched count, error counts) returned by a worker
+ChunkResult = Tuple[bytes, int, Dict[str, int]]
+
+
+def match_record(line: bytes) -> Dict[str, Any]:
+    """
+    Match one raw JSONL record.
+
+    Args:
+        line: Raw record bytes
+
+    Returns:
+        Result body, the same shape the single endpoint returns
+    """
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return {"error": "Invalid JSON format"}
+    if record is None:
+        return {"error": "Missing Data"}
+    if not isinstance(record, dict):
+        return {"error": "Invalid JSON structure - expected JSON object"}
+
+    try:
+        matched_prompt, error = PromptMatchingService.evaluate(record)
+    except TypeError:
+        return {"error": "Invalid data format"}
+    if error:
+        return {"error": error.message}
+    return {"matched_prompt": matched_prompt, "status": "success"}
+
+
+def match_chunk(chunk: Chunk) -> ChunkResult:
+    """
+    Match a chunk of raw lines, skipping blank ones.
+
+    Args:
+        chunk: Tuple of (line number of the first line, raw lines)
+
+    Returns:
+        Tuple of (encoded JSONL results, matched count, error counts by message)
+    """
+    first_line, lines = chunk
+    output = []
+    matched = 0
+    errors: Counter = Counter()
+    for line_number, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        result = match_record(line)
+        if "error" in result:
+            errors[result["error"]] += 1
+        else:
+            matched += 1
+        result["line"] = line_number
+        output.append(encode_body(result))
+    return b"".join(output), matched, dict(errors)
+
+
+def iter_chunks(stream: BinaryIO, chunk_size: int) -> Iterator[Chunk]:
+    """
+    Split a binary stream into chunks of raw lines.
+
+    Args:
+        stream: Binary JSONL stream
+        chunk_size: Lines per chunk
+
+    Yields:
+        Tuple of (line number of the first line, raw lines)
+    """
+    first_line = 1
+    while True:
+        lines = list(itertools.islice(stream, chunk_size))
+        if not lines:
+            return
+        yield first_line, lines
+        first_line += len(lines)
+
+
+def init_worker(rules_file: Optional[str], log_level: int) -> None:
+    """
+    Prepare a pool worker: quiet per-record logging and load the rules.
+
+    Args:
+        rules_file: Optional rule file overriding RULES_FILE
+        log_level: Root log level for the worker
+    """
+    logging.getLogger().setLevel(log_level)
+    if rules_file:
+        PromptMatchingService.rule_store.configure({"RULES_FILE": rules_file})
+    else:
+        PromptMatchingService.get_snapshot()
+
+
+def run_bulk_match(source: BinaryIO, sink: BinaryIO, workers: int = 1, chunk_size: int = 1000,
+                   rules_file: Optional[str] = None, log_level: int = logging.ERROR) -> Dict[str, Any]:
+    """
+    Match every record of a JSONL stream and write results in input order.
+
+    Args:
+        source: Binary JSONL input
+        sink: Binary output for JSONL results
+        workers: Worker processes (1 matches in this process)
+        chunk_size: Records per chunk sent to a worker
+        rules_file: Optional rule file overriding RULES_FILE
+        log_level: Log level while matching
+
+    Returns:
+        Summary with records, matched, errors, seconds and records_per_sec
+    """
+    matched = 0
+    errors: Counter = Counter()
+    start = time.perf_counter()
+
+    def write(result: ChunkResult) -> None:
+        nonlocal matched
+        body, chunk_matched, chunk_errors = result
+        sink.write(body)
+        matched += chunk_matched
+        errors.update(chunk_errors)
+
+    chunks = iter_chunks(source, chunk_size)
+    if workers <= 1:
+        root_logger = logging.getLogger()
+        previous_level = root_logger.level
+        init_worker(rules_file, log_level)
+        try:
+            for chunk in chunks:
+                write(match_chunk(chunk))
+        finally:
+            root_logger.setLevel(previous_level)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(rules_file, log_level)) as pool:
+            # Sliding window of in-flight chunks: results are written in
+            # submission order and reading pauses while the window is full
+            pending: Deque[Future] = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(match_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+
+    sink.flush()
+    seconds = time.perf_counter() - start
+    records = matched + sum(errors.values())
+    return {
+        "records": records,
+        "matched": matched,
+        "errors": dict(errors),
+        "seconds": round(seconds, 3),
+        "records_per_sec": round(records / seconds, 1) if seconds > 0 else 0.0
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Render a run summary for the terminal."""
+    lines = [
+        f"Matched {summary['matched']} of {summary['records']} records in {summary['seconds']:.2f}s "
+        f"({summary['records_per_sec']:.0f} records/s)"
+    ]
+    for message, count in sorted(summary["errors"].items(), key=lambda item: -item[1]):
+        lines.append(f"  {count:>10}  {message}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Match a JSONL archive of prompt requests offline")
+    parser.add_argument("input", help="JSONL input file, or - for stdin")
+    parser.add_argument("--output", "-o", default="-", help="JSONL output file, or - for stdout (default)")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records per worker task")
+    parser.add_argument("--rules", help="Rule file to match against (default: RULES_FILE or built-in rules)")
+    parser.add_argument("--verbose", action="store_true", help="Log per-record warnings")
+    args = parser.parse_args(argv)
+
+    log_level = logging.WARNING if args.verbose else logging.ERROR
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    sink = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        summary = run_bulk_match(source, sink, args.workers, args.chunk_size, args.rules, log_level)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout.buffer:
+            sink.close()
+
+    print(format_summary(summary), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
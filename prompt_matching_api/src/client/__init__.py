@@ -0,0 +1,5 @@
+"""Python clients for the prompt matching API."""
+from src.client.match_client import AsyncMatchClient, MatchClient, MatchError
+from src.client.rules_client import RulesClient, RulesFetchError
+
+__all__ = ["AsyncMatchClient", "MatchClient", "MatchError", "RulesClient", "RulesFetchError"]
@@ -0,0 +1,332 @@
+"""
+Pooled, micro-batching HTTP client for the match API.
+
+Calls from any number of threads (or asyncio tasks) are queued and a
+dispatcher thread groups them: whatever arrives within ``batch_window``
+seconds, up to ``max_batch`` payloads, goes out as one
+``POST /api/match-prompt/batch`` request over a keep-alive connection pool.
+Single payloads, and servers without the batch endpoint (such as the WSGI
+fast path), get plain ``POST /api/match-prompt`` requests.
+
+Usage:
+    from src.client import MatchClient
+
+    with MatchClient("http://localhost:5000") as client:
+        client.match({"situation": "Commercial Auto", "level": "Structure",
+                      "file_type": "Summary Report", "data": "Claim notes"})
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import asyncio
+import json
+import logging
+import queue
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.services.errors import ERROR_STATUS
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean "try again later" rather than "bad payload"
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+JSON_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+
+_Pending = Tuple[Dict[str, Any], Future]
+
+
+class MatchError(ValueError):
+    """Raised when the API rejects a payload, with the server's error message."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MatchClient:
+    """
+    Thread-safe client with a connection pool, micro-batching and retries.
+
+    Every call goes through submit(), which only enqueues the payload, so the
+    synchronous and asyncio APIs share one pool and one batcher.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 10, batch_window: float = 0.002,
+                 max_batch: int = 64, timeout: float = 5.0, retries: int = 2, backoff: float = 0.05,
+                 max_backoff: float = 2.0):
+        """
+        Args:
+            base_url: Server base URL, e.g. "http://localhost:5000"
+            pool_size: Keep-alive connections and concurrent requests
+            batch_window: Seconds to wait for more payloads before sending a batch
+            max_batch: Most payloads per batch request (1 disables batching)
+            timeout: Per-request connect and read timeout in seconds
+            retries: Extra attempts after a connection error, timeout or retryable status
+            backoff: Base delay in seconds, doubled on each retry
+            max_backoff: Cap on a single retry delay in seconds
+        """
+        self.base_url = base_url.rstrip("/")
+        self.batch_window = batch_window
+        self.max_batch = max(1, max_batch)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.batch_supported = self.max_batch > 1
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="match-client")
+        self._pending: "queue.SimpleQueue[Optional[_Pending]]" = queue.SimpleQueue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._dispatcher = threading.Thread(target=self._dispatch_forever, name="match-client-batcher",
+                                            daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, payload: Dict[str, Any]) -> Future:
+        """
+        Queue a payload for matching.
+
+        Args:
+            payload: /api/match-prompt request body
+
+        Returns:
+            Future resolving to the matched prompt name, or failing with MatchError
+            (rejected payload) or requests.RequestException (retries exhausted)
+        """
+        future: Future = Future()
+        with self._close_lock:
+            # Checked and queued together, so nothing lands behind close()'s sentinel
+            if self._closed:
+                raise RuntimeError("MatchClient is closed")
+            self._pending.put((payload, future))
+        return future
+
+    def match(self, payload: Dict[str, Any]) -> str:
+        """
+        Match one payload, blocking until the (possibly batched) response arrives.
+
+        Args:
+            payload: /api/match-prompt request body
+
+        Returns:
+            Matched prompt name
+
+        Raises:
+            MatchError: If the server rejected the payload
+            requests.RequestException: If the server could not be reached
+        """
+        return self.submit(payload).result()
+
+    def match_many(self, payloads: Sequence[Dict[str, Any]],
+                   return_exceptions: bool = False) -> List[Union[str, Exception]]:
+        """
+        Match several payloads, letting the batcher group them.
+
+        Args:
+            payloads: Request bodies
+            return_exceptions: Return errors in place instead of raising the first one
+
+        Returns:
+            Prompt names (or exceptions) in payload order
+        """
+        futures = [self.submit(payload) for payload in payloads]
+        if not return_exceptions:
+            return [future.result() for future in futures]
+        return [future.exception() or future.result() for future in futures]
+
+    def close(self) -> None:
+        """Send everything still queued, then release the pool."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+        self.session.close()
+        # Anything the dispatcher did not take (it stopped on an error) must not hang its caller
+        while True:
+            try:
+                item = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("MatchClient is closed"))
+
+    def __enter__(self) -> "MatchClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _dispatch_forever(self) -> None:
+        pending = self._pending
+        closing = False
+        while not closing:
+            item = pending.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    # Take what is already queued, then wait out the window
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = pending.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+
+            batch = [(payload, future) for payload, future in batch if future.set_running_or_notify_cancel()]
+            if len(batch) > 1 and self.batch_supported:
+                self._executor.submit(self._send_batch, batch)
+            else:
+                for payload, future in batch:
+                    self._executor.submit(self._send_single, payload, future)
+
+    def _post(self, path: str, body: Any) -> requests.Response:
+        data = json.dumps(body, separators=(",", ":")).encode("utf-8")
+        attempt = 0
+        while True:
+            delay = min(self.backoff * (2 ** attempt), self.max_backoff) * random.uniform(0.5, 1.0)
+            try:
+                response = self.session.post(self.base_url + path, data=data, headers=JSON_HEADERS,
+                                             timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.retries:
+                    raise
+                logger.warning("POST %s failed (%s), retrying in %.3fs", path, e, delay)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, min(float(retry_after), self.max_backoff))
+                logger.warning("POST %s returned %d, retrying in %.3fs", path, response.status_code, delay)
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _read_result(body: Any, status_code: int) -> str:
+        if status_code == 200 and isinstance(body, dict) and "matched_prompt" in body:
+            return body["matched_prompt"]
+        message = body.get("error") if isinstance(body, dict) else None
+        raise MatchError(message or f"HTTP {status_code}", status_code)
+
+    def _send_single(self, payload: Dict[str, Any], future: Future) -> None:
+        try:
+            response = self._post("/api/match-prompt", payload)
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            future.set_result(self._read_result(body, response.status_code))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _send_batch(self, batch: List[_Pending]) -> None:
+        try:
+            response = self._post("/api/match-prompt/batch", [payload for payload, _ in batch])
+            if response.status_code in (404, 405):
+                # Server without the batch endpoint: send these and all later payloads singly
+                logger.info("Batch endpoint unavailable at %s, falling back to single requests", self.base_url)
+                self.batch_supported = False
+                for payload, future in batch:
+                    self._send_single(payload, future)
+                return
+            results = response.json() if response.status_code == 200 else None
+            if not isinstance(results, list):
+                raise MatchError(f"Batch request failed with HTTP {response.status_code}", response.status_code)
+
+            futures = [future for _, future in batch]
+            for result in results:
+                index = result.get("index") if isinstance(result, dict) else None
+                if not isinstance(index, int) or not 0 <= index < len(futures) or futures[index] is None:
+                    continue
+                future, futures[index] = futures[index], None
+                if "error" in result:
+                    future.set_exception(MatchError(result["error"], ERROR_STATUS.get(result["error"], 400)))
+                elif "matched_prompt" in result:
+                    future.set_result(result["matched_prompt"])
+                else:
+                    future.set_exception(MatchError("Malformed result in batch response", response.status_code))
+            for future in futures:
+                if future is not None:
+                    future.set_exception(MatchError("Missing result in batch response", response.status_code))
+        except Exception as e:
+            # Never leave a caller waiting on a future this batch was meant to resolve
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+class AsyncMatchClient:
+    """asyncio interface to a MatchClient; calls from all tasks share its pool and batcher."""
+
+    def __init__(self, base_url: str, **options: Any):
+        """
+        Args:
+            base_url: Server base URL
+            **options: MatchClient options
+        """
+        self.client = MatchClient(base_url, **options)
+
+    async def match(self, payload: Dict[str, Any]) -> str:
+        """
+        Match one payload.
+
+        Args:
+            payload: /api/match-prompt request body
+
+        Returns:
+            Matched prompt name
+
+        Raises:
+            MatchError: If the server rejected the payload
+            requests.RequestException: If the server could not be reached
+        """
+        return await asyncio.wrap_future(self.client.submit(payload))
+
+    async def match_many(self, payloads: Sequence[Dict[str, Any]],
+                         return_exceptions: bool = False) -> List[Union[str, BaseException]]:
+        """
+        Match several payloads concurrently.
+
+        Args:
+            payloads: Request bodies
+            return_exceptions: Return errors in place instead of raising the first one
+
+        Returns:
+            Prompt names (or exceptions) in payload order
+        """
+        return await asyncio.gather(*(self.match(payload) for payload in payloads),
+                                    return_exceptions=return_exceptions)
+
+    async def close(self) -> None:
+        """Send everything still queued, then release the pool."""
+        await asyncio.get_running_loop().run_in_executor(None, self.client.close)
+
+    async def __aenter__(self) -> "AsyncMatchClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
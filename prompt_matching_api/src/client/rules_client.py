@@ -0,0 +1,230 @@
+"""
+Local prompt matching against the rule set exported by ``GET /api/rules``.
+
+The client keeps the compiled rules in memory and, optionally, on disk. It
+revalidates them in a background thread with ``If-None-Match``, so callers
+match with no network round trip and pick up rule changes within one refresh
+interval. Matching uses the same snapshot compiler, validator and index as
+the server, so results are identical.
+
+Usage:
+    from src.client import RulesClient
+
+    with RulesClient("http://localhost:5000", cache_path="/var/cache/prompt-rules.json") as client:
+        prompt_name = client.match({"situation": "Commercial Auto", "level": "Structure",
+                                    "file_type": "Summary Report", "data": ""})
+"""
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+from src.services.prompt_service import PromptMatchingService
+from src.services.rule_index import RuleConflictError
+from src.services.rule_store import RuleLoadError, RuleSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Refresh interval used until the server sends a Cache-Control max-age
+DEFAULT_MAX_AGE = 60
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+# (url, request headers, timeout) -> (status, lower-cased response headers, body)
+Transport = Callable[[str, Mapping[str, str], float], Tuple[int, Dict[str, str], bytes]]
+
+
+class RulesFetchError(RuntimeError):
+    """Raised when no usable rule set could be fetched or loaded."""
+
+
+def urllib_transport(url: str, headers: Mapping[str, str], timeout: float) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Perform a GET request with urllib.
+
+    Args:
+        url: Absolute URL
+        headers: Request headers
+        timeout: Socket timeout in seconds
+
+    Returns:
+        Tuple of (status, lower-cased response headers, body)
+    """
+    try:
+        with urlopen(Request(url, headers=dict(headers)), timeout=timeout) as response:
+            return response.status, {k.lower(): v for k, v in response.headers.items()}, response.read()
+    except HTTPError as e:
+        # urllib reports 304 Not Modified as an error
+        return e.code, {k.lower(): v for k, v in e.headers.items()}, b""
+
+
+class RulesClient:
+    """
+    Matches payloads in-process against a cached copy of the server's rules.
+
+    Every match reads the current snapshot reference without locking; a
+    refresh compiles the new rules off to the side and swaps the reference,
+    like RuleStore does on the server.
+    """
+
+    def __init__(self, base_url: str, cache_path: Optional[str] = None,
+                 refresh_interval: Optional[float] = None, timeout: float = 5.0,
+                 transport: Optional[Transport] = None, background: bool = True):
+        """
+        Load the rules and start background revalidation.
+
+        The on-disk copy is used first when present, so a client can start
+        while the server is unreachable; otherwise the rules are fetched
+        before returning.
+
+        Args:
+            base_url: Server base URL, e.g. "http://localhost:5000"
+            cache_path: JSON file to persist the rules in (None keeps them in memory only)
+            refresh_interval: Seconds between revalidations (None follows the server's max-age)
+            timeout: Request timeout in seconds
+            transport: Callable performing GET requests (defaults to urllib)
+            background: Whether to revalidate in a background thread
+
+        Raises:
+            RulesFetchError: If no rules could be loaded from disk or the server
+        """
+        self.url = base_url.rstrip("/") + "/api/rules"
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self._transport = transport or urllib_transport
+        self._state: Optional[Tuple[RuleSnapshot, Optional[str]]] = None
+        self._max_age = DEFAULT_MAX_AGE
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if not self._load_cache_file():
+            try:
+                self.refresh()
+            except (OSError, ValueError, RulesFetchError) as e:
+                raise RulesFetchError(f"Could not load rules from {self.url}: {str(e)}")
+        if background:
+            self._thread = threading.Thread(target=self._revalidate_forever, name="rules-client", daemon=True)
+            self._thread.start()
+
+    @property
+    def snapshot(self) -> RuleSnapshot:
+        """Compiled rules currently used for matching."""
+        return self._state[0]
+
+    @property
+    def etag(self) -> Optional[str]:
+        """ETag of the current rules."""
+        return self._state[1]
+
+    def match(self, data: Dict[str, Any]) -> str:
+        """
+        Match a payload locally with the server's semantics.
+
+        Args:
+            data: Payload shaped like a /api/match-prompt request
+
+        Returns:
+            Matched prompt name
+
+        Raises:
+            ValueError: With the error message the server would return
+        """
+        matched_prompt, error = PromptMatchingService.evaluate(data, self._state[0])
+        if error:
+            raise ValueError(error.message)
+        return matched_prompt
+
+    def refresh(self) -> bool:
+        """
+        Revalidate the rules with the server now.
+
+        Returns:
+            True if new rules were installed, False if they were still current
+
+        Raises:
+            RulesFetchError: If the server answered with an unexpected status or invalid rules
+            OSError: If the server could not be reached
+        """
+        with self._refresh_lock:
+            headers = {"Accept": "application/json"}
+            state = self._state
+            if state is not None and state[1]:
+                headers["If-None-Match"] = state[1]
+
+            status, response_headers, body = self._transport(self.url, headers, self.timeout)
+            max_age = _MAX_AGE.search(response_headers.get("cache-control", ""))
+            if max_age:
+                self._max_age = int(max_age.group(1))
+
+            if status == 304 and state is not None:
+                return False
+            if status != 200:
+                raise RulesFetchError(f"GET {self.url} returned {status}")
+
+            document = json.loads(body)
+            etag = response_headers.get("etag")
+            self._state = (self._compile(document), etag)
+            logger.info("Installed rules %s from %s", etag, self.url)
+            self._save_cache_file(document, etag)
+            return True
+
+    def close(self) -> None:
+        """Stop background revalidation."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "RulesClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _compile(self, document: Mapping[str, Any]) -> RuleSnapshot:
+        try:
+            return RuleSnapshot.from_document(document, self.url, document.get("max_data_length"))
+        except (RuleLoadError, RuleConflictError) as e:
+            raise RulesFetchError(f"Invalid rules from {self.url}: {str(e)}")
+
+    def _revalidate_forever(self) -> None:
+        while not self._stop.wait(max(self.refresh_interval or self._max_age, 1)):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep matching with the rules we have
+                logger.warning("Rule revalidation against %s failed: %s", self.url, e)
+
+    def _load_cache_file(self) -> bool:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as cache_file:
+                cached = json.load(cache_file)
+            if cached.get("url") != self.url:
+                return False
+            self._state = (self._compile(cached["document"]), cached.get("etag"))
+        except (OSError, ValueError, KeyError, AttributeError, RulesFetchError) as e:
+            logger.warning("Ignoring unreadable rule cache %s: %s", self.cache_path, e)
+            return False
+        logger.info("Loaded rules %s from %s", self._state[1], self.cache_path)
+        return True
+
+    def _save_cache_file(self, document: Mapping[str, Any], etag: Optional[str]) -> None:
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            # Write then rename, so readers never see a partial file
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False) as cache_file:
+                json.dump({"url": self.url, "etag": etag, "document": document}, cache_file)
+            os.replace(cache_file.name, self.cache_path)
+        except OSError as e:
+            logger.warning("Could not write rule cache %s: %s", self.cache_path, e)
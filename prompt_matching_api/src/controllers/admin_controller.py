@@ -0,0 +1,216 @@
+from flask import Blueprint, Response, current_app, request, jsonify
+import hmac
+import logging
+from src.services.jobs import job_queue
+from src.services.prompt_service import PromptMatchingService
+from src.services.rule_index import RuleConflictError
+from src.services.rule_store import RuleLoadError
+from src.services.tenants import UNKNOWN_TENANT, tenant_registry
+from src.utils.memory import memory_diagnostics
+from src.utils.profiling import profiler, render_collapsed, render_pstats
+
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.before_request
+def require_admin_token():
+    """Reject admin requests without the configured X-Admin-Token."""
+    admin_token = current_app.config.get('ADMIN_TOKEN') or ''
+    supplied_token = request.headers.get('X-Admin-Token', '')
+    if not admin_token or not hmac.compare_digest(supplied_token.encode(), admin_token.encode()):
+        logger.warning(f"Rejected admin request to {request.path}")
+        return jsonify({
+            "error": "Unauthorized"
+        }), 401
+    return None
+
+class AdminController:
+    """Controller class for operational endpoints."""
+    
+    @staticmethod
+    def describe_rules(snapshot):
+        """Summarise a rule snapshot for admin responses."""
+        return {
+            "version": snapshot.version,
+            "source": snapshot.source,
+            "rule_count": len(snapshot.index)
+        }
+    
+    @classmethod
+    def handle_rules_status(cls):
+        """Handle GET request describing the active rule snapshot."""
+        return jsonify(cls.describe_rules(PromptMatchingService.get_snapshot())), 200
+    
+    @classmethod
+    def handle_rules_reload(cls):
+        """Handle POST request rebuilding the rule snapshot from its source."""
+        try:
+            snapshot = PromptMatchingService.rule_store.reload()
+        except (RuleLoadError, RuleConflictError) as e:
+            logger.error(f"Rule reload failed: {str(e)}")
+            return jsonify({
+                "error": "Rule reload failed",
+                "detail": str(e),
+                "active": cls.describe_rules(PromptMatchingService.get_snapshot())
+            }), 400
+        
+        return jsonify({
+            "status": "reloaded",
+            **cls.describe_rules(snapshot)
+        }), 200
+    
+    @classmethod
+    def handle_profile(cls):
+        """Handle GET request returning profiles aggregated over a recent window."""
+        if not profiler.enabled:
+            return jsonify({
+                "error": "Profiling is disabled"
+            }), 404
+        
+        try:
+            seconds = float(request.args.get('seconds', 60))
+            limit = int(request.args.get('limit', 40))
+        except ValueError:
+            return jsonify({
+                "error": "seconds and limit must be numbers"
+            }), 400
+        output_format = request.args.get('format', 'pstats')
+        if output_format not in ('pstats', 'collapsed'):
+            return jsonify({
+                "error": "format must be pstats or collapsed"
+            }), 400
+        
+        stats, captures = profiler.collector.aggregate(seconds)
+        if stats is None:
+            return jsonify({
+                "error": f"No profiles captured in the last {seconds:g} seconds"
+            }), 404
+        
+        if output_format == 'collapsed':
+            body = render_collapsed(stats)
+        else:
+            try:
+                body = render_pstats(stats, request.args.get('sort', 'cumulative'), limit)
+            except KeyError:
+                return jsonify({
+                    "error": "Unknown sort key"
+                }), 400
+        response = Response(body, mimetype='text/plain')
+        response.headers['X-Profile-Captures'] = str(captures)
+        return response, 200
+
+    
+    @classmethod
+    def handle_memory_report(cls):
+        """Handle GET request returning memory diagnostics and top allocation sites."""
+        if not memory_diagnostics.enabled:
+            return jsonify({
+                "error": "Memory diagnostics are disabled"
+            }), 404
+        
+        try:
+            limit = int(request.args.get('limit', 15))
+        except ValueError:
+            return jsonify({
+                "error": "limit must be a number"
+            }), 400
+        group_by = request.args.get('group_by', 'lineno')
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            return jsonify({
+                "error": "group_by must be lineno, filename or traceback"
+            }), 400
+        
+        return jsonify(memory_diagnostics.report(limit, group_by)), 200
+    
+    @classmethod
+    def handle_memory_baseline(cls):
+        """Handle POST request resetting the allocation growth baseline."""
+        if not memory_diagnostics.enabled:
+            return jsonify({
+                "error": "Memory diagnostics are disabled"
+            }), 404
+        
+        memory_diagnostics.take_baseline()
+        return jsonify({
+            "status": "baseline reset"
+        }), 200
+    
+    @staticmethod
+    def handle_tenants_status():
+        """Handle GET request describing the tenant rule cache."""
+        limit = request.args.get('limit', '20')
+        if not limit.isdigit():
+            return jsonify({
+                "error": "limit must be a non-negative integer"
+            }), 400
+        return jsonify(tenant_registry.info(int(limit))), 200
+    
+    @classmethod
+    def handle_tenant_reload(cls, tenant_id):
+        """Handle POST request recompiling one tenant's rules from storage."""
+        tenant_registry.invalidate(tenant_id)
+        tables, error = tenant_registry.lookup(tenant_id)
+        if error is not None:
+            return jsonify({
+                "error": error
+            }), 404 if error == UNKNOWN_TENANT else 400
+        
+        return jsonify({
+            "status": "reloaded",
+            "tenant": tenant_id,
+            "rules": cls.describe_rules(tables.snapshot)
+        }), 200
+    
+    @staticmethod
+    def handle_jobs_status():
+        """Handle GET request describing the background job queue and workers."""
+        if not job_queue.enabled:
+            return jsonify({
+                "error": "Background jobs are disabled"
+            }), 404
+        
+        return jsonify(job_queue.stats()), 200
+
+
+# Route definitions
+@admin_bp.route('/rules', methods=['GET'])
+def rules_status():
+    """Admin endpoint describing the active rule set."""
+    return AdminController.handle_rules_status()
+
+@admin_bp.route('/rules/reload', methods=['POST'])
+def rules_reload():
+    """Admin endpoint reloading the rule set."""
+    return AdminController.handle_rules_reload()
+
+@admin_bp.route('/profile', methods=['GET'])
+def profile():
+    """Admin endpoint returning aggregated request profiles."""
+    return AdminController.handle_profile()
+
+@admin_bp.route('/memory', methods=['GET'])
+def memory_report():
+    """Admin endpoint returning memory diagnostics."""
+    return AdminController.handle_memory_report()
+
+@admin_bp.route('/memory/baseline', methods=['POST'])
+def memory_baseline():
+    """Admin endpoint resetting the allocation growth baseline."""
+    return AdminController.handle_memory_baseline()
+
+@admin_bp.route('/tenants', methods=['GET'])
+def tenants_status():
+    """Admin endpoint describing the tenant rule cache."""
+    return AdminController.handle_tenants_status()
+
+@admin_bp.route('/tenants/<tenant_id>/reload', methods=['POST'])
+def tenant_reload(tenant_id):
+    """Admin endpoint recompiling one tenant's rules."""
+    return AdminController.handle_tenant_reload(tenant_id)
+
+@admin_bp.route('/jobs', methods=['GET'])
+def jobs_status():
+    """Admin endpoint describing the background job queue."""
+    return AdminController.handle_jobs_status()
@@ -0,0 +1,103 @@
+from flask import Blueprint, request, jsonify
+import logging
+from src.controllers.prompt_controller import BodyTooLargeError, PromptController
+from src.services.jobs import QUEUED, job_queue
+from src.services.prompt_service import PromptMatchingService
+from src.services.response_cache import response_cache
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+job_bp = Blueprint('jobs', __name__)
+
+class JobController:
+    """Controller class for the background job API."""
+    
+    @staticmethod
+    def handle_job_submission():
+        """Handle POST request matching a payload and queueing its processing."""
+        if not job_queue.enabled:
+            return PromptController.cached_response(response_cache.error("Background jobs are disabled"))
+        
+        if not request.is_json:
+            logger.warning("Job request without JSON content-type received")
+            return PromptController.cached_response(response_cache.error("Content-Type must be application/json"))
+        
+        tables, tenant_error = PromptController.resolve_tenant()
+        if tenant_error is not None:
+            return PromptController.cached_response(tenant_error)
+        
+        try:
+            request_data = PromptController.read_json()
+        except BodyTooLargeError as e:
+            logger.warning("Job request rejected: %s", e)
+            return PromptController.cached_response(response_cache.error(str(e)))
+        except Exception as json_error:
+            logger.warning("Invalid JSON received: %s", json_error)
+            return PromptController.cached_response(response_cache.error("Invalid JSON format"))
+        
+        if request_data is None:
+            logger.warning("Empty JSON request received")
+            return PromptController.cached_response(response_cache.error("Missing Data"))
+        
+        if not isinstance(request_data, dict):
+            logger.warning("Invalid JSON structure - expected object, got %s", type(request_data).__name__)
+            return PromptController.cached_response(
+                response_cache.error("Invalid JSON structure - expected JSON object")
+            )
+        
+        # Match in the request so invalid payloads fail fast with the usual errors
+        snapshot = tables.snapshot if tables is not None else PromptMatchingService.get_snapshot()
+        try:
+            prompt_name, error = PromptMatchingService.evaluate(request_data, snapshot)
+        except TypeError as e:
+            logger.warning(f"Type error: {str(e)}")
+            return PromptController.cached_response(response_cache.error("Invalid data format"))
+        if error:
+            logger.warning("Validation error: %s", error.message)
+            return PromptController.cached_response(response_cache.error(error.message))
+        
+        job = job_queue.submit(prompt_name, request_data, snapshot)
+        if job is None:
+            logger.warning("Job queue full, rejected %s", prompt_name)
+            return PromptController.cached_response(response_cache.error("Job queue full"))
+        
+        if metrics.enabled:
+            metrics.increment("matches", prompt_name)
+        logger.info("Queued job %s for %s", job.job_id, prompt_name)
+        return jsonify({
+            "job_id": job.job_id,
+            "status": QUEUED,
+            "matched_prompt": prompt_name
+        }), 202, {"Location": f"/api/jobs/{job.job_id}"}
+    
+    @staticmethod
+    def handle_job_status(job_id):
+        """Handle GET request returning a job, long-polling with ?wait=<seconds>."""
+        job = job_queue.get(job_id)
+        if job is None:
+            return PromptController.cached_response(response_cache.error("Job not found"))
+        
+        try:
+            wait = float(request.args.get('wait', 0))
+        except ValueError:
+            return jsonify({
+                "error": "wait must be a number of seconds"
+            }), 400
+        if wait > 0 and not job.finished:
+            job.wait(min(wait, job_queue.max_wait))
+        
+        return jsonify(job.to_dict()), 200
+
+
+# Route definitions
+@job_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """API endpoint queueing a payload for background processing."""
+    return JobController.handle_job_submission()
+
+@job_bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """API endpoint returning a background job's status and result."""
+    return JobController.handle_job_status(job_id)
@@ -1,94 +1,382 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from typing import Any, Dict, Iterator, Optional, Tuple
+import itertools
+import json
 import logging
-from src.services.prompt_service import PromptMatchingService
+from src.services.codes import MEDIA_TYPE as CODES_MEDIA_TYPE
+from src.services.prompt_service import ErrorCode, PromptMatchingService
+from src.services.response_cache import CachedResponse, ERROR_STATUS, etag_matches, response_cache
+from src.services.rule_store import RuleSnapshot
+from src.services.tenants import tenant_registry
+from src.utils.intake import IntakeError, StreamedObject, streaming_intake
+from src.utils.logging_setup import redact_payload, success_sampler
+from src.utils.metrics import metrics
+from src.utils.streaming import INVALID_ITEM, StreamingJSONError, iter_json_array, iter_ndjson, read_capped
 
 logger = logging.getLogger(__name__)
 
 # Create blueprint
 prompt_bp = Blueprint('prompt', __name__)
 
+# Batch item bodies for each validation failure, indexed by ErrorCode
+ITEM_FAILURES = tuple(
+    ({"error": code.message}, ERROR_STATUS.get(code.message, 400)) if code else None for code in ErrorCode
+)
+
+class BodyTooLargeError(Exception):
+    """Raised when a buffered request body exceeds MAX_BODY_BYTES."""
+    pass
+
 class PromptController:
     """Controller class handling HTTP requests and responses."""
     
     @staticmethod
-    def handle_prompt_matching():
-        """Handle POST request for prompt matching."""
+    def read_body() -> Optional[bytes]:
+        """
+        Read the request body, enforcing MAX_BODY_BYTES.
+        
+        Returns:
+            Body bytes, or None if the body exceeds the cap
+        """
+        max_body_bytes = current_app.config['MAX_BODY_BYTES']
+        content_length = request.content_length
+        if not content_length and request.environ.get('wsgi.input_terminated'):
+            # Werkzeug reports 0 for a body the server (or decompression) ends instead of a length
+            content_length = None
+        if content_length is None:
+            # Chunked body without a length: read in bounded chunks up to one byte past the cap
+            return read_capped(request.stream, max_body_bytes)
+        if content_length > max_body_bytes:
+            return None
+        return request.stream.read(content_length) if content_length > 0 else b""
+    
+    @classmethod
+    def read_json(cls) -> Any:
+        """
+        Decode the request body as JSON.
+        
+        Raises:
+            BodyTooLargeError: If the body exceeds MAX_BODY_BYTES
+        """
+        body = cls.read_body()
+        if body is None:
+            raise BodyTooLargeError("Request body too large")
+        return json.loads(body)
+    
+    @staticmethod
+    def cached_response(cached: CachedResponse) -> Response:
+        """Wrap a pre-encoded response body in a Flask response."""
+        if metrics.enabled:
+            if cached.error is None:
+                metrics.increment("matches", cached.matched_prompt)
+            else:
+                metrics.increment("errors", cached.error)
+        return Response(cached.body, status=cached.status_code, mimetype="application/json")
+    
+    @staticmethod
+    def resolve_tenant(tenant_id: Optional[str] = None):
+        """
+        Look up the tenant named in the path or the tenant header.
+        
+        Args:
+            tenant_id: Tenant from the URL path, if any
+            
+        Returns:
+            Tuple of (tables, error); tables is None for the global rules,
+            error is a cached error response for an unusable tenant
+        """
+        if tenant_id is None and tenant_registry.enabled:
+            tenant_id = request.headers.get(tenant_registry.header)
+        if tenant_id is None:
+            return None, None
+        tables, error = tenant_registry.lookup(tenant_id)
+        if error is not None:
+            logger.warning("Tenant %s rejected: %s", tenant_id, error)
+            return None, response_cache.error(error)
+        return tables, None
+    
+    @classmethod
+    def handle_prompt_matching(cls, tenant_id: Optional[str] = None):
+        """
+        Handle POST request for prompt matching.
+        
+        Args:
+            tenant_id: Tenant from the URL path (defaults to the tenant header, then the global rules)
+        """
         try:
             # Check if request contains JSON
             if not request.is_json:
                 logger.warning("Request without JSON content-type received")
-                return jsonify({
-                    "error": "Content-Type must be application/json"
-                }), 400
+                return cls.cached_response(response_cache.error("Content-Type must be application/json"))
+            
+            tables, tenant_error = cls.resolve_tenant(tenant_id)
+            if tenant_error is not None:
+                return cls.cached_response(tenant_error)
+            
+            render = request.args.get('render', '').lower() in ('1', 'true', 'yes')
+            
+            # Large documents: parse incrementally instead of buffering the body
+            if streaming_intake.enabled:
+                return cls.handle_streamed_matching(render, tables)
             
             # Get JSON data from request with error handling
             try:
-                request_data = request.get_json(force=True)
+                request_data = cls.read_json()
+            except BodyTooLargeError as e:
+                logger.warning("Request rejected: %s", e)
+                return cls.cached_response(response_cache.error(str(e)))
             except Exception as json_error:
-                logger.warning(f"Invalid JSON received: {str(json_error)}")
-                return jsonify({
-                    "error": "Invalid JSON format"
-                }), 400
+                logger.warning("Invalid JSON received: %s", json_error)
+                return cls.cached_response(response_cache.error("Invalid JSON format"))
             
             # Handle case where JSON is None or empty
             if request_data is None:
                 logger.warning("Empty JSON request received")
-                return jsonify({
-                    "error": "Missing Data"
-                }), 400
+                return cls.cached_response(response_cache.error("Missing Data"))
             
             # Check if request_data is not a dictionary
             if not isinstance(request_data, dict):
-                logger.warning(f"Invalid JSON structure - expected object, got {type(request_data).__name__}")
-                return jsonify({
-                    "error": "Invalid JSON structure - expected JSON object"
-                }), 400
-            
-            logger.info(f"Processing request: {request_data}")
-            
-            # Process request through service layer
-            matched_prompt = PromptMatchingService.process_request(request_data)
+                logger.warning("Invalid JSON structure - expected object, got %s", type(request_data).__name__)
+                return cls.cached_response(response_cache.error("Invalid JSON structure - expected JSON object"))
             
-            # Return success response
-            response = {
-                "matched_prompt": matched_prompt,
-                "status": "success"
-            }
-            logger.info(f"Request successful: {response}")
-            return jsonify(response), 200
+            # Success-path logs are sampled; payloads are redacted before formatting
+            log_success = success_sampler.sample() and logger.isEnabledFor(logging.INFO)
+            if log_success:
+                logger.info("Processing request: %s", redact_payload(request_data))
             
-        except ValueError as e:
-            # Handle business logic errors
-            error_message = str(e)
-            
-            logger.warning(f"Validation error: {error_message}")
-            
-            if error_message == "Missing Data":
-                return jsonify({
-                    "error": "Missing Data"
-                }), 400
-            elif error_message == "Invalid Prompt":
-                return jsonify({
-                    "error": "Invalid Prompt"
-                }), 400
+            # Validate and match through the service layer, serving pre-encoded bytes
+            if render:
+                cached = response_cache.respond_rendered(request_data, tables)
             else:
-                return jsonify({
-                    "error": "Invalid Prompt"
-                }), 400
+                cached = response_cache.respond(request_data, tables)
+            if cached.error is not None:
+                logger.warning("Validation error: %s", cached.error)
+            elif log_success:
+                logger.info("Request successful: %s", cached.matched_prompt)
+            return cls.cached_response(cached)
         
         except TypeError as e:
             # Handle type errors (like trying to access dict methods on non-dict)
             logger.warning(f"Type error: {str(e)}")
-            return jsonify({
-                "error": "Invalid data format"
-            }), 400
+            return cls.cached_response(response_cache.error("Invalid data format"))
                 
         except Exception as e:
             # Handle unexpected errors
             logger.error(f"Unexpected error: {str(e)}")
+            return cls.cached_response(response_cache.error("Internal server error"))
+    
+    @classmethod
+    def handle_streamed_matching(cls, render: bool, tables=None):
+        """
+        Handle POST request for prompt matching with the streaming intake.
+        
+        Args:
+            render: Whether to return the rendered prompt
+            tables: Tenant response tables (defaults to the global rules)
+        """
+        snapshot = tables.snapshot if tables is not None else PromptMatchingService.get_snapshot()
+        try:
+            document = streaming_intake.read(
+                request.stream, request.content_length, keep_text=render,
+                max_chars=snapshot.validator.max_length
+            )
+        except IntakeError as e:
+            logger.warning("Streamed request rejected: %s", e)
+            return cls.cached_response(response_cache.error(str(e)))
+        
+        if document is None:
+            logger.warning("Empty JSON request received")
+            return cls.cached_response(response_cache.error("Missing Data"))
+        
+        if not isinstance(document, StreamedObject):
+            logger.warning("Invalid JSON structure - expected object, got %s", type(document).__name__)
+            return cls.cached_response(response_cache.error("Invalid JSON structure - expected JSON object"))
+        
+        log_success = success_sampler.sample() and logger.isEnabledFor(logging.INFO)
+        if log_success:
+            logger.info("Processing streamed request: %s (spooled: %s)", redact_payload(document.fields),
+                        {name: text.length for name, text in document.spooled.items()})
+        
+        cached = response_cache.respond_streamed(document, render, tables)
+        if cached.error is not None:
+            logger.warning("Validation error: %s", cached.error)
+        elif log_success:
+            logger.info("Request successful: %s", cached.matched_prompt)
+        return cls.cached_response(cached)
+    
+    @staticmethod
+    def handle_rules_export():
+        """Handle GET request exporting the active rule set for local matching."""
+        export = response_cache.rules_export()
+        headers = {
+            "ETag": export.etag,
+            "Cache-Control": f"public, max-age={current_app.config['RULES_EXPORT_MAX_AGE']}"
+        }
+        if etag_matches(request.headers.get('If-None-Match'), export.etag):
+            return Response(status=304, headers=headers)
+        return Response(export.body, status=200, headers=headers, mimetype="application/json")
+    
+    @staticmethod
+    def handle_code_table():
+        """Handle GET request publishing the integer code table."""
+        table = response_cache.code_table()
+        headers = {
+            "ETag": table.etag,
+            "Cache-Control": f"public, max-age={current_app.config['RULES_EXPORT_MAX_AGE']}"
+        }
+        if etag_matches(request.headers.get('If-None-Match'), table.etag):
+            return Response(status=304, headers=headers)
+        return Response(table.body, status=200, headers=headers, mimetype="application/json")
+    
+    @classmethod
+    def handle_code_matching(cls):
+        """Handle POST request matching a packed body of integer code records."""
+        table = response_cache.code_table()
+        headers = {"X-Code-Table": table.version}
+        error = None
+        if request.mimetype != CODES_MEDIA_TYPE:
+            error = "Content-Type must be application/x-prompt-codes"
+        elif request.headers.get('X-Code-Table', table.version) != table.version:
+            error = "Code table changed"
+        else:
+            body = cls.read_body()
+            if body is None:
+                error = "Request body too large"
+            else:
+                try:
+                    return Response(table.match_packed(body), status=200, headers=headers,
+                                    mimetype=CODES_MEDIA_TYPE)
+                except ValueError:
+                    error = "Invalid code record length"
+        
+        logger.warning("Code request rejected: %s", error)
+        cached = response_cache.error(error)
+        return Response(cached.body, status=cached.status_code, headers=headers, mimetype="application/json")
+    
+    @staticmethod
+    def match_item(item: Any, snapshot: Optional[RuleSnapshot] = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Match a single batch item, mirroring the single-request error semantics.
+        
+        Args:
+            item: Decoded JSON item, or INVALID_ITEM if it could not be decoded
+            snapshot: Tenant rule snapshot (defaults to the global rules)
+            
+        Returns:
+            Tuple of (response_body, status_code)
+        """
+        if item is INVALID_ITEM:
+            return {"error": "Invalid JSON format"}, 400
+        if item is None:
+            return {"error": "Missing Data"}, 400
+        if not isinstance(item, dict):
+            return {"error": "Invalid JSON structure - expected JSON object"}, 400
+        
+        try:
+            matched_prompt, error = PromptMatchingService.evaluate(item, snapshot)
+            if error:
+                return ITEM_FAILURES[error]
+            return {"matched_prompt": matched_prompt, "status": "success"}, 200
+        except TypeError as e:
+            logger.warning(f"Type error: {str(e)}")
+            return {"error": "Invalid data format"}, 400
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            return {"error": "Internal server error"}, 500
+    
+    @classmethod
+    def iter_batch_results(cls, items: Iterator[Any],
+                           snapshot: Optional[RuleSnapshot] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Match items one at a time, yielding a result as soon as each is ready.
+        
+        Args:
+            items: Iterator of decoded JSON items
+            snapshot: Tenant rule snapshot (defaults to the global rules)
+            
+        Yields:
+            Result dict for each item, tagged with its position in the batch
+        """
+        processed = 0
+        errors = 0
+        try:
+            for index, item in enumerate(items):
+                body, status_code = cls.match_item(item, snapshot)
+                processed += 1
+                if status_code != 200:
+                    errors += 1
+                if metrics.enabled:
+                    if status_code == 200:
+                        metrics.increment("matches", body["matched_prompt"])
+                    else:
+                        metrics.increment("errors", body["error"])
+                yield {"index": index, **body}
+        except StreamingJSONError as e:
+            logger.warning(f"Invalid JSON in batch at item {processed}: {str(e)}")
+            errors += 1
+            yield {"index": processed, "error": "Invalid JSON format"}
+        except ValueError as e:
+            # The body stopped decoding part way, e.g. a truncated compressed body
+            logger.warning(f"Unreadable batch body at item {processed}: {str(e)}")
+            errors += 1
+            yield {"index": processed, "error": str(e)}
+        logger.info(f"Batch processed: {processed} items, {errors} errors")
+    
+    @classmethod
+    def handle_batch_matching(cls):
+        """Handle POST request matching a JSON array of payloads."""
+        if not request.is_json:
+            logger.warning("Batch request without JSON content-type received")
             return jsonify({
-                "error": "Internal server error"
-            }), 500
+                "error": "Content-Type must be application/json"
+            }), 400
+        
+        tables, tenant_error = cls.resolve_tenant()
+        if tenant_error is not None:
+            return jsonify({"error": tenant_error.error}), tenant_error.status_code
+        snapshot = tables.snapshot if tables is not None else None
+        
+        # Decode the first element eagerly so a malformed body still gets a 400
+        items = iter_json_array(request.stream)
+        try:
+            first = next(items)
+        except StopIteration:
+            items = iter(())
+        except StreamingJSONError as e:
+            logger.warning(f"Invalid batch JSON received: {str(e)}")
+            return jsonify({
+                "error": "Invalid JSON format - expected JSON array"
+            }), 400
+        else:
+            items = itertools.chain((first,), items)
+        
+        def generate():
+            yield "["
+            for position, result in enumerate(cls.iter_batch_results(items, snapshot)):
+                yield ("," if position else "") + json.dumps(result)
+            yield "]"
+        
+        return Response(stream_with_context(generate()), status=200, mimetype="application/json")
+    
+    @classmethod
+    def handle_stream_matching(cls):
+        """Handle POST request matching newline-delimited JSON payloads."""
+        if request.mimetype != "application/x-ndjson":
+            logger.warning("Stream request without NDJSON content-type received")
+            return jsonify({
+                "error": "Content-Type must be application/x-ndjson"
+            }), 400
+        
+        tables, tenant_error = cls.resolve_tenant()
+        if tenant_error is not None:
+            return jsonify({"error": tenant_error.error}), tenant_error.status_code
+        snapshot = tables.snapshot if tables is not None else None
+        
+        def generate():
+            for result in cls.iter_batch_results(iter_ndjson(request.stream), snapshot):
+                yield json.dumps(result) + "\n"
+        
+        return Response(stream_with_context(generate()), status=200, mimetype="application/x-ndjson")
 
 
 # Route definitions
@@ -97,6 +385,36 @@ def match_prompt():
     """API endpoint for prompt matching."""
     return PromptController.handle_prompt_matching()
 
+@prompt_bp.route('/tenants/<tenant_id>/match-prompt', methods=['POST'])
+def match_tenant_prompt(tenant_id):
+    """API endpoint for prompt matching against one tenant's rules."""
+    return PromptController.handle_prompt_matching(tenant_id)
+
+@prompt_bp.route('/match-prompt/batch', methods=['POST'])
+def match_prompt_batch():
+    """API endpoint for matching a JSON array of payloads."""
+    return PromptController.handle_batch_matching()
+
+@prompt_bp.route('/match-prompt/stream', methods=['POST'])
+def match_prompt_stream():
+    """API endpoint for matching newline-delimited JSON payloads."""
+    return PromptController.handle_stream_matching()
+
+@prompt_bp.route('/rules', methods=['GET'])
+def export_rules():
+    """API endpoint exporting the compiled rule set."""
+    return PromptController.handle_rules_export()
+
+@prompt_bp.route('/codes', methods=['GET'])
+def code_table():
+    """API endpoint publishing the integer code table."""
+    return PromptController.handle_code_table()
+
+@prompt_bp.route('/match-codes', methods=['POST'])
+def match_codes():
+    """API endpoint matching packed integer code records."""
+    return PromptController.handle_code_matching()
+
 @prompt_bp.route('/match-prompt', methods=['GET', 'PUT', 'DELETE', 'PATCH'])
 def method_not_allowed():
     """Handle unsupported HTTP methods."""
@@ -0,0 +1 @@
+"""Servers module containing alternative serving front ends."""
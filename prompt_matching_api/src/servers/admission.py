@@ -0,0 +1,304 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+from collections import OrderedDict
+import threading
+import time
+from src.services.response_cache import encode_body
+
+WSGIApp = Callable[[Dict[str, Any], Callable], Iterable[bytes]]
+
+RATE_LIMITED = "rate_limited"
+OVERLOADED = "overloaded"
+
+# Pre-encoded rejections so shedding never builds a response per request
+REJECTIONS = {
+    RATE_LIMITED: ("429 TOO MANY REQUESTS", encode_body({"error": "Too many requests"})),
+    OVERLOADED: ("503 SERVICE UNAVAILABLE", encode_body({"error": "Server overloaded"}))
+}
+
+
+class TokenBucketLimiter:
+    """
+    Per-client token buckets refilled continuously at a fixed rate.
+
+    Buckets are kept in least-recently-used order. When ``max_clients`` is
+    reached, fully refilled buckets are dropped first, then the least
+    recently used ones, so a flood of new keys never resets the buckets of
+    clients that are still active.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate: Tokens added per second to each client's bucket
+            burst: Bucket capacity
+            max_clients: Buckets kept before the least recently used are discarded
+            clock: Monotonic clock in seconds
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        """
+        Take one token from a client's bucket.
+
+        Args:
+            key: Client key
+
+        Returns:
+            True if a token was available
+        """
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._evict(now)
+                bucket = self._buckets[key] = [float(self.burst), now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+            if bucket[0] < 1.0:
+                return False
+            bucket[0] -= 1.0
+            return True
+
+    def _evict(self, now: float) -> None:
+        # Buckets are ordered by last use, so idle ones are at the front. A
+        # bucket that has refilled completely carries no state worth keeping.
+        refill_seconds = self.burst / self.rate
+        buckets = self._buckets
+        while buckets and now - next(iter(buckets.values()))[1] >= refill_seconds:
+            buckets.popitem(last=False)
+        while len(buckets) >= self.max_clients:
+            buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """
+    Decides whether a request may start work.
+
+    Requests are checked against a per-client token bucket (429 when empty),
+    keyed by the peer address, or by the peer address and a client id header
+    when ``ADMISSION_CLIENT_HEADER`` is configured,
+    then against a limit on requests in flight (503 when full). Without a
+    queue target, a full limit rejects at once. With one, requests wait up to
+    ``queue_timeout`` for a slot and the wait is measured; once waits have
+    stayed above the target for a whole interval (a standing queue rather
+    than a burst), new requests are rejected instead of queued until a
+    request gets a slot within the target again.
+    """
+
+    def __init__(self):
+        self.max_in_flight = 0
+        self.limiter: Optional[TokenBucketLimiter] = None
+        self.client_header = ""
+        self.queue_target = 0.0
+        self.queue_interval = 0.1
+        self.queue_timeout = 0.1
+        self._clock: Callable[[], float] = time.monotonic
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._above_target_since: Optional[float] = None
+        self.shedding = False
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        with self._lock:
+            self._in_flight = 0
+            self._rejected = {RATE_LIMITED: 0, OVERLOADED: 0}
+            self._above_target_since = None
+            self.shedding = False
+
+    def configure(self, config: Mapping[str, Any], clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Apply the ADMISSION_* settings.
+
+        Args:
+            config: Application config mapping
+            clock: Monotonic clock in seconds
+        """
+        self._clock = clock
+        self.max_in_flight = config.get('ADMISSION_MAX_IN_FLIGHT', 0)
+        self._slots = threading.BoundedSemaphore(self.max_in_flight) if self.max_in_flight > 0 else None
+
+        rate = config.get('ADMISSION_RATE', 0)
+        self.limiter = None
+        if rate > 0:
+            self.limiter = TokenBucketLimiter(rate, config.get('ADMISSION_BURST', 0) or int(rate),
+                                              config.get('ADMISSION_MAX_CLIENTS', 10000), clock)
+        self.client_header = config.get('ADMISSION_CLIENT_HEADER') or ""
+
+        self.queue_target = config.get('ADMISSION_QUEUE_TARGET_MS', 0) / 1000
+        self.queue_interval = config.get('ADMISSION_QUEUE_INTERVAL_MS', 100) / 1000
+        self.queue_timeout = config.get('ADMISSION_QUEUE_TIMEOUT_MS', 100) / 1000
+        self._reset_counters()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any admission check is configured."""
+        return self._slots is not None or self.limiter is not None
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently admitted and not yet released."""
+        return self._in_flight
+
+    def admit(self, client_key: str) -> Optional[str]:
+        """
+        Try to admit a request.
+
+        Args:
+            client_key: Key identifying the client for rate limiting
+
+        Returns:
+            None if admitted (call release() when done), otherwise the
+            rejection reason (RATE_LIMITED or OVERLOADED)
+        """
+        if self.limiter is not None and not self.limiter.allow(client_key):
+            self._count_rejection(RATE_LIMITED)
+            return RATE_LIMITED
+
+        slots = self._slots
+        if slots is not None and not self._acquire(slots):
+            self._count_rejection(OVERLOADED)
+            return OVERLOADED
+
+        with self._lock:
+            self._in_flight += 1
+        return None
+
+    def _count_rejection(self, reason: str) -> None:
+        with self._lock:
+            self._rejected[reason] += 1
+
+    def _acquire(self, slots: threading.BoundedSemaphore) -> bool:
+        if slots.acquire(blocking=False):
+            self._record_wait(0.0)
+            return True
+        if not self.queue_target:
+            return False
+        with self._lock:
+            shedding = self.shedding
+        if shedding:
+            return False
+
+        start = self._clock()
+        acquired = slots.acquire(timeout=self.queue_timeout)
+        self._record_wait(self._clock() - start)
+        return acquired
+
+    def _record_wait(self, waited: float) -> None:
+        if not self.queue_target:
+            return
+        now = self._clock()
+        # The window and the flag move together, so concurrent waits cannot interleave their updates
+        with self._lock:
+            if waited < self.queue_target:
+                self._above_target_since = None
+                self.shedding = False
+            elif self._above_target_since is None:
+                self._above_target_since = now
+            elif now - self._above_target_since >= self.queue_interval:
+                self.shedding = True
+
+    def release(self) -> None:
+        """Release the slot taken by an admitted request."""
+        with self._lock:
+            self._in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def metric_lines(self, prefix: str = "prompt_api") -> Iterator[str]:
+        """Prometheus lines describing admission state."""
+        with self._lock:
+            rejected = dict(self._rejected)
+            shedding = self.shedding
+        yield f"# HELP {prefix}_admission_in_flight Requests currently admitted."
+        yield f"# TYPE {prefix}_admission_in_flight gauge"
+        yield f"{prefix}_admission_in_flight {self.in_flight}"
+        yield f"# HELP {prefix}_admission_rejected_total Requests rejected by admission control."
+        yield f"# TYPE {prefix}_admission_rejected_total counter"
+        for reason, count in rejected.items():
+            yield f'{prefix}_admission_rejected_total{{reason="{reason}"}} {count}'
+        yield f"# HELP {prefix}_admission_shedding Whether adaptive load shedding is active."
+        yield f"# TYPE {prefix}_admission_shedding gauge"
+        yield f"{prefix}_admission_shedding {int(shedding)}"
+
+
+admission_controller = AdmissionController()
+
+
+class _ReleasingIterable:
+    """Response iterable that releases the admission slot when the server closes it."""
+
+    def __init__(self, result: Iterable[bytes], release: Callable[[], None]):
+        self._result = result
+        self._release = release
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._result)
+
+    def close(self) -> None:
+        try:
+            if hasattr(self._result, "close"):
+                self._result.close()
+        finally:
+            self._release()
+
+
+class AdmissionMiddleware:
+    """
+    WSGI middleware applying admission control to the match endpoints.
+
+    Rejections are answered from pre-encoded bodies before the wrapped app
+    runs, so shed requests never parse JSON or write log records.
+    """
+
+    def __init__(self, app: WSGIApp, controller: AdmissionController,
+                 path_prefix: Union[str, Tuple[str, ...]] = ("/api/match-prompt", "/api/tenants/")):
+        """
+        Args:
+            app: Wrapped WSGI application
+            controller: Admission controller
+            path_prefix: Paths starting with this prefix (or any of these prefixes) are admission controlled
+        """
+        self.app = app
+        self.controller = controller
+        self.path_prefix = path_prefix
+        self.client_environ_key = ("HTTP_" + controller.client_header.upper().replace("-", "_")
+                                   if controller.client_header else None)
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        if environ.get("REQUEST_METHOD") != "POST" or not environ.get("PATH_INFO", "").startswith(self.path_prefix):
+            return self.app(environ, start_response)
+
+        # A client id header is only a sub-key of the peer address, so a client
+        # cannot borrow another address's bucket by sending its id
+        client_key = environ.get("REMOTE_ADDR", "")
+        if self.client_environ_key is not None:
+            client_id = environ.get(self.client_environ_key)
+            if client_id:
+                client_key = f"{client_key}/{client_id}"
+        rejection = self.controller.admit(client_key)
+        if rejection is not None:
+            status, body = REJECTIONS[rejection]
+            start_response(status, [("Content-Type", "application/json"),
+                                    ("Content-Length", str(len(body))),
+                                    ("Retry-After", "1")])
+            return [body]
+
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            self.controller.release()
+            raise
+        return _ReleasingIterable(result, self.controller.release)
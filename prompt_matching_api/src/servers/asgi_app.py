@@ -0,0 +1,282 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import asyncio
+import logging
+import tempfile
+from src.servers.wsgi_app import (BODY_TOO_LARGE_BODY, HEALTH_BODY, METHOD_NOT_ALLOWED_BODY, NOT_FOUND_BODY,
+                                  PromptMatchingWSGIApp, is_json_content_type, render_requested, tenant_path_id)
+from src.services.response_cache import response_cache
+from src.services.tenants import tenant_registry
+from src.utils.intake import BODY_TOO_LARGE, streaming_intake
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+JSON_HEADERS = [(b"content-type", b"application/json")]
+
+# Bodies up to this size are parsed and matched on the event loop; larger ones in a worker thread
+INLINE_PARSE_BYTES = 64 * 1024
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before its request body has arrived."""
+
+
+def header_value(scope: Scope, name: bytes) -> Optional[str]:
+    """
+    Return the first value of a request header.
+
+    Args:
+        scope: ASGI HTTP scope
+        name: Lower-case header name
+
+    Returns:
+        Header value, or None if absent
+    """
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def declared_length(scope: Scope) -> Optional[int]:
+    """Content-Length of the request, or None if absent or malformed."""
+    value = header_value(scope, b"content-length")
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class PromptMatchingASGIApp:
+    """
+    ASGI application serving /api/match-prompt, /api/tenants/<tenant>/match-prompt and /health.
+
+    Request bodies are awaited chunk by chunk, so a slow upload holds a
+    coroutine rather than a thread. Once a small body is in, parsing,
+    validation and matching run inline on the event loop: they are
+    dictionary lookups on pre-encoded responses and take microseconds, less
+    than a hop to a thread pool would cost. Bodies over
+    ``INLINE_PARSE_BYTES`` are parsed in a worker thread so a multi-megabyte
+    document does not stall every other connection, as is loading a
+    tenant's rules for the first time (file IO and compilation). Responses and error
+    semantics match the WSGI fast path, which shares the matching code.
+    """
+
+    def __init__(self, max_body_bytes: int):
+        """
+        Args:
+            max_body_bytes: Largest buffered request body accepted
+        """
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path = scope["path"]
+        method = scope["method"]
+        if path == "/api/match-prompt" or tenant_path_id(path) is not None:
+            if method == "POST":
+                try:
+                    status_code, body = await self.handle_prompt_matching(scope, receive, tenant_path_id(path))
+                except ClientDisconnected:
+                    logger.info("Client disconnected before sending the whole request body")
+                    return
+            else:
+                logger.warning(f"Unsupported method {method} attempted on /match-prompt")
+                status_code, body = 405, METHOD_NOT_ALLOWED_BODY
+        elif path == "/health" and method in ("GET", "HEAD"):
+            status_code, body = 200, HEALTH_BODY
+        else:
+            status_code, body = 404, NOT_FOUND_BODY
+
+        await self.send_response(send, status_code, body, method == "HEAD")
+
+    @staticmethod
+    async def lifespan(receive: Receive, send: Send) -> None:
+        """Acknowledge lifespan events; services are configured by the app factory."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def send_response(send: Send, status_code: int, body: Union[bytes, Iterable[bytes]],
+                            head: bool = False) -> None:
+        """
+        Send a complete response.
+
+        Args:
+            send: ASGI send callable
+            status_code: HTTP status
+            body: Encoded body, or an iterable of pieces for a streamed body
+            head: Whether to omit the body (HEAD request)
+        """
+        if isinstance(body, bytes):
+            await send({"type": "http.response.start", "status": status_code,
+                        "headers": JSON_HEADERS + [(b"content-length", str(len(body)).encode("ascii"))]})
+            await send({"type": "http.response.body", "body": b"" if head else body})
+            return
+
+        # Streamed rendered prompt: length unknown up front
+        await send({"type": "http.response.start", "status": status_code, "headers": JSON_HEADERS})
+        try:
+            for piece in body:
+                await send({"type": "http.response.body", "body": piece, "more_body": True})
+        finally:
+            close = getattr(body, "close", None)
+            if close is not None:
+                close()
+        await send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    async def lookup_tenant(tenant_id: Optional[str]) -> Tuple[Any, Any]:
+        """
+        Resolve a tenant's response tables, loading cold tenants off the event loop.
+
+        Args:
+            tenant_id: Tenant from the path or tenant header, or None for the global rules
+
+        Returns:
+            Tuple of (tables, error) as from PromptMatchingWSGIApp.lookup_tenant
+        """
+        if tenant_id is None:
+            return None, None
+        tables = tenant_registry.cached(tenant_id)
+        if tables is not None:
+            return tables, None
+        return await asyncio.get_running_loop().run_in_executor(None, PromptMatchingWSGIApp.lookup_tenant,
+                                                                tenant_id)
+
+    async def handle_prompt_matching(self, scope: Scope, receive: Receive,
+                                     tenant_id: Optional[str] = None) -> Tuple[int, Union[bytes, Iterable[bytes]]]:
+        """
+        Handle POST /api/match-prompt and /api/tenants/<tenant>/match-prompt.
+
+        Args:
+            scope: ASGI HTTP scope
+            receive: ASGI receive callable
+            tenant_id: Tenant from the path (defaults to the tenant header, then the global rules)
+
+        Returns:
+            Tuple of (status_code, body)
+
+        Raises:
+            ClientDisconnected: If the client went away mid-body
+        """
+        if not is_json_content_type(header_value(scope, b"content-type") or ""):
+            logger.warning("Request without JSON content-type received")
+            return PromptMatchingWSGIApp.respond(response_cache.error("Content-Type must be application/json"))
+
+        if tenant_id is None and tenant_registry.enabled:
+            tenant_id = header_value(scope, tenant_registry.header.lower().encode("latin-1"))
+        tables, tenant_error = await self.lookup_tenant(tenant_id)
+        if tenant_error is not None:
+            return PromptMatchingWSGIApp.respond(tenant_error)
+
+        render = render_requested(scope.get("query_string", b"").decode("latin-1"))
+        if streaming_intake.enabled:
+            return await self.handle_streamed_matching(scope, receive, render, tables)
+
+        body = await self.read_body(scope, receive, self.max_body_bytes)
+        if body is None:
+            logger.warning(f"Request body exceeds {self.max_body_bytes} bytes")
+            return 413, BODY_TOO_LARGE_BODY
+        if len(body) <= INLINE_PARSE_BYTES:
+            return PromptMatchingWSGIApp.match_body(body, render, tables)
+        return await asyncio.get_running_loop().run_in_executor(None, PromptMatchingWSGIApp.match_body,
+                                                                body, render, tables)
+
+    async def handle_streamed_matching(self, scope: Scope, receive: Receive, render: bool,
+                                       tables: Any = None) -> Tuple[int, Union[bytes, Iterable[bytes]]]:
+        """
+        Handle POST /api/match-prompt with the streaming intake.
+
+        The body is spooled (to memory, then a temp file) as it arrives and
+        parsed once complete, so large uploads never sit in memory whole.
+        Bodies over ``INLINE_PARSE_BYTES`` are parsed in a worker thread.
+
+        Args:
+            scope: ASGI HTTP scope
+            receive: ASGI receive callable
+            render: Whether to return the rendered prompt
+            tables: Tenant response tables (defaults to the global rules)
+
+        Returns:
+            Tuple of (status_code, body)
+
+        Raises:
+            ClientDisconnected: If the client went away mid-body
+        """
+        max_body_bytes = streaming_intake.max_body_bytes
+        with tempfile.SpooledTemporaryFile(max_size=streaming_intake.spool_memory_bytes) as spool:
+            length = await self.read_body(scope, receive, max_body_bytes, spool,
+                                          streaming_intake.spool_memory_bytes)
+            if length is None:
+                logger.warning("Streamed request rejected: %s", BODY_TOO_LARGE)
+                return PromptMatchingWSGIApp.respond(response_cache.error(BODY_TOO_LARGE))
+            spool.seek(0)
+            try:
+                if length <= INLINE_PARSE_BYTES:
+                    return PromptMatchingWSGIApp.match_stream(spool, length, render, tables)
+                return await asyncio.get_running_loop().run_in_executor(None, PromptMatchingWSGIApp.match_stream,
+                                                                        spool, length, render, tables)
+            except Exception as e:
+                logger.error(f"Unexpected error: {str(e)}")
+                return PromptMatchingWSGIApp.respond(response_cache.error("Internal server error"))
+
+    @staticmethod
+    async def read_body(scope: Scope, receive: Receive, max_body_bytes: int,
+                        spool: Optional[Any] = None, spool_memory_bytes: int = 0) -> Union[bytes, int, None]:
+        """
+        Await the request body, enforcing a size cap.
+
+        Args:
+            scope: ASGI HTTP scope
+            receive: ASGI receive callable
+            max_body_bytes: Maximum accepted body size
+            spool: File to write the body to instead of returning it
+            spool_memory_bytes: Bytes the spool holds in memory; later writes
+                may reach a temp file and run in a worker thread
+
+        Returns:
+            Body bytes (or, with ``spool``, the number of bytes written), or
+            None if the body exceeds the cap
+
+        Raises:
+            ClientDisconnected: If the client went away mid-body
+        """
+        declared = declared_length(scope)
+        if declared is not None and declared > max_body_bytes:
+            return None
+
+        chunks: List[bytes] = []
+        received = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnected()
+            chunk = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            received += len(chunk)
+            if received > max_body_bytes:
+                return None
+            if spool is not None:
+                if received > spool_memory_bytes:
+                    # Keep temp file I/O off the event loop
+                    await asyncio.get_running_loop().run_in_executor(None, spool.write, chunk)
+                else:
+                    spool.write(chunk)
+            elif chunk:
+                chunks.append(chunk)
+        return received if spool is not None else b"".join(chunks)
@@ -0,0 +1,367 @@
+"""
+Minimal HTTP/1.1 server for ASGI applications, built on asyncio streams.
+
+A stand-in for a production ASGI server (uvicorn, hypercorn) that needs
+nothing outside the standard library: it serves tests, benchmarks and
+single-process deployments. It supports keep-alive, Content-Length and
+chunked request bodies, ``Expect: 100-continue``, chunked streamed
+responses and write backpressure, and runs the application's lifespan
+handler when it starts and stops.
+"""
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+import asyncio
+import logging
+import signal
+
+logger = logging.getLogger(__name__)
+
+ASGIApp = Callable[[Dict[str, Any], Callable, Callable], Awaitable[None]]
+
+INTERNAL_ERROR_BODY = b'{"error":"Internal server error"}\n'
+
+
+class BadRequest(Exception):
+    """Raised when a request cannot be parsed."""
+
+
+class _RequestCycle:
+    """receive/send callables and response state for one request on a connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str,
+                 headers: List[Tuple[bytes, bytes]], keep_alive: bool, chunk_size: int, read_timeout: float):
+        self.reader = reader
+        self.writer = writer
+        self.head = method == "HEAD"
+        self.keep_alive = keep_alive
+        self.chunk_size = chunk_size
+        self.read_timeout = read_timeout
+        self.remaining = 0
+        self.chunked = False
+        self.expect_continue = False
+        for name, value in headers:
+            if name == b"content-length":
+                try:
+                    self.remaining = int(value)
+                except ValueError:
+                    raise BadRequest("Invalid Content-Length")
+                if self.remaining < 0:
+                    raise BadRequest("Invalid Content-Length")
+            elif name == b"transfer-encoding" and b"chunked" in value.lower():
+                self.chunked = True
+            elif name == b"expect" and value.lower() == b"100-continue":
+                self.expect_continue = True
+        if self.chunked:
+            self.remaining = 0  # Transfer-Encoding overrides Content-Length
+        self.body_done = not self.chunked and self.remaining == 0
+        self.status = 0
+        self.headers: Optional[List[Tuple[bytes, bytes]]] = None
+        self.started = False
+        self.finished = False
+        self.chunked_response = False
+        self.response_done = asyncio.Event()
+
+    async def receive(self) -> Dict[str, Any]:
+        if self.body_done:
+            # Nothing more to read: wait until the response is out, as ASGI expects
+            await self.response_done.wait()
+            return {"type": "http.disconnect"}
+
+        if self.expect_continue:
+            self.expect_continue = False
+            if not self.started:
+                self.writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+        try:
+            # A client that stalls mid-body is treated as gone, like one idle between requests
+            body = await asyncio.wait_for(self._read_body(), self.read_timeout)
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError, BadRequest):
+            self.keep_alive = False
+            self.body_done = True
+            return {"type": "http.disconnect"}
+        return {"type": "http.request", "body": body, "more_body": not self.body_done}
+
+    async def _read_body(self) -> bytes:
+        if self.chunked:
+            return await self._read_chunk()
+        body = await self.reader.read(min(self.remaining, self.chunk_size))
+        if not body:
+            raise ConnectionResetError("connection closed mid-body")
+        self.remaining -= len(body)
+        self.body_done = self.remaining == 0
+        return body
+
+    async def _read_chunk(self) -> bytes:
+        if self.remaining == 0:
+            size_line = await self.reader.readline()
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise BadRequest("Invalid chunk size")
+            if size == 0:
+                # Skip trailers up to the blank line
+                while (await self.reader.readline()).strip():
+                    pass
+                self.body_done = True
+                return b""
+            self.remaining = size
+        body = await self.reader.read(min(self.remaining, self.chunk_size))
+        if not body:
+            raise asyncio.IncompleteReadError(b"", self.remaining)
+        self.remaining -= len(body)
+        if self.remaining == 0:
+            await self.reader.readexactly(2)  # CRLF after the chunk data
+        return body
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            if self.started:
+                raise RuntimeError("Response already started")
+            self.started = True
+            self.status = message["status"]
+            self.headers = list(message.get("headers", []))
+            return
+
+        if message["type"] != "http.response.body" or self.finished:
+            return
+        if not self.started:
+            raise RuntimeError("Response body sent before http.response.start")
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        writer = self.writer
+        if self.headers is not None:
+            writer.write(self._encode_head(body, more_body))
+            self.headers = None
+
+        if not self.head:
+            if self.chunked_response:
+                if body:
+                    writer.write(b"%x\r\n%s\r\n" % (len(body), body))
+                if not more_body:
+                    writer.write(b"0\r\n\r\n")
+            elif body:
+                writer.write(body)
+        if not more_body:
+            self.finished = True
+            self.response_done.set()
+        await writer.drain()
+
+    def _encode_head(self, body: bytes, more_body: bool) -> bytes:
+        names = {name.lower() for name, _ in self.headers}
+        headers = self.headers
+        if b"content-length" not in names:
+            if not more_body:
+                headers.append((b"content-length", str(len(body)).encode("ascii")))
+            else:
+                # Length unknown up front: stream in chunks
+                self.chunked_response = True
+                headers.append((b"transfer-encoding", b"chunked"))
+        if not self.body_done:
+            # The request body was not read in full; the connection cannot be reused
+            self.keep_alive = False
+        if not self.keep_alive:
+            headers.append((b"connection", b"close"))
+
+        try:
+            reason = HTTPStatus(self.status).phrase
+        except ValueError:
+            reason = ""
+        lines = [b"HTTP/1.1 %d %s" % (self.status, reason.encode("ascii"))]
+        lines.extend(name + b": " + value for name, value in headers)
+        return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+class ASGIServer:
+    """
+    Serve an ASGI application over HTTP/1.1 with asyncio.
+
+    Each connection is a coroutine, so thousands of idle or slowly uploading
+    clients cost no threads.
+    """
+
+    def __init__(self, app: ASGIApp, host: str = "127.0.0.1", port: int = 5000,
+                 keepalive_timeout: float = 5.0, max_header_bytes: int = 64 * 1024,
+                 chunk_size: int = 64 * 1024, backlog: int = 4096):
+        """
+        Args:
+            app: ASGI application
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            keepalive_timeout: Seconds to wait for the next request on an idle connection,
+                or for more of a request body
+            max_header_bytes: Largest request head accepted
+            chunk_size: Most body bytes handed to the application per receive()
+            backlog: Listen backlog
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.keepalive_timeout = keepalive_timeout
+        self.max_header_bytes = max_header_bytes
+        self.chunk_size = chunk_size
+        self.backlog = backlog
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections = 0
+        self._lifespan: Optional[asyncio.Task] = None
+        self._lifespan_messages: Optional[asyncio.Queue] = None
+        self._lifespan_replies: Optional[asyncio.Queue] = None
+
+    async def start(self) -> None:
+        """Run the lifespan startup and start accepting connections."""
+        await self._lifespan_event("startup")
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 limit=self.max_header_bytes, backlog=self.backlog)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"ASGI server listening on {self.host}:{self.port}")
+
+    async def close(self) -> None:
+        """Stop accepting connections and run the lifespan shutdown."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        await self._lifespan_event("shutdown")
+
+    async def serve(self) -> None:
+        """Serve until cancelled or sent SIGINT/SIGTERM."""
+        await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        try:
+            await stop.wait()
+        finally:
+            await self.close()
+
+    def run(self) -> None:
+        """Blocking entry point: serve on a new event loop."""
+        asyncio.run(self.serve())
+
+    async def _lifespan_event(self, event: str) -> None:
+        if event == "startup":
+            messages: asyncio.Queue = asyncio.Queue()
+            replies: asyncio.Queue = asyncio.Queue()
+            self._lifespan_messages = messages
+            self._lifespan_replies = replies
+
+            async def run_lifespan():
+                try:
+                    await self.app({"type": "lifespan", "asgi": {"version": "3.0"}}, messages.get, replies.put)
+                except Exception as e:
+                    logger.debug(f"Application does not support lifespan: {e}")
+                await replies.put(None)
+
+            self._lifespan = asyncio.ensure_future(run_lifespan())
+        elif self._lifespan is None or self._lifespan.done():
+            return
+
+        await self._lifespan_messages.put({"type": f"lifespan.{event}"})
+        reply = await self._lifespan_replies.get()
+        if reply is not None and reply["type"] == f"lifespan.{event}.failed":
+            raise RuntimeError(f"Lifespan {event} failed: {reply.get('message', '')}")
+        if event == "shutdown":
+            await self._lifespan
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests on one connection until it closes or stops being kept alive."""
+        self.connections += 1
+        peer = writer.get_extra_info("peername")
+        sockname = writer.get_extra_info("sockname")
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    writer.write(b"HTTP/1.1 431 Request Header Fields Too Large\r\n"
+                                 b"content-length: 0\r\nconnection: close\r\n\r\n")
+                    return
+
+                try:
+                    scope, cycle = self.parse_request(head, reader, writer, peer, sockname)
+                except BadRequest:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\ncontent-length: 0\r\nconnection: close\r\n\r\n")
+                    return
+
+                await self.run_app(scope, cycle)
+                if not cycle.keep_alive or not cycle.finished:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+
+    def parse_request(self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                      peer: Any, sockname: Any) -> Tuple[Dict[str, Any], _RequestCycle]:
+        """
+        Parse a request head into an ASGI scope.
+
+        Raises:
+            BadRequest: If the request line or a header is malformed
+        """
+        lines = head[:-4].split(b"\r\n")
+        try:
+            method, target, version = lines[0].decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise BadRequest("Malformed request line")
+        if not version.startswith("HTTP/1."):
+            raise BadRequest("Unsupported HTTP version")
+
+        headers = []
+        for line in lines[1:]:
+            name, separator, value = line.partition(b":")
+            if not separator or not name.strip():
+                raise BadRequest("Malformed header")
+            headers.append((name.strip().lower(), value.strip()))
+
+        connection = next((value.lower() for name, value in headers if name == b"connection"), b"")
+        keep_alive = b"keep-alive" in connection if version == "HTTP/1.0" else b"close" not in connection
+
+        path, _, query_string = target.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": version[5:],
+            "method": method.upper(),
+            "scheme": "http",
+            "path": unquote(path),
+            "raw_path": path.encode("latin-1"),
+            "query_string": query_string.encode("latin-1"),
+            "root_path": "",
+            "headers": headers,
+            "client": tuple(peer[:2]) if peer else None,
+            "server": tuple(sockname[:2]) if sockname else None
+        }
+        return scope, _RequestCycle(reader, writer, scope["method"], headers, keep_alive, self.chunk_size,
+                                    self.keepalive_timeout)
+
+    async def run_app(self, scope: Dict[str, Any], cycle: _RequestCycle) -> None:
+        """Run the application for one request, answering 500 if it fails before responding."""
+        try:
+            await self.app(scope, cycle.receive, cycle.send)
+        except Exception as e:
+            logger.error(f"Unhandled application error: {e}")
+            if not cycle.started:
+                cycle.keep_alive = False
+                await cycle.send({"type": "http.response.start", "status": 500,
+                                  "headers": [(b"content-type", b"application/json")]})
+                await cycle.send({"type": "http.response.body", "body": INTERNAL_ERROR_BODY})
+                return
+            cycle.keep_alive = False
+        finally:
+            cycle.response_done.set()
+        if not cycle.finished:
+            # The application returned without completing a response
+            cycle.keep_alive = False
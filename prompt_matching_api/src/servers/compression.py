@@ -0,0 +1,446 @@
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+import itertools
+import logging
+import zlib
+
+from src.servers.wsgi_app import STATUS_LINES, body_length
+from src.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+WSGIApp = Callable[[Dict[str, Any], Callable], Iterable[bytes]]
+
+UNSUPPORTED_ENCODING = "Unsupported Content-Encoding"
+INVALID_COMPRESSED_BODY = "Invalid compressed body"
+DECOMPRESSED_TOO_LARGE = "Decompressed body too large"
+
+# zlib window bits per HTTP content coding
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+ZLIB_WBITS = zlib.MAX_WBITS
+RAW_DEFLATE_WBITS = -zlib.MAX_WBITS
+
+CODINGS = ("gzip", "deflate")
+
+# Endpoints that stream their body, capped at max_streamed_bytes
+STREAMED_PATH_SUFFIXES = ("/batch", "/stream")
+
+# Marks a response replaced by the request's decompression error
+REJECTED = object()
+
+
+class DecompressionError(ValueError):
+    """Raised when a compressed request body is malformed or expands past the cap."""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick a response coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate;q=0.5"
+
+    Returns:
+        "gzip" or "deflate" (gzip preferred on equal weight), or None
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    # Codings named explicitly take precedence over "*"
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for coding in CODINGS:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compressor(coding: str, level: int) -> Any:
+    """
+    Create a zlib compressor for a response coding.
+
+    Args:
+        coding: "gzip" or "deflate" (zlib-wrapped, as HTTP defines it)
+        level: Compression level, 1 (fastest) to 9 (smallest)
+
+    Returns:
+        zlib compression object
+    """
+    return zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS if coding == "gzip" else ZLIB_WBITS)
+
+
+def _decompressor(coding: str, first_bytes: bytes) -> Any:
+    if coding == "gzip":
+        return zlib.decompressobj(GZIP_WBITS)
+    # "deflate" should be zlib-wrapped, but some clients send raw deflate
+    is_zlib = len(first_bytes) >= 2 and first_bytes[0] & 0x0F == 8 and \
+        (first_bytes[0] << 8 | first_bytes[1]) % 31 == 0
+    return zlib.decompressobj(ZLIB_WBITS if is_zlib else RAW_DEFLATE_WBITS)
+
+
+class DecompressingInput:
+    """
+    File-like wsgi.input that decompresses a gzip/deflate body as it is read.
+
+    Each zlib call may produce at most ``chunk_size`` bytes, so a small
+    compressed body that expands enormously is stopped once the output passes
+    ``max_bytes`` rather than after it has been inflated, and no more than
+    about one chunk is held at a time. Concatenated gzip members are decoded
+    in turn. The first failure is kept in ``error`` and raised again by every
+    later read.
+    """
+
+    def __init__(self, stream: BinaryIO, content_length: Optional[int], coding: str, max_bytes: int,
+                 chunk_size: int = 64 * 1024):
+        """
+        Args:
+            stream: Compressed body stream
+            content_length: Compressed length, or None to read until EOF
+            coding: "gzip" or "deflate"
+            max_bytes: Largest decompressed size accepted
+            chunk_size: Bytes read, and at most produced, per step
+        """
+        self.stream = stream
+        self.coding = coding
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.total = 0
+        self.error: Optional[str] = None
+        self._remaining = content_length
+        self._decoder = None
+        self._pending = b""
+        self._buffer = bytearray()
+        self._eof = False
+
+    def _fail(self, message: str) -> None:
+        self.error = message
+        raise DecompressionError(message)
+
+    def _output(self, data: bytes) -> None:
+        self.total += len(data)
+        if self.total > self.max_bytes:
+            self._fail(DECOMPRESSED_TOO_LARGE)
+        self._buffer += data
+
+    def fill(self) -> bool:
+        """Decompress the next piece into the buffer, returning False at end of body."""
+        if self.error is not None:
+            raise DecompressionError(self.error)
+        try:
+            while not self._eof:
+                if not self._pending:
+                    remaining = self._remaining
+                    data = self.stream.read(self.chunk_size if remaining is None else min(self.chunk_size, remaining))
+                    if remaining is not None:
+                        self._remaining = remaining - len(data)
+                    if not data:
+                        self._eof = True
+                        if self._decoder is not None:
+                            self._output(self._decoder.flush())
+                            if not self._decoder.eof:
+                                self._fail(INVALID_COMPRESSED_BODY)
+                        return bool(self._buffer)
+                    self._pending = data
+                if self._decoder is None or self._decoder.eof:
+                    # First bytes of the body, or another gzip member following the last one
+                    self._decoder = _decompressor(self.coding, self._pending)
+                decoder = self._decoder
+                out = decoder.decompress(self._pending, self.chunk_size)
+                self._pending = decoder.unconsumed_tail or (decoder.unused_data if decoder.eof else b"")
+                if out:
+                    self._output(out)
+                    return True
+        except zlib.error:
+            self._fail(INVALID_COMPRESSED_BODY)
+        return False
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            while self.fill():
+                pass
+            size = len(self._buffer)
+        else:
+            while len(self._buffer) < size and self.fill():
+                pass
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        limit = None if size is None or size < 0 else size
+        start = 0
+        while True:
+            end = self._buffer.find(b"\n", start)
+            if end >= 0:
+                end += 1
+                break
+            start = len(self._buffer)
+            if (limit is not None and start >= limit) or not self.fill():
+                end = len(self._buffer)
+                break
+        if limit is not None:
+            end = min(end, limit)
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.readline, b"")
+
+
+def decompress_stream(stream: BinaryIO, content_length: Optional[int], coding: str, output: BinaryIO,
+                      max_bytes: int, chunk_size: int = 64 * 1024) -> int:
+    """
+    Decompress a request body into a file, chunk by chunk.
+
+    Args:
+        stream: Compressed body stream
+        content_length: Compressed length, or None to read until EOF
+        coding: "gzip" or "deflate"
+        output: File receiving the decompressed bytes
+        max_bytes: Largest decompressed size accepted
+        chunk_size: Bytes read, and at most produced, per step
+
+    Returns:
+        Decompressed size in bytes
+
+    Raises:
+        DecompressionError: If the body is malformed, truncated or too large
+    """
+    body = DecompressingInput(stream, content_length, coding, max_bytes, chunk_size)
+    for data in iter(lambda: body.read(chunk_size), b""):
+        output.write(data)
+    return body.total
+
+
+def _discard_write(data: bytes) -> None:
+    raise RuntimeError("write() is not supported for compressed responses")
+
+
+class _CompressedIterable:
+    """Response iterable compressing a body of unknown length as it streams."""
+
+    def __init__(self, result: Iterable[bytes], encoder: Any, flush_bytes: int):
+        self._result = result
+        self._encoder = encoder
+        self._flush_bytes = flush_bytes
+
+    def __iter__(self) -> Iterator[bytes]:
+        pending = 0
+        for piece in self._result:
+            if not piece:
+                continue
+            out = self._encoder.compress(piece)
+            pending += len(piece)
+            # Sync-flush periodically so a streamed response keeps arriving in pieces
+            if pending >= self._flush_bytes:
+                out += self._encoder.flush(zlib.Z_SYNC_FLUSH)
+                pending = 0
+            if out:
+                yield out
+        yield self._encoder.flush()
+
+    def close(self) -> None:
+        if hasattr(self._result, "close"):
+            self._result.close()
+
+
+class _ClosingIterable:
+    """Response iterable that runs a cleanup callback when the server closes it."""
+
+    def __init__(self, result: Iterable[bytes], cleanup: Callable[[], None]):
+        self._result = result
+        self._cleanup = cleanup
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._result)
+
+    def close(self) -> None:
+        try:
+            if hasattr(self._result, "close"):
+                self._result.close()
+        finally:
+            self._cleanup()
+
+
+class CompressionMiddleware:
+    """
+    WSGI middleware for gzip/deflate request and response bodies.
+
+    Requests with ``Content-Encoding: gzip`` or ``deflate`` get a wsgi.input
+    that decompresses as the wrapped app reads it, so batch and NDJSON bodies
+    still stream and the app's usual size limits apply to the decompressed
+    bytes. Decompression also stops with a 413 once the output passes
+    ``max_decompressed_bytes``, or ``max_streamed_bytes`` for the batch and
+    NDJSON endpoints. A body that fails before the app responds is answered
+    with the decompression error instead of the app's response.
+
+    Responses are compressed when the client accepts gzip or deflate and the
+    body is at least ``min_size`` bytes; bodies of unknown length (streamed
+    batch and rendered responses) are compressed as they stream. Compressed
+    responses carry ``Vary: Accept-Encoding`` and a weak ETag.
+    """
+
+    def __init__(self, app: WSGIApp, max_decompressed_bytes: int, min_size: int = 1024, level: int = 6,
+                 chunk_size: int = 64 * 1024, max_streamed_bytes: Optional[int] = None):
+        """
+        Args:
+            app: Wrapped WSGI application
+            max_decompressed_bytes: Largest decompressed request body accepted
+            min_size: Smallest response body worth compressing
+            level: zlib compression level for responses
+            chunk_size: Decompression step size, and sync-flush interval for streamed responses
+            max_streamed_bytes: Largest decompressed body for the streaming endpoints
+                (defaults to max_decompressed_bytes)
+        """
+        self.app = app
+        self.max_decompressed_bytes = max_decompressed_bytes
+        self.max_streamed_bytes = max_streamed_bytes or max_decompressed_bytes
+        self.min_size = min_size
+        self.level = level
+        self.chunk_size = chunk_size
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        body = None
+        content_encoding = environ.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+        if content_encoding and content_encoding != "identity":
+            body, error = self.decompress_request(environ, content_encoding)
+            if error is not None:
+                return self.reject(error, start_response)
+        return self.respond(environ, start_response, body)
+
+    def decompress_request(self, environ: Dict[str, Any], coding: str) -> Tuple[Optional[DecompressingInput],
+                                                                                 Optional[str]]:
+        """
+        Replace a compressed wsgi.input with one that decompresses as it is read.
+
+        The first chunk is decoded up front, so a body that is not gzip or
+        deflate at all is rejected before the app runs.
+
+        Args:
+            environ: WSGI environ, updated in place
+            coding: Request Content-Encoding
+
+        Returns:
+            Tuple of (body, error); error is a response message when the body is rejected
+        """
+        if coding not in CODINGS:
+            logger.warning("Rejected request with Content-Encoding %s", coding)
+            return None, UNSUPPORTED_ENCODING
+
+        path = environ.get("PATH_INFO", "")
+        max_bytes = self.max_streamed_bytes if path.endswith(STREAMED_PATH_SUFFIXES) else self.max_decompressed_bytes
+        body = DecompressingInput(environ["wsgi.input"], body_length(environ), coding, max_bytes, self.chunk_size)
+        try:
+            body.fill()
+        except DecompressionError as e:
+            logger.warning("Compressed request rejected: %s", e.message)
+            return None, e.message
+        # The decompressed length is unknown: the app reads until EOF
+        environ["wsgi.input"] = body
+        environ["CONTENT_LENGTH"] = ""
+        environ["wsgi.input_terminated"] = True
+        environ.pop("HTTP_CONTENT_ENCODING", None)
+        return body, None
+
+    @staticmethod
+    def reject(message: str, start_response: Callable) -> Iterable[bytes]:
+        cached = response_cache.error(message)
+        start_response(STATUS_LINES[cached.status_code], [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(cached.body)))
+        ])
+        return [cached.body]
+
+    def respond(self, environ: Dict[str, Any], start_response: Callable,
+                body: Optional[DecompressingInput] = None) -> Iterable[bytes]:
+        """
+        Run the wrapped app, compressing its response when negotiated and worthwhile.
+
+        Args:
+            environ: WSGI environ
+            start_response: WSGI start_response
+            body: Decompressing request body, if the request was compressed
+
+        Returns:
+            Response body iterable
+        """
+        deferred = []
+
+        def capture(status, headers, exc_info=None):
+            if body is not None and body.error is not None:
+                # The app answered a body it could not read; send the decompression error instead
+                deferred.append(REJECTED)
+                return _discard_write
+            # Small, empty and already-encoded responses go straight through
+            if exc_info is None and status[:3] not in ("204", "304"):
+                length = None
+                for name, value in headers:
+                    name = name.lower()
+                    if name == "content-length":
+                        length = int(value)
+                    elif name == "content-encoding":
+                        break
+                else:
+                    if length is None or length >= self.min_size:
+                        deferred.append((status, headers, length))
+                        return _discard_write
+            deferred.append(None)
+            return start_response(status, headers, exc_info)
+
+        result = self.app(environ, capture)
+        if not deferred:
+            # Start the body so a lazy app calls start_response
+            iterator = iter(result)
+            first = next(iterator, b"")
+            result = _ClosingIterable(itertools.chain([first], iterator), getattr(result, "close", lambda: None))
+        if not deferred:
+            # Still no start_response (an empty generator): nothing to compress, let the server handle it
+            return result
+        if deferred[-1] is REJECTED:
+            if hasattr(result, "close"):
+                result.close()
+            logger.warning("Compressed request rejected: %s", body.error)
+            return self.reject(body.error, start_response)
+        if deferred[-1] is None:
+            return result
+        status, headers, length = deferred[-1]
+
+        # The representation now depends on Accept-Encoding, whether or not this client compresses
+        headers = [*headers, ("Vary", "Accept-Encoding")]
+        coding = negotiate_encoding(environ.get("HTTP_ACCEPT_ENCODING"))
+        if coding is None or environ.get("REQUEST_METHOD") == "HEAD":
+            start_response(status, headers)
+            return result
+
+        headers = [(name, f"W/{value}" if name.lower() == "etag" and not value.startswith("W/") else value)
+                   for name, value in headers if name.lower() != "content-length"]
+        headers.append(("Content-Encoding", coding))
+        encoder = compressor(coding, self.level)
+        if length is None:
+            start_response(status, headers)
+            return _CompressedIterable(result, encoder, self.chunk_size)
+
+        try:
+            body = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        compressed = encoder.compress(body) + encoder.flush()
+        headers.append(("Content-Length", str(len(compressed))))
+        start_response(status, headers)
+        return [compressed]
@@ -0,0 +1,631 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import unquote
+import gc
+import itertools
+import logging
+import os
+import queue
+import random
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WSGIApp = Callable[[Dict[str, Any], Callable], Iterable[bytes]]
+
+INTERNAL_ERROR_BODY = b'{"error":"Internal server error"}\n'
+
+
+class _BodyReader:
+    """File-like reader over a request body with a known length."""
+
+    def __init__(self, rfile, length: int):
+        self._rfile = rfile
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._rfile.read(size)
+        self.remaining -= len(data)
+        if not data:
+            self.remaining = 0
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        line = self._rfile.readline(size)
+        self.remaining -= len(line)
+        if not line:
+            self.remaining = 0
+        return line
+
+    def drain(self) -> None:
+        """Discard any unread body bytes so the connection can be reused."""
+        while self.remaining > 0 and self.read(64 * 1024):
+            pass
+
+
+class _ChunkedReader:
+    """File-like reader decoding a chunked transfer-encoded request body."""
+
+    def __init__(self, rfile):
+        self._rfile = rfile
+        self._chunk_remaining = 0
+        self._done = False
+
+    def _next_chunk(self) -> None:
+        size_line = self._rfile.readline(65537)
+        try:
+            self._chunk_remaining = int(size_line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            raise ValueError("Invalid chunked encoding")
+        if self._chunk_remaining == 0:
+            # Skip trailers up to the terminating blank line
+            while self._rfile.readline(65537) not in (b"\r\n", b"\n", b""):
+                pass
+            self._done = True
+
+    def read(self, size: int = -1) -> bytes:
+        parts = []
+        while not self._done and (size is None or size < 0 or size > 0):
+            if self._chunk_remaining == 0:
+                self._next_chunk()
+                continue
+            want = self._chunk_remaining if size is None or size < 0 else min(size, self._chunk_remaining)
+            data = self._rfile.read(want)
+            if not data:
+                self._done = True
+                break
+            parts.append(data)
+            self._chunk_remaining -= len(data)
+            if self._chunk_remaining == 0:
+                self._rfile.readline(3)
+            if size is not None and size >= 0:
+                size -= len(data)
+        return b"".join(parts)
+
+    def readline(self, size: int = -1) -> bytes:
+        line = bytearray()
+        while size is None or size < 0 or len(line) < size:
+            char = self.read(1)
+            if not char:
+                break
+            line += char
+            if char == b"\n":
+                break
+        return bytes(line)
+
+    def drain(self) -> None:
+        while self.read(64 * 1024):
+            pass
+
+
+class WSGIConnectionHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive connection handler that runs a WSGI application."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "PromptMatchingAPI"
+
+    def __init__(self, request: socket.socket, client_address: Any, server: "_WorkerServer"):
+        # Only set up the streams: the worker serves one request at a time through handle_request()
+        self.request = request
+        self.client_address = client_address
+        self.server = server
+        # Accepted but not yet served: still answered if the worker starts stopping
+        self.fresh = True
+        self.setup()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def handle_request(self) -> bool:
+        """
+        Serve one request from the connection.
+
+        Returns:
+            True if the connection stays open for another request
+        """
+        self.close_connection = True
+        self.fresh = False
+        self.handle_one_request()
+        return not self.close_connection
+
+    def has_buffered_request(self) -> bool:
+        """Whether a pipelined request has already arrived, checked without blocking."""
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.server.keepalive_timeout)
+
+    def close(self) -> None:
+        """Flush the response stream and close the connection."""
+        try:
+            self.finish()
+        except OSError:
+            pass
+        finally:
+            try:
+                self.connection.close()
+            except OSError:
+                pass
+
+    def build_environ(self, body) -> Dict[str, Any]:
+        path, _, query = self.path.partition("?")
+        environ = {
+            "REQUEST_METHOD": self.command,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(path, "latin-1"),
+            "QUERY_STRING": query,
+            "CONTENT_TYPE": self.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": self.headers.get("Content-Length", ""),
+            "SERVER_NAME": self.server.server_name,
+            "SERVER_PORT": str(self.server.server_port),
+            "SERVER_PROTOCOL": self.request_version,
+            "REMOTE_ADDR": self.client_address[0] if self.client_address else "",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False
+        }
+        if isinstance(body, _ChunkedReader):
+            environ["wsgi.input_terminated"] = True
+        for name, value in self.headers.items():
+            key = "HTTP_" + name.upper().replace("-", "_")
+            if key in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                continue
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def run_wsgi(self) -> None:
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            body = _ChunkedReader(self.rfile)
+        else:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                self.send_error(400, "Invalid Content-Length")
+                return
+            body = _BodyReader(self.rfile, length)
+
+        response_state: Dict[str, Any] = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info and response_state.get("sent"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_state["status"] = status
+            response_state["headers"] = headers
+            return self.wfile.write
+
+        try:
+            result = self.server.app(self.build_environ(body), start_response)
+            try:
+                chunks = result
+                if "status" not in response_state:
+                    # The app may defer start_response until its first chunk
+                    iterator = iter(result)
+                    first_chunk = next(iterator, b"")
+                    chunks = itertools.chain((first_chunk,), iterator)
+                self.write_response(response_state, chunks)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        except Exception as e:
+            if response_state.get("sent"):
+                raise
+            logger.error(f"Unhandled application error: {e}")
+            self.close_connection = True
+            self.write_response({"status": "500 Internal Server Error",
+                                 "headers": [("Content-Type", "application/json"),
+                                             ("Content-Length", str(len(INTERNAL_ERROR_BODY)))]},
+                                [INTERNAL_ERROR_BODY])
+
+        try:
+            body.drain()
+        except (OSError, ValueError):
+            self.close_connection = True
+
+        self.server.request_finished()
+        if self.server.stopping:
+            self.close_connection = True
+
+    def write_response(self, response_state: Dict[str, Any], result: Iterable[bytes]) -> None:
+        headers = response_state["headers"]
+        header_names = {name.lower() for name, _ in headers}
+        chunked = "content-length" not in header_names and self.request_version == "HTTP/1.1"
+        if "content-length" not in header_names and not chunked:
+            self.close_connection = True
+        if not chunked and not isinstance(result, list):
+            # Collect the body before anything is sent, so an error here can still become a 500
+            result = list(result)
+
+        lines = [f"{self.protocol_version} {response_state['status']}\r\n",
+                 f"Server: {self.server_version}\r\n",
+                 f"Date: {formatdate(usegmt=True)}\r\n"]
+        lines.extend(f"{name}: {value}\r\n" for name, value in headers)
+        if chunked:
+            lines.append("Transfer-Encoding: chunked\r\n")
+        if self.close_connection:
+            lines.append("Connection: close\r\n")
+        head = "".join(lines).encode("latin-1") + b"\r\n"
+        response_state["sent"] = True
+
+        if self.command == "HEAD":
+            self.wfile.write(head)
+            return
+
+        if not chunked:
+            # Single write for the common small pre-encoded response
+            self.wfile.write(head + b"".join(result))
+            return
+
+        self.wfile.write(head)
+        for chunk in result:
+            if chunk:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_HEAD = do_OPTIONS = run_wsgi
+
+
+class _WorkerServer:
+    """
+    Per-worker state shared by the connection handlers of one process.
+
+    One poller thread waits on the listening socket and on idle connections,
+    new or kept alive; ``threads`` handler threads each serve one request at a
+    time and then hand the connection back to the poller. An idle client
+    therefore never holds a handler thread, and is closed after
+    ``keepalive_timeout`` seconds without a request.
+    """
+
+    def __init__(self, app: WSGIApp, listener: socket.socket, max_requests: int, keepalive_timeout: float):
+        self.app = app
+        self.listener = listener
+        host, port = listener.getsockname()[:2]
+        self.server_name = host if host not in ("0.0.0.0", "") else "localhost"
+        self.server_port = port
+        self.max_requests = max_requests
+        self.keepalive_timeout = keepalive_timeout
+        self.stopping = False
+        self._requests = 0
+        self._lock = threading.Lock()
+        # Connections with a request to serve, and connections going back to the poller
+        self._ready: "queue.SimpleQueue[Optional[WSGIConnectionHandler]]" = queue.SimpleQueue()
+        self._returned: "queue.SimpleQueue[WSGIConnectionHandler]" = queue.SimpleQueue()
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+
+    def request_finished(self) -> None:
+        if not self.max_requests:
+            return
+        with self._lock:
+            self._requests += 1
+            if self._requests >= self.max_requests and not self.stopping:
+                logger.info(f"Worker {os.getpid()} served {self._requests} requests, recycling")
+                self.stopping = True
+
+    def serve(self, threads: int) -> None:
+        """
+        Serve connections until stopping, then let in-flight requests finish.
+
+        Args:
+            threads: Number of handler threads
+        """
+        handlers = [threading.Thread(target=self.handle_loop, name=f"handler-{i}", daemon=True)
+                    for i in range(threads)]
+        for thread in handlers:
+            thread.start()
+        try:
+            self.poll_loop()
+        finally:
+            for _ in handlers:
+                self._ready.put(None)
+            for thread in handlers:
+                thread.join()
+            while not self._returned.empty():
+                self._returned.get().close()
+            self._wake_reader.close()
+            self._wake_writer.close()
+
+    def poll_loop(self) -> None:
+        """Accept connections and pass each one to a handler thread when its next request arrives."""
+        selector = selectors.DefaultSelector()
+        selector.register(self.listener, selectors.EVENT_READ)
+        selector.register(self._wake_reader, selectors.EVENT_READ)
+        # Idle keep-alive connections in deadline order
+        idle: "OrderedDict[WSGIConnectionHandler, float]" = OrderedDict()
+        try:
+            while not self.stopping:
+                timeout = 0.5
+                if idle:
+                    timeout = max(0.0, min(timeout, next(iter(idle.values())) - time.monotonic()))
+                for key, _ in selector.select(timeout):
+                    if key.fileobj is self.listener:
+                        self.accept()
+                    elif key.fileobj is self._wake_reader:
+                        try:
+                            while self._wake_reader.recv(4096):
+                                pass
+                        except BlockingIOError:
+                            pass
+                    else:
+                        selector.unregister(key.fileobj)
+                        del idle[key.data]
+                        self._ready.put(key.data)
+
+                deadline = time.monotonic() + self.keepalive_timeout
+                while not self._returned.empty():
+                    handler = self._returned.get()
+                    selector.register(handler.connection, selectors.EVENT_READ, handler)
+                    idle[handler] = deadline
+
+                now = time.monotonic()
+                while idle:
+                    handler, expires = next(iter(idle.items()))
+                    if expires > now:
+                        break
+                    del idle[handler]
+                    selector.unregister(handler.connection)
+                    handler.close()
+        finally:
+            for handler in idle:
+                if handler.fresh:
+                    # The client connected before the worker began stopping, so serve its request
+                    self._ready.put(handler)
+                else:
+                    handler.close()
+            selector.close()
+
+    def accept(self) -> None:
+        try:
+            connection, address = self.listener.accept()
+        except (BlockingIOError, InterruptedError):
+            # Another worker took the connection
+            return
+        except OSError:
+            if self.stopping:
+                return
+            raise
+        connection.settimeout(self.keepalive_timeout)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            handler = WSGIConnectionHandler(connection, address, self)
+        except Exception as e:
+            logger.error(f"Connection error from {address}: {str(e)}")
+            connection.close()
+            return
+        # Idle until its first request arrives, like a returned keep-alive connection
+        self._returned.put(handler)
+
+    def handle_loop(self) -> None:
+        while True:
+            handler = self._ready.get()
+            if handler is None:
+                return
+            try:
+                keep_open = handler.handle_request() and not self.stopping
+            except Exception as e:
+                logger.error(f"Connection error from {handler.client_address}: {str(e)}")
+                keep_open = False
+            if not keep_open:
+                handler.close()
+            elif handler.has_buffered_request():
+                # Pipelined request: queue it behind connections already waiting
+                self._ready.put(handler)
+            else:
+                self._returned.put(handler)
+                try:
+                    self._wake_writer.send(b"\0")
+                except (BlockingIOError, OSError):
+                    # The poller is already awake (or gone); it drains _returned either way
+                    pass
+
+
+class PreforkServer:
+    """
+    Pre-forking HTTP server for a WSGI application.
+
+    The application is built and warmed in the parent, then the garbage
+    collector is frozen before forking so workers share the compiled rules and
+    response caches copy-on-write. The parent supervises the workers:
+
+        SIGTERM / SIGINT   graceful shutdown (workers finish in-flight requests)
+        SIGHUP             graceful restart: rebuild the app, roll workers one by one
+        max_requests       workers exit after serving this many requests and are replaced
+    """
+
+    def __init__(self, app_factory: Callable[[], WSGIApp], host: str = "0.0.0.0", port: int = 5000,
+                 workers: int = 0, threads: int = 4, max_requests: int = 0,
+                 max_requests_jitter: int = 0, keepalive_timeout: float = 5.0,
+                 graceful_timeout: float = 30.0, backlog: int = 2048,
+                 warmup: Optional[Callable[[WSGIApp], None]] = None,
+                 post_fork: Optional[Callable[[], None]] = None):
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = max(1, threads)
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.keepalive_timeout = keepalive_timeout
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.warmup = warmup
+        self.post_fork = post_fork
+        self.app: Optional[WSGIApp] = None
+        self.listener: Optional[socket.socket] = None
+        self.children: Dict[int, int] = {}
+        self._generation = 0
+        self._stopping = False
+        self._restart_requested = False
+
+    def bind(self) -> socket.socket:
+        """Create the listening socket shared by all workers."""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(self.backlog)
+        # Workers wait in a selector and accept without blocking, since another worker may win the connection
+        listener.setblocking(False)
+        self.port = listener.getsockname()[1]
+        self.listener = listener
+        return listener
+
+    def load_app(self) -> WSGIApp:
+        """Build and warm the application in the parent process."""
+        app = self.app_factory()
+        if self.warmup is not None:
+            self.warmup(app)
+        # Move everything allocated so far out of the collector's reach so
+        # GC passes in the workers don't touch (and un-share) those pages
+        gc.collect()
+        gc.freeze()
+        self.app = app
+        return app
+
+    def spawn_worker(self) -> int:
+        """Fork one worker from the warm parent state."""
+        pid = os.fork()
+        if pid:
+            self.children[pid] = self._generation
+            return pid
+
+        # Child process
+        exit_code = 0
+        try:
+            self.run_worker()
+        except Exception as e:
+            logger.error(f"Worker {os.getpid()} crashed: {str(e)}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def run_worker(self) -> None:
+        """Serve connections until asked to stop or recycled."""
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            max_requests += random.randint(0, self.max_requests_jitter)
+
+        server = _WorkerServer(self.app, self.listener, max_requests, self.keepalive_timeout)
+
+        def stop(signum, frame):
+            server.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        if self.post_fork is not None:
+            self.post_fork()
+
+        server.serve(self.threads)
+
+    def _handle_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _handle_restart(self, signum, frame) -> None:
+        self._restart_requested = True
+
+    def reap(self) -> List[int]:
+        """Collect exited workers without blocking."""
+        exited = []
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if self.children.pop(pid, None) is not None:
+                exited.append(pid)
+        return exited
+
+    def restart(self) -> None:
+        """Rebuild the app and replace workers one at a time."""
+        logger.info("Graceful restart: rebuilding application")
+        gc.unfreeze()
+        old_workers = list(self.children)
+        self._generation += 1
+        self.load_app()
+        for pid in old_workers:
+            self.spawn_worker()
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve_forever(self) -> None:
+        """Bind, fork the workers and supervise them until shut down."""
+        if self.listener is None:
+            self.bind()
+        if self.app is None:
+            self.load_app()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_restart)
+
+        logger.info(f"Prefork server listening on {self.host}:{self.port} "
+                    f"with {self.workers} workers x {self.threads} threads")
+        for _ in range(self.workers):
+            self.spawn_worker()
+
+        try:
+            while not self._stopping:
+                time.sleep(0.1)
+                self.reap()
+                if self._restart_requested:
+                    self._restart_requested = False
+                    self.restart()
+                # Replace workers that were recycled or crashed
+                current = sum(1 for generation in self.children.values() if generation == self._generation)
+                for _ in range(self.workers - current):
+                    self.spawn_worker()
+        finally:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        """Stop all workers, waiting up to graceful_timeout for in-flight requests."""
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.reap()
+        self.children.clear()
+
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+        logger.info("Prefork server stopped")
@@ -0,0 +1,412 @@
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import parse_qs
+import json
+import logging
+from src.services.codes import MEDIA_TYPE as CODES_MEDIA_TYPE
+from src.services.prompt_service import PromptMatchingService
+from src.services.response_cache import CachedResponse, encode_body, etag_matches, response_cache
+from src.services.tenants import tenant_registry
+from src.utils.intake import IntakeError, StreamedObject, streaming_intake
+from src.utils.logging_setup import redact_payload, success_sampler
+from src.utils.metrics import metrics
+from src.utils.streaming import read_capped
+
+logger = logging.getLogger(__name__)
+
+STATUS_LINES = {
+    200: "200 OK",
+    304: "304 NOT MODIFIED",
+    400: "400 BAD REQUEST",
+    404: "404 NOT FOUND",
+    405: "405 METHOD NOT ALLOWED",
+    409: "409 CONFLICT",
+    413: "413 REQUEST ENTITY TOO LARGE",
+    415: "415 UNSUPPORTED MEDIA TYPE",
+    500: "500 INTERNAL SERVER ERROR",
+    503: "503 SERVICE UNAVAILABLE"
+}
+
+HEALTH_BODY = encode_body({"status": "healthy", "service": "Prompt Matching API"})
+NOT_FOUND_BODY = encode_body({"error": "Endpoint not found"})
+METHOD_NOT_ALLOWED_BODY = encode_body({"error": "Method not allowed. Only POST requests are supported."})
+BODY_TOO_LARGE_BODY = encode_body({"error": "Request body too large"})
+
+TENANT_PATH_PREFIX = "/api/tenants/"
+TENANT_PATH_SUFFIX = "/match-prompt"
+
+
+def is_json_content_type(content_type: str) -> bool:
+    """Mirror Flask's request.is_json check on a raw Content-Type header."""
+    mimetype = content_type.split(";", 1)[0].strip().lower()
+    return mimetype == "application/json" or (
+        mimetype.startswith("application/") and mimetype.endswith("+json")
+    )
+
+
+def render_requested(query_string: str) -> bool:
+    """Whether the query string asks for the rendered prompt (?render=1)."""
+    if "render" not in query_string:
+        return False
+    values = parse_qs(query_string).get("render", [""])
+    return values[0].lower() in ("1", "true", "yes")
+
+
+def tenant_path_id(path: str) -> Optional[str]:
+    """Tenant id from /api/tenants/<tenant>/match-prompt, or None for any other path."""
+    if not (path.startswith(TENANT_PATH_PREFIX) and path.endswith(TENANT_PATH_SUFFIX)):
+        return None
+    tenant_id = path[len(TENANT_PATH_PREFIX):-len(TENANT_PATH_SUFFIX)]
+    return tenant_id if tenant_id and "/" not in tenant_id else None
+
+
+def body_length(environ: Dict[str, Any]) -> Optional[int]:
+    """
+    Work out how many bytes of wsgi.input belong to the request body.
+
+    Args:
+        environ: WSGI environ
+
+    Returns:
+        The declared length, None for a chunked body of unknown length, or 0
+    """
+    try:
+        content_length = int(environ.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        content_length = 0
+    if content_length <= 0 and environ.get("wsgi.input_terminated"):
+        return None
+    return max(content_length, 0)
+
+
+def read_body(environ: Dict[str, Any], max_body_bytes: int) -> Optional[bytes]:
+    """
+    Read the request body from wsgi.input, enforcing a size cap.
+
+    Args:
+        environ: WSGI environ
+        max_body_bytes: Maximum accepted body size
+
+    Returns:
+        Body bytes, or None if the body exceeds the cap
+    """
+    stream = environ["wsgi.input"]
+    content_length = body_length(environ)
+
+    if content_length is None:
+        # Chunked body without a length: read in bounded chunks up to one byte past the cap
+        return read_capped(stream, max_body_bytes)
+    if content_length > max_body_bytes:
+        return None
+    if content_length > 0:
+        return stream.read(content_length)
+    return b""
+
+
+class PromptMatchingWSGIApp:
+    """
+    Minimal WSGI application serving /api/match-prompt, /api/tenants/<tenant>/match-prompt,
+    /api/match-codes, /api/rules, /api/codes and /health without Flask.
+
+    Responses and error semantics match PromptController; bodies come straight
+    from the pre-encoded response cache.
+    """
+
+    def __init__(self, max_body_bytes: int, rules_max_age: int = 60):
+        self.max_body_bytes = max_body_bytes
+        self.rules_cache_control = f"public, max-age={rules_max_age}"
+
+    def __call__(self, environ: Dict[str, Any],
+                 start_response: Callable[[str, List[Tuple[str, str]]], Any]) -> Iterable[bytes]:
+        path = environ.get("PATH_INFO", "")
+        method = environ.get("REQUEST_METHOD", "GET")
+
+        if path == "/api/match-prompt" or tenant_path_id(path) is not None:
+            if method == "POST":
+                status_code, body = self.handle_prompt_matching(environ, tenant_path_id(path))
+            else:
+                logger.warning(f"Unsupported method {method} attempted on /match-prompt")
+                status_code, body = 405, METHOD_NOT_ALLOWED_BODY
+        elif path == "/api/match-codes" and method == "POST":
+            return self.handle_code_matching(environ, start_response)
+        elif path == "/api/rules" and method in ("GET", "HEAD"):
+            return self.handle_rules_export(environ, start_response)
+        elif path == "/api/codes" and method in ("GET", "HEAD"):
+            return self.handle_code_table(environ, start_response)
+        elif path == "/health" and method in ("GET", "HEAD"):
+            status_code, body = 200, HEALTH_BODY
+        else:
+            status_code, body = 404, NOT_FOUND_BODY
+
+        if not isinstance(body, bytes):
+            # Streamed rendered prompt: length unknown up front
+            start_response(STATUS_LINES[status_code], [("Content-Type", "application/json")])
+            return body
+
+        start_response(STATUS_LINES[status_code], [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(body)))
+        ])
+        return [b"" if method == "HEAD" else body]
+
+    def handle_rules_export(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        """
+        Handle GET /api/rules, answering revalidations with 304.
+
+        Args:
+            environ: WSGI environ
+            start_response: WSGI start_response
+
+        Returns:
+            Response body iterable
+        """
+        export = response_cache.rules_export()
+        headers = [("ETag", export.etag), ("Cache-Control", self.rules_cache_control)]
+        if etag_matches(environ.get("HTTP_IF_NONE_MATCH"), export.etag):
+            start_response(STATUS_LINES[304], headers)
+            return [b""]
+        start_response(STATUS_LINES[200], [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(export.body))),
+            *headers
+        ])
+        return [b"" if environ.get("REQUEST_METHOD") == "HEAD" else export.body]
+
+    def handle_code_table(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        """
+        Handle GET /api/codes, answering revalidations with 304.
+
+        Args:
+            environ: WSGI environ
+            start_response: WSGI start_response
+
+        Returns:
+            Response body iterable
+        """
+        table = response_cache.code_table()
+        headers = [("ETag", table.etag), ("Cache-Control", self.rules_cache_control)]
+        if etag_matches(environ.get("HTTP_IF_NONE_MATCH"), table.etag):
+            start_response(STATUS_LINES[304], headers)
+            return [b""]
+        start_response(STATUS_LINES[200], [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(table.body))),
+            *headers
+        ])
+        return [b"" if environ.get("REQUEST_METHOD") == "HEAD" else table.body]
+
+    def handle_code_matching(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        """
+        Handle POST /api/match-codes with a packed body of code records.
+
+        Args:
+            environ: WSGI environ
+            start_response: WSGI start_response
+
+        Returns:
+            Response body iterable
+        """
+        table = response_cache.code_table()
+        error = None
+        if environ.get("CONTENT_TYPE", "").split(";", 1)[0].strip().lower() != CODES_MEDIA_TYPE:
+            error = "Content-Type must be application/x-prompt-codes"
+        elif environ.get("HTTP_X_CODE_TABLE", table.version) != table.version:
+            error = "Code table changed"
+        else:
+            body = read_body(environ, self.max_body_bytes)
+            if body is None:
+                logger.warning(f"Request body exceeds {self.max_body_bytes} bytes")
+                error = "Request body too large"
+            else:
+                try:
+                    results = table.match_packed(body)
+                except ValueError:
+                    error = "Invalid code record length"
+
+        if error is not None:
+            logger.warning("Code request rejected: %s", error)
+            cached = response_cache.error(error)
+            start_response(STATUS_LINES[cached.status_code], [
+                ("Content-Type", "application/json"),
+                ("Content-Length", str(len(cached.body))),
+                ("X-Code-Table", table.version)
+            ])
+            return [cached.body]
+
+        start_response(STATUS_LINES[200], [
+            ("Content-Type", CODES_MEDIA_TYPE),
+            ("Content-Length", str(len(results))),
+            ("X-Code-Table", table.version)
+        ])
+        return [results]
+
+    @staticmethod
+    def parse_json(body: bytes) -> Any:
+        """Decode a buffered request body as JSON."""
+        return json.loads(body)
+
+    @staticmethod
+    def respond(cached: CachedResponse) -> Tuple[int, Union[bytes, Iterable[bytes]]]:
+        """Unpack a cached response, counting its outcome."""
+        if metrics.enabled:
+            if cached.error is None:
+                metrics.increment("matches", cached.matched_prompt)
+            else:
+                metrics.increment("errors", cached.error)
+        return cached.status_code, cached.body
+
+    @staticmethod
+    def lookup_tenant(tenant_id: Optional[str]) -> Tuple[Any, Optional[CachedResponse]]:
+        """
+        Resolve a tenant's response tables.
+
+        Shared by every front end.
+
+        Args:
+            tenant_id: Tenant from the path or tenant header, or None for the global rules
+
+        Returns:
+            Tuple of (tables, error); tables is None for the global rules,
+            error is a cached error response for an unusable tenant
+        """
+        if tenant_id is None:
+            return None, None
+        tables, error = tenant_registry.lookup(tenant_id)
+        if error is not None:
+            logger.warning("Tenant %s rejected: %s", tenant_id, error)
+            return None, response_cache.error(error)
+        return tables, None
+
+    def handle_prompt_matching(self, environ: Dict[str, Any],
+                               tenant_id: Optional[str] = None) -> Tuple[int, Union[bytes, Iterable[bytes]]]:
+        """
+        Handle POST /api/match-prompt and /api/tenants/<tenant>/match-prompt.
+
+        Args:
+            environ: WSGI environ
+            tenant_id: Tenant from the path (defaults to the tenant header, then the global rules)
+
+        Returns:
+            Tuple of (status_code, body)
+        """
+        try:
+            if not is_json_content_type(environ.get("CONTENT_TYPE", "")):
+                logger.warning("Request without JSON content-type received")
+                return self.respond(response_cache.error("Content-Type must be application/json"))
+
+            if tenant_id is None and tenant_registry.enabled:
+                tenant_id = environ.get(tenant_registry.environ_key)
+            tables, tenant_error = self.lookup_tenant(tenant_id)
+            if tenant_error is not None:
+                return self.respond(tenant_error)
+
+            if streaming_intake.enabled:
+                return self.match_stream(environ["wsgi.input"], body_length(environ),
+                                         render_requested(environ.get("QUERY_STRING", "")), tables)
+
+            body = read_body(environ, self.max_body_bytes)
+            if body is None:
+                logger.warning(f"Request body exceeds {self.max_body_bytes} bytes")
+                return 413, BODY_TOO_LARGE_BODY
+
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            return self.respond(response_cache.error("Internal server error"))
+
+        return self.match_body(body, render_requested(environ.get("QUERY_STRING", "")), tables)
+
+    @classmethod
+    def match_body(cls, body: bytes, render: bool = False, tables: Any = None) -> Tuple[int, bytes]:
+        """
+        Match a buffered /api/match-prompt request body.
+
+        Shared by every front end that has the whole body in hand.
+
+        Args:
+            body: Request body
+            render: Whether successful responses carry the rendered prompt
+            tables: Tenant response tables from lookup_tenant (defaults to the global rules)
+
+        Returns:
+            Tuple of (status_code, body)
+        """
+        try:
+            try:
+                request_data = cls.parse_json(body)
+            except ValueError as json_error:
+                logger.warning("Invalid JSON received: %s", json_error)
+                return cls.respond(response_cache.error("Invalid JSON format"))
+
+            if request_data is None:
+                logger.warning("Empty JSON request received")
+                return cls.respond(response_cache.error("Missing Data"))
+
+            if not isinstance(request_data, dict):
+                logger.warning("Invalid JSON structure - expected object, got %s", type(request_data).__name__)
+                return cls.respond(response_cache.error("Invalid JSON structure - expected JSON object"))
+
+            log_success = success_sampler.sample() and logger.isEnabledFor(logging.INFO)
+            if log_success:
+                logger.info("Processing request: %s", redact_payload(request_data))
+
+            if render:
+                cached = response_cache.respond_rendered(request_data, tables)
+            else:
+                cached = response_cache.respond(request_data, tables)
+            if cached.error is not None:
+                logger.warning("Validation error: %s", cached.error)
+            elif log_success:
+                logger.info("Request successful: %s", cached.matched_prompt)
+            return cls.respond(cached)
+
+        except TypeError as e:
+            logger.warning(f"Type error: {str(e)}")
+            return cls.respond(response_cache.error("Invalid data format"))
+
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            return cls.respond(response_cache.error("Internal server error"))
+
+    @classmethod
+    def match_stream(cls, stream: BinaryIO, content_length: Optional[int], render: bool = False,
+                     tables: Any = None) -> Tuple[int, Union[bytes, Iterable[bytes]]]:
+        """
+        Match a /api/match-prompt request body by reading it incrementally.
+
+        Args:
+            stream: Body stream
+            content_length: Declared body length, or None to read until EOF
+            render: Whether successful responses carry the rendered prompt
+            tables: Tenant response tables from lookup_tenant (defaults to the global rules)
+
+        Returns:
+            Tuple of (status_code, body)
+        """
+        snapshot = tables.snapshot if tables is not None else PromptMatchingService.get_snapshot()
+        try:
+            document = streaming_intake.read(
+                stream, content_length, keep_text=render,
+                max_chars=snapshot.validator.max_length
+            )
+        except IntakeError as e:
+            logger.warning("Streamed request rejected: %s", e)
+            return cls.respond(response_cache.error(str(e)))
+
+        if document is None:
+            logger.warning("Empty JSON request received")
+            return cls.respond(response_cache.error("Missing Data"))
+
+        if not isinstance(document, StreamedObject):
+            logger.warning("Invalid JSON structure - expected object, got %s", type(document).__name__)
+            return cls.respond(response_cache.error("Invalid JSON structure - expected JSON object"))
+
+        log_success = success_sampler.sample() and logger.isEnabledFor(logging.INFO)
+        if log_success:
+            logger.info("Processing streamed request: %s (spooled: %s)", redact_payload(document.fields),
+                        {name: text.length for name, text in document.spooled.items()})
+
+        cached = response_cache.respond_streamed(document, render, tables)
+        if cached.error is not None:
+            logger.warning("Validation error: %s", cached.error)
+        elif log_success:
+            logger.info("Request successful: %s", cached.matched_prompt)
+        return cls.respond(cached)
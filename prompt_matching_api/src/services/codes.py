@@ -0,0 +1,211 @@
+"""
+Compact integer-coded wire format for high-volume callers.
+
+The code table numbers every valid situation, level and file type, and every
+prompt, by its position in the rule definitions, so codes only change when
+values are removed or reordered. A request is a sequence of records of three
+little-endian unsigned 16-bit codes (situation, level, file_type); the
+response is one little-endian unsigned 16-bit prompt code per record, with
+NO_MATCH for records that match nothing or carry an unknown code.
+
+Matching a record is a single lookup in a dense table precomputed for every
+code combination, so no strings are decoded or compared per request.
+"""
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import logging
+import struct
+import sys
+from src.services.rule_index import MATCH_FIELDS
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPE = "application/x-prompt-codes"
+
+# One request record: situation, level and file_type codes
+RECORD = struct.Struct("<HHH")
+
+# Prompt code returned for records that match no rule
+NO_MATCH = 0xFFFF
+
+# Largest number of code combinations given a precomputed table (2 bytes each)
+MAX_DENSE_ENTRIES = 1 << 20
+
+_SWAP_BYTES = sys.byteorder != "little"
+
+
+class CodeTable:
+    """
+    Code assignments and precomputed matches for one rule snapshot.
+
+    Attributes:
+        values: Field name to values in code order, for each of MATCH_FIELDS
+        prompts: Prompt names in code order
+        version: Content hash identifying this table
+        body: Encoded JSON document published to callers
+        etag: Quoted ``version``, for HTTP caching
+    """
+
+    __slots__ = ("values", "prompts", "version", "body", "etag", "_sizes", "_dense", "_snapshot", "_prompt_codes")
+
+    def __init__(self, snapshot: Any):
+        """
+        Args:
+            snapshot: RuleSnapshot to assign codes for
+        """
+        self.values: Dict[str, Tuple[str, ...]] = dict(snapshot.ordered_values)
+        self.prompts: Tuple[str, ...] = tuple(snapshot.criteria)
+        if len(self.prompts) >= NO_MATCH or any(len(values) > NO_MATCH + 1 for values in self.values.values()):
+            raise ValueError("Rule set has too many values for 16-bit codes")
+
+        document = {
+            "situations": list(self.values["situation"]),
+            "levels": list(self.values["level"]),
+            "file_types": list(self.values["file_type"]),
+            "prompts": list(self.prompts),
+            "no_match": NO_MATCH
+        }
+        encoded = json.dumps(document, separators=(",", ":")).encode("utf-8")
+        self.version = hashlib.blake2b(encoded, digest_size=8).hexdigest()
+        document["version"] = self.version
+        self.body = (json.dumps(document, separators=(",", ":")) + "\n").encode("utf-8")
+        self.etag = '"%s"' % self.version
+
+        self._sizes = tuple(len(self.values[field]) for field in MATCH_FIELDS)
+        self._snapshot = snapshot
+        self._prompt_codes = {name: code for code, name in enumerate(self.prompts)}
+        self._dense = self._build_dense()
+
+    def _build_dense(self) -> Optional[array]:
+        situations, levels, file_types = (self.values[field] for field in MATCH_FIELDS)
+        if len(situations) * len(levels) * len(file_types) > MAX_DENSE_ENTRIES:
+            logger.info("Code table too large to precompute; matching records through the rule index")
+            return None
+        lookup = self._snapshot.index.lookup
+        prompt_codes = self._prompt_codes
+        return array("H", [
+            prompt_codes.get(lookup(situation, level, file_type), NO_MATCH)
+            for situation in situations
+            for level in levels
+            for file_type in file_types
+        ])
+
+    def code_for(self, situation: str, level: str, file_type: str) -> Tuple[int, int, int]:
+        """
+        Encode routing values as a record.
+
+        Args:
+            situation: Situation value
+            level: Level value
+            file_type: File type value
+
+        Returns:
+            Tuple of (situation, level, file_type) codes
+
+        Raises:
+            ValueError: If a value has no code
+        """
+        return tuple(self.values[field].index(value)
+                     for field, value in zip(MATCH_FIELDS, (situation, level, file_type)))
+
+    def match(self, situation: int, level: int, file_type: int) -> int:
+        """
+        Match one record.
+
+        Args:
+            situation: Situation code
+            level: Level code
+            file_type: File type code
+
+        Returns:
+            Prompt code, or NO_MATCH
+        """
+        return self.match_codes([situation, level, file_type])[0]
+
+    def match_codes(self, codes: Sequence[int]) -> List[int]:
+        """
+        Match a flat sequence of records.
+
+        Args:
+            codes: Situation, level and file_type codes of each record in turn
+
+        Returns:
+            One prompt code (or NO_MATCH) per record
+        """
+        situations = codes[0::3]
+        levels = codes[1::3]
+        file_types = codes[2::3]
+        situation_count, level_count, file_type_count = self._sizes
+        dense = self._dense
+        if dense is not None:
+            return [
+                dense[(situation * level_count + level) * file_type_count + file_type]
+                if situation < situation_count and level < level_count and file_type < file_type_count
+                else NO_MATCH
+                for situation, level, file_type in zip(situations, levels, file_types)
+            ]
+
+        situation_values, level_values, file_type_values = (self.values[field] for field in MATCH_FIELDS)
+        lookup = self._snapshot.index.lookup
+        prompt_codes = self._prompt_codes
+        return [
+            prompt_codes.get(lookup(situation_values[situation], level_values[level], file_type_values[file_type]),
+                             NO_MATCH)
+            if situation < situation_count and level < level_count and file_type < file_type_count
+            else NO_MATCH
+            for situation, level, file_type in zip(situations, levels, file_types)
+        ]
+
+    def match_packed(self, body: bytes) -> bytes:
+        """
+        Match a packed request body.
+
+        Args:
+            body: Concatenated RECORD-encoded records
+
+        Returns:
+            Concatenated little-endian unsigned 16-bit prompt codes
+
+        Raises:
+            ValueError: If the body length is not a whole number of records
+        """
+        if len(body) % RECORD.size:
+            raise ValueError(f"Body length must be a multiple of {RECORD.size} bytes")
+        codes = array("H", body)
+        if _SWAP_BYTES:
+            codes.byteswap()
+        results = array("H", self.match_codes(codes))
+        if _SWAP_BYTES:
+            results.byteswap()
+        return results.tobytes()
+
+
+def pack_records(records: Iterable[Sequence[int]]) -> bytes:
+    """
+    Encode records as a request body.
+
+    Args:
+        records: (situation, level, file_type) code triples
+
+    Returns:
+        Packed body
+    """
+    return b"".join(RECORD.pack(*record) for record in records)
+
+
+def unpack_results(body: bytes) -> List[int]:
+    """
+    Decode a response body.
+
+    Args:
+        body: Packed prompt codes
+
+    Returns:
+        Prompt codes (NO_MATCH where nothing matched)
+    """
+    codes = array("H", body)
+    if _SWAP_BYTES:
+        codes.byteswap()
+    return codes.tolist()
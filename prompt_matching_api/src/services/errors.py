@@ -0,0 +1,45 @@
+"""
+Error messages returned by the match endpoints and their HTTP statuses.
+
+Kept free of other imports so clients can map error messages to statuses
+without loading the service.
+"""
+
+# Fixed error messages returned by the match endpoints
+ERROR_MESSAGES = (
+    "Missing Data",
+    "Invalid Prompt",
+    "Data exceeds maximum length",
+    "Request body too large",
+    "Invalid JSON format",
+    "Invalid data format",
+    "Content-Type must be application/json",
+    "Invalid JSON structure - expected JSON object",
+    "Internal server error",
+    "Code table changed",
+    "Content-Type must be application/x-prompt-codes",
+    "Invalid code record length",
+    "Unknown tenant",
+    "Tenant rules unavailable",
+    "Job not found",
+    "Job queue full",
+    "Background jobs are disabled",
+    "Unsupported Content-Encoding",
+    "Invalid compressed body",
+    "Decompressed body too large"
+)
+
+# Status codes for errors that are not plain 400s
+ERROR_STATUS = {
+    "Data exceeds maximum length": 413,
+    "Request body too large": 413,
+    "Decompressed body too large": 413,
+    "Unsupported Content-Encoding": 415,
+    "Code table changed": 409,
+    "Unknown tenant": 404,
+    "Job not found": 404,
+    "Background jobs are disabled": 404,
+    "Internal server error": 500,
+    "Tenant rules unavailable": 503,
+    "Job queue full": 503
+}
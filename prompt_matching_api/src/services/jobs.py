@@ -0,0 +1,462 @@
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Mapping, Optional, Tuple
+import heapq
+import importlib
+import itertools
+import logging
+import threading
+import time
+import uuid
+
+from src.services.templates import CompiledTemplate, template_cache
+from src.utils.memory import deep_sizeof
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Recent waits and run times kept for the admin percentiles
+_RECENT_SAMPLES = 1024
+
+JobProcessor = Callable[[str, Optional[CompiledTemplate], Dict[str, Any]], Any]
+
+
+def render_prompt(prompt_name: str, template: Optional[CompiledTemplate], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Default job processor: render the matched prompt's template around the document.
+
+    Module level so it can run in a worker process.
+
+    Args:
+        prompt_name: Matched prompt name
+        template: Compiled template of the matched rule, or None
+        payload: Validated request payload
+
+    Returns:
+        JSON-serializable result
+    """
+    if template is None:
+        return {"prompt": None}
+    return {"prompt": template.render({
+        "prompt": prompt_name,
+        "situation": payload["situation"],
+        "level": payload["level"],
+        "file_type": payload["file_type"],
+        "data": payload["data"] or ""
+    })}
+
+
+def load_processor(path: Optional[str]) -> JobProcessor:
+    """
+    Import a job processor from a ``module:function`` path.
+
+    Args:
+        path: Import path, or None for render_prompt
+
+    Returns:
+        Processor callable
+
+    Raises:
+        ValueError: If the path is malformed or does not name a callable
+    """
+    if not path:
+        return render_prompt
+    module_name, _, attribute = path.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"JOB_PROCESSOR must look like module:function, got {path!r}")
+    try:
+        processor = getattr(importlib.import_module(module_name), attribute)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"Could not load JOB_PROCESSOR {path!r}: {str(e)}")
+    if not callable(processor):
+        raise ValueError(f"JOB_PROCESSOR {path!r} is not callable")
+    return processor
+
+
+def _percentiles(samples: Deque[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {"count": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+class Job:
+    """A submitted payload and, once processed, its result."""
+
+    __slots__ = ("job_id", "prompt_name", "priority", "template", "payload", "size", "status", "submitted_at",
+                 "started_at", "finished_at", "result", "error", "_enqueued", "_done")
+
+    def __init__(self, prompt_name: str, priority: int, template: Optional[CompiledTemplate],
+                 payload: Dict[str, Any]):
+        self.job_id = uuid.uuid4().hex
+        self.prompt_name = prompt_name
+        self.priority = priority
+        self.template = template
+        self.payload: Optional[Dict[str, Any]] = payload
+        # Approximate bytes pinned: the queued payload, then the kept result
+        self.size = deep_sizeof(payload)
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self._enqueued = time.monotonic()
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job has a result or an error."""
+        return self._done.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until the job finishes.
+
+        Args:
+            timeout: Seconds to wait at most
+
+        Returns:
+            True if the job finished
+        """
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the job for the API."""
+        description = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "matched_prompt": self.prompt_name,
+            "priority": self.priority,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.status == DONE:
+            description["result"] = self.result
+        elif self.status == FAILED:
+            description["error"] = self.error
+        return description
+
+
+class _QueueState:
+    """
+    Heap, workers and counters of one JobQueue configuration.
+
+    Workers capture the state they were started for, so a worker that
+    outlives a reconfiguration only drains and counts its own, stopped state.
+    A state is never restarted once stopping.
+    """
+
+    def __init__(self, processor: JobProcessor, workers: int, executor: str, result_ttl: float,
+                 result_max_bytes: int = 0):
+        self.processor = processor
+        self.workers = workers
+        self.executor_kind = executor
+        self.result_ttl = result_ttl
+        self.result_max_bytes = result_max_bytes
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.heap: List[Tuple[int, int, Job]] = []
+        self.sequence = itertools.count()
+        self.jobs: Dict[str, Job] = {}
+        self.expiry: Deque[Tuple[float, str]] = deque()
+        self.queued_by_prompt: Counter = Counter()
+        self.queued_bytes = 0
+        self.retained_bytes = 0
+        self.threads: List[threading.Thread] = []
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.stopping = False
+        self.started_at: Optional[float] = None
+        self.running = 0
+        self.busy_seconds = 0.0
+        self.waits: Deque[float] = deque(maxlen=_RECENT_SAMPLES)
+        self.run_times: Deque[float] = deque(maxlen=_RECENT_SAMPLES)
+        self.counts = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def expire(self) -> None:
+        # Called with the lock held; finish times are appended in order
+        now = time.monotonic()
+        while self.expiry and self.expiry[0][0] <= now:
+            self.evict_oldest()
+
+    def retain(self, job: Job) -> None:
+        # Called with the lock held once a job finishes; the oldest results go first past the byte budget
+        self.expiry.append((time.monotonic() + self.result_ttl, job.job_id))
+        self.retained_bytes += job.size
+        while self.result_max_bytes and self.retained_bytes > self.result_max_bytes and self.expiry:
+            self.evict_oldest()
+
+    def evict_oldest(self) -> None:
+        job = self.jobs.pop(self.expiry.popleft()[1], None)
+        if job is not None:
+            self.retained_bytes -= job.size
+
+
+class JobQueue:
+    """
+    Bounded priority queue of matched payloads processed by a worker pool.
+
+    Matching happens in the request; only the heavy processing of the
+    matched prompt (``JOB_PROCESSOR``, by default rendering its template
+    around the document) is queued. Jobs are ordered by the priority of their
+    prompt (``JOB_PRIORITIES``, lower first) and then by submission order.
+    ``JOB_WORKERS`` threads take jobs off the queue; with
+    ``JOB_EXECUTOR=process`` each thread hands its job to a process pool of
+    the same size, so CPU-bound processors are not serialised by the GIL.
+
+    The queue holds at most ``JOB_QUEUE_SIZE`` jobs and ``JOB_QUEUE_MAX_BYTES``
+    of queued payloads. Workers start on the first submission rather than at
+    configure time, so prefork workers each start their own pool after
+    forking. Finished jobs drop their payload and are kept for
+    ``JOB_RESULT_TTL`` seconds, oldest evicted first once kept results pass
+    ``JOB_RESULT_MAX_BYTES``.
+    """
+
+    def __init__(self):
+        self._state: Optional[_QueueState] = None
+        self.configure({})
+
+    def configure(self, config: Mapping[str, Any]) -> None:
+        """
+        Apply the JOB_* settings, stopping any running workers and dropping all jobs.
+
+        Args:
+            config: Application config mapping
+
+        Raises:
+            ValueError: If JOB_PROCESSOR or JOB_EXECUTOR is invalid
+        """
+        executor = config.get('JOB_EXECUTOR') or 'thread'
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"JOB_EXECUTOR must be thread or process, got {executor!r}")
+        processor = load_processor(config.get('JOB_PROCESSOR'))
+        self.executor = executor
+        self.processor = processor
+        self.workers = config.get('JOB_WORKERS', 0)
+        self.max_queued = config.get('JOB_QUEUE_SIZE', 1000)
+        self.max_bytes = config.get('JOB_QUEUE_MAX_BYTES', 256 * 1024 * 1024)
+        self.result_ttl = config.get('JOB_RESULT_TTL', 300)
+        self.result_max_bytes = config.get('JOB_RESULT_MAX_BYTES', 256 * 1024 * 1024)
+        self.max_wait = config.get('JOB_MAX_WAIT', 30)
+        self.priorities: Dict[str, int] = dict(config.get('JOB_PRIORITIES') or {})
+        self.default_priority = config.get('JOB_DEFAULT_PRIORITY', 10)
+        self.shutdown()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the job API is configured with any workers."""
+        return self.workers > 0
+
+    def _start(self, state: _QueueState) -> None:
+        # Called with the state lock held on the first submission
+        state.started_at = time.monotonic()
+        if state.executor_kind == 'process':
+            state.executor = ProcessPoolExecutor(max_workers=state.workers)
+        for number in range(state.workers):
+            thread = threading.Thread(target=self._work, args=(state,), name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            state.threads.append(thread)
+        logger.info(f"Started {state.workers} job workers ({state.executor_kind} executor)")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Stop the workers, letting running jobs finish; queued jobs fail as cancelled.
+
+        The queue starts over empty, with new workers on the next submission.
+
+        Args:
+            timeout: Seconds to wait for each worker
+        """
+        # Swap first, so a submission racing with the shutdown lands in the new state
+        state, self._state = self._state, _QueueState(self.processor, self.workers, self.executor,
+                                                       self.result_ttl, self.result_max_bytes)
+        if state is None:
+            return
+        with state.lock:
+            state.stopping = True
+            state.condition.notify_all()
+            cancelled = [job for _, _, job in state.heap]
+            state.heap.clear()
+            state.queued_by_prompt.clear()
+            state.queued_bytes = 0
+            for job in cancelled:
+                job.status, job.error, job.payload = FAILED, "Job cancelled", None
+                job._done.set()
+            threads = list(state.threads)
+        for thread in threads:
+            thread.join(timeout)
+        if state.executor is not None:
+            state.executor.shutdown(wait=False, cancel_futures=True)
+
+    def priority_of(self, prompt_name: str) -> int:
+        """Queue priority of a prompt (lower runs first)."""
+        return self.priorities.get(prompt_name, self.default_priority)
+
+    def submit(self, prompt_name: str, payload: Dict[str, Any], snapshot: Any) -> Optional[Job]:
+        """
+        Queue a matched payload for processing.
+
+        Args:
+            prompt_name: Prompt the payload matched
+            payload: Validated request payload
+            snapshot: Rule snapshot the payload was matched against
+
+        Returns:
+            The queued job, or None if the queue is full
+        """
+        # Compiled once per snapshot and shared with the synchronous render path
+        template = template_cache.get(snapshot, prompt_name)
+        job = Job(prompt_name, self.priority_of(prompt_name), template, payload)
+        while True:
+            state = self._state
+            with state.lock:
+                if state.stopping:
+                    # Replaced by a shutdown or reconfiguration; use the new state
+                    continue
+                state.expire()
+                if len(state.heap) >= self.max_queued or (
+                        self.max_bytes and state.queued_bytes + job.size > self.max_bytes):
+                    state.counts["rejected"] += 1
+                    return None
+                if not state.threads:
+                    self._start(state)
+                heapq.heappush(state.heap, (job.priority, next(state.sequence), job))
+                state.jobs[job.job_id] = job
+                state.queued_by_prompt[prompt_name] += 1
+                state.queued_bytes += job.size
+                state.counts["submitted"] += 1
+                state.condition.notify()
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Look up a job that is queued, running or finished within the TTL.
+
+        Args:
+            job_id: Id returned on submission
+
+        Returns:
+            The job, or None if unknown or expired
+        """
+        state = self._state
+        with state.lock:
+            state.expire()
+            return state.jobs.get(job_id)
+
+    def _next_job(self, state: _QueueState) -> Optional[Job]:
+        with state.lock:
+            while not state.heap and not state.stopping:
+                state.condition.wait()
+            if state.stopping:
+                return None
+            _, _, job = heapq.heappop(state.heap)
+            state.queued_by_prompt[job.prompt_name] -= 1
+            if not state.queued_by_prompt[job.prompt_name]:
+                del state.queued_by_prompt[job.prompt_name]
+            state.queued_bytes -= job.size
+            state.running += 1
+            job.status = RUNNING
+            job.started_at = time.time()
+            waited = time.monotonic() - job._enqueued
+            state.waits.append(waited)
+        if metrics.enabled:
+            metrics.observe("job_wait", int(waited * 1e9))
+        return job
+
+    def _work(self, state: _QueueState) -> None:
+        while True:
+            job = self._next_job(state)
+            if job is None:
+                return
+            start = time.monotonic()
+            try:
+                if state.executor is not None:
+                    result = state.executor.submit(state.processor, job.prompt_name, job.template,
+                                                   job.payload).result()
+                else:
+                    result = state.processor(job.prompt_name, job.template, job.payload)
+                status, error = DONE, None
+            except Exception as e:
+                logger.error(f"Job {job.job_id} ({job.prompt_name}) failed: {str(e)}")
+                result, status, error = None, FAILED, "Job processing failed"
+            elapsed = time.monotonic() - start
+            if metrics.enabled:
+                metrics.observe("job_run", int(elapsed * 1e9))
+            result_size = deep_sizeof(result)
+
+            with state.lock:
+                state.running -= 1
+                state.busy_seconds += elapsed
+                state.run_times.append(elapsed)
+                state.counts["completed" if status == DONE else "failed"] += 1
+                job.result, job.error, job.status = result, error, status
+                job.finished_at = time.time()
+                # The document is no longer needed once processed
+                job.payload = None
+                job.size = result_size
+                state.retain(job)
+            job._done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth, waits and worker utilization for the admin endpoint.
+
+        Returns:
+            Stats mapping; waits and run times are in seconds over the last
+            1024 jobs, utilization is the busy fraction since workers started
+        """
+        state = self._state
+        with state.lock:
+            state.expire()
+            uptime = time.monotonic() - state.started_at if state.started_at is not None else 0.0
+            capacity = uptime * state.workers
+            return {
+                "enabled": self.enabled,
+                "executor": state.executor_kind,
+                "workers": state.workers,
+                "started": bool(state.threads),
+                "queue_depth": len(state.heap),
+                "queue_limit": self.max_queued,
+                "queued_bytes": state.queued_bytes,
+                "queue_max_bytes": self.max_bytes,
+                "queued_by_prompt": dict(state.queued_by_prompt),
+                "running": state.running,
+                "retained": len(state.jobs),
+                "retained_bytes": state.retained_bytes,
+                "retained_max_bytes": self.result_max_bytes,
+                "utilization": min(1.0, state.busy_seconds / capacity) if capacity else 0.0,
+                "busy_seconds": state.busy_seconds,
+                "wait_seconds": _percentiles(state.waits),
+                "run_seconds": _percentiles(state.run_times),
+                **state.counts
+            }
+
+    def metric_lines(self, prefix: str = "prompt_api") -> Iterator[str]:
+        """Prometheus lines describing the job queue."""
+        stats = self.stats()
+        yield f"# HELP {prefix}_job_queue_depth Jobs waiting for a worker."
+        yield f"# TYPE {prefix}_job_queue_depth gauge"
+        yield f"{prefix}_job_queue_depth {stats['queue_depth']}"
+        yield f"# HELP {prefix}_job_workers_busy Workers processing a job."
+        yield f"# TYPE {prefix}_job_workers_busy gauge"
+        yield f"{prefix}_job_workers_busy {stats['running']}"
+        yield f"# HELP {prefix}_job_worker_busy_seconds_total Time workers spent processing jobs."
+        yield f"# TYPE {prefix}_job_worker_busy_seconds_total counter"
+        yield f"{prefix}_job_worker_busy_seconds_total {stats['busy_seconds']:.6f}"
+        yield f"# HELP {prefix}_jobs_total Jobs by outcome."
+        yield f"# TYPE {prefix}_jobs_total counter"
+        for outcome in ("submitted", "completed", "failed", "rejected"):
+            yield f'{prefix}_jobs_total{{outcome="{outcome}"}} {stats[outcome]}'
+
+
+job_queue = JobQueue()
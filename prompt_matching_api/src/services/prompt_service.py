@@ -1,12 +1,98 @@
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, NamedTuple, Optional, Tuple
+import enum
 import logging
-from config.config import Config
+from src.services.rule_index import RuleIndex
+from src.services.rule_store import RuleSnapshot, RuleStore
+from src.utils.validators import DATA_TOO_LARGE, INVALID_PROMPT, MISSING_DATA
 
 logger = logging.getLogger(__name__)
 
+class ErrorCode(enum.IntEnum):
+    """Outcome of validating and matching a request; OK is falsy, every error truthy."""
+    
+    OK = 0
+    MISSING_DATA = 1
+    INVALID_PROMPT = 2
+    DATA_TOO_LARGE = 3
+    
+    @property
+    def message(self) -> str:
+        """Error message returned to API callers ("" for OK)."""
+        return ERROR_CODE_MESSAGES[self]
+
+ERROR_CODE_MESSAGES = {
+    ErrorCode.OK: "",
+    ErrorCode.MISSING_DATA: MISSING_DATA,
+    ErrorCode.INVALID_PROMPT: INVALID_PROMPT,
+    ErrorCode.DATA_TOO_LARGE: DATA_TOO_LARGE
+}
+
+# Validator messages back to codes
+_CODES_BY_MESSAGE = {message: code for code, message in ERROR_CODE_MESSAGES.items() if message}
+
+class MatchResult(NamedTuple):
+    """Matched prompt name, or None with the error code explaining why not."""
+    
+    prompt_name: Optional[str]
+    error: ErrorCode
+
+# Shared failure results, one per error code; successes are built per match so
+# no cache grows with the prompt names of every snapshot and tenant
+_FAILURES = {code: MatchResult(None, code) for code in ErrorCode if code}
+
 class PromptMatchingService:
     """Service class containing business logic for prompt matching."""
     
+    # Active rule set; swapped atomically on reload, read without locking
+    rule_store = RuleStore()
+    
+    @classmethod
+    def get_snapshot(cls) -> RuleSnapshot:
+        """Return the active rule snapshot, compiling the Config rules on first use."""
+        return cls.rule_store.snapshot
+    
+    @classmethod
+    def get_rule_index(cls) -> RuleIndex:
+        """Return the compiled rule index of the active snapshot."""
+        return cls.rule_store.snapshot.index
+    
+    @classmethod
+    def check_request(cls, data: Dict[str, Any], snapshot: Optional[RuleSnapshot] = None) -> ErrorCode:
+        """
+        Validate structure, types, lengths and allowed values in a single pass.
+        
+        Args:
+            data: Input dictionary to validate
+            snapshot: Rule snapshot to validate against (defaults to the active one)
+            
+        Returns:
+            ErrorCode.OK, or the code of the first failure
+        """
+        snapshot = snapshot or cls.rule_store.snapshot
+        failure = snapshot.validator.validate(data)
+        if failure is None:
+            return ErrorCode.OK
+        
+        error_msg, field = failure
+        logger.debug("Validation failed for field %s: %s", field or "<payload>", error_msg)
+        return _CODES_BY_MESSAGE[error_msg]
+    
+    @classmethod
+    def validate_request(cls, data: Dict[str, Any],
+                         snapshot: Optional[RuleSnapshot] = None) -> Tuple[bool, str]:
+        """
+        Validate a request, reporting the error message instead of a code.
+        
+        Args:
+            data: Input dictionary to validate
+            snapshot: Rule snapshot to validate against (defaults to the active one)
+            
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        code = cls.check_request(data, snapshot)
+        return not code, ERROR_CODE_MESSAGES[code]
+    
     @classmethod
     def validate_input_data(cls, data: Dict[str, Any]) -> Tuple[bool, str]:
         """
@@ -18,85 +104,77 @@ class PromptMatchingService:
         Returns:
             Tuple of (is_valid, error_message)
         """
-        # Ensure data is a dictionary
-        if not isinstance(data, dict):
-            logger.warning(f"Invalid data type: expected dict, got {type(data).__name__}")
-            return False, "Missing Data"
-            
-        required_fields = ["situation", "level", "file_type", "data"]
+        failure = cls.rule_store.snapshot.validator.validate(data, check_choices=False)
+        if failure is None:
+            return True, ""
         
-        # Check for missing fields
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            logger.warning(f"Missing fields: {missing_fields}")
-            return False, "Missing Data"
-        
-        # Check for empty or None values in required fields (except data which can be empty)
-        for field in ["situation", "level", "file_type"]:
-            field_value = data.get(field)
-            
-            # Check if field is None
-            if field_value is None:
-                logger.warning(f"None value for field: {field}")
-                return False, "Missing Data"
-            
-            # Check if field is not a string
-            if not isinstance(field_value, str):
-                logger.warning(f"Invalid type for field {field}: expected str, got {type(field_value).__name__}")
-                return False, "Missing Data"
-            
-            # Check if field is empty string
-            if not field_value.strip():
-                logger.warning(f"Empty or whitespace-only value for field: {field}")
-                return False, "Missing Data"
-        
-        # Validate data field type (can be empty but must be string)
-        data_field = data.get("data")
-        if data_field is not None and not isinstance(data_field, str):
-            logger.warning(f"Invalid type for data field: expected str, got {type(data_field).__name__}")
-            return False, "Missing Data"
-        
-        return True, ""
+        error_msg, field = failure
+        logger.debug("Validation failed for field %s: %s", field or "<payload>", error_msg)
+        return False, error_msg
     
     @classmethod
-    def validate_field_values(cls, data: Dict[str, Any]) -> Tuple[bool, str]:
+    def validate_field_values(cls, data: Dict[str, Any],
+                              snapshot: Optional[RuleSnapshot] = None) -> Tuple[bool, str]:
         """
         Validate that field values are within acceptable ranges.
         
+        Uses the snapshot's compiled validator, so structural failures are
+        reported as they are on the request path.
+        
         Args:
             data: Input dictionary to validate
+            snapshot: Rule snapshot to validate against (defaults to the active one)
             
         Returns:
             Tuple of (is_valid, error_message)
         """
-        situation = data.get("situation")
-        level = data.get("level")
-        file_type = data.get("file_type")
-        
-        # Validate situation
-        if situation not in Config.VALID_SITUATIONS:
-            logger.warning(f"Invalid situation: {situation}")
-            return False, "Invalid Prompt"
+        snapshot = snapshot or cls.rule_store.snapshot
+        failure = snapshot.validator.validate(data, check_choices=True)
+        if failure is None:
+            return True, ""
+        
+        error_msg, field = failure
+        if error_msg == INVALID_PROMPT:
+            logger.warning("Invalid %s: %.200s", field, data.get(field))
+        else:
+            logger.debug("Validation failed for field %s: %s", field or "<payload>", error_msg)
+        return False, error_msg
+    
+    @classmethod
+    def find_prompt(cls, data: Dict[str, Any], snapshot: Optional[RuleSnapshot] = None) -> Optional[str]:
+        """
+        Match validated input data to the appropriate prompt.
         
-        # Validate level
-        if level not in Config.VALID_LEVELS:
-            logger.warning(f"Invalid level: {level}")
-            return False, "Invalid Prompt"
+        Args:
+            data: Input dictionary containing situation, level, file_type, and data
+            snapshot: Rule snapshot to match against (defaults to the active one)
+            
+        Returns:
+            Matched prompt name, or None if no rule matches
+        """
+        situation = data["situation"]
+        level = data["level"]
+        file_type = data["file_type"]
         
-        # Validate file_type
-        if file_type not in Config.VALID_FILE_TYPES:
-            logger.warning(f"Invalid file_type: {file_type}")
-            return False, "Invalid Prompt"
+        # Look up matching prompt in the compiled index
+        snapshot = snapshot or cls.rule_store.snapshot
+        prompt_name = snapshot.index.lookup(situation, level, file_type)
+        if prompt_name is not None:
+            logger.debug("Matched %s for input: %s, %s, %s", prompt_name, situation, level, file_type)
+            return prompt_name
         
-        return True, ""
+        # No match found
+        logger.warning("No matching prompt for: %.200s, %.200s, %.200s", situation, level, file_type)
+        return None
     
     @classmethod
-    def match_prompt(cls, data: Dict[str, Any]) -> str:
+    def match_prompt(cls, data: Dict[str, Any], snapshot: Optional[RuleSnapshot] = None) -> str:
         """
         Match input data to appropriate prompt.
         
         Args:
             data: Input dictionary containing situation, level, file_type, and data
+            snapshot: Rule snapshot to match against (defaults to the active one)
             
         Returns:
             Matched prompt name
@@ -104,22 +182,35 @@ class PromptMatchingService:
         Raises:
             ValueError: If no matching prompt is found
         """
-        situation = data["situation"]
-        level = data["level"]
-        file_type = data["file_type"]
-        
-        # Search for matching prompt
-        for prompt_name, criteria in Config.PROMPT_CRITERIA.items():
-            if (criteria["situation"] == situation and 
-                criteria["level"] == level and 
-                criteria["file_type"] == file_type):
-                
-                logger.info(f"Matched {prompt_name} for input: {situation}, {level}, {file_type}")
-                return prompt_name
+        prompt_name = cls.find_prompt(data, snapshot)
+        if prompt_name is None:
+            raise ValueError(INVALID_PROMPT)
+        return prompt_name
+    
+    @classmethod
+    def evaluate(cls, data: Dict[str, Any], snapshot: Optional[RuleSnapshot] = None) -> MatchResult:
+        """
+        Validate and match a request without raising for invalid input.
         
-        # No match found
-        logger.warning(f"No matching prompt for: {situation}, {level}, {file_type}")
-        raise ValueError("Invalid Prompt")
+        Args:
+            data: Input dictionary
+            snapshot: Rule snapshot to use (defaults to the active one)
+            
+        Returns:
+            MatchResult with the prompt name, or None and the error code
+        """
+        # Use one snapshot for the whole request so a concurrent reload
+        # can't mix old valid values with new rules
+        snapshot = snapshot or cls.rule_store.snapshot
+        
+        code = cls.check_request(data, snapshot)
+        if code:
+            return _FAILURES[code]
+        
+        prompt_name = cls.find_prompt(data, snapshot)
+        if prompt_name is None:
+            return _FAILURES[ErrorCode.INVALID_PROMPT]
+        return MatchResult(prompt_name, ErrorCode.OK)
     
     @classmethod
     def process_request(cls, data: Dict[str, Any]) -> str:
@@ -135,15 +226,7 @@ class PromptMatchingService:
         Raises:
             ValueError: For various validation errors
         """
-        # Validate input structure
-        is_valid, error_msg = cls.validate_input_data(data)
-        if not is_valid:
-            raise ValueError(error_msg)
-        
-        # Validate field values
-        is_valid, error_msg = cls.validate_field_values(data)
-        if not is_valid:
-            raise ValueError(error_msg)
-        
-        # Match prompt
-        return cls.match_prompt(data)
\ No newline at end of file
+        prompt_name, error = cls.evaluate(data)
+        if error:
+            raise ValueError(error.message)
+        return prompt_name
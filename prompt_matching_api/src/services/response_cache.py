@@ -0,0 +1,351 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import functools
+import hashlib
+import json
+import logging
+from src.services.codes import CodeTable
+from src.services.errors import ERROR_MESSAGES, ERROR_STATUS
+from src.services.prompt_service import ErrorCode, PromptMatchingService
+from src.services.rule_store import RuleSnapshot
+from src.services.templates import template_cache
+from src.utils.intake import SpooledText, StreamedObject
+
+logger = logging.getLogger(__name__)
+
+
+def encode_body(body: Dict[str, Any]) -> bytes:
+    """Encode a response body the same way Flask's jsonify does in production."""
+    return (json.dumps(body, separators=(",", ":"), sort_keys=True) + "\n").encode("utf-8")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an entity tag (weak comparison).
+
+    Args:
+        if_none_match: Header value, possibly a comma-separated list or "*"
+        etag: Current quoted entity tag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate[2:] if candidate.startswith("W/") else candidate
+                                         for candidate in candidates)
+
+
+def _iter_rendered_body(matched_prompt: str, segments: List[Any],
+                        document: StreamedObject) -> Iterator[bytes]:
+    """Encode a rendered response piece by piece, streaming spooled text from its spool."""
+    try:
+        yield ('{"matched_prompt":%s,"prompt":"' % json.dumps(matched_prompt)).encode("utf-8")
+        for segment in segments:
+            if isinstance(segment, SpooledText):
+                for text in segment.chunks():
+                    # Escaping is per character, so pieces can be encoded separately
+                    yield json.dumps(text)[1:-1].encode("utf-8")
+            else:
+                yield json.dumps(segment)[1:-1].encode("utf-8")
+        yield b'","status":"success"}\n'
+    finally:
+        document.close()
+
+
+class CachedResponse:
+    """Pre-encoded response for one matching outcome."""
+
+    __slots__ = ("body", "status_code", "matched_prompt", "error")
+
+    def __init__(self, body: Union[bytes, Iterable[bytes]], status_code: int,
+                 matched_prompt: Optional[str] = None, error: Optional[str] = None):
+        self.body = body
+        self.status_code = status_code
+        self.matched_prompt = matched_prompt
+        self.error = error
+
+
+class RulesExport:
+    """Encoded rule set export of one snapshot with its content hash."""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+# Error responses do not depend on the rules, so every snapshot shares them
+ERROR_RESPONSES = {
+    message: CachedResponse(encode_body({"error": message}), ERROR_STATUS.get(message, 400), error=message)
+    for message in ERROR_MESSAGES
+}
+
+# Validation failures indexed by ErrorCode, so no message is compared per request
+FAILURE_RESPONSES = tuple(ERROR_RESPONSES[code.message] if code else None for code in ErrorCode)
+
+
+class _ResponseTables:
+    """Encoded responses and match memo for a single rule snapshot."""
+
+    def __init__(self, snapshot: RuleSnapshot, memo_size: int):
+        self.snapshot = snapshot
+        self.successes = {
+            prompt_name: CachedResponse(encode_body({"matched_prompt": prompt_name, "status": "success"}),
+                                        200, matched_prompt=prompt_name)
+            for prompt_name in snapshot.criteria
+        }
+        self.errors = ERROR_RESPONSES
+        self.failures = FAILURE_RESPONSES
+        # lru_cache is thread-safe and bounded; keyed on the routing triple
+        self.resolve = functools.lru_cache(maxsize=memo_size)(self._resolve)
+
+    def build_exports(self) -> None:
+        """Build the lazily cached rule export and code table now rather than on first request."""
+        # Reading a cached_property computes and stores it
+        _ = self.rules_export
+        _ = self.code_table
+
+    @functools.cached_property
+    def rules_export(self) -> RulesExport:
+        # Not sorted: prompt order breaks priority ties
+        document = self.snapshot.to_document()
+        return RulesExport((json.dumps(document, separators=(",", ":")) + "\n").encode("utf-8"))
+
+    @functools.cached_property
+    def code_table(self) -> CodeTable:
+        return CodeTable(self.snapshot)
+
+    def _resolve(self, situation: str, level: str, file_type: str) -> CachedResponse:
+        data = {"situation": situation, "level": level, "file_type": file_type}
+        prompt_name = PromptMatchingService.find_prompt(data, self.snapshot)
+        if prompt_name is None:
+            return self.failures[ErrorCode.INVALID_PROMPT]
+        return self.successes[prompt_name]
+
+
+class ResponseCache:
+    """
+    Pre-serialized responses for every rule and fixed error.
+
+    Tables are rebuilt whenever the active rule snapshot changes, so a rule
+    reload invalidates all encoded bodies and memoized matches at once.
+    """
+
+    def __init__(self, memo_size: int = 1024):
+        self.memo_size = memo_size
+        self._tables: Optional[_ResponseTables] = None
+
+    def configure(self, memo_size: int) -> None:
+        """
+        Set the memo size and rebuild the tables for the active snapshot.
+
+        Args:
+            memo_size: Maximum number of memoized (situation, level, file_type) triples
+        """
+        self.memo_size = memo_size
+        self._tables = None
+        self._current()
+
+    def _current(self) -> _ResponseTables:
+        snapshot = PromptMatchingService.get_snapshot()
+        tables = self._tables
+        if tables is None or tables.snapshot is not snapshot:
+            tables = _ResponseTables(snapshot, self.memo_size)
+            self._tables = tables
+            logger.debug(f"Built response cache for rule snapshot v{snapshot.version}")
+        return tables
+
+    def build_tables(self, snapshot: RuleSnapshot, memo_size: Optional[int] = None) -> _ResponseTables:
+        """
+        Build response tables for a snapshot other than the active one.
+
+        Args:
+            snapshot: Rule snapshot, e.g. a tenant's
+            memo_size: Memo size (defaults to the configured one)
+
+        Returns:
+            Tables to pass to respond(), respond_rendered() or respond_streamed()
+        """
+        return _ResponseTables(snapshot, self.memo_size if memo_size is None else memo_size)
+
+    def error(self, message: str) -> CachedResponse:
+        """
+        Return the pre-encoded response for an error message.
+
+        Args:
+            message: One of ERROR_MESSAGES; other messages are encoded on the fly
+
+        Returns:
+            Cached response
+        """
+        cached = ERROR_RESPONSES.get(message)
+        if cached is None:
+            cached = CachedResponse(encode_body({"error": message}), ERROR_STATUS.get(message, 400),
+                                    error=message)
+        return cached
+
+    def respond(self, data: Dict[str, Any], tables: Optional[_ResponseTables] = None) -> CachedResponse:
+        """
+        Validate and match a request payload, returning its pre-encoded response.
+
+        Args:
+            data: Decoded request payload
+            tables: Tables from build_tables() (defaults to the active snapshot's)
+
+        Returns:
+            Cached response for the outcome
+        """
+        return self._respond(tables or self._current(), data)
+
+    @staticmethod
+    def lookup(tables: _ResponseTables, situation: str, level: str, file_type: str) -> CachedResponse:
+        """
+        Return the memoized response for a validated routing triple.
+        
+        Every match goes through here, memo hit or not, so it is the
+        match_prompt metrics stage.
+        
+        Args:
+            tables: Response tables to match against
+            situation: Validated situation
+            level: Validated level
+            file_type: Validated file type
+            
+        Returns:
+            Cached success response, or the Invalid Prompt failure
+        """
+        return tables.resolve(situation, level, file_type)
+
+    @staticmethod
+    def _respond(tables: _ResponseTables, data: Dict[str, Any]) -> CachedResponse:
+        code = PromptMatchingService.check_request(data, tables.snapshot)
+        if code:
+            return tables.failures[code]
+        return ResponseCache.lookup(tables, data["situation"], data["level"], data["file_type"])
+
+    def respond_rendered(self, data: Dict[str, Any], tables: Optional[_ResponseTables] = None) -> CachedResponse:
+        """
+        Like respond(), but successful responses also carry the rendered prompt.
+
+        Rendered bodies depend on ``data`` and are encoded per request; errors
+        still come from the pre-encoded tables.
+
+        Args:
+            data: Decoded request payload
+            tables: Tables from build_tables() (defaults to the active snapshot's)
+
+        Returns:
+            Response for the outcome
+        """
+        # One snapshot for matching and rendering, even across a reload
+        return self._respond_rendered(tables or self._current(), data)
+
+    @classmethod
+    def _respond_rendered(cls, tables: _ResponseTables, data: Dict[str, Any]) -> CachedResponse:
+        cached = cls._respond(tables, data)
+        if cached.error is not None:
+            return cached
+
+        prompt = template_cache.render(tables.snapshot, cached.matched_prompt, data)
+        body = encode_body({"matched_prompt": cached.matched_prompt, "prompt": prompt, "status": "success"})
+        return CachedResponse(body, 200, matched_prompt=cached.matched_prompt)
+
+    def respond_streamed(self, document: StreamedObject, render: bool = False,
+                         tables: Optional[_ResponseTables] = None) -> CachedResponse:
+        """
+        Validate and match a request body read by the streaming intake.
+
+        A spooled ``data`` value takes part in validation through its length
+        only, so matching needs nothing but the routing fields. A rendered
+        response around spooled data is streamed from the spool, and its body
+        is an iterator that releases the spool once exhausted or closed; the
+        spool is released before returning in every other case.
+
+        Args:
+            document: Object read by StreamingIntake
+            render: Whether successful responses carry the rendered prompt
+            tables: Tables from build_tables() (defaults to the active snapshot's)
+
+        Returns:
+            Response for the outcome
+        """
+        tables = tables or self._current()
+        data = document.spooled.get("data")
+        if data is None:
+            document.close()
+            if render:
+                return self._respond_rendered(tables, document.fields)
+            return self._respond(tables, document.fields)
+
+        cached = self._respond_spooled(tables, document.fields, data)
+        if not render or cached.error is not None:
+            document.close()
+            return cached
+
+        fields = document.fields
+        template = template_cache.get(tables.snapshot, cached.matched_prompt)
+        if template is None:
+            document.close()
+            body = encode_body({"matched_prompt": cached.matched_prompt, "prompt": None, "status": "success"})
+            return CachedResponse(body, 200, matched_prompt=cached.matched_prompt)
+
+        segments = template.segments({
+            "prompt": cached.matched_prompt,
+            "situation": fields["situation"],
+            "level": fields["level"],
+            "file_type": fields["file_type"],
+            "data": data
+        })
+        return CachedResponse(_iter_rendered_body(cached.matched_prompt, segments, document), 200,
+                              matched_prompt=cached.matched_prompt)
+
+    @staticmethod
+    def _respond_spooled(tables: _ResponseTables, fields: Dict[str, Any],
+                         data: SpooledText) -> CachedResponse:
+        # Validate with an empty stand-in for data, then apply its length cap
+        # with the precedence the validator gives it: after structural errors
+        # in the routing fields, before "Invalid Prompt"
+        code = PromptMatchingService.check_request(dict(fields, data=""), tables.snapshot)
+        if code == ErrorCode.OK or code == ErrorCode.INVALID_PROMPT:
+            max_length = tables.snapshot.validator.max_length
+            if max_length and data.length > max_length:
+                return tables.failures[ErrorCode.DATA_TOO_LARGE]
+        if code:
+            return tables.failures[code]
+        return ResponseCache.lookup(tables, fields["situation"], fields["level"], fields["file_type"])
+
+    def rules_export(self) -> RulesExport:
+        """
+        Return the encoded export of the active rule snapshot.
+
+        The ETag is a hash of the body, so it is the same in every worker
+        process serving the same rules.
+
+        Returns:
+            Export body and ETag
+        """
+        return self._current().rules_export
+
+    def code_table(self) -> CodeTable:
+        """
+        Return the integer code table of the active rule snapshot.
+
+        Returns:
+            Code table, built on first use for each snapshot
+        """
+        return self._current().code_table
+
+    def memo_info(self) -> Tuple[int, int, int]:
+        """
+        Memo statistics for the current snapshot.
+
+        Returns:
+            Tuple of (hits, misses, current_size)
+        """
+        info = self._current().resolve.cache_info()
+        return info.hits, info.misses, info.currsize
+
+
+response_cache = ResponseCache()
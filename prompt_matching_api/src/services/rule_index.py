@@ -0,0 +1,258 @@
+from typing import Dict, Any, FrozenSet, Iterable, Mapping, Optional, Tuple, Union
+import sys
+import logging
+
+logger = logging.getLogger(__name__)
+
+RuleKey = Tuple[str, str, str]
+RuleValues = Optional[FrozenSet[str]]
+CriteriaSource = Union[Mapping[str, Mapping[str, Any]], Iterable[Tuple[str, Mapping[str, Any]]]]
+
+MATCH_FIELDS = ("situation", "level", "file_type")
+
+# Criteria value that matches any value of a field
+WILDCARD = "*"
+
+
+class RuleConflictError(ValueError):
+    """Raised when a rule set contains duplicate or conflicting rules."""
+
+
+def parse_field_values(value: Any) -> RuleValues:
+    """
+    Normalise a criteria value into the set of values it matches.
+
+    Args:
+        value: A single value, a list of values, or WILDCARD
+
+    Returns:
+        Frozenset of interned values, or None if the field matches anything
+
+    Raises:
+        ValueError: If the value is not a non-empty string or list of strings
+    """
+    if isinstance(value, str):
+        values = [value]
+    elif isinstance(value, (list, tuple, set, frozenset)) and value:
+        values = list(value)
+    else:
+        raise ValueError(f"expected a string or list of strings, got {value!r}")
+
+    if not all(isinstance(item, str) and item for item in values):
+        raise ValueError(f"expected a string or list of strings, got {value!r}")
+    if WILDCARD in values:
+        return None
+    return frozenset(sys.intern(item) for item in values)
+
+
+class Rule:
+    """Immutable record describing a single prompt matching rule."""
+
+    __slots__ = ("name", "situation", "level", "file_type", "priority")
+
+    def __init__(self, name: str, situation: Any, level: Any, file_type: Any, priority: int = 0):
+        object.__setattr__(self, "name", sys.intern(name))
+        object.__setattr__(self, "situation", parse_field_values(situation))
+        object.__setattr__(self, "level", parse_field_values(level))
+        object.__setattr__(self, "file_type", parse_field_values(file_type))
+        object.__setattr__(self, "priority", priority)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Rule records are immutable")
+
+    @property
+    def values(self) -> Tuple[RuleValues, RuleValues, RuleValues]:
+        """Accepted values per match field (None means any value)."""
+        return (self.situation, self.level, self.file_type)
+
+    @property
+    def key(self) -> Optional[RuleKey]:
+        """Exact lookup key, or None if the rule uses wildcards or value sets."""
+        if any(values is None or len(values) != 1 for values in self.values):
+            return None
+        return tuple(next(iter(values)) for values in self.values)
+
+    def matches(self, situation: str, level: str, file_type: str) -> bool:
+        """Whether this rule accepts the given criteria."""
+        return all(values is None or value in values
+                   for values, value in zip(self.values, (situation, level, file_type)))
+
+    def __repr__(self) -> str:
+        def describe(values: RuleValues) -> Any:
+            return WILDCARD if values is None else sorted(values)
+        return (f"Rule({self.name!r}, {describe(self.situation)!r}, {describe(self.level)!r}, "
+                f"{describe(self.file_type)!r}, priority={self.priority})")
+
+
+def _bitmask(bits: Iterable[int]) -> int:
+    """Build an integer bitset from bit positions."""
+    bits = list(bits)
+    if not bits:
+        return 0
+    buffer = bytearray(max(bits) // 8 + 1)
+    for bit in bits:
+        buffer[bit >> 3] |= 1 << (bit & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class RuleIndex:
+    """
+    Compiled prompt rule table.
+
+    Exact-only rule sets are served from a hash table. Once wildcard or
+    value-set rules are present, every field value maps to a bitset of the
+    rules accepting it; a lookup intersects one bitset per field and picks the
+    lowest set bit. Bits are assigned in rank order (higher priority first,
+    then definition order), so the lowest bit is the winning rule. Results
+    are memoized, so repeated criteria cost one dict lookup.
+    """
+
+    __slots__ = ("_table", "_rules", "_names", "_field_masks", "_wildcard_masks", "_memo")
+
+    # Results of bitset lookups are memoized per index; the key space is
+    # bounded by the valid field values, so this is cleared only as a backstop
+    MEMO_SIZE = 65536
+
+    def __init__(self, rules: Tuple[Rule, ...]):
+        self._rules = rules
+
+        if all(rule.key is not None for rule in rules):
+            self._table: Optional[Dict[RuleKey, str]] = {rule.key: rule.name for rule in rules}
+        else:
+            self._table = None
+
+        self._memo: Dict[RuleKey, Optional[str]] = {}
+
+        ranked = sorted(range(len(rules)), key=lambda position: (-rules[position].priority, position))
+        self._names = tuple(rules[position].name for position in ranked)
+
+        field_bits = [{} for _ in MATCH_FIELDS]
+        wildcard_bits = [[] for _ in MATCH_FIELDS]
+        for bit, position in enumerate(ranked):
+            for field, values in enumerate(rules[position].values):
+                if values is None:
+                    wildcard_bits[field].append(bit)
+                else:
+                    for value in values:
+                        field_bits[field].setdefault(value, []).append(bit)
+
+        # Fold wildcard rules into every value's bitset so lookups are one
+        # dict get per field; unknown values fall back to the wildcard bitset
+        self._wildcard_masks = tuple(_bitmask(bits) for bits in wildcard_bits)
+        self._field_masks = tuple(
+            {value: _bitmask(bits) | wildcard_mask for value, bits in value_bits.items()}
+            for value_bits, wildcard_mask in zip(field_bits, self._wildcard_masks)
+        )
+
+    @classmethod
+    def compile(cls, criteria: CriteriaSource) -> "RuleIndex":
+        """
+        Compile prompt criteria into an index.
+
+        Each field is a single value, a list of values, or ``"*"`` for any
+        value. An optional integer ``priority`` (default 0) decides between
+        overlapping rules; equal priorities fall back to definition order.
+
+        Args:
+            criteria: Mapping of prompt name to criteria dict (the shape of
+                ``Config.PROMPT_CRITERIA``), or an iterable of
+                ``(prompt_name, criteria)`` pairs
+
+        Returns:
+            Compiled rule index
+
+        Raises:
+            RuleConflictError: If a prompt name appears twice, two prompts share
+                the same criteria, or a rule has a missing or malformed field
+        """
+        items = criteria.items() if isinstance(criteria, Mapping) else criteria
+
+        rules = []
+        seen_names = set()
+        seen_values: Dict[Tuple[RuleValues, ...], str] = {}
+
+        for prompt_name, rule_criteria in items:
+            if prompt_name in seen_names:
+                raise RuleConflictError(f"Duplicate rule name: {prompt_name}")
+
+            missing_fields = [field for field in MATCH_FIELDS if rule_criteria.get(field) is None]
+            if missing_fields:
+                raise RuleConflictError(f"Rule {prompt_name} is missing fields: {missing_fields}")
+
+            priority = rule_criteria.get("priority", 0)
+            if isinstance(priority, bool) or not isinstance(priority, int):
+                raise RuleConflictError(f"Rule {prompt_name} has a non-integer priority: {priority!r}")
+
+            try:
+                rule = Rule(prompt_name, *(rule_criteria[field] for field in MATCH_FIELDS), priority=priority)
+            except ValueError as e:
+                raise RuleConflictError(f"Rule {prompt_name} has an invalid field: {str(e)}")
+
+            existing = seen_values.get(rule.values)
+            if existing is not None:
+                raise RuleConflictError(f"Rules {existing} and {prompt_name} share criteria: {rule!r}")
+
+            seen_names.add(prompt_name)
+            seen_values[rule.values] = prompt_name
+            rules.append(rule)
+
+        logger.debug(f"Compiled rule index with {len(rules)} rules")
+        return cls(tuple(rules))
+
+    def lookup(self, situation: str, level: str, file_type: str) -> Optional[str]:
+        """
+        Look up the prompt matching the given criteria.
+
+        Args:
+            situation: Situation value
+            level: Level value
+            file_type: File type value
+
+        Returns:
+            Matched prompt name, or None if no rule matches
+        """
+        table = self._table
+        if table is not None:
+            return table.get((situation, level, file_type))
+
+        key = (situation, level, file_type)
+        memo = self._memo
+        try:
+            return memo[key]
+        except KeyError:
+            pass
+
+        prompt_name = self.match(situation, level, file_type)
+        if len(memo) >= self.MEMO_SIZE:
+            memo.clear()
+        memo[key] = prompt_name
+        return prompt_name
+
+    def match(self, situation: str, level: str, file_type: str) -> Optional[str]:
+        """
+        Evaluate the rule bitsets directly, bypassing the lookup memo.
+
+        Args:
+            situation: Situation value
+            level: Level value
+            file_type: File type value
+
+        Returns:
+            Name of the highest-ranked matching rule, or None if no rule matches
+        """
+        situation_masks, level_masks, file_type_masks = self._field_masks
+        any_situation, any_level, any_file_type = self._wildcard_masks
+        candidates = (situation_masks.get(situation, any_situation)
+                      & level_masks.get(level, any_level)
+                      & file_type_masks.get(file_type, any_file_type))
+        if not candidates:
+            return None
+        return self._names[(candidates & -candidates).bit_length() - 1]
+
+    @property
+    def rules(self) -> Tuple[Rule, ...]:
+        """Compiled rules in definition order."""
+        return self._rules
+
+    def __len__(self) -> int:
+        return len(self._rules)
@@ -0,0 +1,372 @@
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+from types import MappingProxyType
+import itertools
+import json
+import logging
+import os
+import threading
+
+from config.config import Config
+from src.services.rule_index import RuleIndex, RuleConflictError, MATCH_FIELDS
+from src.services.templates import CompiledTemplate
+from src.utils.validators import CompiledValidator, PROMPT_REQUEST_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+_versions = itertools.count(1)
+
+
+class RuleLoadError(ValueError):
+    """Raised when an external rule file cannot be read or parsed."""
+
+
+class RuleSnapshot:
+    """Immutable, fully compiled view of the rule set used to serve requests."""
+
+    __slots__ = ("version", "source", "index", "criteria", "valid_situations", "valid_levels",
+                 "valid_file_types", "ordered_values", "validator", "__weakref__")
+
+    def __init__(self, index: RuleIndex, criteria: Mapping[str, Mapping[str, str]],
+                 valid_situations: Iterable[str], valid_levels: Iterable[str],
+                 valid_file_types: Iterable[str], source: str,
+                 max_data_length: Optional[int] = None):
+        object.__setattr__(self, "version", next(_versions))
+        object.__setattr__(self, "source", source)
+        object.__setattr__(self, "index", index)
+        object.__setattr__(self, "criteria", MappingProxyType(
+            {name: MappingProxyType(dict(rule)) for name, rule in criteria.items()}
+        ))
+        # Valid values in definition order (duplicates dropped), for stable wire codes
+        object.__setattr__(self, "ordered_values", MappingProxyType({
+            field: tuple(dict.fromkeys(values))
+            for field, values in zip(MATCH_FIELDS, (valid_situations, valid_levels, valid_file_types))
+        }))
+        object.__setattr__(self, "valid_situations", frozenset(self.ordered_values["situation"]))
+        object.__setattr__(self, "valid_levels", frozenset(self.ordered_values["level"]))
+        object.__setattr__(self, "valid_file_types", frozenset(self.ordered_values["file_type"]))
+        object.__setattr__(self, "validator", CompiledValidator(
+            PROMPT_REQUEST_SCHEMA,
+            {"situation": self.valid_situations, "level": self.valid_levels,
+             "file_type": self.valid_file_types},
+            Config.MAX_DATA_LENGTH if max_data_length is None else max_data_length
+        ))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Rule snapshots are immutable")
+
+    @classmethod
+    def build(cls, criteria: Mapping[str, Mapping[str, str]], valid_situations: Iterable[str],
+              valid_levels: Iterable[str], valid_file_types: Iterable[str],
+              source: str = "config", max_data_length: Optional[int] = None) -> "RuleSnapshot":
+        """
+        Compile criteria and valid values into a snapshot.
+
+        Args:
+            criteria: Mapping of prompt name to criteria dict
+            valid_situations: Accepted situation values
+            valid_levels: Accepted level values
+            valid_file_types: Accepted file type values
+            source: Description of where the rules came from
+            max_data_length: Cap on the data field length (defaults to Config.MAX_DATA_LENGTH)
+
+        Returns:
+            Compiled snapshot
+
+        Raises:
+            RuleConflictError: If rules conflict, reference values that are not
+                valid, or carry a template that does not compile
+        """
+        ordered_values = {
+            "situation": tuple(valid_situations),
+            "level": tuple(valid_levels),
+            "file_type": tuple(valid_file_types)
+        }
+        valid_values = {field: frozenset(values) for field, values in ordered_values.items()}
+
+        index = RuleIndex.compile(criteria)
+        for rule in index.rules:
+            for field, values in zip(MATCH_FIELDS, rule.values):
+                unknown = sorted(values - valid_values[field]) if values is not None else None
+                if unknown:
+                    raise RuleConflictError(f"Rule {rule.name} uses unknown {field}: {', '.join(unknown)}")
+
+        # Reject broken templates at load time rather than on first render
+        for prompt_name, rule_criteria in criteria.items():
+            if rule_criteria.get("template") is not None:
+                CompiledTemplate.compile(rule_criteria["template"])
+
+        return cls(index, criteria, ordered_values["situation"], ordered_values["level"],
+                   ordered_values["file_type"], source, max_data_length)
+
+    @classmethod
+    def from_config(cls, config: Any) -> "RuleSnapshot":
+        """
+        Build a snapshot from the built-in Config rule attributes.
+
+        Args:
+            config: Config class or Flask config mapping
+
+        Returns:
+            Compiled snapshot
+        """
+        get = config.get if isinstance(config, Mapping) else lambda key: getattr(config, key, None)
+        return cls.build(get('PROMPT_CRITERIA'), get('VALID_SITUATIONS'),
+                         get('VALID_LEVELS'), get('VALID_FILE_TYPES'),
+                         max_data_length=get('MAX_DATA_LENGTH'))
+
+    @classmethod
+    def from_document(cls, document: Mapping[str, Any], source: str,
+                      max_data_length: Optional[int] = None) -> "RuleSnapshot":
+        """
+        Build a snapshot from a parsed rule file.
+
+        Args:
+            document: Parsed rule file with valid_situations, valid_levels,
+                valid_file_types and prompts keys
+            source: Description of where the rules came from
+            max_data_length: Cap on the data field length (defaults to Config.MAX_DATA_LENGTH)
+
+        Returns:
+            Compiled snapshot
+
+        Raises:
+            RuleLoadError: If required keys are missing or have the wrong shape
+        """
+        required_keys = ["valid_situations", "valid_levels", "valid_file_types", "prompts"]
+        missing_keys = [key for key in required_keys if key not in document]
+        if missing_keys:
+            raise RuleLoadError(f"Rule file {source} is missing keys: {missing_keys}")
+
+        for key in required_keys[:3]:
+            values = document[key]
+            if not isinstance(values, (list, tuple)) or not all(isinstance(value, str) for value in values):
+                raise RuleLoadError(f"Rule file {source}: {key} must be a list of strings")
+        prompts = document["prompts"]
+        if not isinstance(prompts, Mapping):
+            raise RuleLoadError(f"Rule file {source}: prompts must map prompt names to criteria")
+        for prompt_name, rule_criteria in prompts.items():
+            if not isinstance(prompt_name, str) or not isinstance(rule_criteria, Mapping):
+                raise RuleLoadError(f"Rule file {source}: prompt {prompt_name!r} must map to a criteria object")
+            template = rule_criteria.get("template")
+            if template is not None and not isinstance(template, str):
+                raise RuleLoadError(f"Rule file {source}: prompt {prompt_name} has a non-string template")
+
+        return cls.build(document["prompts"], document["valid_situations"],
+                         document["valid_levels"], document["valid_file_types"], source,
+                         max_data_length)
+
+    def to_document(self) -> Dict[str, Any]:
+        """
+        Export the snapshot in the rule file format.
+
+        Prompts and valid values keep their definition order (prompt order
+        breaks ties between matching rules of equal priority), and the data
+        length cap is included so a consumer can validate exactly like the
+        server.
+
+        Returns:
+            Document accepted by from_document
+        """
+        return {
+            "valid_situations": list(self.ordered_values["situation"]),
+            "valid_levels": list(self.ordered_values["level"]),
+            "valid_file_types": list(self.ordered_values["file_type"]),
+            "prompts": {name: dict(rule) for name, rule in self.criteria.items()},
+            "max_data_length": self.validator.max_length
+        }
+
+
+def load_rule_file(path: str) -> Dict[str, Any]:
+    """
+    Read a JSON, YAML or TOML rule file.
+
+    Args:
+        path: Path to the rule file; the format is chosen by extension
+
+    Returns:
+        Parsed document
+
+    Raises:
+        RuleLoadError: If the file cannot be read or parsed
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == ".json":
+            with open(path, "r", encoding="utf-8") as rule_file:
+                document = json.load(rule_file)
+        elif extension in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise RuleLoadError("PyYAML is required to load YAML rule files")
+            with open(path, "r", encoding="utf-8") as rule_file:
+                document = yaml.safe_load(rule_file)
+        elif extension == ".toml":
+            import tomllib
+            with open(path, "rb") as rule_file:
+                document = tomllib.load(rule_file)
+        else:
+            raise RuleLoadError(f"Unsupported rule file format: {extension}")
+    except RuleLoadError:
+        raise
+    except Exception as e:
+        raise RuleLoadError(f"Could not load rule file {path}: {str(e)}")
+
+    if not isinstance(document, dict):
+        raise RuleLoadError(f"Rule file {path} must contain a mapping")
+    return document
+
+
+class RuleStore:
+    """
+    Holder for the active rule snapshot.
+
+    Readers take ``store.snapshot`` without locking; a reload compiles a new
+    snapshot off to the side and publishes it with a single reference
+    assignment, so readers see either the old or the new rule set, never a mix.
+    """
+
+    def __init__(self, snapshot: Optional[RuleSnapshot] = None):
+        self._snapshot = snapshot
+        self._config: Any = None
+        self._rules_file: Optional[str] = None
+        self._reload_lock = threading.Lock()
+        self._file_signature: Optional[Tuple[int, int]] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+
+    @property
+    def snapshot(self) -> RuleSnapshot:
+        """Currently active snapshot."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.configure(Config)
+            snapshot = self._snapshot
+        return snapshot
+
+    @property
+    def rules_file(self) -> Optional[str]:
+        """External rule file backing this store, if any."""
+        return self._rules_file
+
+    def configure(self, config: Any) -> RuleSnapshot:
+        """
+        Load the initial snapshot from RULES_FILE, or the built-in Config rules.
+
+        Args:
+            config: Config class or Flask config mapping
+
+        Returns:
+            The active snapshot
+        """
+        get = config.get if isinstance(config, Mapping) else lambda key: getattr(config, key, None)
+        self.stop_watching()
+        self._config = config
+        self._rules_file = get('RULES_FILE') or None
+        self._file_signature = None
+        return self.reload()
+
+    def publish(self, snapshot: RuleSnapshot) -> RuleSnapshot:
+        """
+        Atomically make a compiled snapshot the active one.
+
+        Args:
+            snapshot: Snapshot to publish
+
+        Returns:
+            The published snapshot
+        """
+        self._snapshot = snapshot
+        logger.info(f"Published rule snapshot v{snapshot.version} from {snapshot.source} "
+                    f"with {len(snapshot.index)} rules")
+        return snapshot
+
+    def reload(self) -> RuleSnapshot:
+        """
+        Rebuild the snapshot from its source and swap it in.
+
+        On failure the current snapshot stays active.
+
+        Returns:
+            The newly active snapshot
+
+        Raises:
+            RuleLoadError: If the rule file cannot be read or parsed
+            RuleConflictError: If the rules are inconsistent
+        """
+        with self._reload_lock:
+            if self._rules_file:
+                signature = self._read_signature()
+                snapshot = RuleSnapshot.from_document(load_rule_file(self._rules_file), self._rules_file,
+                                                      self._max_data_length())
+                self._file_signature = signature
+            else:
+                snapshot = RuleSnapshot.from_config(self._config or Config)
+            return self.publish(snapshot)
+
+    def _max_data_length(self) -> Optional[int]:
+        config = self._config
+        if config is None:
+            return None
+        if isinstance(config, Mapping):
+            return config.get('MAX_DATA_LENGTH')
+        return getattr(config, 'MAX_DATA_LENGTH', None)
+
+    def _read_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._rules_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the rule file if it changed on disk since the last load.
+
+        Returns:
+            True if a new snapshot was published
+        """
+        if not self._rules_file:
+            return False
+        signature = self._read_signature()
+        if signature is None or signature == self._file_signature:
+            return False
+        try:
+            self.reload()
+        except (RuleLoadError, RuleConflictError) as e:
+            # Remember the bad version so it is not retried until it changes again
+            self._file_signature = signature
+            logger.error(f"Rule reload failed, keeping v{self.snapshot.version}: {str(e)}")
+            return False
+        return True
+
+    def start_watching(self, interval: float) -> None:
+        """
+        Poll the rule file in a background thread and reload it when it changes.
+
+        Args:
+            interval: Seconds between checks
+        """
+        if not self._rules_file or self._watcher is not None:
+            return
+
+        self._stop_watching.clear()
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                # One bad reload must not end the watcher for the life of the process
+                try:
+                    self.reload_if_changed()
+                except Exception:
+                    logger.exception(f"Rule file check failed, keeping v{self.snapshot.version}")
+
+        self._watcher = threading.Thread(target=watch, name="rule-file-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching {self._rules_file} for rule changes every {interval}s")
+
+    def stop_watching(self) -> None:
+        """Stop the background file watcher, if running."""
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
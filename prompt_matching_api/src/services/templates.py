@@ -0,0 +1,230 @@
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+import functools
+import logging
+import string
+import threading
+import weakref
+from src.services.rule_index import RuleConflictError
+
+logger = logging.getLogger(__name__)
+
+# Placeholders a prompt template may use
+TEMPLATE_FIELDS = ("prompt", "situation", "level", "file_type", "data")
+
+_formatter = string.Formatter()
+
+
+class TemplateError(RuleConflictError):
+    """Raised when a rule's prompt template cannot be compiled."""
+
+
+class CompiledTemplate:
+    """
+    Prompt template parsed once into literal text and placeholder slots.
+
+    Templates use ``str.format`` syntax restricted to plain ``{field}``
+    placeholders (``{{`` and ``}}`` escape braces). Rendering fills the slots
+    and joins everything in one pass, so a large ``data`` value is copied
+    exactly once.
+    """
+
+    __slots__ = ("source", "_parts", "_slots")
+
+    def __init__(self, source: str, parts: Tuple[str, ...], slots: Tuple[Tuple[int, str], ...]):
+        self.source = source
+        self._parts = parts
+        self._slots = slots
+
+    @classmethod
+    def compile(cls, source: str) -> "CompiledTemplate":
+        """
+        Parse a template.
+
+        Args:
+            source: Template text
+
+        Returns:
+            Compiled template
+
+        Raises:
+            TemplateError: If the template is malformed or uses unsupported placeholders
+        """
+        if not isinstance(source, str):
+            raise TemplateError(f"Template must be a string, got {type(source).__name__}")
+
+        parts: List[str] = []
+        slots: List[Tuple[int, str]] = []
+        try:
+            for literal, field, format_spec, conversion in _formatter.parse(source):
+                if literal:
+                    parts.append(literal)
+                if field is None:
+                    continue
+                if field not in TEMPLATE_FIELDS:
+                    raise TemplateError(f"Unknown template placeholder: {{{field}}}")
+                if format_spec or conversion:
+                    raise TemplateError(f"Format specs are not supported in placeholder: {{{field}}}")
+                slots.append((len(parts), field))
+                parts.append("")
+        except ValueError as e:
+            if isinstance(e, TemplateError):
+                raise
+            raise TemplateError(f"Malformed template: {str(e)}")
+
+        return cls(source, tuple(parts), tuple(slots))
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Placeholders used by the template, in order."""
+        return tuple(field for _, field in self._slots)
+
+    def segments(self, values: Mapping[str, Any]) -> List[Any]:
+        """
+        Literal text and placeholder values in order, without joining them.
+
+        Lets callers stream values that are not plain strings.
+
+        Args:
+            values: Value for every placeholder in TEMPLATE_FIELDS
+
+        Returns:
+            Literal strings interleaved with the placeholder values
+        """
+        parts: List[Any] = list(self._parts)
+        for index, field in self._slots:
+            parts[index] = values[field]
+        return parts
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """
+        Fill the placeholders.
+
+        Args:
+            values: Value for every placeholder in TEMPLATE_FIELDS
+
+        Returns:
+            Rendered prompt
+        """
+        parts = list(self._parts)
+        for index, field in self._slots:
+            parts[index] = values[field]
+        return "".join(parts)
+
+
+class TemplateCache:
+    """
+    Bounded caches of compiled prompt templates, one per rule snapshot.
+
+    Each snapshot (the global rules and every tenant's) gets its own LRU keyed
+    by prompt name, held weakly so it goes away with the snapshot. A rule
+    reload never serves a stale template, and switching between tenants keeps
+    every snapshot's compiled templates. Hit and miss counts are kept across
+    snapshots.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        # Reentrant: a snapshot may be released, running _retire, while the lock is held
+        self._lock = threading.RLock()
+        self._caches: "weakref.WeakKeyDictionary[Any, Callable[[str], Optional[CompiledTemplate]]]" = \
+            weakref.WeakKeyDictionary()
+        # Counts of caches whose snapshot has been released
+        self._retired_hits = 0
+        self._retired_misses = 0
+
+    def configure(self, max_size: int) -> None:
+        """
+        Set the cache size and drop all compiled templates.
+
+        Args:
+            max_size: Maximum number of compiled templates kept per snapshot
+        """
+        with self._lock:
+            self.max_size = max_size
+            self._caches = weakref.WeakKeyDictionary()
+            self._retired_hits = self._retired_misses = 0
+
+    def _retire(self, caches: Any, lookup: Any) -> None:
+        # Runs when a snapshot is released; counts only caches still part of this configuration
+        with self._lock:
+            if caches is self._caches:
+                info = lookup.cache_info()
+                self._retired_hits += info.hits
+                self._retired_misses += info.misses
+
+    def _lookup_for(self, snapshot: Any) -> Callable[[str], Optional[CompiledTemplate]]:
+        lookup = self._caches.get(snapshot)
+        if lookup is not None:
+            return lookup
+
+        criteria = snapshot.criteria
+
+        def compile_for(prompt_name: str) -> Optional[CompiledTemplate]:
+            source = criteria.get(prompt_name, {}).get("template")
+            return CompiledTemplate.compile(source) if source is not None else None
+
+        with self._lock:
+            caches = self._caches
+            lookup = caches.get(snapshot)
+            if lookup is None:
+                lookup = functools.lru_cache(maxsize=self.max_size)(compile_for)
+                caches[snapshot] = lookup
+                weakref.finalize(snapshot, self._retire, caches, lookup)
+                logger.debug(f"Created template cache for rule snapshot v{snapshot.version}")
+        return lookup
+
+    def get(self, snapshot: Any, prompt_name: str) -> Optional[CompiledTemplate]:
+        """
+        Return the compiled template of a prompt.
+
+        Args:
+            snapshot: Rule snapshot the prompt was matched against
+            prompt_name: Matched prompt name
+
+        Returns:
+            Compiled template, or None if the rule has no template
+        """
+        return self._lookup_for(snapshot)(prompt_name)
+
+    def render(self, snapshot: Any, prompt_name: str, data: Mapping[str, Any]) -> Optional[str]:
+        """
+        Render a matched prompt's template with the request fields.
+
+        Args:
+            snapshot: Rule snapshot the prompt was matched against
+            prompt_name: Matched prompt name
+            data: Validated request payload
+
+        Returns:
+            Rendered prompt, or None if the rule has no template
+        """
+        template = self.get(snapshot, prompt_name)
+        if template is None:
+            return None
+        return template.render({
+            "prompt": prompt_name,
+            "situation": data["situation"],
+            "level": data["level"],
+            "file_type": data["file_type"],
+            "data": data["data"] or ""
+        })
+
+    def info(self) -> Tuple[int, int, int]:
+        """
+        Cache statistics.
+
+        Returns:
+            Tuple of (hits, misses, current_size) over all snapshots
+        """
+        with self._lock:
+            hits, misses, size = self._retired_hits, self._retired_misses, 0
+            lookups = list(self._caches.values())
+        for lookup in lookups:
+            info = lookup.cache_info()
+            hits += info.hits
+            misses += info.misses
+            size += info.currsize
+        return hits, misses, size
+
+
+template_cache = TemplateCache()
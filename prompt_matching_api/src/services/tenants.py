@@ -0,0 +1,314 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from src.services.response_cache import ERROR_RESPONSES, FAILURE_RESPONSES, response_cache, _ResponseTables
+from src.services.rule_index import RuleConflictError
+from src.services.rule_store import RuleLoadError, RuleSnapshot, load_rule_file
+from src.utils.memory import deep_sizeof
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tenant ids double as file names, so nothing that could leave the rules directory
+TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+RULE_EXTENSIONS = (".json", ".yaml", ".yml", ".toml")
+
+UNKNOWN_TENANT = "Unknown tenant"
+RULES_UNAVAILABLE = "Tenant rules unavailable"
+
+# Hash, key and value pointers plus an index entry per dict item
+_DICT_SLOT_BYTES = 32
+
+
+class TenantLookup(NamedTuple):
+    """Outcome of resolving a tenant: its response tables, or an error message."""
+
+    tables: Optional[_ResponseTables]
+    error: Optional[str]
+
+
+def memo_bytes(snapshot: RuleSnapshot, memo_size: int) -> int:
+    """
+    Upper bound of the bytes a full match memo holds for a snapshot.
+
+    Each lru_cache entry is a link list, a hashed key list of the routing
+    triple (at most the longest valid value of each field) and a dict slot;
+    results are the shared pre-encoded responses.
+
+    Args:
+        snapshot: Rule snapshot the memo resolves against
+        memo_size: Maximum memo entries
+
+    Returns:
+        Size in bytes
+    """
+    key = sys.getsizeof([None] * 3) + sum(
+        sys.getsizeof(max(values, key=len, default="")) for values in snapshot.ordered_values.values()
+    )
+    return memo_size * (key + sys.getsizeof([None] * 4) + _DICT_SLOT_BYTES)
+
+
+class _TenantEntry:
+    """A tenant's compiled tables and the bytes they are accounted at."""
+
+    __slots__ = ("tables", "size", "loaded_at")
+
+    def __init__(self, tables: _ResponseTables, size: int):
+        self.tables = tables
+        self.size = size
+        self.loaded_at = time.time()
+
+
+class TenantRegistry:
+    """
+    Tenant-scoped rule sets, compiled on first use and kept in a bounded LRU.
+
+    Each tenant's rules live in ``<TENANT_RULES_DIR>/<tenant>.json`` (or
+    .yaml/.yml/.toml). The first request for a tenant loads and compiles the
+    file into a rule snapshot and response tables; later requests take the
+    compiled tables from the cache. The cache is bounded both by tenant count
+    and by the approximate bytes the compiled tables hold, evicting the least
+    recently used tenants first, so a process can serve thousands of tenants
+    while the busy ones stay resident.
+
+    Concurrent first requests for the same tenant compile it once; the others
+    wait for that compile. Failures (unknown tenant, bad rule file) are not
+    cached, so fixing a file takes effect on the next request.
+    """
+
+    def __init__(self):
+        self.configure({})
+
+    def configure(self, config: Mapping[str, Any]) -> None:
+        """
+        Apply the TENANT_* settings and drop every cached tenant.
+
+        Args:
+            config: Application config mapping
+        """
+        self.rules_dir: Optional[str] = config.get('TENANT_RULES_DIR') or None
+        self.header = config.get('TENANT_HEADER') or 'X-Tenant'
+        self.environ_key = "HTTP_" + self.header.upper().replace("-", "_")
+        self.max_tenants = max(1, config.get('TENANT_CACHE_SIZE', 1000))
+        self.max_bytes = config.get('TENANT_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+        self.memo_size = config.get('TENANT_MEMO_SIZE', 64)
+        self.max_data_length = config.get('MAX_DATA_LENGTH')
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _TenantEntry]" = OrderedDict()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compiles = 0
+        self.compile_failures = 0
+        self.compile_ns = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether tenant rule sets are configured."""
+        return self.rules_dir is not None
+
+    def find_rule_file(self, tenant_id: str) -> Optional[str]:
+        """
+        Locate a tenant's rule file.
+
+        Args:
+            tenant_id: Tenant id
+
+        Returns:
+            Path to the rule file, or None for an unknown or malformed id
+        """
+        if self.rules_dir is None or not TENANT_ID_PATTERN.fullmatch(tenant_id):
+            return None
+        for extension in RULE_EXTENSIONS:
+            path = os.path.join(self.rules_dir, tenant_id + extension)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def cached(self, tenant_id: str) -> Optional[_ResponseTables]:
+        """
+        Return a resident tenant's tables without loading anything.
+
+        Lets an event loop serve hot tenants inline and hand only cold ones
+        to a worker thread.
+
+        Args:
+            tenant_id: Tenant id
+
+        Returns:
+            The tenant's tables (counted as a hit), or None if not resident
+        """
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(tenant_id)
+            self.hits += 1
+            return entry.tables
+
+    def lookup(self, tenant_id: str) -> TenantLookup:
+        """
+        Return a tenant's response tables, compiling its rules on first use.
+
+        Args:
+            tenant_id: Tenant id from the header or path
+
+        Returns:
+            TenantLookup with the tables, or with "Unknown tenant" or
+            "Tenant rules unavailable" as the error
+        """
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is not None:
+                self._entries.move_to_end(tenant_id)
+                self.hits += 1
+                return TenantLookup(entry.tables, None)
+            self.misses += 1
+            loading = self._loading.setdefault(tenant_id, threading.Lock())
+
+        with loading:
+            # Another request may have compiled it while this one waited
+            with self._lock:
+                entry = self._entries.get(tenant_id)
+            if entry is not None:
+                return TenantLookup(entry.tables, None)
+            try:
+                return self._compile(tenant_id)
+            finally:
+                with self._lock:
+                    self._loading.pop(tenant_id, None)
+
+    def _compile(self, tenant_id: str) -> TenantLookup:
+        path = self.find_rule_file(tenant_id)
+        if path is None:
+            return TenantLookup(None, UNKNOWN_TENANT)
+
+        start = time.perf_counter_ns()
+        try:
+            snapshot = RuleSnapshot.from_document(load_rule_file(path), path, self.max_data_length)
+            tables = response_cache.build_tables(snapshot, self.memo_size)
+            # Build the lazily cached exports now so their bytes are charged with the rest
+            tables.build_exports()
+        except (RuleLoadError, RuleConflictError) as e:
+            with self._lock:
+                self.compile_failures += 1
+            logger.error(f"Could not compile rules for tenant {tenant_id}: {str(e)}")
+            return TenantLookup(None, RULES_UNAVAILABLE)
+        elapsed = time.perf_counter_ns() - start
+        if metrics.enabled:
+            metrics.observe("compile_tenant_rules", elapsed)
+
+        # Error responses are shared by every snapshot, so they are not charged to the tenant;
+        # the match memo fills in later, so it is charged at its bound
+        size = deep_sizeof(tables, exclude=(ERROR_RESPONSES, FAILURE_RESPONSES)) + memo_bytes(snapshot,
+                                                                                               self.memo_size)
+        with self._lock:
+            self.compiles += 1
+            self.compile_ns += elapsed
+            self._entries[tenant_id] = _TenantEntry(tables, size)
+            self._bytes += size
+            self._evict()
+        logger.info(f"Compiled rules for tenant {tenant_id} from {path}: {len(snapshot.index)} rules, "
+                    f"{size} bytes in {elapsed / 1e6:.2f} ms")
+        return TenantLookup(tables, None)
+
+    def _evict(self) -> None:
+        # The newest tenant always stays, even if it alone exceeds the byte budget
+        while len(self._entries) > 1 and (len(self._entries) > self.max_tenants or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def invalidate(self, tenant_id: Optional[str] = None) -> int:
+        """
+        Drop cached tenants so their rules are reloaded on next use.
+
+        Args:
+            tenant_id: Tenant to drop (defaults to all)
+
+        Returns:
+            Number of tenants dropped
+        """
+        with self._lock:
+            if tenant_id is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                return dropped
+            entry = self._entries.pop(tenant_id, None)
+            if entry is None:
+                return 0
+            self._bytes -= entry.size
+            return 1
+
+    def info(self, limit: int = 20) -> Dict[str, Any]:
+        """
+        Describe the cache for the admin endpoint.
+
+        Args:
+            limit: Most recently used tenants to list
+
+        Returns:
+            Counters, budgets and the hottest resident tenants
+        """
+        with self._lock:
+            recent: List[Dict[str, Any]] = [
+                {"tenant": tenant_id, "rules": len(entry.tables.snapshot.index), "bytes": entry.size,
+                 "version": entry.tables.snapshot.version, "loaded_at": entry.loaded_at}
+                for tenant_id, entry in itertools.islice(reversed(self._entries.items()), limit)
+            ]
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "tenants": len(self._entries),
+                "bytes": self._bytes,
+                "max_tenants": self.max_tenants,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "compiles": self.compiles,
+                "compile_failures": self.compile_failures,
+                "compile_seconds": self.compile_ns / 1e9,
+                "recent": recent
+            }
+
+    def metric_lines(self, prefix: str = "prompt_api") -> Iterator[str]:
+        """Prometheus lines describing the tenant cache."""
+        yield f"# HELP {prefix}_tenant_cache_lookups_total Tenant rule cache lookups by result."
+        yield f"# TYPE {prefix}_tenant_cache_lookups_total counter"
+        yield f'{prefix}_tenant_cache_lookups_total{{result="hit"}} {self.hits}'
+        yield f'{prefix}_tenant_cache_lookups_total{{result="miss"}} {self.misses}'
+        lookups = self.hits + self.misses
+        yield f"# HELP {prefix}_tenant_cache_hit_ratio Fraction of tenant lookups served from memory."
+        yield f"# TYPE {prefix}_tenant_cache_hit_ratio gauge"
+        yield f"{prefix}_tenant_cache_hit_ratio {self.hits / lookups if lookups else 0.0:.6f}"
+        yield f"# HELP {prefix}_tenant_cache_entries Tenants with compiled rules in memory."
+        yield f"# TYPE {prefix}_tenant_cache_entries gauge"
+        yield f"{prefix}_tenant_cache_entries {len(self._entries)}"
+        yield f"# HELP {prefix}_tenant_cache_bytes Approximate bytes held by compiled tenant rules."
+        yield f"# TYPE {prefix}_tenant_cache_bytes gauge"
+        yield f"{prefix}_tenant_cache_bytes {self._bytes}"
+        yield f"# HELP {prefix}_tenant_cache_evictions_total Tenants evicted to stay within the cache budget."
+        yield f"# TYPE {prefix}_tenant_cache_evictions_total counter"
+        yield f"{prefix}_tenant_cache_evictions_total {self.evictions}"
+        yield f"# HELP {prefix}_tenant_compiles_total Tenant rule compiles by result."
+        yield f"# TYPE {prefix}_tenant_compiles_total counter"
+        yield f'{prefix}_tenant_compiles_total{{result="ok"}} {self.compiles}'
+        yield f'{prefix}_tenant_compiles_total{{result="failed"}} {self.compile_failures}'
+        yield f"# HELP {prefix}_tenant_compile_seconds_total Time spent compiling tenant rules."
+        yield f"# TYPE {prefix}_tenant_compile_seconds_total counter"
+        yield f"{prefix}_tenant_compile_seconds_total {self.compile_ns / 1e9:.6f}"
+
+
+tenant_registry = TenantRegistry()
@@ -0,0 +1,367 @@
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Mapping, Optional
+import codecs
+import json
+import logging
+import re
+import tempfile
+from src.utils.streaming import may_be_truncated
+
+logger = logging.getLogger(__name__)
+
+# Error messages raised by the streaming intake
+BODY_TOO_LARGE = "Request body too large"
+INVALID_JSON = "Invalid JSON format"
+
+# One run of JSON string content: plain characters, simple escapes, \u escapes
+# other than high surrogates, or a complete surrogate pair. Lone high
+# surrogates and anything that could be cut off at the buffer end stop the run.
+_STRING_RUN = re.compile(
+    r'(?:[^"\\\x00-\x1f]+'
+    r'|\\["\\/bfnrt]'
+    r'|\\u(?![dD][89abAB])[0-9a-fA-F]{4}'
+    r'|\\u[dD][89abAB][0-9a-fA-F]{2}\\u[dD][c-fC-F][0-9a-fA-F]{2})*'
+)
+_ANY_UNICODE_ESCAPE = re.compile(r'\\u[0-9a-fA-F]{4}')
+
+_WHITESPACE = " \t\r\n"
+
+
+class IntakeError(ValueError):
+    """Raised when a streamed request body is too large or not valid JSON."""
+
+
+class SpooledText:
+    """
+    Text of a JSON string value that was streamed out of a request body.
+
+    The text is written to a ``SpooledTemporaryFile`` that moves to disk once
+    it outgrows ``memory_bytes``. With ``keep=False`` only the length is
+    tracked and the text itself is dropped.
+    """
+
+    def __init__(self, memory_bytes: int, keep: bool = True, max_chars: int = 0):
+        """
+        Args:
+            memory_bytes: Size above which the spool moves to a temp file
+            keep: Whether to keep the text at all
+            max_chars: Stop keeping text past this many characters (0 = no limit)
+        """
+        self.length = 0
+        self.max_chars = max_chars
+        self._file = tempfile.SpooledTemporaryFile(max_size=memory_bytes) if keep else None
+
+    @property
+    def kept(self) -> bool:
+        """Whether the full text is available from chunks()."""
+        return self._file is not None
+
+    @property
+    def on_disk(self) -> bool:
+        """Whether the spool has moved from memory to a temp file."""
+        return self._file is not None and getattr(self._file, "_rolled", False)
+
+    def write(self, text: str) -> None:
+        """Append decoded text."""
+        self.length += len(text)
+        if self._file is None:
+            return
+        if self.max_chars and self.length > self.max_chars:
+            # The value will be rejected as too long; stop spending disk on it
+            self.close()
+            return
+        # surrogatepass keeps lone surrogates, which JSON allows
+        self._file.write(text.encode("utf-8", "surrogatepass"))
+
+    def chunks(self, chunk_bytes: int = 64 * 1024) -> Iterator[str]:
+        """
+        Read the text back in pieces.
+
+        Args:
+            chunk_bytes: Bytes read from the spool at a time
+
+        Yields:
+            Consecutive pieces of the text (never splitting a character)
+        """
+        if self._file is None:
+            raise ValueError("Spooled text was not kept")
+        decoder = codecs.getincrementaldecoder("utf-8")("surrogatepass")
+        self._file.seek(0)
+        for block in iter(lambda: self._file.read(chunk_bytes), b""):
+            text = decoder.decode(block)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def close(self) -> None:
+        """Release the spool."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class StreamedObject:
+    """A JSON object read by StreamingIntake."""
+
+    __slots__ = ("fields", "spooled")
+
+    def __init__(self, fields: Dict[str, Any], spooled: Dict[str, SpooledText]):
+        """
+        Args:
+            fields: Members decoded in memory
+            spooled: Streamed string members, which are absent from ``fields``
+        """
+        self.fields = fields
+        self.spooled = spooled
+
+    def close(self) -> None:
+        """Release every spooled member."""
+        for text in self.spooled.values():
+            text.close()
+
+
+class StreamingIntake:
+    """
+    Incremental reader for JSON object bodies with large string members.
+
+    The body is read in chunks. Members named in ``streamed_fields`` whose
+    string value does not fit in the current chunk are decoded piece by piece
+    into a SpooledText, so a 100 MB ``data`` value never exists as one Python
+    string. Everything else is decoded in memory and may not exceed
+    ``max_buffered_chars``. Whole bodies are capped at ``max_body_bytes``,
+    checked against Content-Length before anything is read.
+    """
+
+    def __init__(self, streamed_fields: Iterable[str] = ("data",)):
+        """
+        Args:
+            streamed_fields: Object members whose string values may be streamed
+        """
+        self.streamed_fields = frozenset(streamed_fields)
+        self.configure({})
+
+    def configure(self, config: Mapping[str, Any]) -> None:
+        """
+        Apply the STREAMING_INTAKE* settings.
+
+        Args:
+            config: Application config mapping
+        """
+        self.enabled = config.get('STREAMING_INTAKE', False)
+        self.max_body_bytes = config.get('STREAMING_MAX_BODY_BYTES', 1024 * 1024 * 1024)
+        self.max_buffered_chars = config.get('MAX_BODY_BYTES', 16 * 1024 * 1024)
+        self.spool_memory_bytes = config.get('STREAMING_SPOOL_MEMORY_BYTES', 1024 * 1024)
+        self.chunk_size = config.get('STREAMING_CHUNK_BYTES', 64 * 1024)
+
+    def read(self, stream: BinaryIO, content_length: Optional[int] = None,
+             keep_text: bool = True, max_chars: int = 0) -> Any:
+        """
+        Read one JSON document from a request body.
+
+        Args:
+            stream: Body stream
+            content_length: Declared body length, or None to read until EOF
+            keep_text: Whether streamed strings keep their text (False only counts it)
+            max_chars: Stop keeping a streamed string past this length (0 = no limit)
+
+        Returns:
+            StreamedObject for a JSON object, otherwise the decoded value
+
+        Raises:
+            IntakeError: If the body is too large or not valid JSON
+        """
+        if content_length is not None and content_length > self.max_body_bytes:
+            raise IntakeError(BODY_TOO_LARGE)
+        return _ObjectReader(self, stream, content_length, keep_text, max_chars).read()
+
+
+class _ObjectReader:
+    """Parser state for a single StreamingIntake.read() call."""
+
+    def __init__(self, intake: StreamingIntake, stream: BinaryIO, content_length: Optional[int],
+                 keep_text: bool, max_chars: int):
+        self.intake = intake
+        self.stream = stream
+        self.remaining = content_length
+        self.keep_text = keep_text
+        self.max_chars = max_chars
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")("surrogatepass")
+        self.decoder = json.JSONDecoder()
+        self.body_bytes = 0
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk to the buffer, returning False at end of stream."""
+        if self.eof:
+            return False
+        # Read at least as much as is already buffered so re-parsing a value
+        # that spans chunks stays linear overall
+        size = max(self.intake.chunk_size, len(self.buffer) - self.pos)
+        if self.remaining is not None:
+            size = min(size, self.remaining)
+        chunk = self.stream.read(size) if size > 0 else b""
+        if not chunk:
+            self.eof = True
+            try:
+                self.buffer = self.buffer[self.pos:] + self.text_decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                raise IntakeError(INVALID_JSON)
+        else:
+            self.body_bytes += len(chunk)
+            if self.remaining is not None:
+                self.remaining -= len(chunk)
+            if self.body_bytes > self.intake.max_body_bytes:
+                raise IntakeError(BODY_TOO_LARGE)
+            try:
+                self.buffer = self.buffer[self.pos:] + self.text_decoder.decode(chunk)
+            except UnicodeDecodeError:
+                raise IntakeError(INVALID_JSON)
+        self.pos = 0
+        return True
+
+    def next_token(self) -> str:
+        """Skip whitespace and return the next significant character ('' at EOF)."""
+        while True:
+            buffer = self.buffer
+            pos = self.pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self.fill():
+                return ""
+
+    def decode_value(self) -> Any:
+        """Decode one JSON value held in memory, reading more data as needed."""
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as err:
+                # A malformed value is final; only one cut off by the buffer end needs more data
+                if not may_be_truncated(err, len(self.buffer)):
+                    raise IntakeError(INVALID_JSON)
+                if len(self.buffer) - self.pos > self.intake.max_buffered_chars:
+                    raise IntakeError(BODY_TOO_LARGE)
+                if self.fill():
+                    continue
+                raise IntakeError(INVALID_JSON)
+            # A value ending exactly at the buffer boundary may be truncated (e.g. a number)
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+            if end - self.pos > self.intake.max_buffered_chars:
+                raise IntakeError(BODY_TOO_LARGE)
+            self.pos = end
+            return value
+
+    def stream_string(self) -> Any:
+        """
+        Decode the string starting at pos, spooling it if it spans chunks.
+
+        Returns:
+            str if the whole string was already buffered, otherwise SpooledText
+        """
+        self.pos += 1  # opening quote
+        spooled = None
+        while True:
+            buffer = self.buffer
+            end = _STRING_RUN.match(buffer, self.pos).end()
+            closed = need_more = False
+            if end == len(buffer):
+                need_more = True
+            elif buffer[end] == '"':
+                closed = True
+            elif buffer[end] != "\\":
+                raise IntakeError(INVALID_JSON)  # control character
+            elif len(buffer) - end < 12 and not self.eof:
+                need_more = True  # the escape may be cut off
+            else:
+                # A lone high surrogate escape, which json.loads accepts
+                lone = _ANY_UNICODE_ESCAPE.match(buffer, end)
+                if lone is None:
+                    raise IntakeError(INVALID_JSON)
+                end = lone.end()
+
+            piece = json.loads('"' + buffer[self.pos:end] + '"')
+            if closed and spooled is None:
+                self.pos = end + 1
+                return piece
+
+            if spooled is None:
+                spooled = SpooledText(self.intake.spool_memory_bytes, self.keep_text, self.max_chars)
+            spooled.write(piece)
+            if closed:
+                self.pos = end + 1
+                return spooled
+            self.pos = end
+            if need_more and not self.fill():
+                spooled.close()
+                raise IntakeError(INVALID_JSON)  # unterminated string
+
+    def read(self) -> Any:
+        token = self.next_token()
+        if token != "{":
+            # Not an object: decode it whole so errors match the buffered path
+            if token == "":
+                raise IntakeError(INVALID_JSON)
+            value = self.decode_value()
+            if self.next_token() != "":
+                raise IntakeError(INVALID_JSON)
+            return value
+
+        self.pos += 1
+        fields: Dict[str, Any] = {}
+        spooled: Dict[str, SpooledText] = {}
+        document = StreamedObject(fields, spooled)
+        try:
+            token = self.next_token()
+            if token == "}":
+                self.pos += 1
+            else:
+                while True:
+                    if token != '"':
+                        raise IntakeError(INVALID_JSON)
+                    key = self.decode_value()
+                    if self.next_token() != ":":
+                        raise IntakeError(INVALID_JSON)
+                    self.pos += 1
+
+                    token = self.next_token()
+                    if token == '"' and key in self.intake.streamed_fields:
+                        value = self.stream_string()
+                    else:
+                        value = self.decode_value()
+
+                    # Later duplicates win, as with json.loads
+                    fields.pop(key, None)
+                    previous = spooled.pop(key, None)
+                    if previous is not None:
+                        previous.close()
+                    if isinstance(value, SpooledText):
+                        spooled[key] = value
+                    else:
+                        fields[key] = value
+
+                    token = self.next_token()
+                    if token == ",":
+                        self.pos += 1
+                        token = self.next_token()
+                        continue
+                    if token == "}":
+                        self.pos += 1
+                        break
+                    raise IntakeError(INVALID_JSON)
+
+            if self.next_token() != "":
+                raise IntakeError(INVALID_JSON)
+        except Exception:
+            document.close()
+            raise
+        logger.debug("Streamed %d body bytes with %d spooled fields", self.body_bytes, len(spooled))
+        return document
+
+
+streaming_intake = StreamingIntake()
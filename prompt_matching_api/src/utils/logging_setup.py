@@ -0,0 +1,225 @@
+from typing import Any, Dict, Mapping, Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import hashlib
+import itertools
+import logging
+import os
+import queue
+import random
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class LogStats:
+    """Counters describing log records that were written, sampled out or dropped."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset all counters to zero."""
+        # itertools.count increments atomically under the GIL, so the hot
+        # path needs no lock
+        self._sampled_in = itertools.count()
+        self._sampled_out = itertools.count()
+        self._queue_full = itertools.count()
+
+    def record_sampled_in(self) -> None:
+        next(self._sampled_in)
+
+    def record_sampled_out(self) -> None:
+        next(self._sampled_out)
+
+    def record_queue_full(self) -> None:
+        next(self._queue_full)
+
+    @staticmethod
+    def _value(counter: itertools.count) -> int:
+        # repr() of a count is "count(N)" and does not advance it
+        return int(repr(counter)[6:-1])
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Current counter values.
+
+        Returns:
+            Dictionary with sampled_in, sampled_out and queue_full counts
+        """
+        return {
+            "sampled_in": self._value(self._sampled_in),
+            "sampled_out": self._value(self._sampled_out),
+            "queue_full": self._value(self._queue_full)
+        }
+
+
+log_stats = LogStats()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_stats.record_queue_full()
+
+
+class SuccessSampler:
+    """Decides which success-path requests get logged."""
+
+    def __init__(self, rate: float = 1.0):
+        self.rate = rate
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: float) -> None:
+        self._rate = min(max(float(value), 0.0), 1.0)
+
+    def sample(self) -> bool:
+        """
+        Decide whether the current request's success logs should be written.
+
+        Returns:
+            True if the request is sampled in
+        """
+        if self._rate >= 1.0 or random.random() < self._rate:
+            log_stats.record_sampled_in()
+            return True
+        log_stats.record_sampled_out()
+        return False
+
+
+success_sampler = SuccessSampler()
+
+_payload_max_chars = 200
+_payload_hash = False
+
+
+def redact_payload(payload: Any) -> Any:
+    """
+    Build a log-safe summary of a request payload.
+
+    Short routing fields are kept as-is, while long string values (typically
+    ``data``) are truncated and annotated with their length and optionally a digest.
+
+    Args:
+        payload: Decoded request payload
+
+    Returns:
+        Payload copy that is cheap to format
+    """
+    if not isinstance(payload, dict):
+        return f"<{type(payload).__name__}>"
+
+    redacted = {}
+    for key, value in payload.items():
+        if isinstance(value, str) and len(value) > _payload_max_chars:
+            summary = f"{value[:_payload_max_chars]}...<{len(value)} chars"
+            if _payload_hash:
+                digest = hashlib.blake2b(value.encode("utf-8", "replace"), digest_size=8).hexdigest()
+                summary += f" blake2b:{digest}"
+            redacted[key] = summary + ">"
+        elif isinstance(value, (dict, list)):
+            redacted[key] = f"<{type(value).__name__} of {len(value)}>"
+        else:
+            redacted[key] = value
+    return redacted
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+def configure_logging(config: Mapping[str, Any]) -> QueueListener:
+    """
+    Install a non-blocking logging pipeline on the root logger.
+
+    Records are put on a bounded queue by the request threads and written to a
+    size-rotated log file and stderr by a background listener thread. Calling
+    this again replaces the previous pipeline.
+
+    Args:
+        config: Application config with the LOG_* settings
+
+    Returns:
+        The running queue listener
+    """
+    global _listener, _queue_handler, _payload_max_chars, _payload_hash
+
+    shutdown_logging()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    log_file = config.get('LOG_FILE', 'logs/app.log')
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = RotatingFileHandler(
+        log_file,
+        maxBytes=config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=config.get('LOG_BACKUP_COUNT', 5)
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', 10000))
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(config.get('LOG_LEVEL', 'INFO'))
+    root_logger.addHandler(_queue_handler)
+
+    success_sampler.rate = config.get('LOG_SUCCESS_SAMPLE_RATE', 1.0)
+    _payload_max_chars = config.get('LOG_PAYLOAD_MAX_CHARS', 200)
+    _payload_hash = config.get('LOG_PAYLOAD_HASH', False)
+
+    _listener.start()
+    return _listener
+
+
+def reinit_after_fork(config: Mapping[str, Any]) -> QueueListener:
+    """
+    Restart the logging pipeline in a freshly forked child process.
+
+    The parent's listener thread does not exist in the child, so its queue is
+    abandoned rather than stopped, and a new pipeline is installed.
+
+    Args:
+        config: Application config with the LOG_* settings
+
+    Returns:
+        The child's running queue listener
+    """
+    global _listener, _queue_handler
+
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+    _queue_handler = None
+    _listener = None
+    return configure_logging(config)
+
+
+def shutdown_logging() -> None:
+    """Flush pending records and remove the pipeline installed by configure_logging."""
+    global _listener, _queue_handler
+
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,333 @@
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import sys
+import threading
+import time
+import tracemalloc
+
+WSGIApp = Callable[[Dict[str, Any], Callable], Iterable[bytes]]
+
+# Size histogram bucket upper bounds in bytes (1 KiB .. 64 MiB)
+SIZE_BOUNDS = tuple(1024 * 4 ** exponent for exponent in range(9))
+
+# Frames from these files are allocation noise rather than request work
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>",
+                  "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+class SizeHistogram:
+    """Distribution of byte sizes over fixed power-of-four buckets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero all buckets."""
+        self.counts = [0] * (len(SIZE_BOUNDS) + 1)
+        self.total = 0
+        self.count = 0
+        self.maximum = 0
+
+    def observe(self, size: int) -> None:
+        """Record one size in bytes."""
+        slot = next((index for index, bound in enumerate(SIZE_BOUNDS) if size <= bound), len(SIZE_BOUNDS))
+        with self._lock:
+            self.counts[slot] += 1
+            self.total += size
+            self.count += 1
+            if size > self.maximum:
+                self.maximum = size
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current distribution.
+
+        Returns:
+            Dictionary with count, sum_bytes, max_bytes and non-cumulative bucket counts
+        """
+        with self._lock:
+            counts = list(self.counts)
+            summary = {"count": self.count, "sum_bytes": self.total, "max_bytes": self.maximum}
+        summary["buckets"] = [{"le": bound, "count": count} for bound, count in zip(SIZE_BOUNDS, counts)]
+        summary["buckets"].append({"le": "+Inf", "count": counts[-1]})
+        return summary
+
+    def prometheus_lines(self, name: str, help_text: str) -> Iterator[str]:
+        """Render the histogram in the Prometheus text format."""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.total, self.count
+        yield f"# HELP {name} {help_text}"
+        yield f"# TYPE {name} histogram"
+        cumulative = 0
+        for bound, bucket_count in zip(SIZE_BOUNDS, counts):
+            cumulative += bucket_count
+            yield f'{name}_bucket{{le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{le="+Inf"}} {count}'
+        yield f"{name}_sum {total}"
+        yield f"{name}_count {count}"
+
+
+_LEAF_TYPES = (str, bytes, int, float, complex, bool, type(None))
+
+
+def deep_sizeof(root: Any, exclude: Iterable[Any] = ()) -> int:
+    """
+    Approximate the memory held by an object graph.
+
+    Follows containers, instance dicts and slots, counting each object once
+    with sys.getsizeof. Callables, classes and modules are shared code, not
+    data, and are not counted or followed.
+
+    Args:
+        root: Object to measure
+        exclude: Objects shared with other graphs; neither counted nor followed
+
+    Returns:
+        Size in bytes
+    """
+    seen = {id(shared) for shared in exclude}
+    total = 0
+    pending = [root]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen or callable(item):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, _LEAF_TYPES):
+            continue
+        if isinstance(item, Mapping):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+        else:
+            instance_dict = getattr(item, "__dict__", None)
+            if isinstance(instance_dict, dict):
+                pending.append(instance_dict)
+            for cls in type(item).__mro__:
+                slots = cls.__dict__.get("__slots__", ())
+                for slot in (slots,) if isinstance(slots, str) else slots:
+                    value = getattr(item, slot, None)
+                    if value is not None:
+                        pending.append(value)
+    return total
+
+
+def _site(traceback: tracemalloc.Traceback) -> str:
+    # Frames run from the outermost caller to the allocating line
+    return " -> ".join(f"{frame.filename}:{frame.lineno}" for frame in traceback)
+
+
+class MemoryDiagnostics:
+    """
+    Opt-in memory diagnostics for request handling.
+
+    Records the size of every request body and, while tracemalloc is tracing,
+    the peak traced allocation of every request. tracemalloc's peak is
+    process-wide and resetting it clears the peak of any request already
+    running, so multithreaded servers measure one request at a time
+    (measure_lock) while tracing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_frames = 1
+        self.top_requests = 20
+        self.body_sizes = SizeHistogram()
+        self.request_peaks = SizeHistogram()
+        self._largest: List[Tuple[int, float, str, int]] = []
+        self._largest_lock = threading.Lock()
+        self.measure_lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_tracing = False
+
+    def configure(self, config: Any) -> None:
+        """
+        Apply the MEMORY_* settings, starting or stopping tracemalloc.
+
+        Args:
+            config: Application config mapping
+        """
+        self.enabled = bool(config.get('MEMORY_DIAGNOSTICS_ENABLED', False))
+        self.trace_frames = max(int(config.get('MEMORY_TRACE_FRAMES', 1)), 1)
+        self.top_requests = config.get('MEMORY_TOP_REQUESTS', 20)
+        self.body_sizes.reset()
+        self.request_peaks.reset()
+        with self._largest_lock:
+            self._largest = []
+
+        if self.enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+                self._started_tracing = True
+            self.take_baseline()
+        else:
+            if self._started_tracing and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._started_tracing = False
+            self._baseline = None
+
+    def take_baseline(self) -> None:
+        """Snapshot current allocations as the reference for growth reports."""
+        self._baseline = self._snapshot() if tracemalloc.is_tracing() else None
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+        )
+
+    def record_request(self, path: str, body_size: int, peak: int) -> None:
+        """
+        Record one request's body size and peak allocation.
+
+        Args:
+            path: Request path
+            body_size: Request body bytes read
+            peak: Peak traced bytes allocated while handling the request
+        """
+        self.request_peaks.observe(peak)
+        entry = (peak, time.time(), path, body_size)
+        with self._largest_lock:
+            if len(self._largest) < self.top_requests:
+                heapq.heappush(self._largest, entry)
+            elif entry > self._largest[0]:
+                heapq.heapreplace(self._largest, entry)
+
+    def largest_requests(self) -> List[Dict[str, Any]]:
+        """Requests with the highest peak allocation, largest first."""
+        with self._largest_lock:
+            entries = sorted(self._largest, reverse=True)
+        return [{"peak_bytes": peak, "timestamp": round(timestamp, 3), "path": path, "body_bytes": body_size}
+                for peak, timestamp, path, body_size in entries]
+
+    def report(self, limit: int = 15, group_by: str = "lineno") -> Dict[str, Any]:
+        """
+        Build the diagnostics report served on /admin/memory.
+
+        Args:
+            limit: Number of allocation sites to list
+            group_by: tracemalloc grouping ("lineno", "filename" or "traceback")
+
+        Returns:
+            Report dictionary
+        """
+        report: Dict[str, Any] = {
+            "tracing": tracemalloc.is_tracing(),
+            "body_sizes": self.body_sizes.snapshot(),
+            "request_peaks": self.request_peaks.snapshot(),
+            "largest_requests": self.largest_requests()
+        }
+        if not tracemalloc.is_tracing():
+            return report
+
+        current, peak = tracemalloc.get_traced_memory()
+        report["traced_current_bytes"] = current
+        report["traced_peak_bytes"] = peak
+
+        snapshot = self._snapshot()
+        report["top_allocations"] = [
+            {"site": _site(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(group_by)[:limit]
+        ]
+        if self._baseline is not None:
+            report["growth_since_baseline"] = [
+                {"site": _site(stat.traceback), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in snapshot.compare_to(self._baseline, group_by)[:limit]
+                if stat.size_diff > 0
+            ]
+        return report
+
+    def metric_lines(self, prefix: str = "prompt_api") -> Iterator[str]:
+        """Prometheus lines for the body size and request peak histograms."""
+        yield from self.body_sizes.prometheus_lines(f"{prefix}_request_body_bytes", "Request body sizes.")
+        yield from self.request_peaks.prometheus_lines(f"{prefix}_request_peak_alloc_bytes",
+                                                       "Peak traced allocation per request.")
+
+
+memory_diagnostics = MemoryDiagnostics()
+
+
+class _CountingInput:
+    """wsgi.input proxy counting the bytes the application reads."""
+
+    def __init__(self, stream: Any):
+        self._stream = stream
+        self.bytes_read = 0
+
+    def read(self, *args: Any) -> bytes:
+        data = self._stream.read(*args)
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, buffer: Any) -> int:
+        size = self._stream.readinto(buffer)
+        self.bytes_read += size or 0
+        return size
+
+    def readline(self, *args: Any) -> bytes:
+        line = self._stream.readline(*args)
+        self.bytes_read += len(line)
+        return line
+
+    def readlines(self, *args: Any) -> List[bytes]:
+        lines = self._stream.readlines(*args)
+        self.bytes_read += sum(len(line) for line in lines)
+        return lines
+
+    def __iter__(self) -> Iterator[bytes]:
+        for line in self._stream:
+            self.bytes_read += len(line)
+            yield line
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class MemoryTrackingMiddleware:
+    """
+    WSGI middleware recording body sizes and per-request peak allocation.
+
+    Only installed in memory diagnostics mode. The response body is drained
+    inside the measurement so streamed work is included. Under a
+    multithreaded server traced requests are serialised, since the peak
+    counter they reset is shared by the whole process.
+    """
+
+    def __init__(self, app: WSGIApp, diagnostics: MemoryDiagnostics):
+        self.app = app
+        self.diagnostics = diagnostics
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        body = environ["wsgi.input"] = _CountingInput(environ["wsgi.input"])
+        tracing = tracemalloc.is_tracing()
+        lock = self.diagnostics.measure_lock if tracing and environ.get("wsgi.multithread") else None
+        if lock is not None:
+            lock.acquire()
+        try:
+            if tracing:
+                start_size, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+
+            result = self.app(environ, start_response)
+            try:
+                chunks = list(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if lock is not None:
+                lock.release()
+
+        self.diagnostics.body_sizes.observe(body.bytes_read)
+        if tracing:
+            self.diagnostics.record_request(environ.get("PATH_INFO", ""), body.bytes_read,
+                                            max(peak - start_size, 0))
+        return chunks
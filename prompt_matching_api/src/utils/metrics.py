@@ -0,0 +1,309 @@
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from bisect import bisect_left
+import functools
+import threading
+import time
+
+# Histogram bucket upper bounds in nanoseconds (1us .. 100ms)
+BUCKET_BOUNDS_NS = (
+    1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 500_000,
+    1_000_000, 2_500_000, 5_000_000, 10_000_000, 25_000_000, 50_000_000, 100_000_000
+)
+
+# Slot layout of a histogram list: one count per bucket, then +Inf, sum_ns and count
+_INF_SLOT = len(BUCKET_BOUNDS_NS)
+_SUM_SLOT = _INF_SLOT + 1
+_COUNT_SLOT = _INF_SLOT + 2
+
+
+class _Shard:
+    """Counters and histograms written by a single thread."""
+
+    __slots__ = ("histograms", "counters")
+
+    def __init__(self):
+        self.histograms: Dict[str, List[int]] = {}
+        self.counters: Dict[Tuple[str, str], int] = {}
+
+    def merge_into(self, other: "_Shard") -> None:
+        """Add this shard's values to another shard."""
+        for stage, values in list(self.histograms.items()):
+            total = other.histograms.setdefault(stage, [0] * len(values))
+            for slot, value in enumerate(list(values)):
+                total[slot] += value
+        for key, value in list(self.counters.items()):
+            other.counters[key] = other.counters.get(key, 0) + value
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    Low-overhead per-stage latency histograms and outcome counters.
+
+    Each thread writes only to its own shard, so recording never takes a lock;
+    shards are summed when metrics are rendered. Stages are timed by wrapping
+    methods at startup, so nothing is wrapped (and nothing is paid) when
+    metrics are disabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._local = threading.local()
+        self._request = threading.local()
+        self._shards: Dict[threading.Thread, _Shard] = {}
+        self._retired = _Shard()
+        self._shards_lock = threading.Lock()
+        self._instrumented: List[Tuple[Any, str, Any]] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            return self._new_shard()
+
+    def _new_shard(self) -> _Shard:
+        shard = _Shard()
+        with self._shards_lock:
+            # Fold shards of finished threads into one, so servers that spawn
+            # a thread per request keep a bounded number of shards
+            for thread in [thread for thread in self._shards if not thread.is_alive()]:
+                self._shards.pop(thread).merge_into(self._retired)
+            self._shards[threading.current_thread()] = shard
+        self._local.shard = shard
+        return shard
+
+    def _histogram(self, stage: str) -> List[int]:
+        histograms = self._shard().histograms
+        histogram = histograms.get(stage)
+        if histogram is None:
+            histogram = histograms[stage] = [0] * (_COUNT_SLOT + 1)
+        return histogram
+
+    def observe(self, stage: str, duration_ns: int) -> None:
+        """
+        Record a stage duration.
+
+        Args:
+            stage: Stage name
+            duration_ns: Duration in nanoseconds
+        """
+        histogram = self._histogram(stage)
+        histogram[bisect_left(BUCKET_BOUNDS_NS, duration_ns)] += 1
+        histogram[_SUM_SLOT] += duration_ns
+        histogram[_COUNT_SLOT] += 1
+
+    def increment(self, name: str, label: str) -> None:
+        """
+        Increment a labelled counter.
+
+        Args:
+            name: Counter name (e.g. "matches")
+            label: Label value (e.g. the prompt name)
+        """
+        try:
+            counters = self._local.shard.counters
+        except AttributeError:
+            counters = self._new_shard().counters
+        key = (name, label)
+        counters[key] = counters.get(key, 0) + 1
+
+    def instrument(self, owner: Any, attribute: str, stage: str) -> None:
+        """
+        Wrap a function, staticmethod or classmethod so every call is timed.
+
+        Args:
+            owner: Class or module that defines the callable
+            attribute: Attribute name of the callable
+            stage: Stage name to record durations under
+        """
+        original = owner.__dict__[attribute]
+        descriptor = type(original) if isinstance(original, (classmethod, staticmethod)) else None
+        func = original.__func__ if descriptor else original
+        local = threading.local()
+        request_state = self._request
+        histogram_for = self._histogram
+        perf_counter_ns = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                # Cache this thread's histogram for the stage to skip lookups
+                try:
+                    histogram = local.histogram
+                except AttributeError:
+                    histogram = local.histogram = histogram_for(stage)
+                histogram[bisect_left(BUCKET_BOUNDS_NS, elapsed)] += 1
+                histogram[_SUM_SLOT] += elapsed
+                histogram[_COUNT_SLOT] += 1
+                timings = getattr(request_state, "timings", None)
+                if timings is not None:
+                    timings.append((stage, elapsed))
+
+        setattr(owner, attribute, descriptor(timed) if descriptor else timed)
+        self._instrumented.append((owner, attribute, original))
+
+    def begin_request(self) -> None:
+        """Start collecting this thread's stage durations for a Server-Timing header."""
+        self._request.timings = []
+
+    def end_request(self) -> List[Tuple[str, int]]:
+        """
+        Stop collecting this thread's stage durations.
+
+        Returns:
+            (stage, duration_ns) pairs recorded since begin_request, in call order
+        """
+        timings = getattr(self._request, "timings", None) or []
+        self._request.timings = None
+        return timings
+
+    def configure(self, enabled: bool, stages: Iterable[Tuple[Any, str, str]] = ()) -> None:
+        """
+        Enable or disable metrics, (re)installing stage instrumentation.
+
+        Args:
+            enabled: Whether to record metrics
+            stages: (owner, attribute, stage_name) triples to time when enabled
+        """
+        while self._instrumented:
+            owner, attribute, original = self._instrumented.pop()
+            setattr(owner, attribute, original)
+
+        self.enabled = enabled
+        if enabled:
+            for owner, attribute, stage in stages:
+                self.instrument(owner, attribute, stage)
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """
+        Register a callable returning extra Prometheus text lines at render time.
+
+        Args:
+            collector: Callable yielding complete exposition lines
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def reset(self) -> None:
+        """Zero all recorded values."""
+        with self._shards_lock:
+            # Zero in place: threads keep references to their own histograms
+            for shard in [self._retired, *self._shards.values()]:
+                for values in list(shard.histograms.values()):
+                    values[:] = [0] * len(values)
+                for key in list(shard.counters):
+                    shard.counters[key] = 0
+
+    def collect(self) -> Tuple[Dict[str, List[int]], Dict[Tuple[str, str], int]]:
+        """
+        Sum all thread shards.
+
+        Returns:
+            Tuple of (histograms by stage, counters by (name, label))
+        """
+        total = _Shard()
+        with self._shards_lock:
+            shards = [self._retired, *self._shards.values()]
+        for shard in shards:
+            shard.merge_into(total)
+        return total.histograms, {key: value for key, value in total.counters.items() if value}
+
+    def render(self, prefix: str = "prompt_api") -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix: Metric name prefix
+
+        Returns:
+            Exposition text
+        """
+        histograms, counters = self.collect()
+        lines = []
+
+        name = f"{prefix}_stage_duration_seconds"
+        lines.append(f"# HELP {name} Time spent in each request processing stage.")
+        lines.append(f"# TYPE {name} histogram")
+        for stage in sorted(histograms):
+            values = histograms[stage]
+            label = f'stage="{_escape_label(stage)}"'
+            cumulative = 0
+            for bound_ns, count in zip(BUCKET_BOUNDS_NS, values):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label},le="{bound_ns / 1e9:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {values[_COUNT_SLOT]}')
+            lines.append(f"{name}_sum{{{label}}} {values[_SUM_SLOT] / 1e9:.9f}")
+            lines.append(f"{name}_count{{{label}}} {values[_COUNT_SLOT]}")
+
+        for counter_name, label_name, help_text in (
+            ("matches", "prompt", "Requests matched to each prompt."),
+            ("errors", "error", "Requests rejected with each error.")
+        ):
+            name = f"{prefix}_{counter_name}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (key_name, label), value in sorted(counters.items()):
+                if key_name == counter_name:
+                    lines.append(f'{name}{{{label_name}="{_escape_label(label)}"}} {value}')
+
+        for collector in self._collectors:
+            lines.extend(collector())
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def format_server_timing(timings: Iterable[Tuple[str, int]], total_ns: int) -> str:
+    """
+    Format stage durations as a Server-Timing header value.
+
+    Args:
+        timings: (stage, duration_ns) pairs in call order
+        total_ns: Total handling time in nanoseconds
+
+    Returns:
+        Header value with durations in milliseconds (microsecond precision)
+    """
+    parts = []
+    # Integer formatting is several times cheaper than float formatting here
+    for stage, duration_ns in timings:
+        micros = duration_ns // 1000
+        parts.append("%s;dur=%d.%03d" % (stage, micros // 1000, micros % 1000))
+    micros = total_ns // 1000
+    parts.append("total;dur=%d.%03d" % (micros // 1000, micros % 1000))
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """WSGI middleware adding a Server-Timing header with per-stage durations."""
+
+    def __init__(self, app: Callable, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        # Inlined begin_request/end_request: this runs on every response
+        request_state = self.registry._request
+        timings = request_state.timings = []
+        start = time.perf_counter_ns()
+
+        def timed_start_response(status, headers, exc_info=None):
+            # Stages that run while a streamed body is iterated are not included
+            request_state.timings = None
+            value = format_server_timing(timings, time.perf_counter_ns() - start)
+            return start_response(status, headers + [("Server-Timing", value)], exc_info)
+
+        try:
+            return self.app(environ, timed_start_response)
+        finally:
+            request_state.timings = None
@@ -0,0 +1,246 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import threading
+import time
+
+WSGIApp = Callable[[Dict[str, Any], Callable], Iterable[bytes]]
+
+# pstats function key: (filename, line number, function name)
+FunctionKey = Tuple[str, int, str]
+
+# Deepest call path emitted in collapsed-stack output
+MAX_STACK_DEPTH = 64
+
+
+class ProfileCollector:
+    """
+    Rolling aggregate of per-request cProfile captures.
+
+    Captures are merged into fixed-width time buckets, so memory depends on the
+    number of distinct functions, not the number of requests, and windows
+    older than the retention period are dropped.
+    """
+
+    def __init__(self, retention_seconds: int = 300, bucket_seconds: int = 10,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            retention_seconds: How long captures are kept
+            bucket_seconds: Width of each aggregation bucket
+            clock: Monotonic clock in seconds
+        """
+        self.retention_seconds = retention_seconds
+        self.bucket_seconds = bucket_seconds
+        self._clock = clock
+        self._buckets: Dict[int, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, profile: cProfile.Profile) -> None:
+        """
+        Merge a finished capture into the current bucket.
+
+        Args:
+            profile: Disabled profiler holding one request's capture
+        """
+        stats = pstats.Stats(profile)
+        bucket_id = int(self._clock() // self.bucket_seconds)
+        with self._lock:
+            bucket = self._buckets.get(bucket_id)
+            if bucket is None:
+                self._buckets[bucket_id] = [stats, 1]
+                oldest = bucket_id - self.retention_seconds // self.bucket_seconds
+                for stale in [key for key in self._buckets if key < oldest]:
+                    del self._buckets[stale]
+            else:
+                bucket[0].add(stats)
+                bucket[1] += 1
+
+    def aggregate(self, seconds: float) -> Tuple[Optional[pstats.Stats], int]:
+        """
+        Merge the captures from the most recent time window.
+
+        Args:
+            seconds: Window length, capped at the retention period
+
+        Returns:
+            Tuple of (merged stats or None if nothing was captured, capture count)
+        """
+        first_bucket = int((self._clock() - seconds) // self.bucket_seconds)
+        merged = None
+        count = 0
+        with self._lock:
+            for bucket_id in sorted(self._buckets):
+                if bucket_id < first_bucket:
+                    continue
+                stats, captures = self._buckets[bucket_id]
+                if merged is None:
+                    merged = pstats.Stats()
+                merged.add(stats)
+                count += captures
+        return merged, count
+
+    def clear(self) -> None:
+        """Drop all captures."""
+        with self._lock:
+            self._buckets.clear()
+
+
+def render_pstats(stats: pstats.Stats, sort: str = "cumulative", limit: int = 40) -> str:
+    """
+    Render stats as the standard pstats table.
+
+    Args:
+        stats: Profile stats
+        sort: pstats sort key
+        limit: Number of functions to list
+
+    Returns:
+        Report text
+    """
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def _frame_name(function: FunctionKey) -> str:
+    filename, line, name = function
+    if filename == "~":
+        label = name
+    else:
+        label = f"{os.path.basename(filename)}:{line}:{name}"
+    return label.replace(";", ":").replace(" ", "_")
+
+
+def render_collapsed(stats: pstats.Stats) -> str:
+    """
+    Render stats as collapsed stacks ("a;b;c <microseconds>") for flamegraph tools.
+
+    cProfile records caller/callee edges rather than full stacks, so paths are
+    rebuilt by walking callees from the entry points and splitting each
+    function's time across its callers in proportion to the time recorded on
+    each edge.
+
+    Args:
+        stats: Profile stats
+
+    Returns:
+        One line per call path with its self time in microseconds
+    """
+    entries = stats.stats
+    callees: Dict[FunctionKey, List[FunctionKey]] = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(function)
+
+    samples: Dict[str, float] = {}
+
+    def walk(function: FunctionKey, path: List[str], on_path: set, self_time: float,
+             inclusive_time: float) -> None:
+        path.append(_frame_name(function))
+        on_path.add(function)
+        key = ";".join(path)
+        samples[key] = samples.get(key, 0.0) + self_time
+
+        total_inclusive = entries[function][3]
+        share = inclusive_time / total_inclusive if total_inclusive else 0.0
+        if len(path) < MAX_STACK_DEPTH:
+            for callee in callees.get(function, ()):
+                if callee in on_path:
+                    continue
+                _, _, edge_self, edge_inclusive = entries[callee][4][function][:4]
+                if edge_inclusive * share > 0:
+                    walk(callee, path, on_path, edge_self * share, edge_inclusive * share)
+
+        on_path.discard(function)
+        path.pop()
+
+    # Entry points have no callers besides themselves (recursion is folded
+    # into a single node by cProfile)
+    for function, (_, _, self_time, inclusive_time, callers) in entries.items():
+        if not callers or set(callers) == {function}:
+            walk(function, [], set(), self_time, inclusive_time)
+
+    lines = [f"{key} {round(value * 1e6)}" for key, value in samples.items() if round(value * 1e6) > 0]
+    return "\n".join(sorted(lines)) + ("\n" if lines else "")
+
+
+class RequestProfiler:
+    """Decides which requests are profiled and collects their captures."""
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.header = "X-Profile"
+        self.admin_token = ""
+        self.collector = ProfileCollector()
+
+    def configure(self, config: Any) -> None:
+        """
+        Apply the PROFILING_* settings.
+
+        Args:
+            config: Application config mapping
+        """
+        self.enabled = bool(config.get('PROFILING_ENABLED', False))
+        self.sample_rate = min(max(float(config.get('PROFILE_SAMPLE_RATE', 0.0)), 0.0), 1.0)
+        self.header = config.get('PROFILE_HEADER', 'X-Profile')
+        self.admin_token = config.get('ADMIN_TOKEN') or ''
+        self.collector = ProfileCollector(config.get('PROFILE_RETENTION_SECONDS', 300),
+                                          config.get('PROFILE_BUCKET_SECONDS', 10))
+
+
+profiler = RequestProfiler()
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware capturing cProfile data for sampled requests.
+
+    A request is profiled when it sends the profile header carrying the admin
+    token or is picked by the sample rate. Only installed when profiling is enabled, so there is no
+    cost otherwise.
+    """
+
+    def __init__(self, app: WSGIApp, request_profiler: RequestProfiler):
+        self.app = app
+        self.profiler = request_profiler
+        self.header_environ_key = "HTTP_" + request_profiler.header.upper().replace("-", "_")
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        sample_rate = self.profiler.sample_rate
+        if not (self._requested(environ) or (sample_rate and random.random() < sample_rate)):
+            return self.app(environ, start_response)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active on this interpreter
+            return self.app(environ, start_response)
+
+        try:
+            # Drain the body inside the capture so streamed work is included
+            result = self.app(environ, start_response)
+            try:
+                body = b"".join(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        finally:
+            profile.disable()
+        self.profiler.collector.add(profile)
+        return [body]
+
+    def _requested(self, environ: Dict[str, Any]) -> bool:
+        """Whether the request carries the profile header with the admin token."""
+        supplied = environ.get(self.header_environ_key)
+        admin_token = self.profiler.admin_token
+        if not supplied or not admin_token:
+            return False
+        return hmac.compare_digest(supplied.encode("latin-1"), admin_token.encode())
@@ -0,0 +1,163 @@
+from typing import Any, BinaryIO, Iterator, Optional, Tuple
+import codecs
+import json
+
+# Sentinel yielded in place of an item that could not be decoded
+INVALID_ITEM = object()
+
+# Longest partial token that fails to decode before reaching the end of the
+# buffer, e.g. "-Infinit" or a split surrogate pair escape
+_TRUNCATED_TAIL = 12
+
+
+class StreamingJSONError(ValueError):
+    """Raised when a streamed JSON document is malformed."""
+
+
+def may_be_truncated(err: json.JSONDecodeError, buffer_length: int) -> bool:
+    """
+    Whether a decode error could go away once more of the body is read.
+
+    Only a value cut off by the end of the buffer can be completed by reading
+    more; any earlier error is final however much follows.
+
+    Args:
+        err: Error raised decoding the buffer
+        buffer_length: Length of the buffer that was decoded
+
+    Returns:
+        True if the error is at the buffer tail or in an unterminated string
+    """
+    return err.pos >= buffer_length - _TRUNCATED_TAIL or err.msg.startswith("Unterminated string")
+
+
+def read_capped(stream: BinaryIO, max_bytes: int, chunk_size: int = 64 * 1024) -> Optional[bytes]:
+    """
+    Read a body of unknown length in bounded chunks, stopping past a cap.
+
+    Reading max_bytes + 1 in one call would allocate a buffer of the full cap
+    up front on raw streams, whatever the body's real size.
+
+    Args:
+        stream: Binary stream positioned at the start of the body
+        max_bytes: Maximum accepted body size
+        chunk_size: Most bytes requested per read
+
+    Returns:
+        Body bytes, or None if the body exceeds the cap
+    """
+    chunks = []
+    total = 0
+    while total <= max_bytes:
+        chunk = stream.read(min(chunk_size, max_bytes + 1 - total))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        total += len(chunk)
+    return None if total > max_bytes else b"".join(chunks)
+
+
+def iter_ndjson(stream: BinaryIO) -> Iterator[Any]:
+    """
+    Decode newline-delimited JSON from a binary stream one line at a time.
+
+    Args:
+        stream: Binary stream positioned at the start of the body
+
+    Yields:
+        Decoded item for each non-blank line, or INVALID_ITEM if a line is not valid JSON
+    """
+    for raw_line in iter(stream.readline, b""):
+        line = raw_line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield INVALID_ITEM
+
+
+def iter_json_array(stream: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Decode the elements of a top-level JSON array without buffering the whole body.
+
+    Args:
+        stream: Binary stream positioned at the start of the body
+        chunk_size: Minimum number of bytes to read at a time
+
+    Yields:
+        Each decoded array element in order
+
+    Raises:
+        StreamingJSONError: If the body is not a well-formed JSON array
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        """Append the next chunk to the buffer, returning False at end of stream."""
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        # Read at least as much as is already buffered so re-parsing a large
+        # element that spans chunks stays linear overall
+        chunk = stream.read(max(chunk_size, len(buffer) - pos))
+        if not chunk:
+            eof = True
+            buffer = buffer[pos:] + text_decoder.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        return True
+
+    def next_token() -> str:
+        """Skip whitespace and return the next significant character ('' at EOF)."""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                return ""
+
+    def decode_value() -> Tuple[Any, int]:
+        """Decode one JSON value starting at pos, reading more data as needed."""
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as err:
+                if may_be_truncated(err, len(buffer)) and fill():
+                    continue
+                raise StreamingJSONError("Invalid JSON format")
+            # A value ending exactly at the buffer boundary may be truncated (e.g. a number)
+            if end == len(buffer) and not eof and fill():
+                continue
+            return value, end
+
+    if next_token() != "[":
+        raise StreamingJSONError("Expected a JSON array")
+    pos += 1
+
+    if next_token() == "]":
+        pos += 1
+    else:
+        while True:
+            value, pos = decode_value()
+            yield value
+
+            token = next_token()
+            if token == ",":
+                pos += 1
+                next_token()
+                continue
+            if token == "]":
+                pos += 1
+                break
+            raise StreamingJSONError("Invalid JSON format")
+
+    if next_token() != "":
+        raise StreamingJSONError("Unexpected data after JSON array")
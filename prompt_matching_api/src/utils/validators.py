@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
 import re
 
 class InputValidator:
@@ -105,26 +105,197 @@ class InputValidator:
         
         return errors
 
+# Error messages produced by the compiled request validator
+MISSING_DATA = "Missing Data"
+INVALID_PROMPT = "Invalid Prompt"
+DATA_TOO_LARGE = "Data exceeds maximum length"
+
+# Failure reasons reported per field by CompiledValidator.validate_all
+FIELD_ABSENT = "absent"
+FIELD_WRONG_TYPE = "wrong_type"
+FIELD_BLANK = "blank"
+
+class FieldSpec:
+    """Declarative description of one string field in a request schema."""
+    
+    __slots__ = ("name", "nullable", "allow_blank", "choices", "length_limited")
+    
+    def __init__(self, name: str, nullable: bool = False, allow_blank: bool = False,
+                 choices: Optional[str] = None, length_limited: bool = False):
+        """
+        Args:
+            name: Field name; every field in a schema is required
+            nullable: Whether None is accepted
+            allow_blank: Whether empty or whitespace-only strings are accepted
+            choices: Key of the allowed-value set supplied at compile time
+            length_limited: Whether the compile-time length cap applies
+        """
+        self.name = name
+        self.nullable = nullable
+        self.allow_blank = allow_blank
+        self.choices = choices
+        self.length_limited = length_limited
+
+# Schema for /api/match-prompt payloads
+PROMPT_REQUEST_SCHEMA = (
+    FieldSpec("situation", choices="situation"),
+    FieldSpec("level", choices="level"),
+    FieldSpec("file_type", choices="file_type"),
+    FieldSpec("data", nullable=True, allow_blank=True, length_limited=True)
+)
+
+_ABSENT = object()
+
+class CompiledValidator:
+    """
+    Single-pass request validator compiled from a schema.
+    
+    Structural problems (missing field, None, wrong type, blank, over the
+    length cap) are returned as soon as they are found. A value outside its
+    allowed set is remembered and only reported if the rest of the payload is
+    structurally valid, so "Missing Data" keeps precedence over "Invalid Prompt".
+    """
+    
+    __slots__ = ("_fields", "max_length")
+    
+    def __init__(self, schema: Tuple[FieldSpec, ...], choices: Optional[Dict[str, FrozenSet[str]]] = None,
+                 max_length: int = 0):
+        """
+        Args:
+            schema: Field specs in check order
+            choices: Allowed-value sets keyed by FieldSpec.choices (fields without one are not checked)
+            max_length: Length cap for length-limited fields (0 disables it)
+        """
+        choices = choices or {}
+        self.max_length = max_length
+        self._fields = tuple(
+            (spec.name, spec.nullable, spec.allow_blank,
+             frozenset(choices[spec.choices]) if spec.choices in choices else None,
+             max_length if spec.length_limited and max_length > 0 else 0)
+            for spec in schema
+        )
+    
+    @property
+    def field_names(self) -> List[str]:
+        """Names of the fields checked by this validator."""
+        return [field[0] for field in self._fields]
+    
+    def validate(self, data: Any, check_choices: bool = True) -> Optional[Tuple[str, str]]:
+        """
+        Validate a payload in one pass over the schema.
+        
+        Args:
+            data: Decoded request payload
+            check_choices: Whether to check values against their allowed sets
+            
+        Returns:
+            None if valid, otherwise a tuple of (error_message, field_name)
+        """
+        if not isinstance(data, dict):
+            return MISSING_DATA, ""
+        
+        deferred = None
+        for name, nullable, allow_blank, choices, max_length in self._fields:
+            value = data.get(name, _ABSENT)
+            if value is _ABSENT:
+                return MISSING_DATA, name
+            if value is None:
+                if nullable:
+                    continue
+                return MISSING_DATA, name
+            if not isinstance(value, str):
+                return MISSING_DATA, name
+            if not allow_blank and (not value or value.isspace()):
+                return MISSING_DATA, name
+            if max_length and len(value) > max_length:
+                return DATA_TOO_LARGE, name
+            if check_choices and deferred is None and choices is not None and value not in choices:
+                deferred = (INVALID_PROMPT, name)
+        return deferred
+    
+    def validate_all(self, data: Any, check_choices: bool = True,
+                     truncate: bool = False) -> Tuple[List[Tuple[str, str]], Dict[str, Any]]:
+        """
+        Validate a payload, reporting every failure instead of the first.
+        
+        Absent and wrongly typed fields are reported for the whole payload
+        first; only a structurally valid payload is checked for blank values,
+        lengths and allowed values, and sanitized.
+        
+        Args:
+            data: Decoded request payload
+            check_choices: Whether to check values against their allowed sets
+            truncate: Whether to truncate length-limited fields instead of rejecting them
+            
+        Returns:
+            Tuple of (failures, sanitized_data); failures are (reason, field_name)
+            tuples, reason being FIELD_ABSENT, FIELD_WRONG_TYPE, FIELD_BLANK,
+            DATA_TOO_LARGE or INVALID_PROMPT, and sanitized_data holds the
+            stripped values of the fields that passed
+        """
+        if not isinstance(data, dict):
+            data = {}
+        
+        failures = []
+        for name, nullable, _, _, _ in self._fields:
+            value = data.get(name, _ABSENT)
+            if value is _ABSENT:
+                failures.append((FIELD_ABSENT, name))
+            elif not isinstance(value, str) and not (value is None and nullable):
+                failures.append((FIELD_WRONG_TYPE, name))
+        if failures:
+            return failures, {}
+        
+        sanitized = {}
+        for name, _, allow_blank, choices, max_length in self._fields:
+            value = data[name]
+            if value is None:
+                sanitized[name] = None
+                continue
+            value = value.strip()
+            if not allow_blank and not value:
+                failures.append((FIELD_BLANK, name))
+            elif max_length and len(value) > max_length and not truncate:
+                failures.append((DATA_TOO_LARGE, name))
+            elif check_choices and choices is not None and value not in choices:
+                failures.append((INVALID_PROMPT, name))
+            else:
+                sanitized[name] = value[:max_length] if max_length else value
+        return failures, sanitized
+
 class PromptValidator:
     """Specialized validator for prompt matching requests."""
     
-    # Define validation constants
-    REQUIRED_FIELDS = ["situation", "level", "file_type", "data"]
+    # Define validation constants (derived from PROMPT_REQUEST_SCHEMA)
+    REQUIRED_FIELDS = [spec.name for spec in PROMPT_REQUEST_SCHEMA]
     
-    EXPECTED_STRUCTURE = {
-        "situation": str,
-        "level": str,
-        "file_type": str,
-        "data": str
-    }
+    EXPECTED_STRUCTURE = {name: str for name in REQUIRED_FIELDS}
     
-    MAX_DATA_LENGTH = 10000  # Maximum length for data field
+    MAX_DATA_LENGTH = 10000  # Maximum length for data field, which is truncated past it
+    
+    # Unlike the request path, null values are rejected
+    _validator = CompiledValidator(
+        tuple(FieldSpec(spec.name, allow_blank=spec.allow_blank, length_limited=spec.length_limited)
+              for spec in PROMPT_REQUEST_SCHEMA),
+        max_length=MAX_DATA_LENGTH
+    )
+    
+    _MESSAGES = {
+        FIELD_ABSENT: "Missing required field: {}",
+        FIELD_WRONG_TYPE: "Field {} must be of type str",
+        FIELD_BLANK: "Field {} cannot be empty"
+    }
     
     @classmethod
     def validate_prompt_request(cls, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Comprehensive validation for prompt matching requests.
         
+        Checks the fields of PROMPT_REQUEST_SCHEMA, reporting every failure
+        rather than the first and rejecting null data. Data longer than
+        MAX_DATA_LENGTH is truncated in the sanitized output rather than
+        rejected.
+        
         Args:
             data: Request data to validate
             
@@ -136,44 +307,9 @@ class PromptValidator:
                 'sanitized_data': Dict[str, Any]
             }
         """
-        result = {
-            'is_valid': True,
-            'errors': [],
-            'sanitized_data': {}
+        failures, sanitized_data = cls._validator.validate_all(data, check_choices=False, truncate=True)
+        return {
+            'is_valid': not failures,
+            'errors': [cls._MESSAGES[reason].format(field) for reason, field in failures],
+            'sanitized_data': sanitized_data
         }
-        
-        # Check JSON structure
-        structure_errors = InputValidator.validate_json_structure(data, cls.EXPECTED_STRUCTURE)
-        if structure_errors:
-            result['errors'].extend(structure_errors)
-            result['is_valid'] = False
-            return result
-        
-        # Check for missing fields
-        missing_fields = InputValidator.validate_required_fields(data, cls.REQUIRED_FIELDS)
-        if missing_fields:
-            result['errors'].append(f"Missing required fields: {', '.join(missing_fields)}")
-            result['is_valid'] = False
-            return result
-        
-        # Sanitize and validate individual fields
-        sanitized_data = {}
-        
-        for field in cls.REQUIRED_FIELDS:
-            if field == "data":
-                # Data field can be empty but should be sanitized
-                sanitized_data[field] = InputValidator.sanitize_string(
-                    data[field], 
-                    max_length=cls.MAX_DATA_LENGTH
-                )
-            else:
-                # Other fields must not be empty
-                if not InputValidator.is_valid_string(data[field], allow_empty=False):
-                    result['errors'].append(f"Field {field} cannot be empty")
-                    result['is_valid'] = False
-                else:
-                    sanitized_data[field] = InputValidator.sanitize_string(data[field])
-        
-        result['sanitized_data'] = sanitized_data
-        
-        return result
\ No newline at end of file
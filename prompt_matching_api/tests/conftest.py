@@ -0,0 +1,62 @@
+import pytest
+from werkzeug.test import Client
+from app import create_app, create_fast_app
+from config.config import Config
+from src.services.prompt_service import PromptMatchingService
+
+ADMIN_TOKEN = "test-admin-token"
+DATA_CAP = 10000
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    """Serve the /admin endpoints, which are only registered with a token."""
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", ADMIN_TOKEN)
+
+@pytest.fixture
+def admin_headers():
+    """Headers authenticating an admin request."""
+    return {"X-Admin-Token": ADMIN_TOKEN}
+
+@pytest.fixture
+def app(admin_token):
+    """Create and configure a test app."""
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture
+def capped_app(monkeypatch, admin_token):
+    """Create an app rejecting data over DATA_CAP characters."""
+    monkeypatch.setattr(Config, "MAX_DATA_LENGTH", DATA_CAP)
+    try:
+        yield create_app()
+    finally:
+        monkeypatch.undo()
+        create_app()
+
+@pytest.fixture
+def client(app):
+    """Create a test client."""
+    return app.test_client()
+
+@pytest.fixture(params=["flask", "fast"])
+def any_client(request):
+    """Test client for the Flask app and for the WSGI fast path."""
+    if request.param == "flask":
+        return request.getfixturevalue('client')
+    return Client(create_fast_app())
+
+@pytest.fixture
+def restore_rules():
+    """Reload the configured rules after a test publishes its own."""
+    yield
+    PromptMatchingService.rule_store.reload()
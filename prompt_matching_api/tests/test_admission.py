@@ -0,0 +1,132 @@
+import json
+import threading
+from werkzeug.test import Client
+from tests.conftest import FakeClock
+from src.servers.admission import (
+    AdmissionController, AdmissionMiddleware, TokenBucketLimiter, OVERLOADED
+)
+
+def controller(clock=None, **settings):
+    admission = AdmissionController()
+    admission.configure(settings, clock or FakeClock())
+    return admission
+
+def ok_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "application/json")])
+    return [b'{"status":"success"}']
+
+class TestAdmission:
+    """Test cases for admission control and load shedding."""
+
+    def test_token_bucket_refills(self):
+        """Test a client is limited to its burst, then refilled at the rate."""
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(rate=2, burst=2, clock=clock)
+        assert [limiter.allow("a") for _ in range(3)] == [True, True, False]
+        assert limiter.allow("b")
+        clock.now += 0.5
+        assert limiter.allow("a")
+        assert not limiter.allow("a")
+
+    def test_idle_clients_are_discarded(self):
+        """Test the bucket table stays bounded."""
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(rate=1, burst=1, max_clients=2, clock=clock)
+        limiter.allow("a")
+        limiter.allow("b")
+        clock.now += 5
+        limiter.allow("c")
+        assert len(limiter) == 1
+
+    def test_full_table_evicts_least_recently_used(self):
+        """Test new keys evict the least recently used bucket instead of resetting every client."""
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(rate=0.1, burst=1, max_clients=2, clock=clock)
+        assert limiter.allow("a")
+        assert limiter.allow("b")
+        assert not limiter.allow("a")
+        # "b" is now least recently used, so only its bucket is dropped
+        assert limiter.allow("c")
+        assert not limiter.allow("a")
+        assert len(limiter) == 2
+
+    def test_in_flight_limit(self):
+        """Test requests beyond the in-flight limit are rejected at once."""
+        admission = controller(ADMISSION_MAX_IN_FLIGHT=2)
+        assert admission.admit("a") is None
+        assert admission.admit("a") is None
+        assert admission.admit("a") == OVERLOADED
+        assert admission.in_flight == 2
+        admission.release()
+        assert admission.admit("a") is None
+
+    def test_adaptive_shedding(self):
+        """Test shedding starts after waits exceed the target for an interval and stops on recovery."""
+        clock = FakeClock()
+        admission = controller(clock, ADMISSION_MAX_IN_FLIGHT=1, ADMISSION_QUEUE_TARGET_MS=5,
+                               ADMISSION_QUEUE_INTERVAL_MS=100, ADMISSION_QUEUE_TIMEOUT_MS=1)
+        assert admission.admit("a") is None
+        admission._record_wait(0.010)
+        clock.now += 0.2
+        admission._record_wait(0.010)
+        assert admission.shedding
+        # A full limit now rejects without queueing
+        assert admission.admit("a") == OVERLOADED
+        admission.release()
+        assert admission.admit("a") is None
+        assert not admission.shedding
+
+    def test_queued_request_gets_slot(self):
+        """Test a request waits for a slot released within the queue timeout."""
+        admission = controller(ADMISSION_MAX_IN_FLIGHT=1, ADMISSION_QUEUE_TARGET_MS=50,
+                               ADMISSION_QUEUE_TIMEOUT_MS=2000)
+        assert admission.admit("a") is None
+        timer = threading.Timer(0.05, admission.release)
+        timer.start()
+        assert admission.admit("a") is None
+        timer.join()
+
+    def test_middleware_rejections(self):
+        """Test rejections are pre-encoded and only match endpoints are controlled."""
+        admission = controller(ADMISSION_RATE=1, ADMISSION_BURST=1, ADMISSION_CLIENT_HEADER="X-Client-Id")
+        client = Client(AdmissionMiddleware(ok_app, admission))
+        headers = {"X-Client-Id": "tenant-1"}
+        assert client.post('/api/match-prompt', headers=headers, buffered=True).status_code == 200
+        response = client.post('/api/match-prompt', headers=headers, buffered=True)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        assert json.loads(response.data) == {"error": "Too many requests"}
+        assert client.post('/api/match-prompt', headers={"X-Client-Id": "tenant-2"}, buffered=True).status_code == 200
+        assert client.get('/health').status_code == 200
+        assert admission.in_flight == 0
+
+    def test_client_header_not_trusted_by_default(self):
+        """Test rotating client ids do not buy new buckets unless the header is configured."""
+        admission = controller(ADMISSION_RATE=1, ADMISSION_BURST=1)
+        client = Client(AdmissionMiddleware(ok_app, admission))
+        assert client.post('/api/match-prompt', headers={"X-Client-Id": "a"}, buffered=True).status_code == 200
+        assert client.post('/api/match-prompt', headers={"X-Client-Id": "b"}, buffered=True).status_code == 429
+        other_address = {"REMOTE_ADDR": "10.0.0.2"}
+        assert client.post('/api/match-prompt', environ_base=other_address, buffered=True).status_code == 200
+
+    def test_app_factory_wiring(self, monkeypatch):
+        """Test the Flask app sheds with 503 when the in-flight limit is full."""
+        from app import create_app
+        from config.config import Config
+        from src.servers.admission import admission_controller
+        monkeypatch.setattr(Config, "ADMISSION_MAX_IN_FLIGHT", 1)
+        try:
+            client = create_app().test_client()
+            payload = {"situation": "Commercial Auto", "level": "Structure",
+                       "file_type": "Summary Report", "data": ""}
+            assert client.post('/api/match-prompt', json=payload, buffered=True).status_code == 200
+            assert admission_controller.admit("held") is None
+            response = client.post('/api/match-prompt', json=payload, buffered=True)
+            assert response.status_code == 503
+            assert json.loads(response.data) == {"error": "Server overloaded"}
+            admission_controller.release()
+            assert 'prompt_api_admission_rejected_total{reason="overloaded"} 1' in \
+                client.get('/metrics').get_data(as_text=True)
+        finally:
+            monkeypatch.undo()
+            create_app()
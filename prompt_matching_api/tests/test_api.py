@@ -1,37 +1,26 @@
+import io
 import pytest
+import tracemalloc
 import json
-from app import create_app
-
-@pytest.fixture
-def app():
-    """Create and configure a test app."""
-    app = create_app()
-    app.config['TESTING'] = True
-    return app
-
-@pytest.fixture
-def client(app):
-    """Create a test client."""
-    return app.test_client()
 
 class TestPromptMatchingAPI:
     """Test cases for the Prompt Matching API."""
     
-    def test_no_json_content_type(self, client):
+    def test_no_json_content_type(self, any_client):
         """Test request without JSON content type."""
-        response = client.post('/api/match-prompt', data="not json")
+        response = any_client.post('/api/match-prompt', data="not json")
         assert response.status_code == 400
         data = json.loads(response.data)
         assert data['error'] == 'Content-Type must be application/json'
     
-    def test_method_not_allowed(self, client):
+    def test_method_not_allowed(self, any_client):
         """Test unsupported HTTP methods."""
-        response = client.get('/api/match-prompt')
+        response = any_client.get('/api/match-prompt')
         assert response.status_code == 405
         data = json.loads(response.data)
         assert 'Method not allowed' in data['error']
     
-    def test_valid_prompt_1(self, client):
+    def test_valid_prompt_1(self, any_client):
         """Test valid Prompt 1 matching."""
         payload = {
             "situation": "Commercial Auto",
@@ -39,13 +28,13 @@ class TestPromptMatchingAPI:
             "file_type": "Summary Report",
             "data": "Test data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data['matched_prompt'] == 'Prompt 1'
         assert data['status'] == 'success'
     
-    def test_valid_prompt_2(self, client):
+    def test_valid_prompt_2(self, any_client):
         """Test valid Prompt 2 matching."""
         payload = {
             "situation": "General Liability",
@@ -53,12 +42,12 @@ class TestPromptMatchingAPI:
             "file_type": "Deposition",
             "data": ""
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data['matched_prompt'] == 'Prompt 2'
     
-    def test_valid_prompt_3(self, client):
+    def test_valid_prompt_3(self, any_client):
         """Test valid Prompt 3 matching."""
         payload = {
             "situation": "Commercial Auto",
@@ -66,12 +55,12 @@ class TestPromptMatchingAPI:
             "file_type": "Summons",
             "data": "Legal data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data['matched_prompt'] == 'Prompt 3'
     
-    def test_valid_prompt_4(self, client):
+    def test_valid_prompt_4(self, any_client):
         """Test valid Prompt 4 matching."""
         payload = {
             "situation": "Workers Compensation",
@@ -79,12 +68,12 @@ class TestPromptMatchingAPI:
             "file_type": "Medical Records",
             "data": "Medical data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data['matched_prompt'] == 'Prompt 4'
     
-    def test_valid_prompt_5(self, client):
+    def test_valid_prompt_5(self, any_client):
         """Test valid Prompt 5 matching."""
         payload = {
             "situation": "Workers Compensation",
@@ -92,12 +81,12 @@ class TestPromptMatchingAPI:
             "file_type": "Summons",
             "data": "Legal document data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data['matched_prompt'] == 'Prompt 5'
     
-    def test_missing_field(self, client):
+    def test_missing_field(self, any_client):
         """Test missing data error."""
         payload = {
             "situation": "Commercial Auto",
@@ -105,12 +94,12 @@ class TestPromptMatchingAPI:
             # missing file_type
             "data": "Test data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 400
         data = json.loads(response.data)
         assert data['error'] == 'Missing Data'
     
-    def test_empty_field(self, client):
+    def test_empty_field(self, any_client):
         """Test empty field error."""
         payload = {
             "situation": "",
@@ -118,12 +107,12 @@ class TestPromptMatchingAPI:
             "file_type": "Summary Report",
             "data": "Test data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 400
         data = json.loads(response.data)
         assert data['error'] == 'Missing Data'
     
-    def test_invalid_combination(self, client):
+    def test_invalid_combination(self, any_client):
         """Test invalid prompt combination."""
         payload = {
             "situation": "Commercial Auto",
@@ -131,12 +120,12 @@ class TestPromptMatchingAPI:
             "file_type": "Deposition",  # This combination doesn't exist
             "data": "Test data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 400
         data = json.loads(response.data)
         assert data['error'] == 'Invalid Prompt'
     
-    def test_invalid_situation(self, client):
+    def test_invalid_situation(self, any_client):
         """Test invalid situation value."""
         payload = {
             "situation": "Invalid Situation",
@@ -144,12 +133,12 @@ class TestPromptMatchingAPI:
             "file_type": "Summary Report",
             "data": "Test data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 400
         data = json.loads(response.data)
         assert data['error'] == 'Invalid Prompt'
     
-    def test_invalid_level(self, client):
+    def test_invalid_level(self, any_client):
         """Test invalid level value."""
         payload = {
             "situation": "Commercial Auto",
@@ -157,12 +146,12 @@ class TestPromptMatchingAPI:
             "file_type": "Summary Report",
             "data": "Test data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 400
         data = json.loads(response.data)
         assert data['error'] == 'Invalid Prompt'
     
-    def test_invalid_file_type(self, client):
+    def test_invalid_file_type(self, any_client):
         """Test invalid file_type value."""
         payload = {
             "situation": "Commercial Auto",
@@ -170,7 +159,49 @@ class TestPromptMatchingAPI:
             "file_type": "Invalid File Type",
             "data": "Test data"
         }
-        response = client.post('/api/match-prompt', json=payload)
+        response = any_client.post('/api/match-prompt', json=payload)
         assert response.status_code == 400
         data = json.loads(response.data)
-        assert data['error'] == 'Invalid Prompt'
\ No newline at end of file
+        assert data['error'] == 'Invalid Prompt'    
+    def test_large_body_rejected(self, any_client):
+        """Test a body over MAX_BODY_BYTES is rejected even with no data length cap."""
+        from config.config import Config
+        payload = {
+            "situation": "Commercial Auto",
+            "level": "Structure",
+            "file_type": "Summary Report",
+            "data": "x" * Config.MAX_BODY_BYTES
+        }
+        response = any_client.post('/api/match-prompt', json=payload)
+        assert response.status_code == 413
+        data = json.loads(response.data)
+        assert data['error'] == 'Request body too large'
+    
+    @pytest.mark.parametrize("chunked", [False, True])
+    def test_small_body_allocation(self, any_client, chunked):
+        """Test a small body is read without allocating a buffer the size of MAX_BODY_BYTES."""
+        from config.config import Config
+        payload = {
+            "situation": "Commercial Auto",
+            "level": "Structure",
+            "file_type": "Summary Report",
+            "data": "Test data"
+        }
+        body = json.dumps(payload).encode()
+        if chunked:
+            kwargs = {"input_stream": io.BytesIO(body), "environ_overrides": {"wsgi.input_terminated": True}}
+        else:
+            kwargs = {"data": body}
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            start_size, _ = tracemalloc.get_traced_memory()
+            response = any_client.post('/api/match-prompt', content_type="application/json", **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+        assert response.status_code == 200
+        assert peak - start_size < Config.MAX_BODY_BYTES // 16
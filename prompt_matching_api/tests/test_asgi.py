@@ -0,0 +1,309 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from werkzeug.test import Client
+from app import create_asgi_app, create_fast_app
+from src.servers.asgi_app import INLINE_PARSE_BYTES
+from src.servers.asgi_server import ASGIServer
+from src.servers.wsgi_app import PromptMatchingWSGIApp
+from src.utils.intake import streaming_intake
+
+VALID_PAYLOAD = {
+    "situation": "Commercial Auto",
+    "level": "Structure",
+    "file_type": "Summary Report",
+    "data": "Claim notes"
+}
+
+def call_asgi(app, method, path, body=b"", headers=(), query_string=b"", chunk_size=None):
+    """Drive an ASGI app in-process, returning (status, headers, body)."""
+    chunk_size = chunk_size or max(1, len(body))
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query_string,
+             "headers": [(name.lower().encode(), value.encode()) for name, value in headers]}
+    asyncio.run(app(scope, receive, send))
+    if not sent:
+        return None, {}, b""
+    start = sent[0]
+    return (start["status"], {name.decode(): value.decode() for name, value in start["headers"]},
+            b"".join(message.get("body", b"") for message in sent[1:]))
+
+def post_json(app, payload, query_string=b"", chunk_size=None):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return call_asgi(app, "POST", "/api/match-prompt", body, [("Content-Type", "application/json")],
+                     query_string, chunk_size)
+
+async def raw_request(port, request):
+    """Send raw bytes over a fresh connection and read until the server closes it."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+async def with_server(app, scenario):
+    server = ASGIServer(app, port=0, keepalive_timeout=1)
+    await server.start()
+    try:
+        return await scenario(server.port)
+    finally:
+        await server.close()
+
+@pytest.fixture(scope="module")
+def asgi_app():
+    return create_asgi_app()
+
+class TestASGIApp:
+    """Test cases for the ASGI application."""
+
+    PAYLOADS = [
+        VALID_PAYLOAD,
+        dict(VALID_PAYLOAD, file_type="Deposition"),
+        dict(VALID_PAYLOAD, situation=""),
+        dict(VALID_PAYLOAD, data="x" * 20000),
+        {"situation": 1},
+        [VALID_PAYLOAD],
+        None,
+        b"{not json"
+    ]
+
+    @pytest.mark.parametrize("payload", PAYLOADS)
+    def test_parity_with_fast_path(self, asgi_app, payload):
+        """Test every outcome matches the WSGI fast path byte for byte."""
+        fast_client = Client(create_fast_app())
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        expected = fast_client.post('/api/match-prompt', data=body, content_type="application/json")
+        status, headers, response_body = post_json(asgi_app, body, chunk_size=7)
+        assert status == expected.status_code
+        assert response_body == expected.get_data()
+
+    def test_rendered_prompt(self, asgi_app):
+        """Test ?render=1 returns the rendered prompt."""
+        status, _, body = post_json(asgi_app, VALID_PAYLOAD, query_string=b"render=1")
+        assert status == 200
+        assert json.loads(body)["prompt"].endswith("Claim notes")
+
+    def test_content_type_required(self, asgi_app):
+        """Test non-JSON bodies are rejected before the body is read."""
+        status, _, body = call_asgi(asgi_app, "POST", "/api/match-prompt", b"{}", [("Content-Type", "text/plain")])
+        assert status == 400
+        assert json.loads(body) == {"error": "Content-Type must be application/json"}
+
+    def test_body_size_cap(self, asgi_app, monkeypatch):
+        """Test bodies over MAX_BODY_BYTES get a 413, with or without Content-Length."""
+        monkeypatch.setattr(asgi_app, "max_body_bytes", 64)
+        body = json.dumps(dict(VALID_PAYLOAD, data="x" * 100)).encode()
+        status, _, _ = post_json(asgi_app, body, chunk_size=16)
+        assert status == 413
+        status, _, _ = call_asgi(asgi_app, "POST", "/api/match-prompt", body,
+                                 [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+        assert status == 413
+
+    def test_streaming_intake(self, asgi_app, monkeypatch):
+        """Test the streaming intake spools the body and renders around large data."""
+        monkeypatch.setattr(streaming_intake, "enabled", True)
+        monkeypatch.setattr(streaming_intake, "chunk_size", 16)
+        status, _, body = post_json(asgi_app, VALID_PAYLOAD, query_string=b"render=1", chunk_size=5)
+        assert status == 200
+        assert json.loads(body)["prompt"].endswith("Claim notes")
+
+    @pytest.mark.parametrize("streaming, method", [(False, "match_body"), (True, "match_stream")])
+    def test_large_bodies_parsed_off_loop(self, asgi_app, monkeypatch, streaming, method):
+        """Test small bodies are matched on the event loop and large ones in a worker thread."""
+        monkeypatch.setattr(streaming_intake, "enabled", streaming)
+        threads = []
+        original = getattr(PromptMatchingWSGIApp, method)
+
+        def recording(*args):
+            threads.append(threading.current_thread())
+            return original(*args)
+
+        monkeypatch.setattr(PromptMatchingWSGIApp, method, recording)
+        small = post_json(asgi_app, VALID_PAYLOAD)
+        large = post_json(asgi_app, dict(VALID_PAYLOAD, data="x" * INLINE_PARSE_BYTES), chunk_size=4096)
+        assert small[0] == large[0] == 200
+        assert threads[0] is threading.main_thread()
+        assert threads[1] is not threading.main_thread()
+
+    def test_spool_writes_past_memory_off_loop(self, asgi_app, monkeypatch):
+        """Test body chunks that may reach the spool's temp file are written in a worker thread."""
+        import tempfile
+        writers = []
+
+        class RecordingSpool(tempfile.SpooledTemporaryFile):
+            def write(self, chunk):
+                writers.append(threading.current_thread())
+                return super().write(chunk)
+
+        monkeypatch.setattr("src.servers.asgi_app.tempfile.SpooledTemporaryFile", RecordingSpool)
+        monkeypatch.setattr(streaming_intake, "enabled", True)
+        monkeypatch.setattr(streaming_intake, "spool_memory_bytes", 1024)
+        status, _, _ = post_json(asgi_app, dict(VALID_PAYLOAD, data="x" * 4096), chunk_size=512)
+        assert status == 200
+        assert writers[0] is threading.main_thread()
+        assert writers[-1] is not threading.main_thread()
+
+    def test_bypassed_middleware_logged(self, monkeypatch, caplog):
+        """Test opt-in WSGI middleware configured for the ASGI app is reported as not applied."""
+        from config.config import Config
+        monkeypatch.setattr(Config, "ADMISSION_MAX_IN_FLIGHT", 4)
+        try:
+            with caplog.at_level("WARNING", logger="app"):
+                create_asgi_app()
+        finally:
+            monkeypatch.undo()
+            create_asgi_app()
+        assert "ignoring admission control" in caplog.text
+
+    def test_health_and_routing(self, asgi_app):
+        """Test /health, unknown paths and unsupported methods."""
+        assert call_asgi(asgi_app, "GET", "/health")[0] == 200
+        assert call_asgi(asgi_app, "GET", "/nope")[0] == 404
+        status, _, body = call_asgi(asgi_app, "GET", "/api/match-prompt")
+        assert status == 405
+        assert json.loads(body) == {"error": "Method not allowed. Only POST requests are supported."}
+
+    def test_disconnect_mid_body(self, asgi_app):
+        """Test a client that goes away mid-upload gets no response and raises nothing."""
+        messages = [{"type": "http.request", "body": b'{"situ', "more_body": True}, {"type": "http.disconnect"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/api/match-prompt", "query_string": b"",
+                 "headers": [(b"content-type", b"application/json")]}
+        asyncio.run(asgi_app(scope, receive, send))
+        assert sent == []
+
+class TestASGIServer:
+    """Test cases for the asyncio HTTP server."""
+
+    def test_keep_alive_requests(self, asgi_app):
+        """Test several requests share one connection."""
+        async def scenario(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            body = json.dumps(VALID_PAYLOAD).encode()
+            statuses = []
+            for _ in range(3):
+                writer.write(b"POST /api/match-prompt HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(next(line.split(b":")[1] for line in head.split(b"\r\n")
+                                  if line.lower().startswith(b"content-length")))
+                response = json.loads(await reader.readexactly(length))
+                statuses.append((head.split(b" ")[1], response["matched_prompt"]))
+            writer.close()
+            return statuses
+
+        assert asyncio.run(with_server(asgi_app, scenario)) == [(b"200", "Prompt 1")] * 3
+
+    def test_chunked_upload_and_expect_continue(self, asgi_app):
+        """Test a chunked body sent after a 100 Continue."""
+        async def scenario(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /api/match-prompt HTTP/1.1\r\nContent-Type: application/json\r\n"
+                         b"Transfer-Encoding: chunked\r\nExpect: 100-continue\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            interim = await reader.readuntil(b"\r\n\r\n")
+            body = json.dumps(VALID_PAYLOAD).encode()
+            for i in range(0, len(body), 10):
+                piece = body[i:i + 10]
+                writer.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                await writer.drain()
+                await asyncio.sleep(0)
+            writer.write(b"0\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            return interim, response
+
+        interim, response = asyncio.run(with_server(asgi_app, scenario))
+        assert interim.startswith(b"HTTP/1.1 100")
+        assert response.startswith(b"HTTP/1.1 200 OK")
+        assert response.endswith(b'{"matched_prompt":"Prompt 1","status":"success"}\n')
+
+    def test_streamed_response_is_chunked(self, asgi_app, monkeypatch):
+        """Test bodies of unknown length go out with chunked transfer encoding."""
+        monkeypatch.setattr(streaming_intake, "enabled", True)
+        monkeypatch.setattr(streaming_intake, "chunk_size", 16)
+        payload = dict(VALID_PAYLOAD, data="y" * 500)
+        body = json.dumps(payload).encode()
+        request = (b"POST /api/match-prompt?render=1 HTTP/1.1\r\nContent-Type: application/json\r\n"
+                   b"Connection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+        response = asyncio.run(with_server(asgi_app, lambda port: raw_request(port, request)))
+        head, _, chunked = response.partition(b"\r\n\r\n")
+        assert b"transfer-encoding: chunked" in head
+        decoded = b""
+        while True:
+            size_line, _, chunked = chunked.partition(b"\r\n")
+            size = int(size_line, 16)
+            if size == 0:
+                break
+            decoded, chunked = decoded + chunked[:size], chunked[size + 2:]
+        assert json.loads(decoded)["prompt"].endswith("y" * 500)
+
+    def test_malformed_request(self, asgi_app):
+        """Test a garbage request line gets a 400 and a closed connection."""
+        response = asyncio.run(with_server(asgi_app, lambda port: raw_request(port, b"NONSENSE\r\n\r\n")))
+        assert response.startswith(b"HTTP/1.1 400")
+
+    def test_application_error(self):
+        """Test an application exception becomes a 500."""
+        async def broken(scope, receive, send):
+            if scope["type"] == "http":
+                raise RuntimeError("boom")
+
+        request = b"GET / HTTP/1.1\r\n\r\n"
+        response = asyncio.run(with_server(broken, lambda port: raw_request(port, request)))
+        assert response.startswith(b"HTTP/1.1 500")
+        assert response.endswith(b'{"error":"Internal server error"}\n')
+
+    def test_stalled_upload_times_out(self, asgi_app):
+        """Test a client that stops sending mid-body is disconnected after the keep-alive timeout."""
+        async def scenario(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /api/match-prompt HTTP/1.1\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: 100\r\n\r\n{\"situation\"")
+            await writer.drain()
+            start = time.monotonic()
+            await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return time.monotonic() - start
+
+        assert asyncio.run(with_server(asgi_app, scenario)) < 3
+
+    def test_many_concurrent_slow_uploads(self, asgi_app):
+        """Test hundreds of connections uploading at once are all served on one thread."""
+        body = json.dumps(VALID_PAYLOAD).encode()
+
+        async def upload(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /api/match-prompt HTTP/1.1\r\nContent-Type: application/json\r\n"
+                         b"Connection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body[:20]))
+            await writer.drain()
+            await asyncio.sleep(0.2)
+            writer.write(body[20:])
+            response = await reader.read()
+            writer.close()
+            return response.split(b" ", 2)[1]
+
+        async def scenario(port):
+            return await asyncio.gather(*(upload(port) for _ in range(300)))
+
+        assert asyncio.run(with_server(asgi_app, scenario)) == [b"200"] * 300
@@ -0,0 +1,100 @@
+import io
+import json
+import pytest
+from src.utils.streaming import StreamingJSONError, iter_json_array
+
+VALID_PAYLOAD = {
+    "situation": "Commercial Auto",
+    "level": "Structure",
+    "file_type": "Summary Report",
+    "data": "Test data"
+}
+
+INVALID_PAYLOAD = {
+    "situation": "Commercial Auto",
+    "level": "Structure",
+    "file_type": "Deposition",
+    "data": "Test data"
+}
+
+class TestBatchEndpoints:
+    """Test cases for the batch and NDJSON streaming endpoints."""
+
+    def test_batch_mixed_results(self, client):
+        """Test per-item results and errors in a JSON array batch."""
+        payload = [VALID_PAYLOAD, INVALID_PAYLOAD, {"situation": "Commercial Auto"}, "not an object"]
+        response = client.post('/api/match-prompt/batch', json=payload)
+        assert response.status_code == 200
+        results = json.loads(response.data)
+        assert results == [
+            {"index": 0, "matched_prompt": "Prompt 1", "status": "success"},
+            {"index": 1, "error": "Invalid Prompt"},
+            {"index": 2, "error": "Missing Data"},
+            {"index": 3, "error": "Invalid JSON structure - expected JSON object"}
+        ]
+
+    def test_batch_empty_array(self, client):
+        """Test an empty batch returns an empty array."""
+        response = client.post('/api/match-prompt/batch', json=[])
+        assert response.status_code == 200
+        assert json.loads(response.data) == []
+
+    def test_batch_not_array(self, client):
+        """Test a non-array batch body is rejected up front."""
+        response = client.post('/api/match-prompt/batch', json=VALID_PAYLOAD)
+        assert response.status_code == 400
+        data = json.loads(response.data)
+        assert data['error'] == 'Invalid JSON format - expected JSON array'
+
+    def test_batch_truncated_body(self, client):
+        """Test a truncated array reports an error item after the decoded ones."""
+        body = "[" + json.dumps(VALID_PAYLOAD) + ", {\"situation\": "
+        response = client.post('/api/match-prompt/batch', data=body, content_type='application/json')
+        results = json.loads(response.data)
+        assert results[0]['matched_prompt'] == 'Prompt 1'
+        assert results[1] == {"index": 1, "error": "Invalid JSON format"}
+
+    def test_stream_ndjson(self, client):
+        """Test NDJSON streaming returns one result line per input line."""
+        body = "\n".join([json.dumps(VALID_PAYLOAD), "{broken", "", json.dumps(INVALID_PAYLOAD)]) + "\n"
+        response = client.post('/api/match-prompt/stream', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert lines == [
+            {"index": 0, "matched_prompt": "Prompt 1", "status": "success"},
+            {"index": 1, "error": "Invalid JSON format"},
+            {"index": 2, "error": "Invalid Prompt"}
+        ]
+
+    def test_stream_wrong_content_type(self, client):
+        """Test the stream endpoint requires an NDJSON content type."""
+        response = client.post('/api/match-prompt/stream', json=[VALID_PAYLOAD])
+        assert response.status_code == 400
+
+class TestIterJsonArray:
+    """Test cases for the incremental JSON array decoder."""
+
+    def test_items_spanning_chunks(self):
+        """Test elements split across tiny reads decode correctly."""
+        items = [VALID_PAYLOAD, 12345, "café", [1, 2], None]
+        stream = io.BytesIO(json.dumps(items).encode())
+        assert list(iter_json_array(stream, chunk_size=3)) == items
+
+    def test_trailing_garbage(self):
+        """Test data after the closing bracket is rejected."""
+        with pytest.raises(StreamingJSONError):
+            list(iter_json_array(io.BytesIO(b"[1, 2] 3")))
+
+    def test_syntax_error_stops_reading(self):
+        """Test a syntax error early in the array fails without buffering the rest of the body."""
+        stream = io.BytesIO(b"[1, }" + b" " * 1000000)
+        with pytest.raises(StreamingJSONError):
+            list(iter_json_array(stream, chunk_size=16))
+        assert stream.tell() <= 64
+
+    def test_truncated_tokens_across_chunks(self):
+        """Test literals, escapes and long strings split across reads still decode."""
+        items = [True, False, None, -1.5e10, "\u00e9\U0001f600", "x" * 1000]
+        stream = io.BytesIO(json.dumps(items).encode())
+        assert list(iter_json_array(stream, chunk_size=1)) == items
@@ -0,0 +1,39 @@
+from benchmarks.suite import DEFAULT_REPLAY_FILE, build_payload_mix, compare, main, measure
+
+def results(**layers):
+    """Build a results document from (p50, p99) pairs."""
+    return {"results": {name: {"p50_us": p50, "p99_us": p99} for name, (p50, p99) in layers.items()}}
+
+class TestBenchmarkSuite:
+    """Test cases for the benchmark regression gate."""
+
+    def test_compare_flags_regressions(self):
+        """Test only metrics beyond the threshold are reported."""
+        baseline = results(service=(10.0, 20.0), http=(100.0, 200.0))
+        current = results(service=(12.0, 30.0), http=(100.0, 210.0))
+        regressions = compare(baseline, current, threshold=0.25)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("service.p99_us")
+
+    def test_compare_exit_status(self, tmp_path):
+        """Test the compare command fails on regression and passes otherwise."""
+        import json
+        baseline_path = tmp_path / "baseline.json"
+        current_path = tmp_path / "current.json"
+        baseline_path.write_text(json.dumps(results(service=(10.0, 20.0))))
+        current_path.write_text(json.dumps(results(service=(10.0, 21.0))))
+        assert main(["compare", str(baseline_path), str(current_path)]) == 0
+        current_path.write_text(json.dumps(results(service=(20.0, 21.0))))
+        assert main(["compare", str(baseline_path), str(current_path)]) == 1
+
+    def test_measure_reports_percentiles(self):
+        """Test measure returns the expected statistics."""
+        stats = measure(lambda payload: None, build_payload_mix(), iterations=50, warmup=5)
+        assert set(stats) == {"p50_us", "p99_us", "mean_us", "ops_per_sec"}
+        assert stats["p50_us"] <= stats["p99_us"]
+
+    def test_default_replay_is_match_payloads(self):
+        """Test the default replay file adds real match payloads to the mix."""
+        replayed = build_payload_mix(DEFAULT_REPLAY_FILE)[len(build_payload_mix()):]
+        assert len(replayed) == 7
+        assert all({"situation", "level", "data"} <= set(payload) for payload in replayed)
@@ -0,0 +1,51 @@
+import io
+import json
+import os
+import pytest
+from src.cli.bulk_match import main, run_bulk_match
+
+REQUESTS_FILE = os.path.join(os.path.dirname(__file__), "fixtures", "match_requests.jsonl")
+
+RECORDS = [
+    b'{"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": ""}\n',
+    b'{"situation": "Commercial Auto", "level": "Structure", "file_type": "Deposition", "data": ""}\n',
+    b'\n',
+    b'{not json\n',
+    b'["a list"]\n',
+    b'{"situation": "Workers Compensation", "level": "Summarize", "file_type": "Summons", "data": ""}\n'
+]
+
+EXPECTED = [
+    {"line": 1, "matched_prompt": "Prompt 1", "status": "success"},
+    {"line": 2, "error": "Invalid Prompt"},
+    {"line": 4, "error": "Invalid JSON format"},
+    {"line": 5, "error": "Invalid JSON structure - expected JSON object"},
+    {"line": 6, "matched_prompt": "Prompt 5", "status": "success"}
+]
+
+class TestBulkMatch:
+    """Test cases for the offline bulk matching CLI."""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_results_in_input_order(self, workers):
+        """Test results keep input order across chunks and workers."""
+        sink = io.BytesIO()
+        summary = run_bulk_match(io.BytesIO(b"".join(RECORDS * 20)), sink, workers=workers, chunk_size=4)
+        results = [json.loads(line) for line in sink.getvalue().splitlines()]
+        assert len(results) == 100
+        for repeat in range(20):
+            for result, expected in zip(results[repeat * 5:repeat * 5 + 5], EXPECTED):
+                assert result == dict(expected, line=expected["line"] + repeat * len(RECORDS))
+        assert summary["records"] == 100
+        assert summary["matched"] == 40
+        assert summary["errors"]["Invalid Prompt"] == 20
+
+    def test_cli_with_requests_fixture(self, tmp_path, capsys):
+        """Test the CLI writes one result per record and prints a summary."""
+        output_path = tmp_path / "results.jsonl"
+        assert main([REQUESTS_FILE, "--output", str(output_path), "--workers", "1"]) == 0
+        results = [json.loads(line) for line in output_path.read_bytes().splitlines()]
+        assert results == [{"line": line, "matched_prompt": f"Prompt {line}", "status": "success"}
+                           for line in range(1, 6)] + [{"line": 6, "error": "Invalid Prompt"},
+                                                       {"line": 7, "error": "Missing Data"}]
+        assert "Matched 5 of 7 records" in capsys.readouterr().err
@@ -0,0 +1,142 @@
+import itertools
+import pytest
+from config.config import Config
+from src.services.codes import MEDIA_TYPE, NO_MATCH, RECORD, CodeTable, pack_records, unpack_results
+from src.services.prompt_service import PromptMatchingService
+from src.services.response_cache import response_cache
+from src.services.rule_store import RuleSnapshot
+
+CODE_HEADERS = {"Content-Type": MEDIA_TYPE}
+
+def json_match(client, situation, level, file_type):
+    """Match through the JSON endpoint, returning the prompt name or None."""
+    response = client.post('/api/match-prompt', json={
+        "situation": situation, "level": level, "file_type": file_type, "data": "Claim notes"})
+    return response.get_json().get("matched_prompt")
+
+class TestCodeTable:
+    """Test cases for CodeTable."""
+
+    def test_codes_follow_definition_order(self, app):
+        """Test codes are positions in the Config definitions."""
+        table = response_cache.code_table()
+        assert table.values["situation"] == tuple(Config.VALID_SITUATIONS)
+        assert table.values["level"] == tuple(Config.VALID_LEVELS)
+        assert table.values["file_type"] == tuple(Config.VALID_FILE_TYPES)
+        assert table.prompts == tuple(Config.PROMPT_CRITERIA)
+
+    def test_every_combination_matches_like_the_index(self, app):
+        """Test the precomputed table agrees with the rule index for every code triple."""
+        table = response_cache.code_table()
+        snapshot = PromptMatchingService.get_snapshot()
+        for record in itertools.product(*(range(len(table.values[field]))
+                                          for field in ("situation", "level", "file_type"))):
+            values = [table.values[field][code] for field, code in zip(("situation", "level", "file_type"), record)]
+            expected = snapshot.index.lookup(*values)
+            assert table.match(*record) == (NO_MATCH if expected is None else table.prompts.index(expected))
+
+    def test_unknown_codes_do_not_match(self, app):
+        """Test out-of-range codes yield NO_MATCH instead of an error."""
+        table = response_cache.code_table()
+        assert table.match(len(table.values["situation"]), 0, 0) == NO_MATCH
+        assert table.match(0, 0, NO_MATCH) == NO_MATCH
+
+    def test_index_fallback_agrees_with_dense_table(self, app, monkeypatch):
+        """Test rule sets too large to precompute match through the rule index."""
+        dense = response_cache.code_table()
+        monkeypatch.setattr("src.services.codes.MAX_DENSE_ENTRIES", 0)
+        sparse = CodeTable(PromptMatchingService.get_snapshot())
+        records = list(itertools.product(range(len(dense.values["situation"]) + 1), range(3), range(3)))
+        body = pack_records(records)
+        assert sparse.match_packed(body) == dense.match_packed(body)
+
+    def test_table_follows_rule_reloads(self, app, restore_rules):
+        """Test a new snapshot gets a new table and version."""
+        before = response_cache.code_table()
+        criteria = dict(list(Config.PROMPT_CRITERIA.items())[:1])
+        PromptMatchingService.rule_store.publish(RuleSnapshot.build(
+            criteria, Config.VALID_SITUATIONS, Config.VALID_LEVELS, Config.VALID_FILE_TYPES))
+        after = response_cache.code_table()
+        assert after.prompts == tuple(criteria)
+        assert after.version != before.version
+
+    def test_code_for_round_trip(self, app):
+        """Test values encode to codes that match the same prompt as the JSON path."""
+        table = response_cache.code_table()
+        name, criteria = next(iter(Config.PROMPT_CRITERIA.items()))
+        record = table.code_for(criteria["situation"], criteria["level"], criteria["file_type"])
+        assert table.prompts[table.match(*record)] == name
+        with pytest.raises(ValueError):
+            table.code_for("Unknown", criteria["level"], criteria["file_type"])
+
+class TestCodeEndpoints:
+    """Test cases for GET /api/codes and POST /api/match-codes."""
+
+    def test_code_table_revalidation(self, any_client):
+        """Test the published table carries an ETag and answers If-None-Match with 304."""
+        response = any_client.get('/api/codes')
+        assert response.status_code == 200
+        document = response.get_json()
+        assert document["situations"] == Config.VALID_SITUATIONS
+        assert document["prompts"] == list(Config.PROMPT_CRITERIA)
+        assert document["no_match"] == NO_MATCH
+        assert response.headers["ETag"] == f'"{document["version"]}"'
+
+        not_modified = any_client.get('/api/codes', headers={"If-None-Match": response.headers["ETag"]})
+        assert not_modified.status_code == 304
+
+    def test_bulk_match_agrees_with_json(self, any_client, client):
+        """Test packed records match the same prompts as the JSON endpoint."""
+        table = any_client.get('/api/codes').get_json()
+        records = list(itertools.product(range(len(table["situations"])), range(len(table["levels"])),
+                                         range(len(table["file_types"]))))
+        response = any_client.post('/api/match-codes', data=pack_records(records), headers=CODE_HEADERS)
+        assert response.status_code == 200
+        assert response.mimetype == MEDIA_TYPE
+        assert response.headers["X-Code-Table"] == table["version"]
+        results = unpack_results(response.get_data())
+        assert len(results) == len(records)
+        for (situation, level, file_type), code in zip(records, results):
+            expected = json_match(client, table["situations"][situation], table["levels"][level],
+                                  table["file_types"][file_type])
+            assert (table["prompts"][code] if code != NO_MATCH else None) == expected
+
+    def test_single_record(self, any_client):
+        """Test a single six-byte record gets a two-byte answer."""
+        table = response_cache.code_table()
+        criteria = next(iter(Config.PROMPT_CRITERIA.values()))
+        record = table.code_for(criteria["situation"], criteria["level"], criteria["file_type"])
+        response = any_client.post('/api/match-codes', data=RECORD.pack(*record), headers=CODE_HEADERS)
+        assert unpack_results(response.get_data()) == [0]
+
+    def test_empty_body(self, any_client):
+        """Test an empty body is an empty batch."""
+        response = any_client.post('/api/match-codes', data=b"", headers=CODE_HEADERS)
+        assert response.status_code == 200
+        assert response.get_data() == b""
+
+    def test_partial_record_rejected(self, any_client):
+        """Test a body that is not a whole number of records is a 400."""
+        response = any_client.post('/api/match-codes', data=b"\x00" * 7, headers=CODE_HEADERS)
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Invalid code record length"}
+
+    def test_wrong_content_type_rejected(self, any_client):
+        """Test JSON bodies are not accepted on the code endpoint."""
+        response = any_client.post('/api/match-codes', json=[[0, 0, 0]])
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Content-Type must be application/x-prompt-codes"}
+
+    def test_stale_table_version_rejected(self, any_client):
+        """Test a caller pinned to another table version gets a 409."""
+        headers = dict(CODE_HEADERS, **{"X-Code-Table": "0" * 16})
+        response = any_client.post('/api/match-codes', data=RECORD.pack(0, 0, 0), headers=headers)
+        assert response.status_code == 409
+        assert response.get_json() == {"error": "Code table changed"}
+        assert response.headers["X-Code-Table"] == response_cache.code_table().version
+
+    def test_body_size_cap(self, any_client):
+        """Test bodies over MAX_BODY_BYTES are rejected."""
+        body = RECORD.pack(0, 0, 0) * (Config.MAX_BODY_BYTES // RECORD.size + 1)
+        response = any_client.post('/api/match-codes', data=body, headers=CODE_HEADERS)
+        assert response.status_code == 413
@@ -0,0 +1,200 @@
+import gzip
+import io
+import json
+import zlib
+import pytest
+from werkzeug.test import Client
+from app import create_app, create_fast_app
+from src.servers.compression import (
+    CompressionMiddleware, DecompressingInput, DecompressionError, decompress_stream, negotiate_encoding
+)
+
+VALID_PAYLOAD = {
+    "situation": "Commercial Auto",
+    "level": "Structure",
+    "file_type": "Summary Report",
+    "data": "Test data"
+}
+
+def encode(body, coding):
+    if coding == "gzip":
+        return gzip.compress(body)
+    if coding == "raw":
+        encoder = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return encoder.compress(body) + encoder.flush()
+    return zlib.compress(body)
+
+def post_compressed(client, path, payload, coding="gzip", **kwargs):
+    body = encode(json.dumps(payload).encode(), coding)
+    return client.post(path, data=body, content_type="application/json",
+                       headers={"Content-Encoding": "deflate" if coding == "raw" else coding}, **kwargs)
+
+class TestDecompression:
+    """Test cases for compressed request bodies."""
+
+    @pytest.mark.parametrize("coding", ["gzip", "deflate", "raw"])
+    def test_compressed_match(self, any_client, coding):
+        """Test gzip, zlib and raw deflate bodies match like plain ones."""
+        response = post_compressed(any_client, '/api/match-prompt', VALID_PAYLOAD, coding)
+        assert response.status_code == 200
+        assert json.loads(response.data)["matched_prompt"] == "Prompt 1"
+
+    def test_compressed_batch(self, client):
+        """Test a compressed batch body is streamed through the batch endpoint."""
+        response = post_compressed(client, '/api/match-prompt/batch', [VALID_PAYLOAD] * 3)
+        assert [item["matched_prompt"] for item in json.loads(response.data)] == ["Prompt 1"] * 3
+
+    def test_concatenated_gzip_members(self):
+        """Test every member of a multi-member gzip body is decoded."""
+        body = gzip.compress(b"abc" * 1000) + gzip.compress(b"def")
+        output = io.BytesIO()
+        assert decompress_stream(io.BytesIO(body), len(body), "gzip", output, 10 ** 6, chunk_size=64) == 3003
+        assert output.getvalue() == b"abc" * 1000 + b"def"
+
+    def test_zip_bomb_stops_early(self):
+        """Test expansion stops at the cap instead of inflating the whole body."""
+        bomb = gzip.compress(b"\0" * (64 * 1024 * 1024))
+        output = io.BytesIO()
+        with pytest.raises(DecompressionError, match="Decompressed body too large"):
+            decompress_stream(io.BytesIO(bomb), len(bomb), "gzip", output, 1024 * 1024)
+        assert len(output.getvalue()) <= 1024 * 1024
+
+    def test_decompressed_cap_response(self):
+        """Test an over-cap body is answered with a 413."""
+        client = Client(CompressionMiddleware(create_fast_app(), max_decompressed_bytes=256))
+        response = post_compressed(client, '/api/match-prompt', dict(VALID_PAYLOAD, data="x" * 1000))
+        assert response.status_code == 413
+        assert json.loads(response.data) == {"error": "Decompressed body too large"}
+
+    def test_body_decompressed_as_read(self):
+        """Test the body is inflated as the app reads it rather than up front."""
+        lines = b"".join(b'{"item": %d}\n' % i for i in range(100000))
+        compressed = io.BytesIO(gzip.compress(lines))
+        body = DecompressingInput(compressed, None, "gzip", 10 ** 8, chunk_size=1024)
+        assert body.readline() == b'{"item": 0}\n'
+        assert body.read(12) == b'{"item": 1}\n'
+        assert compressed.tell() < len(compressed.getvalue()) / 10
+        assert list(body)[-1] == b'{"item": 99999}\n'
+        assert body.total == len(lines)
+
+    def test_streaming_endpoints_use_streaming_cap(self):
+        """Test batch and NDJSON bodies may decompress past the buffered-body cap."""
+        client = Client(CompressionMiddleware(create_app(), max_decompressed_bytes=256,
+                                              max_streamed_bytes=10 ** 6))
+        response = post_compressed(client, '/api/match-prompt/batch', [VALID_PAYLOAD] * 50)
+        assert [item["matched_prompt"] for item in json.loads(response.data)] == ["Prompt 1"] * 50
+        lines = "\n".join(json.dumps(VALID_PAYLOAD) for _ in range(50)).encode()
+        response = client.post('/api/match-prompt/stream', data=gzip.compress(lines),
+                               content_type="application/x-ndjson", headers={"Content-Encoding": "gzip"})
+        assert len(response.data.splitlines()) == 50
+        response = post_compressed(client, '/api/match-prompt', dict(VALID_PAYLOAD, data="x" * 1000))
+        assert response.status_code == 413
+
+    def test_truncated_batch_reports_error_item(self, client):
+        """Test a compressed batch cut short mid-stream ends with an error item."""
+        body = gzip.compress(json.dumps([VALID_PAYLOAD] * 2000).encode())[:-6]
+        response = client.post('/api/match-prompt/batch', data=body, content_type="application/json",
+                               headers={"Content-Encoding": "gzip"})
+        results = json.loads(response.data)
+        assert results[0]["matched_prompt"] == "Prompt 1"
+        assert results[-1] == {"index": len(results) - 1, "error": "Invalid compressed body"}
+
+    @pytest.mark.parametrize("body, coding, status, error", [
+        (b"not gzip at all", "gzip", 400, "Invalid compressed body"),
+        (gzip.compress(b'{"situation": "x"}')[:-6], "gzip", 400, "Invalid compressed body"),
+        (b"{}", "br", 415, "Unsupported Content-Encoding")
+    ])
+    def test_rejected_bodies(self, any_client, body, coding, status, error):
+        """Test corrupt, truncated and unsupported bodies get fixed errors."""
+        response = any_client.post('/api/match-prompt', data=body, content_type="application/json",
+                                   headers={"Content-Encoding": coding})
+        assert response.status_code == status
+        assert json.loads(response.data) == {"error": error}
+
+class TestResponseCompression:
+    """Test cases for negotiated response compression."""
+
+    @pytest.mark.parametrize("header, expected", [
+        ("gzip, deflate", "gzip"),
+        ("deflate", "deflate"),
+        ("gzip;q=0.5, deflate", "deflate"),
+        ("gzip;q=0, identity", None),
+        ("*", "gzip"),
+        ("*, gzip;q=0", "deflate"),
+        ("br", None),
+        (None, None)
+    ])
+    def test_negotiate(self, header, expected):
+        """Test Accept-Encoding parsing honours q-values."""
+        assert negotiate_encoding(header) == expected
+
+    def test_small_response_skipped(self, any_client):
+        """Test a single match is below the threshold and sent as is."""
+        response = any_client.post('/api/match-prompt', json=VALID_PAYLOAD, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+        assert json.loads(response.data)["matched_prompt"] == "Prompt 1"
+
+    def test_large_response_compressed(self, client):
+        """Test large responses are gzipped with a weak ETag that still revalidates."""
+        plain = client.get('/api/rules')
+        response = client.get('/api/rules', headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert int(response.headers["Content-Length"]) == len(response.data) < len(plain.data)
+        assert gzip.decompress(response.data) == plain.data
+        assert response.headers["ETag"] == "W/" + plain.headers["ETag"]
+        revalidated = client.get('/api/rules', headers={"Accept-Encoding": "gzip",
+                                                        "If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+
+    def test_uncompressed_large_response_varies(self, client):
+        """Test a large response not compressed for this client still carries Vary."""
+        response = client.get('/api/rules')
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["Vary"] == "Accept-Encoding"
+
+    def test_streamed_response_compressed(self, client):
+        """Test a streamed batch response is deflated as it streams."""
+        payload = [VALID_PAYLOAD] * 500
+        plain = client.post('/api/match-prompt/batch', json=payload)
+        response = client.post('/api/match-prompt/batch', json=payload, headers={"Accept-Encoding": "deflate"})
+        assert response.headers["Content-Encoding"] == "deflate"
+        assert "Content-Length" not in response.headers
+        assert zlib.decompress(response.data) == plain.data
+        assert len(response.data) < len(plain.data) / 10
+
+    def test_lazy_app_streams(self):
+        """Test an app calling start_response on first iteration is compressed without being buffered."""
+        produced = []
+
+        def app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            for i in range(3):
+                produced.append(i)
+                yield b"x" * 2048
+
+        middleware = CompressionMiddleware(app, 1024, chunk_size=1024)
+        chunks = iter(middleware({"HTTP_ACCEPT_ENCODING": "gzip"}, lambda status, headers, exc_info=None: None))
+        first = next(chunks)
+        assert produced == [0]
+        assert gzip.decompress(first + b"".join(chunks)) == b"x" * 6144
+
+    def test_app_without_start_response(self):
+        """Test a body iterable that never calls start_response passes through untouched."""
+        def app(environ, start_response):
+            return iter(())
+
+        middleware = CompressionMiddleware(app, 1024)
+        assert list(middleware({"HTTP_ACCEPT_ENCODING": "gzip"}, lambda status, headers, exc_info=None: None)) == [b""]
+
+    def test_disabled(self, monkeypatch):
+        """Test COMPRESSION_ENABLED=false leaves bodies untouched."""
+        from config.config import Config
+        monkeypatch.setattr(Config, "COMPRESSION_ENABLED", False)
+        try:
+            client = create_app().test_client()
+            response = client.get('/api/rules', headers={"Accept-Encoding": "gzip"})
+            assert "Content-Encoding" not in response.headers
+        finally:
+            monkeypatch.undo()
+            create_app()
@@ -0,0 +1,183 @@
+import io
+import json
+import tracemalloc
+import pytest
+from werkzeug.test import Client, EnvironBuilder
+from config.config import Config
+from src.utils.intake import IntakeError, StreamedObject, StreamingIntake, streaming_intake
+
+VALID_PAYLOAD = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": ""}
+
+class GeneratedBody:
+    """Request body produced on the fly: prefix, size bytes of filler, suffix."""
+
+    def __init__(self, prefix: bytes, size: int, suffix: bytes, filler: bytes = b"lorem ipsum "):
+        self.parts = [prefix, suffix]
+        self.remaining = size
+        self.filler = filler * (65536 // len(filler))
+        self.length = len(prefix) + size + len(suffix)
+
+    def read(self, size: int = -1) -> bytes:
+        if self.parts[0]:
+            chunk, self.parts[0] = self.parts[0], b""
+            return chunk
+        if self.remaining:
+            chunk = self.filler[:min(size if size > 0 else len(self.filler), self.remaining)]
+            self.remaining -= len(chunk)
+            return chunk
+        chunk, self.parts[1] = self.parts[1], b""
+        return chunk
+
+def document_body(size: int, **fields) -> GeneratedBody:
+    """Body of a match request whose data value is ``size`` generated bytes."""
+    head = json.dumps(dict(VALID_PAYLOAD, **fields, data=""))[:-3]  # up to the opening quote of data
+    return GeneratedBody(head.encode("utf-8") + b'"', size, b'"}')
+
+@pytest.fixture
+def streaming_app(monkeypatch):
+    from app import create_app, create_fast_app
+    monkeypatch.setattr(Config, "STREAMING_INTAKE", True)
+    monkeypatch.setattr(Config, "MAX_DATA_LENGTH", 0)
+    try:
+        yield create_app(), create_fast_app()
+    finally:
+        monkeypatch.undo()
+        create_app()
+
+def call(app, body, query_string=""):
+    """Call a WSGI app with a generated body, returning (status, headers, response iterable)."""
+    environ = EnvironBuilder(path='/api/match-prompt', method="POST", query_string=query_string,
+                             content_type="application/json").get_environ()
+    environ.update({"wsgi.input": body, "CONTENT_LENGTH": str(body.length)})
+    captured = []
+    result = app(environ, lambda status, headers, exc_info=None: captured.extend((status, headers)))
+    return captured[0], dict(captured[1]), result
+
+class TestStreamingIntake:
+    """Test cases for the incremental JSON object reader."""
+
+    @pytest.mark.parametrize("body", [
+        json.dumps(dict(VALID_PAYLOAD, data="xé\\\"\n\U0001F600" * 5000)),
+        json.dumps(dict(VALID_PAYLOAD, data="xé\U0001F600\ud800" * 5000), ensure_ascii=False),
+        json.dumps(dict(VALID_PAYLOAD, data=None, extra=[1, {"a": "b"}])),
+        '{"data": "first", "data": "' + "y" * 10000 + '"}',
+        "{}", "null", "[1, 2]", "  7 "
+    ])
+    def test_matches_json_loads(self, body):
+        """Test streamed decoding gives the same document as json.loads."""
+        intake = StreamingIntake()
+        intake.configure({"STREAMING_CHUNK_BYTES": 97, "STREAMING_SPOOL_MEMORY_BYTES": 512})
+        raw = body.encode("utf-8", "surrogatepass")
+        result = intake.read(io.BytesIO(raw), len(raw))
+        if isinstance(result, StreamedObject):
+            decoded = dict(result.fields)
+            for name, text in result.spooled.items():
+                decoded[name] = "".join(text.chunks())
+                assert text.length == len(decoded[name])
+            result.close()
+            result = decoded
+        assert result == json.loads(raw)
+
+    @pytest.mark.parametrize("body", ["", "{", '{"data": "abc', '{"data": "a\\q"}', '{"data": "\x01"}',
+                                      '{"a": 1}x', '{"a" 1}', '{"a": 1,}', b'{"data": "\xff"}'])
+    def test_invalid_json(self, body):
+        """Test malformed bodies are rejected."""
+        raw = body if isinstance(body, bytes) else body.encode("utf-8")
+        with pytest.raises(IntakeError, match="Invalid JSON format"):
+            StreamingIntake().read(io.BytesIO(raw), len(raw))
+
+    def test_early_malformed_value_fails_fast(self):
+        """Test a malformed field before a large value is rejected without reading the rest."""
+        intake = StreamingIntake()
+        intake.configure({"MAX_BODY_BYTES": 1024, "STREAMING_CHUNK_BYTES": 64})
+        stream = io.BytesIO(b'{"level": tru, "padding": "' + b"x" * 100000 + b'"}')
+        with pytest.raises(IntakeError, match="Invalid JSON format"):
+            intake.read(stream, None)
+        assert stream.tell() <= 64
+
+    def test_body_caps(self):
+        """Test the declared and streamed body caps and the in-memory field cap."""
+        intake = StreamingIntake()
+        intake.configure({"STREAMING_MAX_BODY_BYTES": 1000, "MAX_BODY_BYTES": 100, "STREAMING_CHUNK_BYTES": 64})
+        with pytest.raises(IntakeError, match="too large"):
+            intake.read(io.BytesIO(b""), 1001)
+        with pytest.raises(IntakeError, match="too large"):
+            intake.read(document_body(2000), None)
+        with pytest.raises(IntakeError, match="too large"):
+            intake.read(io.BytesIO(json.dumps({"other": "z" * 500}).encode()), None)
+        document = intake.read(document_body(900), None)
+        assert document.spooled["data"].length == 900
+
+    def test_spool_moves_to_disk(self):
+        """Test large kept values spill to a temp file and counted values keep nothing."""
+        intake = StreamingIntake()
+        intake.configure({"STREAMING_SPOOL_MEMORY_BYTES": 4096})
+        kept = intake.read(document_body(100000), None)
+        assert kept.spooled["data"].on_disk
+        assert sum(len(text) for text in kept.spooled["data"].chunks()) == 100000
+        kept.close()
+
+        counted = intake.read(document_body(100000), None, keep_text=False)
+        assert counted.spooled["data"].length == 100000
+        assert not counted.spooled["data"].kept
+
+class TestStreamedRequests:
+    """Test cases for /api/match-prompt with STREAMING_INTAKE enabled."""
+
+    def test_parity_with_buffered_path(self, streaming_app, monkeypatch):
+        """Test streamed requests get the same responses as buffered ones."""
+        app, fast_app = streaming_app
+        assert streaming_intake.enabled
+        bodies = [json.dumps(payload) for payload in (
+            VALID_PAYLOAD, dict(VALID_PAYLOAD, data="x" * 200000), dict(VALID_PAYLOAD, file_type="Deposition"),
+            {"situation": "Commercial Auto", "data": "x" * 200000}, dict(VALID_PAYLOAD, data=7), None, [1]
+        )] + ["{broken", ""]
+        for test_client in (app.test_client(), Client(fast_app)):
+            for body in bodies:
+                for path in ('/api/match-prompt', '/api/match-prompt?render=1'):
+                    streamed = test_client.post(path, data=body, content_type="application/json")
+                    monkeypatch.setattr(streaming_intake, "enabled", False)
+                    buffered = test_client.post(path, data=body, content_type="application/json")
+                    monkeypatch.setattr(streaming_intake, "enabled", True)
+                    assert (streamed.status_code, streamed.get_data()) == (buffered.status_code, buffered.get_data())
+
+    def test_data_cap_and_render(self, streaming_app, monkeypatch):
+        """Test the data length cap still applies and rendering streams spooled data."""
+        app, fast_app = streaming_app
+        for wsgi_app in (app, fast_app):
+            status, headers, result = call(wsgi_app, document_body(300000), "render=1")
+            body = b"".join(result)
+            assert status.startswith("200")
+            assert "Content-Length" not in headers
+            response = json.loads(body)
+            assert response["prompt"].endswith("lorem ipsum " * 3)
+            assert len(response["prompt"]) > 300000
+
+        from app import create_fast_app
+        monkeypatch.setattr(Config, "MAX_DATA_LENGTH", 1000)
+        status, _, result = call(create_fast_app(), document_body(300000), "render=1")
+        assert status.startswith("413")
+        assert json.loads(b"".join(result)) == {"error": "Data exceeds maximum length"}
+
+    @pytest.mark.parametrize("render", [False, True])
+    def test_flat_memory_for_100mb_documents(self, streaming_app, render):
+        """Test a 100 MB document is matched (and rendered) without buffering it."""
+        _, fast_app = streaming_app
+        size = 100 * 1024 * 1024
+        tracemalloc.start()
+        try:
+            status, _, result = call(fast_app, document_body(size), "render=1" if render else "")
+            received = 0
+            head = b""
+            for chunk in result:
+                received += len(chunk)
+                head = head or chunk
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert status.startswith("200")
+        assert b'"matched_prompt":"Prompt 1"' in head
+        if render:
+            assert received > size
+        assert peak < 8 * 1024 * 1024
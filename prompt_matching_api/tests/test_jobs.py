@@ -0,0 +1,228 @@
+import threading
+import time
+import pytest
+from config.config import Config
+from src.services.jobs import JobQueue, job_queue, load_processor
+from src.services.prompt_service import PromptMatchingService
+from src.services.templates import template_cache
+
+VALID_PAYLOAD = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": "doc"}
+DEPOSITION_PAYLOAD = {"situation": "General Liability", "level": "Summarize", "file_type": "Deposition", "data": "doc"}
+
+processed = []
+release = threading.Event()
+
+def recording_processor(prompt_name, template, payload):
+    """Processor that waits for the test to release it, recording the order jobs ran in."""
+    release.wait(5)
+    processed.append(prompt_name)
+    return {"length": len(payload["data"])}
+
+def failing_processor(prompt_name, template, payload):
+    raise RuntimeError("downstream unavailable")
+
+@pytest.fixture
+def queue():
+    processed.clear()
+    release.clear()
+    jobs = JobQueue()
+    yield jobs
+    release.set()
+    jobs.shutdown()
+
+def wait_until_running(queue):
+    deadline = time.monotonic() + 5
+    while queue.stats()["running"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+def submit(queue, payload):
+    snapshot = PromptMatchingService.get_snapshot()
+    return queue.submit(PromptMatchingService.evaluate(payload, snapshot).prompt_name, payload, snapshot)
+
+class TestJobQueue:
+    """Test cases for the background job queue."""
+
+    def test_priority_order(self, queue):
+        """Test queued jobs run by prompt priority, then in submission order."""
+        queue.configure({"JOB_WORKERS": 1, "JOB_PROCESSOR": "tests.test_jobs:recording_processor",
+                         "JOB_PRIORITIES": {"Prompt 2": 0}})
+        blocker = submit(queue, VALID_PAYLOAD)
+        wait_until_running(queue)
+        jobs = [submit(queue, payload) for payload in (VALID_PAYLOAD, DEPOSITION_PAYLOAD, VALID_PAYLOAD)]
+        assert queue.stats()["queued_by_prompt"] == {"Prompt 1": 2, "Prompt 2": 1}
+        release.set()
+        assert all(job.wait(5) for job in [blocker] + jobs)
+        assert processed == ["Prompt 1", "Prompt 2", "Prompt 1", "Prompt 1"]
+        assert jobs[0].to_dict()["result"] == {"length": 3}
+        assert jobs[0].payload is None
+
+    def test_queue_bound(self, queue):
+        """Test submissions beyond JOB_QUEUE_SIZE are rejected."""
+        queue.configure({"JOB_WORKERS": 1, "JOB_QUEUE_SIZE": 1, "JOB_PROCESSOR": "tests.test_jobs:recording_processor"})
+        submit(queue, VALID_PAYLOAD)
+        wait_until_running(queue)
+        assert submit(queue, VALID_PAYLOAD) is not None
+        assert submit(queue, VALID_PAYLOAD) is None
+        assert queue.stats()["rejected"] == 1
+
+    def test_queue_byte_bound(self, queue):
+        """Test submissions are rejected once queued payloads would pass JOB_QUEUE_MAX_BYTES."""
+        queue.configure({"JOB_WORKERS": 1, "JOB_QUEUE_MAX_BYTES": 64 * 1024,
+                         "JOB_PROCESSOR": "tests.test_jobs:recording_processor"})
+        submit(queue, VALID_PAYLOAD)
+        wait_until_running(queue)
+        assert submit(queue, dict(VALID_PAYLOAD, data="x" * 100000)) is None
+        assert submit(queue, VALID_PAYLOAD) is not None
+        stats = queue.stats()
+        assert 0 < stats["queued_bytes"] < 64 * 1024 and stats["rejected"] == 1
+
+    def test_result_byte_bound(self, queue):
+        """Test kept results stay within JOB_RESULT_MAX_BYTES, dropping the oldest first."""
+        queue.configure({"JOB_WORKERS": 1, "JOB_RESULT_MAX_BYTES": 250 * 1000})
+        jobs = []
+        for _ in range(5):
+            job = submit(queue, dict(VALID_PAYLOAD, data="x" * 100000))
+            assert job.wait(5)
+            jobs.append(job)
+        stats = queue.stats()
+        assert 200 * 1000 < stats["retained_bytes"] <= 250 * 1000
+        assert [queue.get(job.job_id) is not None for job in jobs] == [False, False, False, True, True]
+        assert jobs[0].to_dict()["result"]["prompt"].endswith("x")
+
+    def test_worker_outliving_shutdown(self, queue):
+        """Test a worker still running after its shutdown timed out never touches the new queue."""
+        queue.configure({"JOB_WORKERS": 1, "JOB_PROCESSOR": "tests.test_jobs:recording_processor"})
+        old = submit(queue, VALID_PAYLOAD)
+        wait_until_running(queue)
+        queue.shutdown(timeout=0.01)
+        new = submit(queue, DEPOSITION_PAYLOAD)
+        release.set()
+        assert old.wait(5) and new.wait(5)
+        stats = queue.stats()
+        assert (stats["running"], stats["submitted"], stats["completed"]) == (0, 1, 1)
+        assert queue.get(old.job_id) is None and queue.get(new.job_id) is new
+
+    def test_failure_and_expiry(self, queue):
+        """Test a failing processor marks the job failed and finished jobs expire."""
+        queue.configure({"JOB_WORKERS": 1, "JOB_PROCESSOR": "tests.test_jobs:failing_processor",
+                         "JOB_RESULT_TTL": 0})
+        job = submit(queue, VALID_PAYLOAD)
+        assert job.wait(5)
+        assert job.to_dict()["error"] == "Job processing failed"
+        assert queue.stats()["failed"] == 1
+        assert queue.get(job.job_id) is None
+
+    def test_shutdown_cancels_queued(self, queue):
+        """Test queued jobs are failed, not left waiting, when workers stop."""
+        queue.configure({"JOB_WORKERS": 1, "JOB_PROCESSOR": "tests.test_jobs:recording_processor"})
+        submit(queue, VALID_PAYLOAD)
+        wait_until_running(queue)
+        queued = submit(queue, VALID_PAYLOAD)
+        release.set()
+        queue.shutdown()
+        assert queued.finished and queued.error == "Job cancelled"
+
+    def test_process_executor(self, queue):
+        """Test the default processor runs in a process pool."""
+        queue.configure({"JOB_WORKERS": 1, "JOB_EXECUTOR": "process"})
+        job = submit(queue, VALID_PAYLOAD)
+        assert job.wait(30)
+        assert job.to_dict()["result"]["prompt"].endswith("\n\ndoc")
+
+    @pytest.mark.parametrize("config", [{"JOB_PROCESSOR": "no_colon"}, {"JOB_PROCESSOR": "os:nothing_here"},
+                                        {"JOB_EXECUTOR": "fiber"}])
+    def test_invalid_config(self, queue, config):
+        """Test misconfiguration fails at configure time."""
+        with pytest.raises(ValueError):
+            queue.configure(config)
+
+    def test_default_processor(self):
+        """Test the default processor is the template renderer."""
+        assert load_processor(None).__name__ == "render_prompt"
+
+    def test_jobs_share_compiled_templates(self, queue):
+        """Test jobs carry the template compiled by the shared template cache."""
+        queue.configure({"JOB_WORKERS": 1})
+        jobs = [submit(queue, VALID_PAYLOAD) for _ in range(2)]
+        assert jobs[0].template is jobs[1].template
+        assert jobs[0].template is template_cache.get(PromptMatchingService.get_snapshot(), "Prompt 1")
+        assert all(job.wait(5) for job in jobs)
+
+    @pytest.mark.parametrize("workers, overrides", [(1, {}), (4, {"JOB_WORKERS": 0})])
+    def test_prefork_workers(self, monkeypatch, workers, overrides):
+        """Test the job API is turned off when several prefork workers would split the jobs."""
+        from app import prefork_overrides
+        monkeypatch.setattr(Config, "JOB_WORKERS", 2)
+        assert prefork_overrides(workers) == overrides
+        assert Config.JOB_WORKERS == 2
+
+@pytest.fixture
+def app(admin_token):
+    """Create a test app with the job API enabled."""
+    from app import create_app
+    app = create_app({"JOB_WORKERS": 2})
+    app.config['TESTING'] = True
+    yield app
+    create_app()
+
+class TestJobAPI:
+    """Test cases for the job endpoints."""
+
+    def test_submit_and_poll(self, client):
+        """Test a job is accepted with an id and its result long-polled."""
+        response = client.post('/api/jobs', json=VALID_PAYLOAD)
+        assert response.status_code == 202
+        body = response.get_json()
+        assert body["matched_prompt"] == "Prompt 1" and body["status"] == "queued"
+        assert response.headers["Location"] == f"/api/jobs/{body['job_id']}"
+
+        result = client.get(f"/api/jobs/{body['job_id']}?wait=10").get_json()
+        assert result["status"] == "done"
+        assert result["result"]["prompt"].endswith("\n\ndoc")
+
+    def test_validation_errors_match_sync_api(self, client):
+        """Test invalid payloads get the same errors as /api/match-prompt and are not queued."""
+        for payload in (dict(VALID_PAYLOAD, level=""), dict(VALID_PAYLOAD, file_type="Deposition"), [1]):
+            expected = client.post('/api/match-prompt', json=payload)
+            response = client.post('/api/jobs', json=payload)
+            assert (response.status_code, response.get_json()) == (expected.status_code, expected.get_json())
+        assert job_queue.stats()["submitted"] == 0
+
+    def test_body_size_cap(self, app, client):
+        """Test bodies over MAX_BODY_BYTES are rejected before being queued."""
+        app.config['MAX_BODY_BYTES'] = 128
+        response = client.post('/api/jobs', json=dict(VALID_PAYLOAD, data="x" * 200))
+        assert response.status_code == 413
+        assert response.get_json() == {"error": "Request body too large"}
+        assert job_queue.stats()["submitted"] == 0
+
+    def test_unknown_job_and_bad_wait(self, client):
+        """Test unknown ids get a 404 and a malformed wait a 400."""
+        assert client.get('/api/jobs/nope').get_json() == {"error": "Job not found"}
+        job_id = client.post('/api/jobs', json=VALID_PAYLOAD).get_json()["job_id"]
+        assert client.get(f'/api/jobs/{job_id}?wait=soon').status_code == 400
+
+    def test_queue_full(self, client, monkeypatch):
+        """Test a full queue answers 503."""
+        monkeypatch.setattr(job_queue, "max_queued", 0)
+        response = client.post('/api/jobs', json=VALID_PAYLOAD)
+        assert response.status_code == 503
+        assert response.get_json() == {"error": "Job queue full"}
+
+    def test_admin_and_metrics(self, client, admin_headers):
+        """Test queue depth, waits and utilization are reported."""
+        job_id = client.post('/api/jobs', json=VALID_PAYLOAD).get_json()["job_id"]
+        client.get(f"/api/jobs/{job_id}?wait=10")
+        stats = client.get('/admin/jobs', headers=admin_headers).get_json()
+        assert stats["completed"] == 1 and stats["queue_depth"] == 0
+        assert stats["wait_seconds"]["count"] == 1
+        assert 0 < stats["utilization"] <= 1
+        assert 'prompt_api_jobs_total{outcome="completed"} 1' in client.get('/metrics').get_data(as_text=True)
+
+    def test_disabled_by_default(self, admin_headers):
+        """Test the job API is off unless JOB_WORKERS is set."""
+        from app import create_app
+        assert Config.JOB_WORKERS == 0
+        client = create_app().test_client()
+        assert client.post('/api/jobs', json=VALID_PAYLOAD).status_code == 404
+        assert client.get('/admin/jobs', headers=admin_headers).status_code == 404
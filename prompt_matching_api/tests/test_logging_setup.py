@@ -0,0 +1,41 @@
+import logging
+import queue
+from src.utils.logging_setup import (
+    DroppingQueueHandler, SuccessSampler, log_stats, redact_payload
+)
+
+class TestLoggingSetup:
+    """Test cases for the queue-based logging pipeline helpers."""
+
+    def test_redact_truncates_large_data(self):
+        """Test large payload values are truncated with their length."""
+        payload = {"situation": "Commercial Auto", "data": "x" * 100000}
+        redacted = redact_payload(payload)
+        assert redacted["situation"] == "Commercial Auto"
+        assert len(redacted["data"]) < 300
+        assert "100000 chars" in redacted["data"]
+
+    def test_redact_non_dict(self):
+        """Test non-dict payloads are summarised by type."""
+        assert redact_payload([1, 2, 3]) == "<list>"
+
+    def test_sampler_counts_dropped(self):
+        """Test sampled-out requests are counted."""
+        log_stats.reset()
+        assert not any(SuccessSampler(0.0).sample() for _ in range(10))
+        assert all(SuccessSampler(1.0).sample() for _ in range(5))
+        assert log_stats.snapshot() == {"sampled_in": 5, "sampled_out": 10, "queue_full": 0}
+
+    def test_full_queue_drops_without_blocking(self):
+        """Test records are dropped and counted when the queue is full."""
+        log_stats.reset()
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        test_logger = logging.getLogger("tests.logging_setup")
+        test_logger.addHandler(handler)
+        test_logger.propagate = False
+        try:
+            test_logger.warning("first")
+            test_logger.warning("second")
+        finally:
+            test_logger.removeHandler(handler)
+        assert log_stats.snapshot()["queue_full"] == 1
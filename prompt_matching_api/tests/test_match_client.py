@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+import pytest
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+from app import create_app, create_fast_app
+from src.client import AsyncMatchClient, MatchClient, MatchError
+
+VALID_PAYLOAD = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": ""}
+INVALID_PAYLOAD = dict(VALID_PAYLOAD, file_type="Deposition")
+
+class KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+class RecordingApp:
+    """WSGI wrapper recording request paths and client ports, optionally failing first."""
+
+    def __init__(self, app, failures: int = 0):
+        self.app = app
+        self.failures = failures
+        self.paths = []
+        self.ports = set()
+
+    def __call__(self, environ, start_response):
+        self.paths.append(environ["PATH_INFO"])
+        self.ports.add(environ.get("REMOTE_PORT"))
+        if self.failures > 0:
+            self.failures -= 1
+            start_response("503 SERVICE UNAVAILABLE", [("Content-Type", "application/json"),
+                                                       ("Content-Length", "2"), ("Retry-After", "0")])
+            return [b"{}"]
+        return self.app(environ, start_response)
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(app):
+        server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+class TestMatchClient:
+    """Test cases for the pooled, batching match client."""
+
+    def test_concurrent_calls_are_batched(self, serve):
+        """Test concurrent calls share batch requests and pooled connections."""
+        app = RecordingApp(create_app())
+        with MatchClient(serve(app), pool_size=2, batch_window=0.05) as client:
+            results = client.match_many([VALID_PAYLOAD, INVALID_PAYLOAD] * 20, return_exceptions=True)
+        assert results[0::2] == ["Prompt 1"] * 20
+        assert all(isinstance(error, MatchError) and error.status_code == 400 and str(error) == "Invalid Prompt"
+                   for error in results[1::2])
+        assert set(app.paths) == {"/api/match-prompt/batch"}
+        assert len(app.paths) < 5
+        assert len(app.ports) <= 2
+
+    def test_single_calls_and_errors(self, serve, capped_app):
+        """Test lone calls use the single endpoint and surface error statuses."""
+        app = RecordingApp(capped_app)
+        with MatchClient(serve(app), batch_window=0) as client:
+            assert client.match(VALID_PAYLOAD) == "Prompt 1"
+            with pytest.raises(MatchError) as error:
+                client.match(dict(VALID_PAYLOAD, data="x" * 20000))
+            assert (str(error.value), error.value.status_code) == ("Data exceeds maximum length", 413)
+        assert app.paths == ["/api/match-prompt", "/api/match-prompt"]
+
+    def test_falls_back_without_batch_endpoint(self, serve):
+        """Test batches are resent as single requests to the WSGI fast path."""
+        app = RecordingApp(create_fast_app())
+        with MatchClient(serve(app), batch_window=0.05) as client:
+            assert client.match_many([VALID_PAYLOAD] * 4) == ["Prompt 1"] * 4
+            assert not client.batch_supported
+        assert app.paths.count("/api/match-prompt") == 4
+
+    def test_malformed_batch_items_fail_their_calls(self, serve):
+        """Test items that are not result objects fail their futures instead of leaving them pending."""
+        def app(environ, start_response):
+            body = b'["oops", {"index": 1}, {"index": 2, "matched_prompt": "Prompt 1"}]'
+            start_response("200 OK", [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+            return [body]
+
+        with MatchClient(serve(app), batch_window=0.05) as client:
+            futures = [client.submit(VALID_PAYLOAD) for _ in range(3)]
+            errors = [future.exception(timeout=5) for future in futures]
+        assert [str(error) for error in errors[:2]] == ["Missing result in batch response",
+                                                        "Malformed result in batch response"]
+        assert errors[2] is None and futures[2].result() == "Prompt 1"
+
+    def test_retries_with_backoff(self, serve):
+        """Test retryable statuses are retried until the retry budget runs out."""
+        with MatchClient(serve(RecordingApp(create_app(), failures=2)), retries=2, backoff=0.001) as client:
+            assert client.match(VALID_PAYLOAD) == "Prompt 1"
+        with MatchClient(serve(RecordingApp(create_app(), failures=5)), retries=1, backoff=0.001) as client:
+            with pytest.raises(MatchError) as error:
+                client.match(VALID_PAYLOAD)
+            assert error.value.status_code == 503
+
+    def test_connection_errors(self):
+        """Test unreachable servers raise after retrying."""
+        with MatchClient("http://127.0.0.1:9", retries=1, backoff=0.001, timeout=0.5) as client:
+            with pytest.raises(requests.ConnectionError):
+                client.match(VALID_PAYLOAD)
+
+    def test_close_racing_submit(self, serve):
+        """Test every payload submitted while closing is either refused or resolved."""
+        client = MatchClient(serve(RecordingApp(create_app())), batch_window=0.001)
+        futures = []
+
+        def submit_until_closed():
+            while True:
+                try:
+                    futures.append(client.submit(VALID_PAYLOAD))
+                except RuntimeError:
+                    return
+
+        threads = [threading.Thread(target=submit_until_closed) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while len(futures) < 50:
+            time.sleep(0.001)
+        client.close()
+        for thread in threads:
+            thread.join(5)
+        assert all(future.result(timeout=5) == "Prompt 1" for future in futures)
+        with pytest.raises(RuntimeError):
+            client.submit(VALID_PAYLOAD)
+
+    def test_async_api(self, serve):
+        """Test the asyncio client batches calls from concurrent tasks."""
+        app = RecordingApp(create_app())
+        base_url = serve(app)
+
+        async def run():
+            async with AsyncMatchClient(base_url, batch_window=0.05) as client:
+                return await client.match_many([VALID_PAYLOAD] * 10)
+
+        assert asyncio.run(run()) == ["Prompt 1"] * 10
+        assert app.paths == ["/api/match-prompt/batch"]
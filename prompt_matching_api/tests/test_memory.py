@@ -0,0 +1,103 @@
+import io
+import threading
+import time
+import tracemalloc
+import pytest
+from config.config import Config
+from src.utils.memory import MemoryDiagnostics, MemoryTrackingMiddleware, SizeHistogram, memory_diagnostics
+
+VALID_PAYLOAD = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": ""}
+
+@pytest.fixture
+def memory_client(monkeypatch):
+    from app import create_app
+    monkeypatch.setattr(Config, "MEMORY_DIAGNOSTICS_ENABLED", True)
+    try:
+        yield create_app().test_client()
+    finally:
+        monkeypatch.undo()
+        create_app()
+
+class TestMemoryDiagnostics:
+    """Test cases for memory diagnostics mode."""
+
+    def test_size_histogram(self):
+        """Test sizes land in power-of-four buckets."""
+        histogram = SizeHistogram()
+        for size in (10, 1024, 1025, 10 ** 9):
+            histogram.observe(size)
+        summary = histogram.snapshot()
+        assert summary["count"] == 4
+        assert summary["max_bytes"] == 10 ** 9
+        assert [bucket["count"] for bucket in summary["buckets"]][:2] == [2, 1]
+        assert summary["buckets"][-1] == {"le": "+Inf", "count": 1}
+
+    def test_request_accounting(self, memory_client, admin_headers):
+        """Test body sizes, request peaks and allocation sites are reported."""
+        assert tracemalloc.is_tracing()
+        memory_client.post('/api/match-prompt', json=dict(VALID_PAYLOAD, data="x" * 5000))
+        memory_client.post('/api/match-prompt', json=VALID_PAYLOAD)
+
+        report = memory_client.get('/admin/memory?limit=5', headers=admin_headers).get_json()
+        assert report["body_sizes"]["count"] == 2
+        assert report["body_sizes"]["max_bytes"] > 5000
+        assert report["request_peaks"]["count"] == 2
+        largest = report["largest_requests"][0]
+        assert largest["path"] == "/api/match-prompt"
+        assert largest["peak_bytes"] > 5000
+        assert 0 < len(report["top_allocations"]) <= 5
+        assert "growth_since_baseline" in report
+
+        assert memory_client.post('/admin/memory/baseline', headers=admin_headers).status_code == 200
+        text = memory_client.get('/metrics').get_data(as_text=True)
+        # Every request is counted, including the two admin calls
+        assert 'prompt_api_request_body_bytes_count 4' in text
+
+    def test_small_request_reports_small_peak(self, memory_client, admin_headers):
+        """Test a small request's peak reflects its own work, not a buffer the size of MAX_BODY_BYTES."""
+        memory_client.post('/api/match-prompt', json=VALID_PAYLOAD)
+        report = memory_client.get('/admin/memory', headers=admin_headers).get_json()
+        match_peak = next(request for request in report["largest_requests"] if request["path"] == "/api/match-prompt")
+        assert match_peak["peak_bytes"] < 256 * 1024
+        assert Config.MAX_BODY_BYTES > 256 * 1024
+
+    def test_multithreaded_requests_measured_one_at_a_time(self):
+        """Test traced requests do not overlap, so none resets another's peak."""
+        active = []
+        overlaps = []
+
+        def app(environ, start_response):
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.01)
+            active.pop()
+            start_response("200 OK", [])
+            return [b"ok"]
+
+        diagnostics = MemoryDiagnostics()
+        middleware = MemoryTrackingMiddleware(app, diagnostics)
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            threads = [
+                threading.Thread(target=middleware, args=(
+                    {"wsgi.input": io.BytesIO(b""), "wsgi.multithread": True}, lambda *args: None
+                ))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            if started:
+                tracemalloc.stop()
+        assert overlaps == [1, 1, 1, 1]
+        assert diagnostics.request_peaks.snapshot()["count"] == 4
+
+    def test_disabled(self, client, admin_headers):
+        """Test diagnostics are off by default."""
+        assert not memory_diagnostics.enabled
+        assert not tracemalloc.is_tracing()
+        assert client.get('/admin/memory', headers=admin_headers).status_code == 404
@@ -0,0 +1,63 @@
+from config.config import Config
+from src.services.response_cache import ResponseCache
+from src.utils.metrics import MetricsRegistry, metrics
+
+VALID_PAYLOAD = {
+    "situation": "Commercial Auto",
+    "level": "Structure",
+    "file_type": "Summary Report",
+    "data": ""
+}
+
+class TestMetrics:
+    """Test cases for stage metrics and the /metrics endpoint."""
+
+    def test_metrics_endpoint(self, client):
+        """Test stage histograms and outcome counters are exposed."""
+        metrics.reset()
+        client.post('/api/match-prompt', json=VALID_PAYLOAD)
+        client.post('/api/match-prompt', json=VALID_PAYLOAD)
+        client.post('/api/match-prompt', json={"situation": "Commercial Auto"})
+
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert 'prompt_api_stage_duration_seconds_count{stage="parse_json"} 3' in text
+        assert 'prompt_api_stage_duration_seconds_count{stage="validate_request"} 3' in text
+        assert 'prompt_api_matches_total{prompt="Prompt 1"} 2' in text
+        assert 'prompt_api_errors_total{error="Missing Data"} 1' in text
+        assert 'prompt_api_stage_duration_seconds_bucket{stage="parse_json",le="+Inf"} 3' in text
+
+    def test_every_stage_timed_on_repeated_requests(self, any_client):
+        """Test memoized matches and the fast path still record every stage."""
+        metrics.reset()
+        for _ in range(3):
+            any_client.post('/api/match-prompt', json=VALID_PAYLOAD)
+
+        text = metrics.render()
+        for stage in ("parse_json", "validate_request", "match_prompt", "serialize_response"):
+            assert f'prompt_api_stage_duration_seconds_count{{stage="{stage}"}} 3' in text
+
+    def test_histogram_buckets(self):
+        """Test observations land in cumulative buckets."""
+        registry = MetricsRegistry()
+        registry.observe("stage", 500)
+        registry.observe("stage", 3_000)
+        registry.observe("stage", 10**12)
+        text = registry.render()
+        assert 'prompt_api_stage_duration_seconds_bucket{stage="stage",le="1e-06"} 1' in text
+        assert 'prompt_api_stage_duration_seconds_bucket{stage="stage",le="5e-06"} 2' in text
+        assert 'prompt_api_stage_duration_seconds_bucket{stage="stage",le="0.1"} 2' in text
+        assert 'prompt_api_stage_duration_seconds_bucket{stage="stage",le="+Inf"} 3' in text
+
+    def test_disabled_removes_instrumentation(self, monkeypatch):
+        """Test disabling metrics restores the original, unwrapped methods."""
+        from app import create_app
+        create_app()
+        assert hasattr(ResponseCache.__dict__['lookup'].__func__, '__wrapped__')
+
+        monkeypatch.setattr(Config, 'METRICS_ENABLED', False)
+        create_app()
+        assert not hasattr(ResponseCache.__dict__['lookup'].__func__, '__wrapped__')
+        assert not metrics.enabled
@@ -0,0 +1,189 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from src.servers.prefork import _WorkerServer
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="prefork server requires os.fork")
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_SCRIPT = """
+import logging, sys
+from app import create_fast_app, warm_app, after_fork
+from src.servers.prefork import PreforkServer
+workers, threads, max_requests = (int(value) for value in sys.argv[2:5])
+PreforkServer(create_fast_app, host="127.0.0.1", port=int(sys.argv[1]), workers=workers, threads=threads,
+              max_requests=max_requests, keepalive_timeout=2, graceful_timeout=5,
+              warmup=warm_app, post_fork=after_fork).serve_forever()
+"""
+
+VALID_PAYLOAD = {
+    "situation": "General Liability",
+    "level": "Summarize",
+    "file_type": "Deposition",
+    "data": ""
+}
+
+def free_port():
+    """Find an unused local TCP port."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def wait_for_server(port, timeout=15.0):
+    """Poll /health until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise AssertionError("prefork server did not start")
+
+def run_server(tmp_path, workers, threads, max_requests):
+    """Run a prefork server in a subprocess, yielding (process, port)."""
+    port = free_port()
+    env = dict(os.environ, LOG_FILE=str(tmp_path / "app.log"), LOG_LEVEL="WARNING")
+    process = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(port), str(workers), str(threads),
+                                str(max_requests)], cwd=PROJECT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(port)
+        yield process, port
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+@pytest.fixture
+def server(tmp_path):
+    """Run a two-worker prefork server recycling workers after 5 requests."""
+    yield from run_server(tmp_path, workers=2, threads=2, max_requests=5)
+
+@pytest.fixture
+def single_worker_server(tmp_path):
+    """Run a one-worker, two-thread prefork server that never recycles."""
+    yield from run_server(tmp_path, workers=1, threads=2, max_requests=0)
+
+def post_match(connection):
+    """Send one match request on an existing connection."""
+    connection.request("POST", "/api/match-prompt", body=json.dumps(VALID_PAYLOAD),
+                       headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+class TestPreforkServer:
+    """Test cases for the pre-forking production server."""
+
+    def test_keepalive_and_recycling(self, server):
+        """Test keep-alive connections and worker recycling keep serving requests."""
+        _, port = server
+        results = []
+        # Each worker recycles after 5 requests; reconnect when a worker closes the connection
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        for _ in range(30):
+            try:
+                results.append(post_match(connection))
+            except (http.client.RemoteDisconnected, ConnectionError):
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                results.append(post_match(connection))
+        assert results == [(200, {"matched_prompt": "Prompt 2", "status": "success"})] * 30
+
+    def test_idle_keepalive_connections_do_not_hold_threads(self, single_worker_server):
+        """Test more keep-alive clients than handler threads are all served without waiting for a timeout."""
+        _, port = single_worker_server
+        connections = [http.client.HTTPConnection("127.0.0.1", port, timeout=5) for _ in range(5)]
+        start = time.monotonic()
+        for _ in range(2):
+            for connection in connections:
+                assert post_match(connection)[0] == 200
+        # A connection held by an idle client would stall the third one for the 2s keep-alive timeout
+        assert time.monotonic() - start < 1.0
+        for connection in connections:
+            connection.close()
+
+    def test_silent_connections_do_not_hold_threads(self, single_worker_server):
+        """Test clients that connect but send nothing do not block requests on other connections."""
+        _, port = single_worker_server
+        silent = [socket.create_connection(("127.0.0.1", port), timeout=5) for _ in range(3)]
+        start = time.monotonic()
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        assert post_match(connection)[0] == 200
+        assert time.monotonic() - start < 1.0
+        connection.close()
+        for sock in silent:
+            sock.close()
+
+    def test_app_error_answers_500(self):
+        """Test an app failing before start_response gets a 500 rather than a dropped connection."""
+        def failing_app(environ, start_response):
+            raise RuntimeError("boom")
+
+        def failing_generator_app(environ, start_response):
+            raise RuntimeError("boom")
+            yield b""
+
+        for app in (failing_app, failing_generator_app):
+            listener = socket.socket()
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            listener.setblocking(False)
+            worker = _WorkerServer(app, listener, max_requests=0, keepalive_timeout=2)
+            thread = threading.Thread(target=worker.serve, args=(1,), daemon=True)
+            thread.start()
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", listener.getsockname()[1], timeout=5)
+                assert post_match(connection) == (500, {"error": "Internal server error"})
+                connection.close()
+            finally:
+                worker.stopping = True
+                thread.join(5)
+                listener.close()
+
+    def test_pipelined_requests(self, single_worker_server):
+        """Test requests already buffered behind the first one on a connection are served."""
+        _, port = single_worker_server
+        body = json.dumps(VALID_PAYLOAD).encode()
+        request = (b"POST /api/match-prompt HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                   b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as connection:
+            connection.sendall(request * 3)
+            received = b""
+            while received.count(b"Prompt 2") < 3:
+                data = connection.recv(65536)
+                assert data
+                received += data
+        assert received.count(b"HTTP/1.1 200") == 3
+
+    def test_chunked_request_body(self, server):
+        """Test chunked request bodies are decoded."""
+        _, port = server
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        body = json.dumps(VALID_PAYLOAD).encode()
+        connection.request("POST", "/api/match-prompt", body=iter([body[:10], body[10:]]),
+                           headers={"Content-Type": "application/json"}, encode_chunked=True)
+        response = connection.getresponse()
+        assert response.status == 200
+        assert json.loads(response.read())["matched_prompt"] == "Prompt 2"
+
+    def test_graceful_restart_and_shutdown(self, server):
+        """Test SIGHUP keeps serving and SIGTERM stops the server cleanly."""
+        process, port = server
+        process.send_signal(signal.SIGHUP)
+        time.sleep(0.5)
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        assert post_match(connection)[0] == 200
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10) == 0
@@ -0,0 +1,92 @@
+import cProfile
+import pytest
+from tests.conftest import FakeClock
+from config.config import Config
+from src.utils.metrics import format_server_timing
+from src.utils.profiling import ProfileCollector, profiler, render_collapsed
+
+VALID_PAYLOAD = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": ""}
+
+def inner():
+    return sum(range(2000))
+
+def middle():
+    return inner()
+
+def outer():
+    return middle()
+
+def capture():
+    profile = cProfile.Profile()
+    profile.enable()
+    outer()
+    profile.disable()
+    return profile
+
+@pytest.fixture
+def profiling_client(monkeypatch):
+    from app import create_app
+    monkeypatch.setattr(Config, "PROFILING_ENABLED", True)
+    try:
+        yield create_app().test_client()
+    finally:
+        monkeypatch.undo()
+        create_app()
+
+class TestProfiling:
+    """Test cases for request profiling and Server-Timing."""
+
+    def test_server_timing_format(self):
+        """Test stage durations are rendered in milliseconds."""
+        value = format_server_timing([("parse_json", 12_345), ("match_prompt", 1_500_000)], 2_000_000)
+        assert value == "parse_json;dur=0.012, match_prompt;dur=1.500, total;dur=2.000"
+
+    def test_server_timing_header(self, client):
+        """Test responses carry per-stage Server-Timing durations."""
+        response = client.post('/api/match-prompt', json=VALID_PAYLOAD)
+        server_timing = response.headers["Server-Timing"]
+        assert "validate_request;dur=" in server_timing
+        assert "total;dur=" in server_timing
+
+    def test_collector_window_and_retention(self):
+        """Test captures are merged per window and expire after the retention period."""
+        clock = FakeClock()
+        collector = ProfileCollector(retention_seconds=60, bucket_seconds=10, clock=clock)
+        collector.add(capture())
+        clock.now += 30
+        collector.add(capture())
+        assert collector.aggregate(15)[1] == 1
+        assert collector.aggregate(60)[1] == 2
+        clock.now += 100
+        collector.add(capture())
+        assert collector.aggregate(300)[1] == 1
+
+    def test_collapsed_stacks(self):
+        """Test collapsed output rebuilds the call path."""
+        collector = ProfileCollector()
+        collector.add(capture())
+        stats, count = collector.aggregate(60)
+        lines = render_collapsed(stats).splitlines()
+        assert any(":outer;" in line and ":middle;" in line and ":inner;" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    def test_header_triggered_profile(self, profiling_client, admin_headers):
+        """Test only a profile header carrying the admin token captures a request."""
+        assert profiling_client.get('/admin/profile', headers=admin_headers).status_code == 404
+        profiling_client.post('/api/match-prompt', json=VALID_PAYLOAD, headers={"X-Profile": "1"})
+        assert profiling_client.get('/admin/profile', headers=admin_headers).status_code == 404
+        profiling_client.post('/api/match-prompt', json=VALID_PAYLOAD, headers={"X-Profile": admin_headers["X-Admin-Token"]})
+        response = profiling_client.get('/admin/profile?seconds=60&limit=20', headers=admin_headers)
+        assert response.status_code == 200
+        assert response.headers["X-Profile-Captures"] == "1"
+        assert "handle_prompt_matching" in response.get_data(as_text=True)
+        collapsed = profiling_client.get('/admin/profile?format=collapsed', headers=admin_headers)
+        collapsed = collapsed.get_data(as_text=True)
+        assert "handle_prompt_matching" in collapsed
+
+    def test_profiling_disabled(self, client, admin_headers):
+        """Test the admin endpoint reports disabled profiling."""
+        assert not profiler.enabled
+        response = client.get('/admin/profile', headers=admin_headers)
+        assert response.status_code == 404
+        assert response.get_json() == {"error": "Profiling is disabled"}
@@ -0,0 +1,63 @@
+import pytest
+from tests.conftest import DATA_CAP
+from src.services.prompt_service import ERROR_CODE_MESSAGES, ErrorCode, MatchResult, PromptMatchingService
+
+VALID_PAYLOAD = {
+    "situation": "Commercial Auto",
+    "level": "Structure",
+    "file_type": "Summary Report",
+    "data": "Claim notes"
+}
+
+PAYLOADS = [
+    (VALID_PAYLOAD, ErrorCode.OK),
+    (dict(VALID_PAYLOAD, file_type="Deposition"), ErrorCode.INVALID_PROMPT),
+    (dict(VALID_PAYLOAD, situation="Unknown"), ErrorCode.INVALID_PROMPT),
+    (dict(VALID_PAYLOAD, level=""), ErrorCode.MISSING_DATA),
+    ({"situation": "Commercial Auto"}, ErrorCode.MISSING_DATA),
+    (dict(VALID_PAYLOAD, data="x" * (DATA_CAP + 1)), ErrorCode.DATA_TOO_LARGE)
+]
+
+class TestEvaluate:
+    """Test cases for the exception-free service entry point."""
+
+    @pytest.mark.parametrize("payload, code", PAYLOADS)
+    def test_codes(self, capped_app, payload, code):
+        """Test each outcome is reported as a code, not an exception."""
+        result = PromptMatchingService.evaluate(payload)
+        assert result.error == code
+        assert (result.prompt_name is not None) == (code == ErrorCode.OK)
+
+    @pytest.mark.parametrize("payload, code", PAYLOADS)
+    def test_process_request_parity(self, capped_app, payload, code):
+        """Test process_request still raises ValueError with the same message."""
+        if code == ErrorCode.OK:
+            assert PromptMatchingService.process_request(payload) == PromptMatchingService.evaluate(payload)[0]
+        else:
+            with pytest.raises(ValueError, match=code.message):
+                PromptMatchingService.process_request(payload)
+
+    def test_failures_are_shared(self, app):
+        """Test error results are preallocated rather than built per request."""
+        payload = dict(VALID_PAYLOAD, situation="Unknown")
+        assert PromptMatchingService.evaluate(payload) is PromptMatchingService.evaluate(payload)
+
+    def test_messages(self):
+        """Test every code has its API message and OK is falsy."""
+        assert set(ERROR_CODE_MESSAGES) == set(ErrorCode)
+        assert not ErrorCode.OK and all(code for code in ErrorCode if code is not ErrorCode.OK)
+        assert ErrorCode.INVALID_PROMPT.message == "Invalid Prompt"
+        assert MatchResult("Prompt 1", ErrorCode.OK) == ("Prompt 1", ErrorCode.OK)
+
+    def test_validate_request_compatibility(self, app):
+        """Test the tuple-returning validator still reports messages."""
+        assert PromptMatchingService.validate_request(VALID_PAYLOAD) == (True, "")
+        assert PromptMatchingService.validate_request({}) == (False, "Missing Data")
+
+    def test_validate_field_values_uses_compiled_validator(self, app):
+        """Test allowed-value checks come from the snapshot's compiled validator."""
+        assert PromptMatchingService.validate_field_values(VALID_PAYLOAD) == (True, "")
+        assert PromptMatchingService.validate_field_values(dict(VALID_PAYLOAD, level="Unknown")) == (
+            False, "Invalid Prompt"
+        )
+        assert PromptMatchingService.validate_field_values(dict(VALID_PAYLOAD, level=None)) == (False, "Missing Data")
@@ -0,0 +1,58 @@
+from flask import jsonify
+from config.config import Config
+from tests.conftest import DATA_CAP
+from src.services.prompt_service import PromptMatchingService
+from src.services.response_cache import ResponseCache, response_cache
+from src.services.rule_store import RuleSnapshot
+
+class TestResponseCache:
+    """Test cases for the pre-serialized response cache."""
+
+    def test_bodies_match_jsonify(self, app):
+        """Test cached bodies are byte-identical to jsonify output."""
+        with app.app_context():
+            for prompt_name, criteria in Config.PROMPT_CRITERIA.items():
+                cached = response_cache.respond(dict(criteria, data=""))
+                expected = jsonify({"matched_prompt": prompt_name, "status": "success"}).get_data()
+                assert cached.body == expected
+            assert response_cache.error("Missing Data").body == jsonify({"error": "Missing Data"}).get_data()
+
+    def test_memo_hits(self, app):
+        """Test repeated triples are served from the memo."""
+        cache = ResponseCache(memo_size=2)
+        payload = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": ""}
+        cache.respond(payload)
+        cache.respond(dict(payload, data="different data"))
+        hits, misses, size = cache.memo_info()
+        assert (hits, misses, size) == (1, 1, 1)
+
+    def test_invalid_outcomes(self, app):
+        """Test error outcomes carry the right status and message."""
+        missing = response_cache.respond({"situation": "Commercial Auto"})
+        assert (missing.status_code, missing.error) == (400, "Missing Data")
+        invalid = response_cache.respond(
+            {"situation": "Commercial Auto", "level": "Structure", "file_type": "Deposition", "data": ""})
+        assert (invalid.status_code, invalid.error) == (400, "Invalid Prompt")
+
+    def test_invalidated_on_rule_change(self, app):
+        """Test a new rule snapshot replaces cached responses."""
+        payload = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": ""}
+        assert response_cache.respond(payload).matched_prompt == "Prompt 1"
+
+        criteria = dict(Config.PROMPT_CRITERIA)
+        criteria["Prompt 9"] = criteria.pop("Prompt 1")
+        PromptMatchingService.rule_store.publish(RuleSnapshot.build(
+            criteria, Config.VALID_SITUATIONS, Config.VALID_LEVELS, Config.VALID_FILE_TYPES))
+        try:
+            cached = response_cache.respond(payload)
+            assert cached.matched_prompt == "Prompt 9"
+            assert b"Prompt 9" in cached.body
+        finally:
+            PromptMatchingService.rule_store.reload()
+
+    def test_data_too_large(self, capped_app):
+        """Test data over MAX_DATA_LENGTH is rejected with a 413."""
+        payload = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report",
+                   "data": "x" * (DATA_CAP + 1)}
+        cached = response_cache.respond(payload)
+        assert (cached.status_code, cached.error) == (413, "Data exceeds maximum length")
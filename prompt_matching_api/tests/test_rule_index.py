@@ -0,0 +1,107 @@
+import pytest
+from config.config import Config
+from src.services.rule_index import Rule, RuleIndex, RuleConflictError
+
+class TestRuleIndex:
+    """Test cases for the compiled prompt rule index."""
+
+    def test_lookup_matches_config_criteria(self):
+        """Test every configured prompt is found by its criteria."""
+        index = RuleIndex.compile(Config.PROMPT_CRITERIA)
+        assert len(index) == len(Config.PROMPT_CRITERIA)
+        for prompt_name, criteria in Config.PROMPT_CRITERIA.items():
+            assert index.lookup(criteria["situation"], criteria["level"], criteria["file_type"]) == prompt_name
+
+    def test_lookup_miss(self):
+        """Test unknown combination returns None."""
+        index = RuleIndex.compile(Config.PROMPT_CRITERIA)
+        assert index.lookup("Commercial Auto", "Structure", "Deposition") is None
+
+    def test_conflicting_rules(self):
+        """Test two prompts with identical criteria are rejected."""
+        criteria = {
+            "Prompt A": {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summons"},
+            "Prompt B": {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summons"}
+        }
+        with pytest.raises(RuleConflictError):
+            RuleIndex.compile(criteria)
+
+    def test_duplicate_rule_name(self):
+        """Test a prompt name defined twice is rejected."""
+        criteria = [
+            ("Prompt A", {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summons"}),
+            ("Prompt A", {"situation": "Commercial Auto", "level": "Summarize", "file_type": "Summons"})
+        ]
+        with pytest.raises(RuleConflictError):
+            RuleIndex.compile(criteria)
+
+    def test_missing_rule_field(self):
+        """Test a rule without all match fields is rejected."""
+        with pytest.raises(RuleConflictError):
+            RuleIndex.compile({"Prompt A": {"situation": "Commercial Auto", "level": "Structure"}})
+
+    def test_rule_is_immutable(self):
+        """Test rule records cannot be modified after compilation."""
+        rule = Rule("Prompt A", "Commercial Auto", "Structure", "Summons")
+        with pytest.raises(AttributeError):
+            rule.name = "Prompt B"
+
+    def test_wildcard_and_value_sets(self):
+        """Test wildcard and value-set fields match every listed value."""
+        criteria = {
+            "Summons": {"situation": "Workers Compensation", "level": "*", "file_type": "Summons"},
+            "Either": {"situation": ["Commercial Auto", "General Liability"], "level": "Structure",
+                       "file_type": "Deposition"}
+        }
+        index = RuleIndex.compile(criteria)
+        assert index.lookup("Workers Compensation", "Structure", "Summons") == "Summons"
+        assert index.lookup("Workers Compensation", "Summarize", "Summons") == "Summons"
+        assert index.lookup("General Liability", "Structure", "Deposition") == "Either"
+        assert index.lookup("Workers Compensation", "Structure", "Deposition") is None
+
+    def test_priority_and_definition_order(self):
+        """Test the highest priority wins, then the earliest definition."""
+        criteria = {
+            "Catch All": {"situation": "*", "level": "*", "file_type": "*"},
+            "Summons": {"situation": "*", "level": "*", "file_type": "Summons"},
+            "Exact": {"situation": "Commercial Auto", "level": "Summarize", "file_type": "Summons",
+                      "priority": 10}
+        }
+        index = RuleIndex.compile(criteria)
+        assert index.lookup("Commercial Auto", "Summarize", "Summons") == "Exact"
+        # Equal priority: the earlier catch-all shadows the later rule
+        assert index.lookup("Commercial Auto", "Structure", "Summons") == "Catch All"
+        assert index.lookup("Anything", "Else", "Entirely") == "Catch All"
+
+    def test_bitset_matches_reference_scan(self):
+        """Test the bitset engine agrees with a priority-ordered scan."""
+        values = ["A", "B", "C"]
+        criteria = {}
+        seen = set()
+        for i in range(60):
+            rule = {
+                "situation": values[i % 3] if i % 4 else "*",
+                "level": [values[i % 3], values[(i + 1) % 3]] if i % 5 else values[i % 3],
+                "file_type": values[(i // 3) % 3] if i % 7 else "*",
+                "priority": i % 3
+            }
+            # Identical criteria are rejected, so keep the first of each
+            key = Rule(f"Rule {i}", rule["situation"], rule["level"], rule["file_type"]).values
+            if key not in seen:
+                seen.add(key)
+                criteria[f"Rule {i}"] = rule
+        index = RuleIndex.compile(criteria)
+        ranked = sorted(enumerate(index.rules), key=lambda item: (-item[1].priority, item[0]))
+        for situation in values + ["D"]:
+            for level in values:
+                for file_type in values:
+                    expected = next((rule.name for _, rule in ranked
+                                     if rule.matches(situation, level, file_type)), None)
+                    assert index.lookup(situation, level, file_type) == expected
+
+    def test_invalid_rule_values(self):
+        """Test malformed field values and priorities are rejected."""
+        with pytest.raises(RuleConflictError):
+            RuleIndex.compile({"Prompt A": {"situation": [], "level": "*", "file_type": "*"}})
+        with pytest.raises(RuleConflictError):
+            RuleIndex.compile({"Prompt A": {"situation": "*", "level": "*", "file_type": "*", "priority": "high"}})
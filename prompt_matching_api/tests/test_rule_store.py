@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import pytest
+from app import create_app
+from config.config import Config
+from src.services.prompt_service import PromptMatchingService
+from src.services.rule_index import RuleConflictError
+from src.services.rule_store import RuleLoadError, RuleSnapshot, RuleStore
+
+RULES_A = {
+    "valid_situations": ["Commercial Auto"],
+    "valid_levels": ["Structure"],
+    "valid_file_types": ["Summons", "Deposition"],
+    "prompts": {
+        "Prompt A1": {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summons"},
+        "Prompt A2": {"situation": "Commercial Auto", "level": "Structure", "file_type": "Deposition"}
+    }
+}
+
+RULES_B = {
+    "valid_situations": ["Commercial Auto"],
+    "valid_levels": ["Structure"],
+    "valid_file_types": ["Summons", "Deposition"],
+    "prompts": {
+        "Prompt B1": {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summons"},
+        "Prompt B2": {"situation": "Commercial Auto", "level": "Structure", "file_type": "Deposition"}
+    }
+}
+
+def write_rules(path, document):
+    """Write a rule document atomically so watchers never see a partial file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as rule_file:
+        json.dump(document, rule_file)
+    os.replace(temp_path, path)
+
+class TestRuleStore:
+    """Test cases for the hot-reloadable rule store."""
+
+    def test_config_snapshot_matches_builtin_rules(self):
+        """Test the default snapshot mirrors Config."""
+        snapshot = RuleSnapshot.from_config(Config)
+        assert snapshot.valid_situations == frozenset(Config.VALID_SITUATIONS)
+        assert snapshot.index.lookup("Commercial Auto", "Structure", "Summary Report") == "Prompt 1"
+
+    @pytest.mark.parametrize("extension, content", [
+        (".yaml", "valid_situations: [Commercial Auto]\nvalid_levels: [Structure]\n"
+                  "valid_file_types: [Summons]\nprompts:\n  Prompt Y:\n"
+                  "    situation: Commercial Auto\n    level: Structure\n    file_type: Summons\n"),
+        (".toml", 'valid_situations = ["Commercial Auto"]\nvalid_levels = ["Structure"]\n'
+                  'valid_file_types = ["Summons"]\n[prompts."Prompt Y"]\n'
+                  'situation = "Commercial Auto"\nlevel = "Structure"\nfile_type = "Summons"\n')
+    ])
+    def test_load_yaml_and_toml(self, tmp_path, extension, content):
+        """Test YAML and TOML rule files load into the same shape as JSON."""
+        if extension == ".yaml":
+            pytest.importorskip("yaml")
+        path = tmp_path / f"rules{extension}"
+        path.write_text(content)
+        store = RuleStore()
+        snapshot = store.configure({"RULES_FILE": str(path)})
+        assert snapshot.index.lookup("Commercial Auto", "Structure", "Summons") == "Prompt Y"
+
+    def test_rule_with_unknown_value_rejected(self):
+        """Test rules referencing values outside the valid lists are rejected."""
+        document = dict(RULES_A, valid_file_types=["Summons"])
+        with pytest.raises(RuleConflictError):
+            RuleSnapshot.from_document(document, "test")
+
+    @pytest.mark.parametrize("document", [
+        dict(RULES_A, prompts=[["Prompt A1", RULES_A["prompts"]["Prompt A1"]]]),
+        dict(RULES_A, valid_situations=3),
+        dict(RULES_A, prompts={"Prompt A1": "Commercial Auto"}),
+        dict(RULES_A, prompts={"Prompt A1": dict(RULES_A["prompts"]["Prompt A1"], template=["x"])})
+    ])
+    def test_malformed_shape_rejected(self, tmp_path, document):
+        """Test wrongly shaped rule files raise RuleLoadError and reloads keep working."""
+        with pytest.raises(RuleLoadError):
+            RuleSnapshot.from_document(document, "test")
+
+        path = tmp_path / "rules.json"
+        write_rules(path, RULES_A)
+        store = RuleStore()
+        original = store.configure({"RULES_FILE": str(path)})
+        write_rules(path, document)
+        assert not store.reload_if_changed()
+        assert store.snapshot is original
+        write_rules(path, RULES_B)
+        assert store.reload_if_changed()
+
+    def test_watcher_survives_unexpected_errors(self, tmp_path, monkeypatch):
+        """Test the watcher thread keeps polling after a reload raises."""
+        path = tmp_path / "rules.json"
+        write_rules(path, RULES_A)
+        store = RuleStore()
+        store.configure({"RULES_FILE": str(path)})
+        calls = []
+        reloaded = threading.Event()
+
+        def flaky_reload_if_changed():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("disk on fire")
+            reloaded.set()
+            return False
+
+        monkeypatch.setattr(store, "reload_if_changed", flaky_reload_if_changed)
+        store.start_watching(0.01)
+        try:
+            assert reloaded.wait(5)
+        finally:
+            store.stop_watching()
+
+    def test_failed_reload_keeps_snapshot(self, tmp_path):
+        """Test a broken rule file leaves the previous snapshot active."""
+        path = tmp_path / "rules.json"
+        write_rules(path, RULES_A)
+        store = RuleStore()
+        original = store.configure({"RULES_FILE": str(path)})
+        path.write_text("{not json")
+        with pytest.raises(RuleLoadError):
+            store.reload()
+        assert store.snapshot is original
+
+    def test_reload_if_changed(self, tmp_path):
+        """Test the watcher check only reloads when the file changes."""
+        path = tmp_path / "rules.json"
+        write_rules(path, RULES_A)
+        store = RuleStore()
+        store.configure({"RULES_FILE": str(path)})
+        assert not store.reload_if_changed()
+        write_rules(path, dict(RULES_B, prompts={**RULES_B["prompts"], "Prompt B3": {
+            "situation": "Commercial Auto", "level": "Structure", "file_type": "Summons"}}))
+        # Conflicting rules are rejected and the old snapshot is kept
+        assert not store.reload_if_changed()
+        write_rules(path, RULES_B)
+        assert store.reload_if_changed()
+        assert store.snapshot.index.lookup("Commercial Auto", "Structure", "Summons") == "Prompt B1"
+
+    def test_reload_endpoint(self, tmp_path, monkeypatch, admin_headers):
+        """Test the admin reload endpoint swaps in edited rules."""
+        path = tmp_path / "rules.json"
+        write_rules(path, RULES_A)
+        monkeypatch.setattr(Config, "RULES_FILE", str(path))
+        client = create_app().test_client()
+        payload = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summons", "data": ""}
+
+        assert client.post('/api/match-prompt', json=payload).get_json()['matched_prompt'] == 'Prompt A1'
+        write_rules(path, RULES_B)
+        response = client.post('/admin/rules/reload', headers=admin_headers)
+        assert response.status_code == 200
+        assert response.get_json()['rule_count'] == 2
+        assert client.post('/api/match-prompt', json=payload).get_json()['matched_prompt'] == 'Prompt B1'
+
+        write_rules(path, dict(RULES_A, prompts=["Prompt A1"]))
+        response = client.post('/admin/rules/reload', headers=admin_headers)
+        assert response.status_code == 400
+        assert response.get_json()['active']['rule_count'] == 2
+
+    def test_admin_token_required(self, monkeypatch):
+        """Test admin endpoints require the configured token."""
+        monkeypatch.setattr(Config, "ADMIN_TOKEN", "secret")
+        client = create_app().test_client()
+        assert client.get('/admin/rules').status_code == 401
+        assert client.get('/admin/rules', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+        assert client.get('/admin/rules', headers={'X-Admin-Token': 'secret'}).status_code == 200
+
+    def test_admin_disabled_without_token(self, monkeypatch):
+        """Test admin endpoints are not served at all when no token is configured."""
+        monkeypatch.setattr(Config, "ADMIN_TOKEN", None)
+        client = create_app().test_client()
+        assert client.post('/admin/rules/reload').status_code == 404
+        assert client.get('/admin/jobs', headers={'X-Admin-Token': ''}).status_code == 404
+
+    def test_concurrent_lookups_during_reloads(self, tmp_path, monkeypatch):
+        """Test readers never see a half-built rule set while rules are reloaded."""
+        path = tmp_path / "rules.json"
+        write_rules(path, RULES_A)
+        store = RuleStore()
+        store.configure({"RULES_FILE": str(path)})
+        monkeypatch.setattr(PromptMatchingService, "rule_store", store)
+
+        payloads = [
+            ({"situation": "Commercial Auto", "level": "Structure", "file_type": "Summons", "data": ""},
+             {"Prompt A1", "Prompt B1"}),
+            ({"situation": "Commercial Auto", "level": "Structure", "file_type": "Deposition", "data": ""},
+             {"Prompt A2", "Prompt B2"})
+        ]
+        stop = threading.Event()
+        failures = []
+        lookups = []
+
+        def reader():
+            count = 0
+            while not stop.is_set():
+                for payload, expected in payloads:
+                    try:
+                        result = PromptMatchingService.process_request(payload)
+                    except Exception as e:
+                        failures.append(repr(e))
+                        return
+                    if result not in expected:
+                        failures.append(result)
+                        return
+                    # Both prompts of one lookup pair must come from the same rule set
+                    snapshot = store.snapshot
+                    names = {snapshot.index.lookup(*(p[field] for field in ("situation", "level", "file_type")))
+                             for p, _ in payloads}
+                    if names not in ({"Prompt A1", "Prompt A2"}, {"Prompt B1", "Prompt B2"}):
+                        failures.append(names)
+                        return
+                    count += 1
+            lookups.append(count)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        try:
+            for i in range(50):
+                write_rules(path, RULES_B if i % 2 == 0 else RULES_A)
+                store.reload()
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        assert failures == []
+        assert sum(lookups) > 0
@@ -0,0 +1,147 @@
+import itertools
+import json
+import time
+from urllib.parse import urlsplit
+import pytest
+from werkzeug.test import Client
+from app import create_fast_app
+from config.config import Config
+from src.client import RulesClient, RulesFetchError
+from src.services.prompt_service import PromptMatchingService
+from src.services.rule_store import RuleSnapshot
+
+def transport_for(app):
+    """Client transport that sends requests to a WSGI app in-process."""
+    test_client = Client(app)
+    requests = []
+
+    def transport(url, headers, timeout):
+        requests.append(dict(headers))
+        response = test_client.get(urlsplit(url).path, headers=dict(headers))
+        return response.status_code, {k.lower(): v for k, v in response.headers.items()}, response.get_data()
+
+    transport.requests = requests
+    return transport
+
+def failing_transport(url, headers, timeout):
+    raise OSError("connection refused")
+
+def publish_rules(criteria):
+    """Publish a new rule snapshot built from the Config valid values."""
+    PromptMatchingService.rule_store.publish(RuleSnapshot.build(
+        criteria, Config.VALID_SITUATIONS, Config.VALID_LEVELS, Config.VALID_FILE_TYPES))
+
+class TestRulesExport:
+    """Test cases for GET /api/rules."""
+
+    def test_export_and_revalidation(self, client):
+        """Test the export carries caching headers and answers If-None-Match with 304."""
+        response = client.get('/api/rules')
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == f"public, max-age={Config.RULES_EXPORT_MAX_AGE}"
+        document = response.get_json()
+        assert list(document["prompts"]) == list(Config.PROMPT_CRITERIA)
+        assert document["valid_situations"] == Config.VALID_SITUATIONS
+        assert document["max_data_length"] == Config.MAX_DATA_LENGTH
+
+        etag = response.headers["ETag"]
+        not_modified = client.get('/api/rules', headers={"If-None-Match": f'"other", W/{etag}'})
+        assert not_modified.status_code == 304
+        assert not_modified.get_data() == b""
+        assert not_modified.headers["ETag"] == etag
+
+    def test_fast_path_parity(self, client):
+        """Test the WSGI fast path serves the same export."""
+        fast_client = Client(create_fast_app())
+        flask_response = client.get('/api/rules')
+        fast_response = fast_client.get('/api/rules')
+        assert fast_response.get_data() == flask_response.get_data()
+        assert fast_response.headers["ETag"] == flask_response.headers["ETag"]
+        assert fast_client.get('/api/rules', headers={"If-None-Match": "*"}).status_code == 304
+
+    def test_etag_changes_with_rules(self, client, restore_rules):
+        """Test a rule change produces a new ETag and body."""
+        etag = client.get('/api/rules').headers["ETag"]
+        criteria = dict(Config.PROMPT_CRITERIA)
+        criteria["Prompt 9"] = criteria.pop("Prompt 1")
+        publish_rules(criteria)
+        response = client.get('/api/rules', headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert "Prompt 9" in response.get_json()["prompts"]
+
+class TestRulesClient:
+    """Test cases for the local-matching client."""
+
+    def test_parity_with_server(self, app, restore_rules):
+        """Test the client and the server agree on every input."""
+        criteria = dict(Config.PROMPT_CRITERIA)
+        criteria["Any Summons"] = {"situation": "*", "level": ["Structure", "Summarize"],
+                                   "file_type": "Summons", "priority": -1}
+        criteria["Deposition Override"] = {"situation": "General Liability", "level": "*",
+                                           "file_type": "Deposition", "priority": 5}
+        publish_rules(criteria)
+        server = app.test_client()
+        client = RulesClient("http://rules.test", transport=transport_for(app), background=False)
+
+        values = {
+            "situation": Config.VALID_SITUATIONS + ["Marine", "", "   ", None, 3],
+            "level": Config.VALID_LEVELS + ["Review", None],
+            "file_type": Config.VALID_FILE_TYPES + ["Invoice", ""],
+            "data": ["", None, "notes", "x" * 20000, 5]
+        }
+        fields = list(values)
+        payloads = [dict(zip(fields, combination)) for combination in itertools.product(*values.values())]
+        payloads += [{key: value for key, value in payload.items() if key != missing}
+                     for payload in payloads[:50] for missing in fields]
+
+        for payload in payloads:
+            response = server.post('/api/match-prompt', json=payload)
+            try:
+                local = {"matched_prompt": client.match(payload), "status": "success"}
+            except ValueError as e:
+                local = {"error": str(e)}
+            assert local == response.get_json(), payload
+
+    def test_revalidates_with_etag(self, app, restore_rules):
+        """Test refresh sends If-None-Match and only installs changed rules."""
+        transport = transport_for(app)
+        client = RulesClient("http://rules.test/", transport=transport, background=False)
+        assert "If-None-Match" not in transport.requests[0]
+        assert client.refresh() is False
+        assert transport.requests[-1]["If-None-Match"] == client.etag
+
+        criteria = dict(Config.PROMPT_CRITERIA)
+        criteria["Prompt 9"] = criteria.pop("Prompt 1")
+        publish_rules(criteria)
+        assert client.refresh() is True
+        assert client.match({"situation": "Commercial Auto", "level": "Structure",
+                             "file_type": "Summary Report", "data": ""}) == "Prompt 9"
+
+    def test_background_refresh(self, app, restore_rules):
+        """Test the background thread picks up rule changes."""
+        with RulesClient("http://rules.test", transport=transport_for(app), refresh_interval=0.01) as client:
+            criteria = dict(Config.PROMPT_CRITERIA)
+            criteria["Prompt 9"] = criteria.pop("Prompt 1")
+            publish_rules(criteria)
+            deadline = time.monotonic() + 5
+            while "Prompt 9" not in client.snapshot.criteria and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert "Prompt 9" in client.snapshot.criteria
+
+    def test_disk_cache(self, app, tmp_path):
+        """Test the on-disk copy serves matches when the server is unreachable."""
+        cache_path = str(tmp_path / "rules.json")
+        first = RulesClient("http://rules.test", cache_path=cache_path, transport=transport_for(app),
+                            background=False)
+        assert json.load(open(cache_path))["etag"] == first.etag
+
+        offline = RulesClient("http://rules.test", cache_path=cache_path, transport=failing_transport,
+                              background=False)
+        assert offline.etag == first.etag
+        assert offline.match({"situation": "Workers Compensation", "level": "Summarize",
+                              "file_type": "Summons", "data": ""}) == "Prompt 5"
+
+        with pytest.raises(RulesFetchError):
+            RulesClient("http://other.test", cache_path=cache_path, transport=failing_transport,
+                        background=False)
@@ -0,0 +1,111 @@
+import gc
+import pytest
+from werkzeug.test import Client
+from app import create_app, create_fast_app
+from config.config import Config
+from src.services.prompt_service import PromptMatchingService
+from src.services.rule_store import RuleSnapshot
+from src.services.templates import CompiledTemplate, TemplateCache, TemplateError
+
+PAYLOAD = {
+    "situation": "Commercial Auto",
+    "level": "Structure",
+    "file_type": "Summary Report",
+    "data": "Claim notes"
+}
+
+class TestCompiledTemplate:
+    """Test cases for compiled prompt templates."""
+
+    def test_render_matches_str_format(self):
+        """Test rendering gives the same text as str.format."""
+        source = "{prompt} for {situation}/{level}/{file_type}: {{literal}} {data}"
+        values = {"prompt": "Prompt 1", "situation": "Commercial Auto", "level": "Structure",
+                  "file_type": "Summary Report", "data": "x" * 5000}
+        template = CompiledTemplate.compile(source)
+        assert template.render(values) == source.format(**values)
+        assert template.fields == ("prompt", "situation", "level", "file_type", "data")
+
+    @pytest.mark.parametrize("source", ["{unknown}", "{data:>10}", "{data!r}", "{data", "}", 42])
+    def test_invalid_templates_rejected(self, source):
+        """Test unsupported or malformed templates fail to compile."""
+        with pytest.raises(TemplateError):
+            CompiledTemplate.compile(source)
+
+    def test_bad_template_rejected_at_build(self):
+        """Test a snapshot with an invalid template is never built."""
+        criteria = dict(Config.PROMPT_CRITERIA)
+        criteria["Prompt 1"] = dict(criteria["Prompt 1"], template="{claimant}")
+        with pytest.raises(TemplateError):
+            RuleSnapshot.build(criteria, Config.VALID_SITUATIONS, Config.VALID_LEVELS,
+                               Config.VALID_FILE_TYPES)
+
+class TestTemplateCache:
+    """Test cases for the per-snapshot template cache."""
+
+    def test_compiled_once_per_snapshot(self, app):
+        """Test templates are compiled once and recompiled after a rule change."""
+        cache = TemplateCache(max_size=8)
+        snapshot = PromptMatchingService.get_snapshot()
+        first = cache.get(snapshot, "Prompt 1")
+        assert cache.get(snapshot, "Prompt 1") is first
+        assert cache.info() == (1, 1, 1)
+
+        criteria = dict(Config.PROMPT_CRITERIA)
+        criteria["Prompt 1"] = dict(criteria["Prompt 1"], template="Reloaded: {data}")
+        reloaded = RuleSnapshot.build(criteria, Config.VALID_SITUATIONS, Config.VALID_LEVELS,
+                                      Config.VALID_FILE_TYPES)
+        assert cache.render(reloaded, "Prompt 1", dict(PAYLOAD)) == "Reloaded: Claim notes"
+        assert cache.info() == (1, 2, 2)
+
+    def test_snapshots_cached_side_by_side(self, app):
+        """Test alternating snapshots (tenant and global rules) keeps both caches and their counts."""
+        cache = TemplateCache(max_size=8)
+        snapshot = PromptMatchingService.get_snapshot()
+        other = RuleSnapshot.build(Config.PROMPT_CRITERIA, Config.VALID_SITUATIONS, Config.VALID_LEVELS,
+                                   Config.VALID_FILE_TYPES)
+        first = cache.get(snapshot, "Prompt 1")
+        for _ in range(3):
+            assert cache.get(other, "Prompt 1") is not first
+            assert cache.get(snapshot, "Prompt 1") is first
+        assert cache.info() == (5, 2, 2)
+
+        del other
+        gc.collect()
+        assert cache.info() == (5, 2, 1)
+
+    def test_rule_without_template(self, app):
+        """Test rules without a template render to None."""
+        criteria = {name: {key: value for key, value in rule.items() if key != "template"}
+                    for name, rule in Config.PROMPT_CRITERIA.items()}
+        snapshot = RuleSnapshot.build(criteria, Config.VALID_SITUATIONS, Config.VALID_LEVELS,
+                                      Config.VALID_FILE_TYPES)
+        assert TemplateCache().render(snapshot, "Prompt 1", dict(PAYLOAD)) is None
+
+class TestRenderedResponses:
+    """Test cases for ?render=1 on both match endpoints."""
+
+    @pytest.mark.parametrize("make_client", [
+        lambda: create_app().test_client(),
+        lambda: Client(create_fast_app())
+    ])
+    def test_render_option(self, make_client):
+        """Test the rendered prompt is returned only when requested."""
+        client = make_client()
+        expected = Config.PROMPT_CRITERIA["Prompt 1"]["template"].replace("{data}", "Claim notes")
+
+        rendered = client.post('/api/match-prompt?render=1', json=PAYLOAD)
+        assert rendered.status_code == 200
+        assert rendered.get_json() == {"matched_prompt": "Prompt 1", "prompt": expected, "status": "success"}
+
+        plain = client.post('/api/match-prompt?render=0', json=PAYLOAD)
+        assert plain.get_json() == {"matched_prompt": "Prompt 1", "status": "success"}
+
+        invalid = client.post('/api/match-prompt?render=1', json=dict(PAYLOAD, file_type="Deposition"))
+        assert invalid.status_code == 400
+        assert invalid.get_json() == {"error": "Invalid Prompt"}
+
+    def test_null_data_renders_empty(self, client):
+        """Test null data renders as an empty string."""
+        response = client.post('/api/match-prompt?render=true', json=dict(PAYLOAD, data=None))
+        assert response.get_json()["prompt"].endswith("\n\n")
@@ -0,0 +1,209 @@
+import json
+import threading
+import pytest
+from werkzeug.test import Client
+from app import create_app, create_asgi_app, create_fast_app
+from config.config import Config
+from src.services.response_cache import ERROR_RESPONSES, FAILURE_RESPONSES, response_cache
+from src.services.tenants import TenantRegistry, memo_bytes, tenant_registry
+from src.utils.memory import deep_sizeof
+from src.utils.metrics import metrics
+from tests.test_asgi import call_asgi
+
+VALID_PAYLOAD = {"situation": "Commercial Auto", "level": "Structure", "file_type": "Summary Report", "data": "x"}
+
+def tenant_rules(prompt_name, file_type="Summary Report"):
+    return {
+        "valid_situations": ["Commercial Auto"],
+        "valid_levels": ["Structure"],
+        "valid_file_types": [file_type],
+        "prompts": {
+            prompt_name: {"situation": "Commercial Auto", "level": "Structure", "file_type": file_type,
+                          "template": prompt_name + ": {data}"}
+        }
+    }
+
+def write_tenant(rules_dir, tenant_id, document):
+    (rules_dir / f"{tenant_id}.json").write_text(json.dumps(document))
+
+@pytest.fixture
+def rules_dir(tmp_path, monkeypatch):
+    write_tenant(tmp_path, "acme", tenant_rules("Acme Prompt"))
+    write_tenant(tmp_path, "globex", tenant_rules("Globex Prompt"))
+    monkeypatch.setattr(Config, "TENANT_RULES_DIR", str(tmp_path))
+    try:
+        yield tmp_path
+    finally:
+        monkeypatch.undo()
+        create_app()
+
+@pytest.fixture
+def tenant_client(rules_dir):
+    return create_app().test_client()
+
+def make_registry(rules_dir, **settings):
+    registry = TenantRegistry()
+    registry.configure(dict({"TENANT_RULES_DIR": str(rules_dir)}, **settings))
+    return registry
+
+class TestTenantRouting:
+    """Test cases for selecting tenant rule sets per request."""
+
+    def test_header_and_path(self, tenant_client):
+        """Test a tenant is chosen by header or path, and the global rules otherwise."""
+        response = tenant_client.post('/api/match-prompt', json=VALID_PAYLOAD, headers={"X-Tenant": "acme"})
+        assert response.get_json()["matched_prompt"] == "Acme Prompt"
+        response = tenant_client.post('/api/tenants/globex/match-prompt?render=1', json=VALID_PAYLOAD)
+        assert response.get_json()["prompt"] == "Globex Prompt: x"
+        response = tenant_client.post('/api/match-prompt', json=VALID_PAYLOAD)
+        assert response.get_json()["matched_prompt"] == "Prompt 1"
+
+    def test_tenant_validation(self, tenant_client):
+        """Test values are validated against the tenant's own rules."""
+        response = tenant_client.post('/api/match-prompt', json=dict(VALID_PAYLOAD, file_type="Deposition"),
+                                      headers={"X-Tenant": "acme"})
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Invalid Prompt"}
+
+    @pytest.mark.parametrize("tenant_id", ["nobody", "..", ".hidden", "a" * 65])
+    def test_unknown_tenant(self, tenant_client, tenant_id):
+        """Test unknown and malformed tenant ids get a 404 without touching other paths."""
+        response = tenant_client.post('/api/match-prompt', json=VALID_PAYLOAD, headers={"X-Tenant": tenant_id})
+        assert response.status_code == 404
+        assert response.get_json() == {"error": "Unknown tenant"}
+
+    def test_header_ignored_without_tenancy(self, client):
+        """Test the tenant header is ignored when TENANT_RULES_DIR is unset."""
+        response = client.post('/api/match-prompt', json=VALID_PAYLOAD, headers={"X-Tenant": "acme"})
+        assert response.get_json()["matched_prompt"] == "Prompt 1"
+        assert client.post('/api/tenants/acme/match-prompt', json=VALID_PAYLOAD).status_code == 404
+
+    def test_batch_uses_tenant(self, tenant_client):
+        """Test batch items are matched against the header's tenant."""
+        response = tenant_client.post('/api/match-prompt/batch', json=[VALID_PAYLOAD],
+                                      headers={"X-Tenant": "acme"})
+        assert response.get_json() == [{"index": 0, "matched_prompt": "Acme Prompt", "status": "success"}]
+
+    def test_front_end_parity(self, rules_dir):
+        """Test the WSGI fast path and ASGI app answer tenant requests like Flask."""
+        flask_client = create_app().test_client()
+        fast_client = Client(create_fast_app())
+        asgi_app = create_asgi_app()
+        body = json.dumps(VALID_PAYLOAD).encode()
+        for path, headers in [('/api/tenants/acme/match-prompt', []), ('/api/match-prompt', [("X-Tenant", "globex")]),
+                              ('/api/tenants/nobody/match-prompt', [])]:
+            expected = flask_client.post(path, data=body, content_type="application/json", headers=headers)
+            fast = fast_client.post(path, data=body, content_type="application/json", headers=headers)
+            status, _, asgi_body = call_asgi(asgi_app, "POST", path, body,
+                                             [("Content-Type", "application/json")] + headers)
+            assert fast.status_code == status == expected.status_code
+            assert fast.get_data() == asgi_body == expected.get_data()
+
+    def test_bad_rule_file(self, tenant_client, rules_dir):
+        """Test a broken rule file gets a 503 and is retried once fixed."""
+        (rules_dir / "broken.json").write_text("{not json")
+        response = tenant_client.post('/api/tenants/broken/match-prompt', json=VALID_PAYLOAD)
+        assert response.status_code == 503
+        assert response.get_json() == {"error": "Tenant rules unavailable"}
+        write_tenant(rules_dir, "broken", tenant_rules("Fixed Prompt"))
+        response = tenant_client.post('/api/tenants/broken/match-prompt', json=VALID_PAYLOAD)
+        assert response.get_json()["matched_prompt"] == "Fixed Prompt"
+
+class TestTenantRegistry:
+    """Test cases for the bounded tenant cache."""
+
+    def test_compiled_once(self, rules_dir):
+        """Test repeat and concurrent lookups share one compile."""
+        registry = make_registry(rules_dir)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.lookup("acme").tables))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert registry.compiles == 1
+        assert len({id(tables) for tables in results}) == 1
+        assert registry.lookup("acme").tables is results[0]
+        assert registry.hits >= 1
+
+    def test_lru_by_count(self, rules_dir):
+        """Test the least recently used tenant is evicted first."""
+        write_tenant(rules_dir, "initech", tenant_rules("Initech Prompt"))
+        registry = make_registry(rules_dir, TENANT_CACHE_SIZE=2)
+        registry.lookup("acme")
+        registry.lookup("globex")
+        registry.lookup("acme")
+        registry.lookup("initech")
+        assert [entry["tenant"] for entry in registry.info()["recent"]] == ["initech", "acme"]
+        assert registry.evictions == 1
+
+    def test_lru_by_bytes(self, rules_dir):
+        """Test the byte budget evicts cold tenants but keeps the newest."""
+        registry = make_registry(rules_dir)
+        registry.lookup("acme")
+        size = registry.info()["bytes"]
+        assert size > 0
+        registry.max_bytes = size
+        registry.lookup("globex")
+        assert registry.info()["tenants"] == 1
+        assert registry.cached("globex") is not None
+        registry.max_bytes = 1
+        registry.lookup("acme")
+        assert registry.info()["tenants"] == 1
+
+    def test_shared_error_responses(self, rules_dir):
+        """Test tenants share error responses and are not charged for them."""
+        registry = make_registry(rules_dir)
+        tables = registry.lookup("acme").tables
+        assert tables.errors is response_cache.build_tables(tables.snapshot).errors
+        assert registry.info()["bytes"] < deep_sizeof(tables) + memo_bytes(tables.snapshot, registry.memo_size)
+
+    def test_lazy_caches_accounted(self, rules_dir):
+        """Test the exports and the match memo bound are charged when the tenant is compiled."""
+        registry = make_registry(rules_dir)
+        tables = registry.lookup("acme").tables
+        size = registry.info()["bytes"]
+        tables.rules_export, tables.code_table
+        shared = (ERROR_RESPONSES, FAILURE_RESPONSES)
+        assert size == deep_sizeof(tables, exclude=shared) + memo_bytes(tables.snapshot, registry.memo_size)
+        assert memo_bytes(tables.snapshot, registry.memo_size) > 0
+
+    def test_invalidate(self, rules_dir):
+        """Test invalidated tenants are recompiled from storage."""
+        registry = make_registry(rules_dir)
+        registry.lookup("acme")
+        write_tenant(rules_dir, "acme", tenant_rules("Acme Prompt v2"))
+        assert registry.invalidate("acme") == 1
+        assert "Acme Prompt v2" in registry.lookup("acme").tables.snapshot.criteria
+        assert registry.invalidate() == 1
+        assert registry.info()["bytes"] == 0
+
+class TestTenantAdmin:
+    """Test cases for the tenant admin endpoints and metrics."""
+
+    def test_reload_and_status(self, tenant_client, rules_dir, admin_headers):
+        """Test reloading a tenant picks up its new rules."""
+        tenant_client.post('/api/tenants/acme/match-prompt', json=VALID_PAYLOAD)
+        write_tenant(rules_dir, "acme", tenant_rules("Acme Prompt v2"))
+        response = tenant_client.post('/admin/tenants/acme/reload', headers=admin_headers)
+        assert response.status_code == 200
+        assert response.get_json()["rules"]["rule_count"] == 1
+        response = tenant_client.post('/api/tenants/acme/match-prompt', json=VALID_PAYLOAD)
+        assert response.get_json()["matched_prompt"] == "Acme Prompt v2"
+        status = tenant_client.get('/admin/tenants', headers=admin_headers).get_json()
+        assert status["tenants"] == 1 and status["hits"] == 1 and status["compiles"] == 2
+        assert tenant_client.post('/admin/tenants/nobody/reload', headers=admin_headers).status_code == 404
+
+    def test_metrics(self, rules_dir, monkeypatch):
+        """Test hit rate and compile time are exported."""
+        monkeypatch.setattr(Config, "METRICS_ENABLED", True)
+        client = create_app().test_client()
+        metrics.reset()
+        for _ in range(4):
+            client.post('/api/match-prompt', json=VALID_PAYLOAD, headers={"X-Tenant": "acme"})
+        body = client.get('/metrics').get_data(as_text=True)
+        assert 'prompt_api_tenant_cache_lookups_total{result="hit"} 3' in body
+        assert "prompt_api_tenant_cache_hit_ratio 0.750000" in body
+        assert 'prompt_api_stage_duration_seconds_count{stage="compile_tenant_rules"} 1' in body
+        assert tenant_registry.compile_ns > 0
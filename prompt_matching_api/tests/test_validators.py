@@ -0,0 +1,91 @@
+import pytest
+from src.utils.validators import (
+    CompiledValidator, PromptValidator, PROMPT_REQUEST_SCHEMA,
+    MISSING_DATA, INVALID_PROMPT, DATA_TOO_LARGE, FIELD_ABSENT, FIELD_BLANK, FIELD_WRONG_TYPE
+)
+
+CHOICES = {
+    "situation": {"Commercial Auto"},
+    "level": {"Structure"},
+    "file_type": {"Summary Report"}
+}
+
+VALID_PAYLOAD = {
+    "situation": "Commercial Auto",
+    "level": "Structure",
+    "file_type": "Summary Report",
+    "data": "Claim notes"
+}
+
+class TestCompiledValidator:
+    """Test cases for the schema-compiled request validator."""
+
+    @pytest.fixture
+    def validator(self):
+        return CompiledValidator(PROMPT_REQUEST_SCHEMA, CHOICES, max_length=20)
+
+    def test_valid_payloads(self, validator):
+        """Test valid payloads, including empty and null data."""
+        assert validator.validate(VALID_PAYLOAD) is None
+        assert validator.validate(dict(VALID_PAYLOAD, data="")) is None
+        assert validator.validate(dict(VALID_PAYLOAD, data=None)) is None
+
+    @pytest.mark.parametrize("payload, expected", [
+        ([], (MISSING_DATA, "")),
+        ({"situation": "Commercial Auto"}, (MISSING_DATA, "level")),
+        (dict(VALID_PAYLOAD, level=None), (MISSING_DATA, "level")),
+        (dict(VALID_PAYLOAD, level=5), (MISSING_DATA, "level")),
+        (dict(VALID_PAYLOAD, file_type="   "), (MISSING_DATA, "file_type")),
+        (dict(VALID_PAYLOAD, data=7), (MISSING_DATA, "data")),
+        (dict(VALID_PAYLOAD, situation="Unknown"), (INVALID_PROMPT, "situation")),
+        (dict(VALID_PAYLOAD, data="x" * 21), (DATA_TOO_LARGE, "data"))
+    ])
+    def test_failures(self, validator, payload, expected):
+        """Test each failure is reported with its message and field."""
+        assert validator.validate(payload) == expected
+
+    def test_missing_data_takes_precedence(self, validator):
+        """Test a structural error later in the payload wins over an unknown value."""
+        payload = {"situation": "Unknown", "level": "Structure", "file_type": "Summary Report"}
+        assert validator.validate(payload) == (MISSING_DATA, "data")
+
+    def test_choices_can_be_skipped(self, validator):
+        """Test structure-only validation ignores allowed values."""
+        assert validator.validate(dict(VALID_PAYLOAD, situation="Unknown"), check_choices=False) is None
+
+    def test_unlimited_length(self):
+        """Test a zero length cap disables the check."""
+        validator = CompiledValidator(PROMPT_REQUEST_SCHEMA, CHOICES, max_length=0)
+        assert validator.validate(dict(VALID_PAYLOAD, data="x" * 100000)) is None
+
+    def test_validate_all(self, validator):
+        """Test every failure is reported, structural ones on their own."""
+        assert validator.validate_all({"situation": "Commercial Auto", "level": 5}) == ([
+            (FIELD_WRONG_TYPE, "level"), (FIELD_ABSENT, "file_type"), (FIELD_ABSENT, "data")
+        ], {})
+        failures, sanitized = validator.validate_all(dict(VALID_PAYLOAD, situation="Unknown", level=" ",
+                                                          data="x" * 21))
+        assert failures == [(INVALID_PROMPT, "situation"), (FIELD_BLANK, "level"), (DATA_TOO_LARGE, "data")]
+        assert sanitized == {"file_type": "Summary Report"}
+        assert validator.validate_all(dict(VALID_PAYLOAD, data=" " + "x" * 30), truncate=True)[1]["data"] == "x" * 20
+
+    def test_prompt_validator_collects_errors(self):
+        """Test PromptValidator rejects null data and reports every failure."""
+        result = PromptValidator.validate_prompt_request({"situation": "Commercial Auto", "level": 5})
+        assert result == {'is_valid': False, 'sanitized_data': {}, 'errors': [
+            "Field level must be of type str", "Missing required field: file_type", "Missing required field: data"
+        ]}
+
+        result = PromptValidator.validate_prompt_request(dict(VALID_PAYLOAD, data=None))
+        assert result['errors'] == ["Field data must be of type str"]
+
+        result = PromptValidator.validate_prompt_request(dict(VALID_PAYLOAD, situation=" ", level="", data=" x "))
+        assert result == {'is_valid': False,
+                          'errors': ["Field situation cannot be empty", "Field level cannot be empty"],
+                          'sanitized_data': {"file_type": "Summary Report", "data": "x"}}
+
+    def test_prompt_validator_truncates_long_data(self):
+        """Test PromptValidator keeps truncating data past MAX_DATA_LENGTH instead of rejecting it."""
+        result = PromptValidator.validate_prompt_request(dict(VALID_PAYLOAD, data="x" * 20000))
+        assert result['is_valid']
+        assert len(result['sanitized_data']['data']) == PromptValidator.MAX_DATA_LENGTH
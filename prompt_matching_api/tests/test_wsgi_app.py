@@ -0,0 +1,61 @@
+import json
+import pytest
+from werkzeug.test import Client
+from app import create_app, create_fast_app
+from src.servers.wsgi_app import PromptMatchingWSGIApp
+
+VALID_PAYLOAD = {
+    "situation": "Workers Compensation",
+    "level": "Structure",
+    "file_type": "Medical Records",
+    "data": "Medical data"
+}
+
+@pytest.fixture
+def clients():
+    """Create test clients for the Flask app and the WSGI fast path."""
+    return create_app().test_client(), Client(create_fast_app())
+
+class TestWSGIFastPath:
+    """Parity test cases for the Flask-free WSGI app."""
+
+    @pytest.mark.parametrize("body, content_type", [
+        (json.dumps(VALID_PAYLOAD), "application/json"),
+        (json.dumps(VALID_PAYLOAD), "application/json; charset=utf-8"),
+        (json.dumps(VALID_PAYLOAD), "application/vnd.api+json"),
+        ("{broken", "application/json"),
+        ("", "application/json"),
+        ("null", "application/json"),
+        ("[1, 2]", "application/json"),
+        (json.dumps(dict(VALID_PAYLOAD, data=None)), "application/json"),
+        (json.dumps(VALID_PAYLOAD), "text/plain")
+    ])
+    def test_match_parity(self, clients, body, content_type):
+        """Test both apps return identical status codes and bodies."""
+        flask_client, wsgi_client = clients
+        flask_response = flask_client.post('/api/match-prompt', data=body, content_type=content_type)
+        wsgi_response = wsgi_client.post('/api/match-prompt', data=body, content_type=content_type)
+        assert wsgi_response.status_code == flask_response.status_code
+        assert json.loads(wsgi_response.data) == json.loads(flask_response.data)
+
+    @pytest.mark.parametrize("method, path", [
+        ("GET", "/health"),
+        ("GET", "/missing"),
+        ("DELETE", "/api/match-prompt")
+    ])
+    def test_route_parity(self, clients, method, path):
+        """Test health, 404 and 405 responses match."""
+        flask_client, wsgi_client = clients
+        flask_response = flask_client.open(path, method=method)
+        wsgi_response = wsgi_client.open(path, method=method)
+        assert wsgi_response.status_code == flask_response.status_code
+        assert json.loads(wsgi_response.data) == json.loads(flask_response.data)
+
+    def test_body_size_cap(self):
+        """Test bodies over the cap are rejected before being read."""
+        create_fast_app()
+        client = Client(PromptMatchingWSGIApp(max_body_bytes=128))
+        response = client.post('/api/match-prompt', json=dict(VALID_PAYLOAD, data="x" * 200))
+        assert response.status_code == 413
+        assert json.loads(response.data)['error'] == 'Request body too large'
+        assert client.post('/api/match-prompt', json=dict(VALID_PAYLOAD, data="")).status_code == 200